@@ -2,6 +2,8 @@
 """
 from __future__ import annotations
 
+import os
+import tempfile
 import time
 from collections import defaultdict
 from typing import TYPE_CHECKING
@@ -13,7 +15,28 @@ from aizynthfinder.analysis import (
     RouteSelectionArguments,
     TreeAnalysis,
 )
-from aizynthfinder.chem import FixedRetroReaction, Molecule, TreeMolecule
+from aizynthfinder.chem import (
+    BinaryTreeReader,
+    FixedRetroReaction,
+    Molecule,
+    TreeMolecule,
+)
+from aizynthfinder.chem.fingerprints import (
+    configure_fingerprint_service,
+    fingerprint_statistics,
+    reset_fingerprint_service,
+)
+from aizynthfinder.chem.mol import set_identity_mode
+from aizynthfinder.chem.molecule_pool import (
+    configure_molecule_pool,
+    molecule_pool,
+    reset_molecule_pool,
+)
+from aizynthfinder.chem.template_cache import (
+    compiled_templates_statistics,
+    reset_compiled_templates_statistics,
+    set_compiled_templates_limit,
+)
 from aizynthfinder.context.config import Configuration
 from aizynthfinder.context.policy import BondFilter
 from aizynthfinder.context.scoring import BrokenBondsScorer, CombinedScorer
@@ -27,8 +50,9 @@ from aizynthfinder.utils.loading import load_dynamic_class
 from aizynthfinder.utils.logging import logger
 
 if TYPE_CHECKING:
-    from aizynthfinder.chem import RetroReaction
+    from aizynthfinder.chem import BinaryTreeWriter, RetroReaction
     from aizynthfinder.utils.type_utils import (
+        Any,
         Callable,
         Dict,
         List,
@@ -146,38 +170,88 @@ class AiZynthFinder:
             ),
         }
         stats.update(self.analysis.tree_statistics())
+        stats["expansion_cache"] = self.search_stats.get("expansion_cache", {})
+        stats["template_cache"] = self.search_stats.get("template_cache", {})
+        stats["molecule_pool"] = self.search_stats.get("molecule_pool", {})
+        stats["fingerprints"] = self.search_stats.get("fingerprints", {})
         return stats
 
+    def load_snapshot(self, filename: str) -> None:
+        """
+        Load a snapshot saved with `save_snapshot`, i.e. set the target molecule
+        and restore the search tree, the statistics of the search and the
+        caches of the expansion and filter policies.
+
+        The search can then be continued by calling `tree_search` with
+        `continue_search` set to True. The configuration, e.g. the search algorithm
+        and the policies, should be the same as when the snapshot was saved.
+
+        :param filename: the path to the snapshot file
+        :raises ValueError: if the file is not a snapshot or if the search algorithm cannot load it
+        """
+        reader = BinaryTreeReader(filename)
+        snapshot = reader.metadata.get("snapshot")
+        if snapshot is None:
+            raise ValueError(f"{filename} does not contain a snapshot of a search")
+        tree_class = self._search_tree_class()
+        if not hasattr(tree_class, "from_binary"):
+            raise ValueError(
+                f"Cannot load a snapshot with the {self.config.search.algorithm} algorithm"
+            )
+
+        self.target_smiles = snapshot["target"]
+        self._prepare_target()
+        self.tree = tree_class.from_binary(reader, self.config)
+        self._reset_search()
+        self.expansion_policy.restore_cache(
+            self._read_cache_table(reader, "expansion_cache")
+        )
+        self.filter_policy.restore_cache(self._read_cache_table(reader, "filter_cache"))
+        self.search_stats = snapshot["search_stats"]
+
     def prepare_tree(self) -> None:
         """
         Setup the tree for searching
 
         :raises ValueError: if the target molecule was not set
         """
-        if not self.target_mol:
-            raise ValueError("No target molecule set")
-
-        try:
-            self.target_mol.sanitize()
-        except MoleculeException:
-            raise ValueError("Target molecule unsanitizable")
-
-        self.stock.reset_exclusion_list()
-        if (
-            self.config.search.exclude_target_from_stock
-            and self.target_mol in self.stock
-        ):
-            self.stock.exclude(self.target_mol)
-            self._logger.debug("Excluding the target compound from the stock")
+        self._prepare_target()
+        self._setup_search_tree()
+        self._reset_search()
 
-        if self.config.search.break_bonds or self.config.search.freeze_bonds:
-            self._setup_focussed_bonds(self.target_mol)
+    def save_snapshot(self, filename: str) -> None:
+        """
+        Save a snapshot of the search, so that it can be continued later,
+        e.g. by another process, after loading it with `load_snapshot`.
+
+        The snapshot is a binary search tree file, see the `serialize` method
+        of the search tree, that in addition contains the target molecule,
+        the statistics of the search and the entries of the caches
+        of the expansion and filter policies. The snapshot is first written to
+        a temporary file that then replaces the file, so that an existing
+        snapshot is never left partially written.
+
+        :param filename: the path to the snapshot file
+        :raises ValueError: if the search tree is not initialized or cannot be saved in a snapshot
+        """
+        if not self.tree:
+            raise ValueError("Search tree not initialized")
+        binary_writer = getattr(self.tree, "binary_writer", None)
+        if binary_writer is None:
+            raise ValueError(
+                f"Cannot save a snapshot of a {self.tree.__class__.__name__} tree"
+            )
 
-        self._setup_search_tree()
-        self.analysis = None
-        self.routes = RouteCollection([])
-        self.filter_policy.reset_cache()
-        self.expansion_policy.reset_cache()
+        fileno, tmp_filename = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp"
+        )
+        os.close(fileno)
+        try:
+            self._write_snapshot(binary_writer(tmp_filename))
+            os.replace(tmp_filename, filename)
+        finally:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
 
     def stock_info(self) -> StrDict:
         """
@@ -197,18 +271,31 @@ class AiZynthFinder:
                     _stock_info[leaf.smiles] = self.stock.availability_list(leaf)
         return _stock_info
 
-    def tree_search(self, show_progress: bool = False) -> float:
+    def tree_search(
+        self, show_progress: bool = False, continue_search: bool = False
+    ) -> float:
         """
         Perform the actual tree search
 
+        If `continue_search` is True, the statistics of the previous search
+        of the tree, e.g. from a loaded snapshot, are updated rather than reset,
+        so that the number of iterations and the search time are the totals of all searches.
+        The time and iteration limits still apply to this search only.
+
         :param show_progress: if True, shows a progress bar
+        :param continue_search: if True, continue the statistics of the previous search
         :return: the time past in seconds
         """
         if not self.tree:
             self.prepare_tree()
         # This is for type checking, prepare_tree is creating it.
         assert self.tree is not None
-        self.search_stats = {"returned_first": False, "iterations": 0}
+        if continue_search and self.search_stats:
+            self.search_stats["returned_first"] = False
+        else:
+            self.search_stats = {"returned_first": False, "iterations": 0}
+        previous_time = self.search_stats.get("time", 0.0)
+        previous_iterations = self.search_stats["iterations"]
 
         time0 = time.time()
         i = 1
@@ -232,8 +319,10 @@ class AiZynthFinder:
                 break
 
             if is_solved and "first_solution_time" not in self.search_stats:
-                self.search_stats["first_solution_time"] = time.time() - time0
-                self.search_stats["first_solution_iteration"] = i
+                self.search_stats["first_solution_time"] = (
+                    previous_time + time.time() - time0
+                )
+                self.search_stats["first_solution_iteration"] = previous_iterations + i
 
             if self.config.search.return_first and is_solved:
                 self._logger.debug("Found first solved route")
@@ -246,7 +335,12 @@ class AiZynthFinder:
             pbar.close()
         time_past = time.time() - time0
         self._logger.debug("Search completed")
-        self.search_stats["time"] = time_past
+        self.search_stats["time"] = previous_time + time_past
+        self.search_stats["expansion_cache"] = self.expansion_policy.cache_statistics()
+        self.search_stats["template_cache"] = compiled_templates_statistics()
+        pool = molecule_pool()
+        self.search_stats["molecule_pool"] = pool.statistics() if pool else {}
+        self.search_stats["fingerprints"] = fingerprint_statistics()
         return time_past
 
     def _setup_focussed_bonds(self, target_mol: Molecule) -> None:
@@ -281,15 +375,100 @@ class AiZynthFinder:
             self.scorers.load(BrokenBondsScorer(self.config))
             self._num_objectives = len(search_rewards)
 
+    def _prepare_target(self) -> None:
+        if not self.target_mol:
+            raise ValueError("No target molecule set")
+
+        set_identity_mode(self.config.search.identity_key)
+
+        try:
+            self.target_mol.sanitize()
+        except MoleculeException:
+            raise ValueError("Target molecule unsanitizable")
+
+        self.stock.reset_exclusion_list()
+        if (
+            self.config.search.exclude_target_from_stock
+            and self.target_mol in self.stock
+        ):
+            self.stock.exclude(self.target_mol)
+            self._logger.debug("Excluding the target compound from the stock")
+
+        if self.config.search.break_bonds or self.config.search.freeze_bonds:
+            self._setup_focussed_bonds(self.target_mol)
+
+    @staticmethod
+    def _read_cache_table(reader: BinaryTreeReader, name: str) -> Dict[str, StrDict]:
+        columns = reader.tables.get(name)
+        entries: Dict[str, StrDict] = defaultdict(dict)
+        if not columns:
+            return entries
+        for idx, (policy, key) in enumerate(
+            zip(columns["policy"].tolist(), columns["key"].tolist())
+        ):
+            if "value" in columns:
+                value: Any = float(columns["value"][idx])
+            else:
+                value = (columns["indices"][idx].copy(), columns["priors"][idx].copy())
+            entries[reader.string(policy)][reader.string(key)] = value
+        return entries
+
+    def _write_snapshot(self, writer: BinaryTreeWriter) -> None:
+        writer.metadata["snapshot"] = {
+            "target": self.target_smiles,
+            "search_stats": self.search_stats,
+        }
+        writer.add_table(
+            "expansion_cache",
+            {"policy": "<i4", "key": "<i4", "indices": "<i8[]", "priors": "<f8[]"},
+        )
+        for policy, entries in self.expansion_policy.cache_entries().items():
+            for key, (indices, priors) in entries.items():
+                writer.add_row(
+                    "expansion_cache",
+                    {
+                        "policy": writer.string(policy),
+                        "key": writer.string(key),
+                        "indices": indices,
+                        "priors": priors,
+                    },
+                )
+        writer.add_table("filter_cache", {"policy": "<i4", "key": "<i4", "value": "<f8"})
+        for policy, entries in self.filter_policy.cache_entries().items():
+            for key, value in entries.items():
+                writer.add_row(
+                    "filter_cache",
+                    {
+                        "policy": writer.string(policy),
+                        "key": writer.string(key),
+                        "value": value,
+                    },
+                )
+        writer.close()
+
+    def _reset_search(self) -> None:
+        self.analysis = None
+        self.routes = RouteCollection([])
+        self.filter_policy.reset_cache()
+        self.expansion_policy.reset_cache()
+        set_compiled_templates_limit(self.config.search.template_cache_size)
+        reset_compiled_templates_statistics()
+        configure_molecule_pool(
+            self.config.search.molecule_pool, self.config.search.molecule_pool_size
+        )
+        reset_molecule_pool(clear=not self.config.search.persistent_molecule_pool)
+        configure_fingerprint_service(self.config.search.fingerprint_cache_size)
+        reset_fingerprint_service()
+
+    def _search_tree_class(self) -> Any:
+        if self.config.search.algorithm.lower() == "mcts":
+            return MctsSearchTree
+        return load_dynamic_class(self.config.search.algorithm)
+
     def _setup_search_tree(self) -> None:
         self._logger.debug(f"Defining tree root:  {self.target_smiles}")
-        if self.config.search.algorithm.lower() == "mcts":
-            self.tree = MctsSearchTree(
-                root_smiles=self.target_smiles, config=self.config
-            )
-        else:
-            cls = load_dynamic_class(self.config.search.algorithm)
-            self.tree = cls(root_smiles=self.target_smiles, config=self.config)
+        cls = self._search_tree_class()
+        self.tree = cls(root_smiles=self.target_smiles, config=self.config)
 
     def _setup_analysis(
         self,
@@ -333,7 +512,11 @@ class AiZynthFinder:
                 )
             ]
 
-        return TreeAnalysis(self.tree, scorers)
+        return TreeAnalysis(
+            self.tree,
+            scorers,
+            max_routes=self.config.post_processing.max_extracted_routes,
+        )
 
 
 class AiZynthExpander:
@@ -3,6 +3,7 @@
 
 from __future__ import annotations
 
+import itertools
 import operator
 from collections import defaultdict
 from typing import TYPE_CHECKING
@@ -46,17 +47,22 @@ class TreeAnalysis:
 
     :ivar scorers: the objects used to score the nodes
     :ivar search_tree: the search tree
+    :ivar max_routes: the maximum number of routes extracted from an AND/OR tree
 
     :param search_tree: the search tree to do the analysis on
     :param scorer: the object used to score the nodes, defaults to StateScorer
+    :param max_routes: the maximum number of routes extracted from an AND/OR tree, if not given all routes are extracted
     """
 
     def __init__(
         self,
         search_tree: Union[MctsSearchTree, AndOrSearchTreeBase],
         scorer: Optional[Union[Scorer, List[Scorer]]] = None,
+        max_routes: Optional[int] = None,
     ) -> None:
         self.search_tree = search_tree
+        self.max_routes = max_routes
+        self._routes: Optional[List[ReactionTree]] = None
         scorer = scorer or StateScorer(search_tree.config)
         if isinstance(scorer, list):
             self.scorers: List[Scorer] = scorer
@@ -81,7 +87,7 @@ class TreeAnalysis:
             sorted_nodes, _, _ = self.scorers[0].sort(nodes)
             return sorted_nodes[0]
 
-        sorted_routes, _, _ = self.scorers[0].sort(self.search_tree.routes())
+        sorted_routes, _, _ = self.scorers[0].sort(self._andor_routes())
         return sorted_routes[0]
 
     def pareto_front(self) -> Tuple[_Solution, ...]:
@@ -97,7 +103,7 @@ class TreeAnalysis:
         if isinstance(self.search_tree, MctsSearchTree):
             solutions = self.search_tree.nodes()
         else:
-            solutions = self.search_tree.routes()  # type: ignore
+            solutions = self._andor_routes()  # type: ignore
 
         scores_arr = np.array(
             [[scorer(solution) for scorer in self.scorers] for solution in solutions]
@@ -134,7 +140,7 @@ class TreeAnalysis:
             actions = [node.actions_to() for node in sorted_items]
 
         else:
-            sorted_items, sorted_scores, _ = scorer.sort(self.search_tree.routes())
+            sorted_items, sorted_scores, _ = scorer.sort(self._andor_routes())
             actions = [route.reactions() for route in sorted_items]
 
         scores = [{repr(scorer): score} for score in sorted_scores]
@@ -157,6 +163,20 @@ class TreeAnalysis:
             return self._tree_statistics_mcts()
         return self._tree_statistics_andor()
 
+    def _andor_routes(self) -> List[ReactionTree]:
+        """
+        Return the routes of an AND/OR tree. If `max_routes` is set, the
+        extraction of routes stops when that many routes have been extracted.
+        """
+        assert isinstance(self.search_tree, AndOrSearchTreeBase)
+        if self.max_routes is None:
+            return self.search_tree.routes()
+        if self._routes is None:
+            self._routes = list(
+                itertools.islice(self.search_tree.iter_routes(), self.max_routes)
+            )
+        return self._routes
+
     def _all_nodes(self) -> Sequence[MctsNode]:
         assert isinstance(self.search_tree, MctsSearchTree)
         # This is to keep backwards compatibility, this should be investigate further
@@ -171,7 +191,7 @@ class TreeAnalysis:
         if isinstance(self.search_tree, MctsSearchTree):
             solutions = self._all_nodes()
         else:
-            solutions = self.search_tree.routes()  # type: ignore
+            solutions = self._andor_routes()  # type: ignore
 
         scores_arr = np.array(
             [[scorer(solution) for scorer in self.scorers] for solution in solutions]
@@ -215,7 +235,7 @@ class TreeAnalysis:
             ", ".join(mol.smiles for mol in route.leafs() if not route.in_stock(mol))  # type: ignore
             for route in top_routes
         )
-        all_routes = self.search_tree.routes()
+        all_routes = self._andor_routes()
         policy_used_counts = self._policy_used_statistics(
             [reaction for route in all_routes for reaction in route.reactions()]
         )
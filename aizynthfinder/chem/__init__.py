@@ -15,8 +15,11 @@ from aizynthfinder.chem.reaction import (
     hash_reactions,
 )
 from aizynthfinder.chem.serialization import (
+    BinaryTreeReader,
+    BinaryTreeWriter,
     MoleculeDeserializer,
     MoleculeSerializer,
     deserialize_action,
+    is_binary_tree_file,
     serialize_action,
 )
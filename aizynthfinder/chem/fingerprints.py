@@ -0,0 +1,192 @@
+""" Module containing a process-wide service that computes and caches Morgan fingerprints
+"""
+from __future__ import annotations
+
+import functools
+import threading
+from typing import TYPE_CHECKING
+
+import numpy as np
+from rdkit.Chem import rdFingerprintGenerator
+
+from aizynthfinder.utils.cache import LruCache
+
+if TYPE_CHECKING:
+    from aizynthfinder.chem.mol import Molecule
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        List,
+        Optional,
+        RdMol,
+        Sequence,
+        StrDict,
+    )
+
+DEFAULT_MAX_ENTRIES = 100000
+DEFAULT_NBITS = 2048
+
+_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _morgan_generator(radius: int, nbits: int, chiral: bool) -> Any:
+    return rdFingerprintGenerator.GetMorganGenerator(
+        radius=radius, fpSize=nbits, includeChirality=chiral
+    )
+
+
+def morgan_fingerprints(
+    rd_mols: Sequence[RdMol],
+    radius: int,
+    nbits: int = DEFAULT_NBITS,
+    chiral: bool = False,
+) -> np.ndarray:
+    """
+    Compute the Morgan fingerprints of a number of RDKit molecules in one pass,
+    without caching them.
+
+    :param rd_mols: the sanitized RDKit molecules
+    :param radius: the radius of the fingerprint
+    :param nbits: the length of the fingerprint
+    :param chiral: if True, include chirality information
+    :return: the fingerprints as the rows of a float32 matrix
+    """
+    generator = _morgan_generator(radius, nbits, chiral)
+    matrix = np.zeros((len(rd_mols), nbits), dtype=np.float32)
+    for row, rd_mol in zip(matrix, rd_mols):
+        row[:] = generator.GetFingerprintAsNumPy(rd_mol)
+    return matrix
+
+
+class FingerprintService(LruCache):
+    """
+    A bounded cache of the Morgan fingerprints of compounds, keyed by the
+    SMILES and the parameters of the fingerprint.
+
+    The fingerprints are computed for a batch of molecules at once and
+    are returned as the rows of a C-contiguous float32 matrix, which can be
+    given to the models of the policies without copying. The cache
+    stores them as packed bits, i.e. one bit per bit of the fingerprint.
+
+    Use `fingerprint_service` to get the service of this process.
+
+    .. code-block::
+
+        matrix = fingerprint_service().fingerprints(mols, radius=2, nbits=2048)
+
+    :param max_entries: the maximum number of cached fingerprints
+    """
+
+    def __init__(self, max_entries: Optional[int] = DEFAULT_MAX_ENTRIES) -> None:
+        super().__init__(max_entries, sizeof=lambda value: value.nbytes)
+
+    def fingerprints(
+        self,
+        mols: Sequence[Molecule],
+        radius: int,
+        nbits: Optional[int] = DEFAULT_NBITS,
+        chiral: bool = False,
+    ) -> np.ndarray:
+        """
+        Return the Morgan fingerprints of a number of molecules. The
+        fingerprints that are not cached are computed in one pass,
+        which will cause these molecules to be sanitized.
+
+        :param mols: the molecules
+        :param radius: the radius of the fingerprint
+        :param nbits: the length of the fingerprint, None means the default length
+        :param chiral: if True, include chirality information
+        :return: the fingerprints as the rows of a float32 matrix
+        """
+        nbits = nbits or DEFAULT_NBITS
+        matrix = np.zeros((len(mols), nbits), dtype=np.float32)
+        keys = [(mol.smiles, radius, nbits, chiral) for mol in mols]
+        missing: List[int] = []
+        with _LOCK:
+            for idx, key in enumerate(keys):
+                packed = self.get(key)
+                if packed is None:
+                    missing.append(idx)
+                else:
+                    matrix[idx] = np.unpackbits(packed, count=nbits)
+        if not missing:
+            return matrix
+
+        generator = _morgan_generator(radius, nbits, chiral)
+        computed = {}
+        for idx in missing:
+            mol = mols[idx]
+            mol.sanitize()
+            bits = generator.GetFingerprintAsNumPy(mol.rd_mol)
+            matrix[idx] = bits
+            computed[keys[idx]] = np.packbits(bits)
+        with _LOCK:
+            for key, packed in computed.items():
+                self[key] = packed
+        return matrix
+
+    def fingerprint(
+        self,
+        mol: Molecule,
+        radius: int,
+        nbits: Optional[int] = DEFAULT_NBITS,
+        chiral: bool = False,
+    ) -> np.ndarray:
+        """
+        Return the Morgan fingerprint of a single molecule
+
+        :param mol: the molecule
+        :param radius: the radius of the fingerprint
+        :param nbits: the length of the fingerprint, None means the default length
+        :param chiral: if True, include chirality information
+        :return: the fingerprint as a float32 vector
+        """
+        return self.fingerprints([mol], radius, nbits, chiral)[0]
+
+
+_SERVICE = FingerprintService()
+
+
+def fingerprint_service() -> FingerprintService:
+    """
+    Return the fingerprint service of this process
+
+    :return: the service
+    """
+    return _SERVICE
+
+
+def configure_fingerprint_service(
+    max_entries: Optional[int] = DEFAULT_MAX_ENTRIES,
+) -> None:
+    """
+    Set the maximum number of fingerprints cached by the service of
+    this process, the cache is pruned if necessary.
+
+    :param max_entries: the maximum number of fingerprints, None means unbounded
+    """
+    with _LOCK:
+        _SERVICE.resize(max_entries)
+
+
+def reset_fingerprint_service(clear: bool = False) -> None:
+    """
+    Reset the statistics of the fingerprint service, and optionally
+    remove all cached fingerprints.
+
+    :param clear: if True, remove all fingerprints
+    """
+    with _LOCK:
+        if clear:
+            _SERVICE.clear()
+        _SERVICE.reset_statistics()
+
+
+def fingerprint_statistics() -> StrDict:
+    """
+    Return the statistics of the fingerprint service of this process
+
+    :return: the statistics
+    """
+    with _LOCK:
+        return _SERVICE.statistics()
@@ -5,13 +5,16 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 import numpy as np
-from rdkit import Chem, DataStructs
+from rdkit import Chem
 from rdkit.Chem import AllChem, Descriptors
 
+from aizynthfinder.chem.fingerprints import fingerprint_service
+from aizynthfinder.chem.molecule_pool import molecule_pool, smiles_atom_order
 from aizynthfinder.utils.bonds import sort_bonds
 from aizynthfinder.utils.exceptions import MoleculeException
 
 if TYPE_CHECKING:
+    from aizynthfinder.chem.molecule_pool import SharedChemistry
     from aizynthfinder.utils.type_utils import (
         Callable,
         Dict,
@@ -20,17 +23,45 @@ if TYPE_CHECKING:
         RdMol,
         Sequence,
         Tuple,
-        Union,
     )
 
+IDENTITY_MODES = ("inchi_key", "smiles")
+_IDENTITY: Dict[str, str] = {"mode": "inchi_key"}
+
+
+def identity_mode() -> str:
+    """
+    Return how molecules are identified, see `set_identity_mode`
+
+    :return: the identity mode
+    """
+    return _IDENTITY["mode"]
+
+
+def set_identity_mode(mode: str) -> None:
+    """
+    Set how molecules are identified when they are hashed and compared,
+    and in the caches of the search. Can be "inchi_key", the default, or "smiles" that
+    uses the canonical SMILES without atom mapping and is cheaper to compute.
+    InChI keys are still computed when they are needed, e.g. by stocks of InChI keys.
+
+    :param mode: the identity mode
+    :raises ValueError: if the mode is not recognized
+    """
+    if mode not in IDENTITY_MODES:
+        raise ValueError(
+            f"Unknown identity mode '{mode}', should be one of {', '.join(IDENTITY_MODES)}"
+        )
+    _IDENTITY["mode"] = mode
+
 
 class Molecule:
     """
     A base class for molecules. Encapsulate an RDKit mol object and
     functions that can be applied to such a molecule.
 
-    The objects of this class is hashable by the inchi key and hence
-    comparable with the equality operator.
+    The objects of this class is hashable by the identity key, by default the inchi key,
+    and hence comparable with the equality operator.
 
     :ivar rd_mol: the RDkit mol object that is encapsulated
     :ivar smiles: the SMILES representation of the molecule
@@ -61,7 +92,9 @@ class Molecule:
 
         self._inchi_key: Optional[str] = None
         self._inchi: Optional[str] = None
-        self._fingerprints: Dict[Union[Tuple[int, int], Tuple[int]], np.ndarray] = {}
+        self._smiles_key: Optional[str] = None
+        self._shared: Optional[SharedChemistry] = None
+        self._fingerprints: Dict[Tuple[int, Optional[int], bool], np.ndarray] = {}
         self._is_sanitized: bool = False
 
         # Atom mapping -> atom index dictionary
@@ -73,12 +106,12 @@ class Molecule:
             self.sanitize()
 
     def __hash__(self) -> int:
-        return hash(self.inchi_key)
+        return hash(self.identity_key)
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Molecule):
             return False
-        return self.inchi_key == other.inchi_key
+        return self.identity_key == other.identity_key
 
     def __len__(self) -> int:
         return self.rd_mol.GetNumAtoms()
@@ -86,6 +119,28 @@ class Molecule:
     def __str__(self) -> str:
         return self.smiles
 
+    @property
+    def identity_key(self) -> str:
+        """
+        The key that identifies the molecule, depending on the mode set by `set_identity_mode`
+        either the inchi key or the canonical SMILES without atom mapping.
+        Will cause the molecule to be sanitized.
+
+        :return: the key
+        """
+        if _IDENTITY["mode"] == "inchi_key":
+            return self.inchi_key
+        if not self._smiles_key:
+            self.sanitize(raise_exception=False)
+            if self.has_atom_mapping():
+                rd_mol = Chem.Mol(self.rd_mol)
+                for atom in rd_mol.GetAtoms():
+                    atom.SetAtomMapNum(0)
+                self._smiles_key = Chem.MolToSmiles(rd_mol)
+            else:
+                self._smiles_key = self.smiles
+        return self._smiles_key
+
     @property
     def inchi(self) -> str:
         """
@@ -110,8 +165,11 @@ class Molecule:
         :return: the inchi key
         """
         if not self._inchi_key:
-            self.sanitize(raise_exception=False)
-            self._inchi_key = Chem.MolToInchiKey(self.rd_mol)
+            if self._shared is not None:
+                self._inchi_key = self._shared.inchi_key
+            else:
+                self.sanitize(raise_exception=False)
+                self._inchi_key = Chem.MolToInchiKey(self.rd_mol)
             if self._inchi_key is None:
                 raise MoleculeException("Could not make InChI key")
         return self._inchi_key
@@ -153,26 +211,25 @@ class Molecule:
         return self.inchi_key[:14] == other.inchi_key[:14]
 
     def fingerprint(
-        self, radius: int, nbits: int = 2048, chiral: bool = False
+        self, radius: int, nbits: Optional[int] = 2048, chiral: bool = False
     ) -> np.ndarray:
         """
         Returns the Morgan fingerprint of the molecule
 
+        The fingerprint is computed by the fingerprint service and is read-only,
+        because it is shared with other molecules of the same compound.
+
         :param radius: the radius of the fingerprint
         :param nbits: the length of the fingerprint
         :param chiral: if True, include chirality information
-        :return: the fingerprint
+        :return: the fingerprint as a float32 vector
         """
-        key = radius, nbits
+        key = radius, nbits, chiral
 
         if key not in self._fingerprints:
-            self.sanitize()
-            bitvect = AllChem.GetMorganFingerprintAsBitVect(
-                self.rd_mol, *key, useChirality=chiral
-            )
-            array = np.zeros((1,))
-            DataStructs.ConvertToNumpyArray(bitvect, array)
-            self._fingerprints[key] = array
+            fingerprint = fingerprint_service().fingerprint(self, radius, nbits, chiral)
+            fingerprint.flags.writeable = False
+            self._fingerprints[key] = fingerprint
 
         return self._fingerprints[key]
 
@@ -233,9 +290,33 @@ class Molecule:
         self._clear_cache()
         self._is_sanitized = True
 
+    def share_chemistry(self, shared: SharedChemistry) -> None:
+        """
+        Use the sanitized RDKit molecule, the InChI key and the fingerprints
+        of another molecule of the same compound, see `MoleculePool`
+
+        The RDKit molecule is only shared if its atoms are in the same order,
+        because the atoms of a tree molecule are matched by index to those of the
+        atom-mapped molecule when templates are applied. The order is compared
+        by the order of the atoms in the canonical SMILES of the molecules.
+
+        :param shared: the chemistry of the compound
+        """
+        if (
+            shared.rd_mol is not self.rd_mol
+            and shared.atom_order is not None
+            and shared.atom_order == smiles_atom_order(self.rd_mol)
+        ):
+            self.rd_mol = shared.rd_mol
+        self._shared = shared
+        self._fingerprints = shared.fingerprints
+        self._is_sanitized = True
+
     def _clear_cache(self):
         self._inchi = None
         self._inchi_key = None
+        self._smiles_key = None
+        self._shared = None
         self._fingerprints = {}
         self._atom_mappings = {}
         self._reverse_atom_mappings = {}
@@ -296,6 +377,9 @@ class TreeMolecule(Molecule):
 
         if self.parent:
             self.remove_atom_mapping()
+            pool = molecule_pool()
+            if pool is not None and self._is_sanitized:
+                pool.intern(self)
 
     @property
     def mapping_to_index(self) -> Dict[int, int]:
@@ -0,0 +1,157 @@
+""" Module containing a process-wide pool of the chemistry shared by molecules of the same compound
+"""
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING
+
+import numpy as np
+from rdkit import Chem
+
+from aizynthfinder.utils.cache import LruCache
+
+if TYPE_CHECKING:
+    from aizynthfinder.chem.mol import Molecule
+    from aizynthfinder.utils.type_utils import (
+        Dict,
+        Optional,
+        RdMol,
+        StrDict,
+        Tuple,
+    )
+
+DEFAULT_MAX_ENTRIES = 100000
+
+_LOCK = threading.Lock()
+_SETTINGS: StrDict = {"enabled": False, "max_entries": DEFAULT_MAX_ENTRIES}
+
+
+def smiles_atom_order(rd_mol: RdMol) -> Optional[str]:
+    """
+    Return the order of the atoms in the SMILES last created from a molecule.
+    Two molecules with the same canonical SMILES have their atoms in the same order
+    if this order is the same.
+
+    :param rd_mol: the RDKit molecule
+    :return: the order of the atoms, or None if no SMILES has been created
+    """
+    if not rd_mol.HasProp("_smilesAtomOutputOrder"):
+        return None
+    return rd_mol.GetProp("_smilesAtomOutputOrder")
+
+
+class SharedChemistry:
+    """
+    The immutable chemistry of a compound that is shared between all
+    molecule objects of that compound, i.e. the sanitized RDKit molecule
+    without atom mapping, the InChI key and the fingerprints.
+
+    :ivar rd_mol: the sanitized RDKit molecule
+    :ivar atom_order: the order of the atoms of the molecule in its canonical SMILES,
+        None if the SMILES has not been created from the molecule
+    :ivar fingerprints: the fingerprints computed so far, shared by the molecules
+
+    :param rd_mol: the sanitized RDKit molecule
+    """
+
+    __slots__ = ("rd_mol", "atom_order", "_inchi_key", "fingerprints")
+
+    def __init__(self, rd_mol: RdMol) -> None:
+        self.rd_mol = rd_mol
+        self.atom_order = smiles_atom_order(rd_mol)
+        self._inchi_key: Optional[str] = None
+        self.fingerprints: Dict[Tuple[int, Optional[int], bool], np.ndarray] = {}
+
+    @property
+    def inchi_key(self) -> str:
+        """
+        The InChI key of the compound, created by lazy evaluation
+
+        :return: the InChI key
+        """
+        if not self._inchi_key:
+            self._inchi_key = Chem.MolToInchiKey(self.rd_mol)
+        return self._inchi_key
+
+
+class MoleculePool(LruCache):
+    """
+    A bounded pool of the chemistry of compounds, keyed by the
+    canonical SMILES.
+
+    When a molecule is interned, the chemistry of a previous
+    molecule of the same compound is re-used, so that the InChI key is only
+    computed once per compound, when it is first needed, and the fingerprints
+    are shared. The atom mapping and the parent of the molecule are not shared,
+    and the RDKit molecule is only shared by molecules with the same atom order.
+
+    Use `molecule_pool` to get the pool of this process. It is only
+    used when enabled with `configure_molecule_pool`.
+
+    :param max_entries: the maximum number of compounds in the pool
+    """
+
+    def __init__(self, max_entries: Optional[int] = DEFAULT_MAX_ENTRIES) -> None:
+        super().__init__(max_entries, sizeof=lambda _: 0)
+
+    def intern(self, mol: Molecule) -> None:
+        """
+        Share the chemistry of a sanitized molecule with the other
+        molecules of the same compound
+
+        :param mol: the molecule
+        """
+        with _LOCK:
+            shared = self.get(mol.smiles)
+            if shared is None:
+                shared = SharedChemistry(mol.rd_mol)
+                self[mol.smiles] = shared
+        mol.share_chemistry(shared)
+
+    def statistics(self) -> StrDict:
+        stats = super().statistics()
+        del stats["bytes"]
+        return stats
+
+
+_POOL = MoleculePool()
+
+
+def configure_molecule_pool(
+    enabled: bool, max_entries: Optional[int] = DEFAULT_MAX_ENTRIES
+) -> None:
+    """
+    Enable or disable the pool of molecules of this process and
+    set the maximum number of compounds in it, the pool is pruned if necessary.
+
+    :param enabled: if True, molecules created in reactions are interned
+    :param max_entries: the maximum number of compounds, None means unbounded
+    """
+    _SETTINGS["enabled"] = enabled
+    _SETTINGS["max_entries"] = max_entries
+    with _LOCK:
+        _POOL.resize(max_entries)
+
+
+def molecule_pool() -> Optional[MoleculePool]:
+    """
+    Return the pool of molecules of this process if it is enabled
+
+    :return: the pool or None
+    """
+    if not _SETTINGS["enabled"]:
+        return None
+    return _POOL
+
+
+def reset_molecule_pool(clear: bool = True) -> None:
+    """
+    Reset the statistics of the pool of molecules, and optionally
+    remove all compounds from it
+
+    :param clear: if True, remove all compounds
+    """
+    with _LOCK:
+        if clear:
+            _POOL.clear()
+        _POOL.reset_statistics()
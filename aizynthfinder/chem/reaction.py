@@ -26,6 +26,7 @@ from aizynthfinder.chem.mol import (
     MoleculeException,
     TreeMolecule,
 )
+from aizynthfinder.chem.template_cache import compiled_templates
 from aizynthfinder.utils.logging import logger
 
 if TYPE_CHECKING:
@@ -35,7 +36,9 @@ if TYPE_CHECKING:
         Iterable,
         List,
         Optional,
+        RdMol,
         RdReaction,
+        Sequence,
         Set,
         StrDict,
         Tuple,
@@ -183,7 +186,7 @@ class RetroReaction(abc.ABC, _ReactionInterfaceMixin):
 
         :return: the products of the reaction
         """
-        if not self._reactants:
+        if self._reactants is None:
             self._reactants = self._apply()
         return self._reactants
 
@@ -208,19 +211,28 @@ class RetroReaction(abc.ABC, _ReactionInterfaceMixin):
         """
         return self._reactants is None
 
-    def copy(self, index: Optional[int] = None) -> "RetroReaction":
+    def copy(
+        self, index: Optional[int] = None, mol: Optional[TreeMolecule] = None
+    ) -> "RetroReaction":
         """
         Shallow copy of this instance.
 
+        If a molecule is given, the copy is a reaction on that molecule instead,
+        and the reactants are not copied.
+
         :param index: new index, defaults to None
+        :param mol: new molecule, defaults to None
         :return: the copy
         """
         # pylint: disable=protected-access
         index = index if index is not None else self.index
         new_reaction = self.__class__(
-            self.mol, index, dict(self.metadata), **self._kwargs
+            mol or self.mol, index, self.metadata.copy(), **self._kwargs
         )
-        new_reaction._reactants = tuple(mol_list for mol_list in self._reactants or [])
+        if mol is not None:
+            return new_reaction
+        if self._reactants is not None:
+            new_reaction._reactants = tuple(mol_list for mol_list in self._reactants)
         new_reaction._smiles = self._smiles
         return new_reaction
 
@@ -324,24 +336,27 @@ class TemplatedRetroReaction(RetroReaction):
         Apply a reactions smarts to a molecule and return the products (reactants for retro templates)
         Will try to sanitize the reactants, and if that fails it will not return that molecule
         """
-        reaction = rdc.rdchiralReaction(self.smarts)
-        rct = _RdChiralProductWrapper(self.mol)
-        try:
-            reactants = rdc.rdchiralRun(reaction, rct, keep_mapnums=True)
-        except RuntimeError as err:
-            logger().debug(
-                f"Runtime error in RDChiral with template {self.smarts} on {self.mol.smiles}\n{err}"
-            )
-            reactants = []
-        except KeyError as err:
-            logger().debug(
-                f"Index error in RDChiral with template {self.smarts} on {self.mol.mapped_smiles}\n{err}"
-            )
-            reactants = []
+        self.mol.sanitize()
+        outcomes = run_rdchiral_templates([self.smarts], RdChiralProduct(self.mol))
+        return self.set_reactants_from_smiles(outcomes[0])
 
+    def set_reactants_from_smiles(
+        self, reactants_smiles: Sequence[str]
+    ) -> Tuple[Tuple[TreeMolecule, ...], ...]:
+        """
+        Set the reactants of the reaction from the outcome of RDChiral, i.e.
+        mapped SMILES strings of the reactants of each outcome.
+
+        This is used when the template has been applied elsewhere, e.g.
+        in another process, see :func:`run_rdchiral_templates`.
+        Outcomes that cannot be sanitized are skipped.
+
+        :param reactants_smiles: the SMILES of the outcomes
+        :return: the reactants of the reaction
+        """
         # Turning rdchiral outcome into rdkit tuple of tuples to maintain compatibility
         outcomes = []
-        for reactant_str in reactants:
+        for reactant_str in reactants_smiles:
             smiles_list = reactant_str.split(".")
             exclude_nums = set(self.mol.mapping_to_index.keys())
             update_func = partial(
@@ -366,7 +381,7 @@ class TemplatedRetroReaction(RetroReaction):
         return self._reactants
 
     def _apply_with_rdkit(self) -> Tuple[Tuple[TreeMolecule, ...], ...]:
-        rxn = AllChem.ReactionFromSmarts(self.smarts)
+        rxn = compiled_templates().rdkit_reaction(self.smarts)
         try:
             reactants_list = rxn.RunReactants([self.mol.mapped_mol])
         except:  # pylint: disable=bare-except
@@ -594,6 +609,81 @@ def hash_reactions(
     return hashlib.sha224(hash_list_str.encode("utf8")).hexdigest()
 
 
+class RdChiralProduct:
+    """
+    A light-weight and picklable representation of a sanitized product
+    molecule, holding the data needed to apply templates with RDChiral.
+
+    It is used to send a molecule to a process pool without
+    serializing the full `TreeMolecule` with its parents.
+
+    :ivar smiles: the SMILES of the molecule
+    :ivar mapped_smiles: the atom-mapped SMILES of the molecule
+    :ivar rd_mol: the RDKit molecule without atom-mapping
+    :ivar mapped_mol: the RDKit molecule with atom-mapping
+
+    :param mol: the molecule to take the data from, should be sanitized
+    """
+
+    __slots__ = ("smiles", "mapped_smiles", "rd_mol", "mapped_mol")
+
+    def __init__(self, mol: TreeMolecule) -> None:
+        self.smiles: str = mol.smiles
+        self.mapped_smiles: str = mol.mapped_smiles
+        self.rd_mol: RdMol = mol.rd_mol
+        self.mapped_mol: RdMol = mol.mapped_mol
+
+    def __getstate__(self) -> Tuple[str, str, bytes, bytes]:
+        return (
+            self.smiles,
+            self.mapped_smiles,
+            self.rd_mol.ToBinary(),
+            self.mapped_mol.ToBinary(),
+        )
+
+    def __setstate__(self, state: Tuple[str, str, bytes, bytes]) -> None:
+        self.smiles, self.mapped_smiles = state[:2]
+        self.rd_mol = Chem.Mol(state[2])
+        self.mapped_mol = Chem.Mol(state[3])
+
+
+def run_rdchiral_templates(
+    smarts_list: Sequence[str], product: RdChiralProduct
+) -> List[List[str]]:
+    """
+    Apply a number of templates to a product molecule with RDChiral and
+    return the mapped SMILES of the reactants of each outcome.
+
+    The RDChiral representation of the product is only setup once,
+    the compiled templates are taken from the cache of the current thread,
+    and the function only deals with strings and a picklable product,
+    so that it can be executed in another process.
+
+    :param smarts_list: the reaction SMARTS of the templates
+    :param product: the product molecule
+    :return: the outcomes of each template, in the same order as the templates
+    """
+    rct = _RdChiralProductWrapper(product)
+    template_cache = compiled_templates()
+    all_outcomes = []
+    for smarts in smarts_list:
+        reaction = template_cache.rdchiral_reaction(smarts)
+        try:
+            reactants = rdc.rdchiralRun(reaction, rct, keep_mapnums=True)
+        except RuntimeError as err:
+            logger().debug(
+                f"Runtime error in RDChiral with template {smarts} on {product.smiles}\n{err}"
+            )
+            reactants = []
+        except KeyError as err:
+            logger().debug(
+                f"Index error in RDChiral with template {smarts} on {product.mapped_smiles}\n{err}"
+            )
+            reactants = []
+        all_outcomes.append(list(reactants))
+    return all_outcomes
+
+
 class _RdChiralProductWrapper:
     """
     Reimplementation of `rdchiralReaction`
@@ -601,8 +691,7 @@ class _RdChiralProductWrapper:
     """
 
     # pylint: disable=W0106,C0103
-    def __init__(self, product: TreeMolecule) -> None:
-        product.sanitize()
+    def __init__(self, product: RdChiralProduct) -> None:
         self.reactant_smiles = product.smiles
 
         # Initialize into RDKit mol
@@ -2,14 +2,130 @@
 """
 from __future__ import annotations
 
+import itertools
+import json
+import struct
+from collections import deque
 from typing import TYPE_CHECKING
 
+import numpy as np
+
 import aizynthfinder.chem
+from aizynthfinder.chem.mol import TreeMolecule
 from aizynthfinder.utils.loading import load_dynamic_class
 
 if TYPE_CHECKING:
-    from aizynthfinder.chem import RetroReaction
-    from aizynthfinder.utils.type_utils import Any, Dict, Optional, Sequence, StrDict
+    from aizynthfinder.chem import Molecule, RetroReaction
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        Callable,
+        Dict,
+        List,
+        Optional,
+        Sequence,
+        StrDict,
+        Union,
+    )
+
+BINARY_TREE_EXTENSION = ".aztree"
+_BINARY_TREE_MAGIC = b"AZTREE01"
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def is_binary_tree_file(filename: str) -> bool:
+    """
+    Return True if a search tree file is in the binary format,
+    i.e. if it has the ``.aztree`` extension
+
+    :param filename: the path to the file
+    :return: if the file is a binary tree file
+    """
+    return str(filename).endswith(BINARY_TREE_EXTENSION)
+
+
+class _LazyTreeMolecule(TreeMolecule):
+    """
+    A tree molecule that is created from its serialization when
+    one of its attributes is accessed for the first time, so that
+    the SMILES is not parsed by RDKit until the molecule is used.
+
+    The parent and the transform are available immediately, and
+    so are the InChI key and the SMILES identity key if they were serialized with the molecule.
+    Once created, the object is turned into a plain `TreeMolecule`.
+
+    :param parent: the parent molecule
+    :param transform: the transform value
+    :param smiles: the serialized SMILES
+    :param inchi_key: the InChI key of the molecule, if known
+    :param smiles_key: the canonical SMILES used as identity key, if known
+    """
+
+    # pylint: disable=super-init-not-called
+    def __init__(
+        self,
+        parent: Optional[TreeMolecule],
+        transform: int,
+        smiles: str,
+        inchi_key: Optional[str] = None,
+        smiles_key: Optional[str] = None,
+    ) -> None:
+        self.parent = parent
+        self.transform = transform
+        self._lazy_smiles = smiles
+        if inchi_key:
+            self._inchi_key = inchi_key
+        if smiles_key:
+            self._smiles_key = smiles_key
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") or "_lazy_smiles" not in self.__dict__:
+            raise AttributeError(name)
+        self._materialize()
+        return getattr(self, name)
+
+    def _materialize(self) -> None:
+        smiles = self.__dict__.pop("_lazy_smiles")
+        inchi_key = self.__dict__.get("_inchi_key")
+        smiles_key = self.__dict__.get("_smiles_key")
+        TreeMolecule.__init__(
+            self, parent=self.parent, transform=self.transform, smiles=smiles
+        )
+        if inchi_key:
+            self._inchi_key = inchi_key
+        if smiles_key:
+            self._smiles_key = smiles_key
+        self.__class__ = TreeMolecule  # type: ignore
+
+
+def _class_name(mol: Molecule) -> str:
+    if isinstance(mol, _LazyTreeMolecule):
+        return "TreeMolecule"
+    return mol.__class__.__name__
+
+
+def _serialized_smiles(mol: Molecule) -> str:
+    if isinstance(mol, _LazyTreeMolecule):
+        return mol.__dict__["_lazy_smiles"]
+    if isinstance(mol, TreeMolecule):
+        return mol.original_smiles if mol.parent is None else mol.mapped_smiles
+    return mol.smiles
+
+
+def _known_inchi_key(mol: Molecule) -> str:
+    # Only InChI keys that have already been computed are serialized,
+    # the instance dictionary is used to not create lazy molecules
+    return vars(mol).get("_inchi_key") or ""
+
+
+def _known_smiles_key(mol: Molecule) -> str:
+    return vars(mol).get("_smiles_key") or ""
 
 
 class MoleculeSerializer:
@@ -46,14 +162,10 @@ class MoleculeSerializer:
 
     def _add_mol(self, mol: aizynthfinder.chem.Molecule) -> None:
         id_ = id(mol)
-        dict_ = {"smiles": mol.smiles, "class": mol.__class__.__name__}
-        if isinstance(mol, aizynthfinder.chem.TreeMolecule):
+        dict_ = {"smiles": _serialized_smiles(mol), "class": _class_name(mol)}
+        if isinstance(mol, TreeMolecule):
             dict_["parent"] = self[mol.parent]
             dict_["transform"] = mol.transform
-            if not mol.parent:
-                dict_["smiles"] = mol.original_smiles
-            else:
-                dict_["smiles"] = mol.mapped_smiles
         self._store[id_] = dict_
 
 
@@ -62,6 +174,11 @@ class MoleculeDeserializer:
     Utility class for deserializing molecules.
     The serialized molecules are created upon instantiation of the class.
 
+    If `lazy` is True, tree molecules are created without parsing
+    the SMILES, which is instead done when the molecule is first used.
+    An InChI key in the serialization is then used as the InChI key of the
+    molecule, so that it can be looked up in a stock without parsing the SMILES.
+
     The deserialized molecules can be obtained with:
 
     .. code-block::
@@ -69,11 +186,13 @@ class MoleculeDeserializer:
         deserializer = MoleculeDeserializer()
         mol = deserializer[idx]
 
+    :param store: the serialized molecules
+    :param lazy: if True, tree molecules are created on first use
     """
 
-    def __init__(self, store: Dict[int, Any]) -> None:
+    def __init__(self, store: Dict[int, Any], lazy: bool = False) -> None:
         self._objects: Dict[int, Any] = {}
-        self._create_molecules(store)
+        self._create_molecules(store, lazy)
 
     def __getitem__(self, id_: Optional[int]) -> Optional[aizynthfinder.chem.Molecule]:
         if id_ is None:
@@ -97,7 +216,7 @@ class MoleculeDeserializer:
             objects.append(obj)
         return objects
 
-    def _create_molecules(self, store: dict) -> None:
+    def _create_molecules(self, store: dict, lazy: bool) -> None:
         for id_, spec in store.items():
             if isinstance(id_, str):
                 id_ = int(id_)
@@ -108,7 +227,14 @@ class MoleculeDeserializer:
 
             kwargs = dict(spec)
             del kwargs["class"]
-            self._objects[id_] = getattr(aizynthfinder.chem, cls)(**kwargs)
+            inchi_key = kwargs.pop("inchi_key", None)
+            smiles_key = kwargs.pop("smiles_key", None)
+            if lazy and cls == "TreeMolecule":
+                self._objects[id_] = _LazyTreeMolecule(
+                    inchi_key=inchi_key, smiles_key=smiles_key, **kwargs
+                )
+            else:
+                self._objects[id_] = getattr(aizynthfinder.chem, cls)(**kwargs)
 
 
 def serialize_action(
@@ -154,3 +280,543 @@ def deserialize_action(
         ]
         return cls.from_serialization(dict_, reactants)
     return cls(**dict_)
+
+
+class _BinaryTable:
+    """
+    The rows of a table in a binary tree file that have not been written yet
+
+    :param columns: the data type of each column
+    """
+
+    def __init__(self, columns: Dict[str, str]) -> None:
+        self.columns = columns
+        self.nrows = 0
+        self.chunks: List[StrDict] = []
+        self.buffer: Dict[str, List[Any]] = {name: [] for name in columns}
+
+    @property
+    def nbuffered(self) -> int:
+        """Return the number of rows that have not been written"""
+        return len(next(iter(self.buffer.values())))
+
+    def append(self, row: StrDict) -> int:
+        """
+        Add a row to the table
+
+        :param row: the value of each column
+        :return: the index of the row
+        """
+        for name, values in self.buffer.items():
+            values.append(row[name])
+        self.nrows += 1
+        return self.nrows - 1
+
+
+class BinaryTreeWriter:
+    """
+    Streaming writer of search trees in a compact binary format, used for
+    files with the ``.aztree`` extension.
+
+    The file contains four tables: the nodes of the tree, the molecules,
+    the actions and the interned strings. The tables are stored column by column.
+    A column with one value per row is stored as an array, and a column
+    with a sequence of values per row is stored as an array of the lengths
+    of the sequences and an array of all the values.
+
+    Molecules are stored with references to the string table for the SMILES
+    and the InChI key, if it has been computed, and with the index of the parent.
+    Actions are stored with the molecule and the reactants, and with the other
+    arguments and the metadata as pairs of interned keys and JSON-encoded values,
+    so that e.g. a template shared by many actions is only stored once.
+
+    The rows are kept in memory until `chunk_size` rows have been added to a table,
+    and are then written to the file. The location of the chunks is written at the
+    end of the file when the writer is closed.
+
+    Additional tables, e.g. with data of the search that is not part of
+    the tree, can be added with `add_table` and `add_row`.
+
+    .. code-block::
+
+        columns = {"mol": "<i4", "children": "<i4[]"}
+        with BinaryTreeWriter("tree.aztree", columns, kind="mytree") as writer:
+            writer.write_tree(
+                root,
+                lambda node: {"mol": writer.molecule(node.mol)},
+                lambda node: node.children,
+            )
+
+    :ivar metadata: additional data, stored as JSON when the writer is closed
+
+    :param filename: the path to the file
+    :param node_columns: the NumPy data type of each column of the nodes, sequences are marked with a trailing ``[]``
+    :param kind: the kind of tree that is written
+    :param metadata: additional data, stored as JSON
+    :param chunk_size: the number of rows of a table kept in memory
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        node_columns: Dict[str, str],
+        kind: str = "",
+        metadata: Optional[StrDict] = None,
+        chunk_size: int = 10000,
+    ) -> None:
+        self._fileobj = open(filename, "wb")
+        self._fileobj.write(_BINARY_TREE_MAGIC)
+        self._kind = kind
+        self.metadata = metadata or {}
+        self._chunk_size = chunk_size
+        self._tables = {
+            "nodes": _BinaryTable(node_columns),
+            "molecules": _BinaryTable(
+                {
+                    "class": "<i4",
+                    "smiles": "<i4",
+                    "inchi_key": "<i4",
+                    "smiles_key": "<i4",
+                    "parent": "<i4",
+                    "transform": "<i4",
+                }
+            ),
+            "actions": _BinaryTable(
+                {
+                    "class": "<i4",
+                    "mol": "<i4",
+                    "queried": "u1",
+                    "outcomes": "<i4[]",
+                    "reactants": "<i4[]",
+                    "args": "<i4[]",
+                    "metadata": "<i4[]",
+                }
+            ),
+            "strings": _BinaryTable({"data": "u1[]"}),
+        }
+        self._string_ids: Dict[str, int] = {}
+        self._molecule_ids: Dict[int, int] = {}
+
+    def __enter__(self) -> "BinaryTreeWriter":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def action(self, action: RetroReaction) -> int:
+        """
+        Add an action to the file
+
+        :param action: the action
+        :return: the index of the action
+        """
+        dict_ = action.to_dict()
+        mol = self.molecule(dict_.pop("mol"))
+        metadata = dict_.pop("metadata", {})
+        outcomes: List[int] = []
+        reactants: List[int] = []
+        if not action.unqueried:
+            for outcome in action.reactants:
+                outcomes.append(len(outcome))
+                reactants.extend(self.molecule(item) for item in outcome)
+        return self.add_row(
+            "actions",
+            {
+                "class": self.string(
+                    f"{action.__class__.__module__}.{action.__class__.__name__}"
+                ),
+                "mol": mol,
+                "queried": not action.unqueried,
+                "outcomes": outcomes,
+                "reactants": reactants,
+                "args": self._encode_dict(dict_),
+                "metadata": self._encode_dict(metadata),
+            },
+        )
+
+    def add_node(self, row: StrDict) -> int:
+        """
+        Add a node to the file
+
+        :param row: the value of each column of the node
+        :return: the index of the node
+        """
+        return self.add_row("nodes", row)
+
+    def add_row(self, name: str, row: StrDict) -> int:
+        """
+        Add a row to a table
+
+        :param name: the name of the table
+        :param row: the value of each column of the row
+        :return: the index of the row
+        """
+        table = self._tables[name]
+        index = table.append(row)
+        if table.nbuffered >= self._chunk_size:
+            self._flush(table)
+        return index
+
+    def add_table(self, name: str, columns: Dict[str, str]) -> None:
+        """
+        Add a table for additional data that is not part of the tree,
+        that can be read with the `tables` of a `BinaryTreeReader`
+
+        :param name: the name of the table
+        :param columns: the NumPy data type of each column, sequences are marked with a trailing ``[]``
+        :raises ValueError: if a table with the name already exists
+        """
+        if name in self._tables:
+            raise ValueError(f"A table with the name {name} already exists")
+        self._tables[name] = _BinaryTable(columns)
+
+    def close(self) -> None:
+        """Write the remaining rows and the location of the chunks, and close the file"""
+        if self._fileobj.closed:
+            return
+        for table in self._tables.values():
+            self._flush(table)
+        footer = {
+            "kind": self._kind,
+            "metadata": self.metadata,
+            "tables": {
+                name: {
+                    "columns": table.columns,
+                    "nrows": table.nrows,
+                    "chunks": table.chunks,
+                }
+                for name, table in self._tables.items()
+            },
+        }
+        footer_bytes = json.dumps(
+            footer, separators=(",", ":"), default=_json_default
+        ).encode("utf-8")
+        self._fileobj.write(footer_bytes)
+        self._fileobj.write(struct.pack("<Q", len(footer_bytes)))
+        self._fileobj.write(_BINARY_TREE_MAGIC)
+        self._fileobj.close()
+
+    def molecule(self, mol: Optional[Molecule]) -> int:
+        """
+        Add a molecule to the file, if it has not already been added.
+        The parent of a tree molecule is added before the molecule.
+
+        :param mol: the molecule
+        :return: the index of the molecule, -1 if the molecule is None
+        """
+        if mol is None:
+            return -1
+        index = self._molecule_ids.get(id(mol))
+        if index is not None:
+            return index
+
+        parent = -1
+        transform = 0
+        if isinstance(mol, TreeMolecule):
+            parent = self.molecule(mol.parent)
+            transform = mol.transform
+        index = self.add_row(
+            "molecules",
+            {
+                "class": self.string(_class_name(mol)),
+                "smiles": self.string(_serialized_smiles(mol)),
+                "inchi_key": self.string(_known_inchi_key(mol)),
+                "smiles_key": self.string(_known_smiles_key(mol)),
+                "parent": parent,
+                "transform": transform,
+            },
+        )
+        self._molecule_ids[id(mol)] = index
+        return index
+
+    def string(self, value: str) -> int:
+        """
+        Add a string to the table of interned strings, if it has not already been added
+
+        :param value: the string
+        :return: the index of the string
+        """
+        index = self._string_ids.get(value)
+        if index is None:
+            index = self.add_row("strings", {"data": value.encode("utf-8")})
+            self._string_ids[value] = index
+        return index
+
+    def write_tree(
+        self,
+        root: Any,
+        record: Callable[[Any], StrDict],
+        children: Callable[[Any], Sequence[Optional[Any]]],
+    ) -> None:
+        """
+        Add all the nodes of a tree in breadth-first order, so that
+        the parent of a node is always added before the node.
+        The indices of the children of a node are added in the ``children`` column,
+        with -1 for children that are None.
+
+        :param root: the root of the tree
+        :param record: returns the value of each column of a node, except the children
+        :param children: returns the children of a node
+        """
+        queue = deque([root])
+        next_index = 1
+        while queue:
+            node = queue.popleft()
+            row = record(node)
+            child_indices = []
+            for child in children(node):
+                if child is None:
+                    child_indices.append(-1)
+                    continue
+                child_indices.append(next_index)
+                next_index += 1
+                queue.append(child)
+            row["children"] = child_indices
+            self.add_node(row)
+
+    def _encode_dict(self, dict_: StrDict) -> List[int]:
+        pairs = []
+        for key, value in dict_.items():
+            pairs.append(self.string(key))
+            encoded = json.dumps(value, separators=(",", ":"), default=_json_default)
+            pairs.append(self.string(encoded))
+        return pairs
+
+    def _flush(self, table: _BinaryTable) -> None:
+        nrows = table.nbuffered
+        if nrows == 0:
+            return
+        blocks = {}
+        for name, dtype in table.columns.items():
+            values = table.buffer[name]
+            if dtype.endswith("[]"):
+                lengths = np.fromiter((len(value) for value in values), "<u4", nrows)
+                flat = np.fromiter(itertools.chain.from_iterable(values), dtype[:-2])
+                blocks[name] = self._write_block(lengths) + self._write_block(flat)
+            else:
+                blocks[name] = self._write_block(np.array(values, dtype=dtype))
+            values.clear()
+        table.chunks.append({"nrows": nrows, "blocks": blocks})
+
+    def _write_block(self, array: np.ndarray) -> List[int]:
+        # All blocks are aligned to 8 bytes from the start of the file
+        self._fileobj.write(b"\0" * (-self._fileobj.tell() % 8))
+        offset = self._fileobj.tell()
+        self._fileobj.write(array.tobytes())
+        return [offset, len(array)]
+
+
+class _RaggedColumn:
+    """
+    A column of a binary tree file with a sequence of values per row
+
+    :param lengths: the length of the sequence of each row
+    :param values: the values of all rows
+    """
+
+    def __init__(self, lengths: np.ndarray, values: np.ndarray) -> None:
+        self.offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self.values = values
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.values[self.offsets[index] : self.offsets[index + 1]]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+class BinaryTreeReader:
+    """
+    Reader of search trees written with `BinaryTreeWriter`.
+
+    The columns of the nodes are read into arrays, and the molecules
+    are deserialized lazily, i.e. the SMILES of a tree molecule is not parsed
+    until the molecule is used. The actions are created when requested.
+
+    .. code-block::
+
+        reader = BinaryTreeReader("tree.aztree")
+        mol = reader.molecules[reader.nodes["mol"][0]]
+        children = reader.nodes["children"][0]
+
+    :ivar kind: the kind of tree
+    :ivar metadata: the additional data of the tree
+    :ivar nodes: the columns of the nodes
+    :ivar nnodes: the number of nodes
+    :ivar molecules: the deserialized molecules
+    :ivar tables: the columns of all tables, including tables added with `BinaryTreeWriter.add_table`
+
+    :param filename: the path to the file
+    :raises ValueError: if the file is not a binary tree file
+    """
+
+    def __init__(self, filename: str) -> None:
+        with open(filename, "rb") as fileobj:
+            buffer = fileobj.read()
+        magic_length = len(_BINARY_TREE_MAGIC)
+        if (
+            len(buffer) < 2 * magic_length + 8
+            or buffer[:magic_length] != _BINARY_TREE_MAGIC
+            or buffer[-magic_length:] != _BINARY_TREE_MAGIC
+        ):
+            raise ValueError(f"{filename} is not a binary search tree file")
+        (footer_size,) = struct.unpack("<Q", buffer[-magic_length - 8 : -magic_length])
+        footer_end = len(buffer) - magic_length - 8
+        footer = json.loads(buffer[footer_end - footer_size : footer_end])
+
+        tables = {
+            name: self._read_table(buffer, spec)
+            for name, spec in footer["tables"].items()
+        }
+        self.kind: str = footer["kind"]
+        self.metadata: StrDict = footer["metadata"]
+        self.nodes = tables["nodes"]
+        self.nnodes: int = footer["tables"]["nodes"]["nrows"]
+        self.tables = tables
+
+        strings = tables["strings"]["data"]
+        data = strings.values.tobytes()
+        offsets = strings.offsets.tolist()
+        self._strings = [
+            data[start:end].decode("utf-8")
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+        self._values: Dict[int, Any] = {}
+        self._actions = tables["actions"]
+        self.molecules = MoleculeDeserializer(
+            self._molecule_store(tables["molecules"]), lazy=True
+        )
+
+    def action(self, index: int) -> RetroReaction:
+        """
+        Create an action
+
+        :param index: the index of the action
+        :return: the action
+        """
+        columns = self._actions
+        dict_ = self._decode_dict(columns["args"][index])
+        dict_["metadata"] = self._decode_dict(columns["metadata"][index])
+        dict_["mol"] = int(columns["mol"][index])
+        dict_["class"] = self._strings[columns["class"][index]]
+        if columns["queried"][index]:
+            reactants = columns["reactants"][index].tolist()
+            outcomes = []
+            start = 0
+            for size in columns["outcomes"][index].tolist():
+                outcomes.append(reactants[start : start + size])
+                start += size
+            dict_["reactants"] = outcomes
+        return deserialize_action(dict_, self.molecules)
+
+    def actions(self, indices: Sequence[int]) -> List[RetroReaction]:
+        """
+        Create a number of actions
+
+        :param indices: the indices of the actions
+        :return: the actions
+        """
+        return [self.action(index) for index in indices]
+
+    def parents(self) -> np.ndarray:
+        """
+        Return the index of the parent of each node, computed
+        from the ``children`` column. The root has -1 as parent.
+
+        :return: the indices of the parents
+        """
+        children = self.nodes["children"]
+        rows = np.repeat(np.arange(self.nnodes), np.diff(children.offsets))
+        mask = children.values >= 0
+        parents = np.full(self.nnodes, -1, dtype=np.int64)
+        parents[children.values[mask]] = rows[mask]
+        return parents
+
+    def string(self, index: int) -> str:
+        """
+        Return an interned string
+
+        :param index: the index of the string
+        :return: the string
+        """
+        return self._strings[index]
+
+    def _decode_dict(self, pairs: np.ndarray) -> StrDict:
+        dict_ = {}
+        pairs_list = pairs.tolist()
+        for key, value in zip(pairs_list[::2], pairs_list[1::2]):
+            dict_[self._strings[key]] = self._decode_value(value)
+        return dict_
+
+    def _decode_value(self, index: int) -> Any:
+        if index in self._values:
+            return self._values[index]
+        value = json.loads(self._strings[index])
+        # Only immutable values are shared between the actions
+        if value is None or isinstance(value, (str, int, float)):
+            self._values[index] = value
+        return value
+
+    def _molecule_store(self, columns: StrDict) -> Dict[int, Any]:
+        store = {}
+        tree_classes = {}
+        # Files written before the SMILES identity key was added do not have the column
+        smiles_keys = (
+            columns["smiles_key"].tolist() if "smiles_key" in columns else None
+        )
+        for index, (cls_index, smiles, inchi_key, parent, transform) in enumerate(
+            zip(
+                columns["class"].tolist(),
+                columns["smiles"].tolist(),
+                columns["inchi_key"].tolist(),
+                columns["parent"].tolist(),
+                columns["transform"].tolist(),
+            )
+        ):
+            cls = self._strings[cls_index]
+            if cls not in tree_classes:
+                tree_classes[cls] = issubclass(
+                    getattr(aizynthfinder.chem, cls), TreeMolecule
+                )
+            spec: StrDict = {"class": cls, "smiles": self._strings[smiles]}
+            if tree_classes[cls]:
+                spec["parent"] = parent if parent >= 0 else None
+                spec["transform"] = transform
+                spec["inchi_key"] = self._strings[inchi_key] or None
+                if smiles_keys is not None:
+                    spec["smiles_key"] = self._strings[smiles_keys[index]] or None
+            store[index] = spec
+        return store
+
+    @staticmethod
+    def _read_table(
+        buffer: bytes, spec: StrDict
+    ) -> Dict[str, Union[np.ndarray, _RaggedColumn]]:
+        def _read_block(dtype: str, offset: int, count: int) -> np.ndarray:
+            return np.frombuffer(
+                buffer, dtype=np.dtype(dtype), count=count, offset=offset
+            )
+
+        columns: Dict[str, Union[np.ndarray, _RaggedColumn]] = {}
+        for name, dtype in spec["columns"].items():
+            blocks = [chunk["blocks"][name] for chunk in spec["chunks"]]
+            if dtype.endswith("[]"):
+                lengths = [_read_block("<u4", *block[:2]) for block in blocks]
+                values = [_read_block(dtype[:-2], *block[2:]) for block in blocks]
+                columns[name] = _RaggedColumn(
+                    _concatenate(lengths, "<u4"), _concatenate(values, dtype[:-2])
+                )
+            else:
+                columns[name] = _concatenate(
+                    [_read_block(dtype, *block) for block in blocks], dtype
+                )
+        return columns
+
+
+def _concatenate(arrays: List[np.ndarray], dtype: str) -> np.ndarray:
+    if len(arrays) == 1:
+        return arrays[0]
+    if not arrays:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate(arrays)
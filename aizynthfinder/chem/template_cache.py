@@ -0,0 +1,184 @@
+""" Module containing a process-wide cache of compiled reaction templates
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from rdchiral import main as rdc
+from rdkit.Chem import AllChem
+
+from aizynthfinder.utils.cache import LruCache
+from aizynthfinder.utils.logging import logger
+
+if TYPE_CHECKING:
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        Callable,
+        Iterable,
+        List,
+        Optional,
+        RdReaction,
+        StrDict,
+        Tuple,
+    )
+
+DEFAULT_MAX_ENTRIES = 5000
+
+_LOCAL = threading.local()
+_ALL_CACHES: List["CompiledTemplateCache"] = []
+_LOCK = threading.Lock()
+_SETTINGS: StrDict = {"max_entries": DEFAULT_MAX_ENTRIES}
+
+
+class CompiledTemplateCache(LruCache):
+    """
+    A bounded cache of compiled reaction templates, i.e. RDChiral
+    and RDKit reaction objects created from a reaction SMARTS.
+
+    The cache keeps track of the time spent on compiling the templates
+    and the time that has been saved by re-using them. The time saved
+    is the compilation time of each template that is found in the cache.
+
+    RDChiral updates the reaction objects when applying them, and hence
+    one cache should only be used by a single thread. Use `compiled_templates`
+    to get the cache of the current thread.
+
+    :ivar parse_time: the total time in seconds spent on compiling templates
+    :ivar time_saved: the total compilation time in seconds saved by cache hits
+
+    :param max_entries: the maximum number of cached reaction objects
+    """
+
+    def __init__(self, max_entries: Optional[int] = DEFAULT_MAX_ENTRIES) -> None:
+        super().__init__(max_entries, sizeof=lambda _: 0)
+        self.parse_time = 0.0
+        self.time_saved = 0.0
+
+    def prewarm(self, smarts_list: Iterable[str], use_rdchiral: bool = True) -> None:
+        """
+        Compile a number of templates and put them in the cache, without
+        updating the hit and miss counters. Templates that cannot be
+        compiled are skipped.
+
+        :param smarts_list: the reaction SMARTS of the templates
+        :param use_rdchiral: if True, compile RDChiral reactions otherwise RDKit reactions
+        """
+        kind = "rdchiral" if use_rdchiral else "rdkit"
+        for smarts in smarts_list:
+            if (kind, smarts) in self:
+                continue
+            try:
+                self._compile(kind, smarts)
+            except Exception as err:  # pylint: disable=broad-except
+                logger().debug(f"Could not compile template {smarts}: {err}")
+
+    def rdchiral_reaction(self, smarts: str) -> rdc.rdchiralReaction:
+        """
+        Return the RDChiral reaction of a template, compile it if
+        it is not in the cache.
+
+        :param smarts: the reaction SMARTS
+        :return: the reaction object
+        """
+        return self._get_or_compile("rdchiral", smarts)
+
+    def rdkit_reaction(self, smarts: str) -> RdReaction:
+        """
+        Return the RDKit reaction of a template, compile it if
+        it is not in the cache.
+
+        :param smarts: the reaction SMARTS
+        :return: the reaction object
+        """
+        return self._get_or_compile("rdkit", smarts)
+
+    def reset_statistics(self) -> None:
+        super().reset_statistics()
+        self.parse_time = 0.0
+        self.time_saved = 0.0
+
+    def statistics(self) -> StrDict:
+        stats = super().statistics()
+        del stats["bytes"]
+        stats["parse_time"] = self.parse_time
+        stats["time_saved"] = self.time_saved
+        return stats
+
+    def _compile(self, kind: str, smarts: str) -> Any:
+        compiler: Callable[[str], Any] = (
+            rdc.rdchiralReaction if kind == "rdchiral" else AllChem.ReactionFromSmarts
+        )
+        time0 = time.perf_counter()
+        reaction = compiler(smarts)
+        elapsed = time.perf_counter() - time0
+        self.parse_time += elapsed
+        self[(kind, smarts)] = (reaction, elapsed)
+        return reaction
+
+    def _get_or_compile(self, kind: str, smarts: str) -> Any:
+        cached: Optional[Tuple[Any, float]] = self.get((kind, smarts))
+        if cached is None:
+            return self._compile(kind, smarts)
+        reaction, elapsed = cached
+        self.time_saved += elapsed
+        return reaction
+
+
+def compiled_templates() -> CompiledTemplateCache:
+    """
+    Return the cache of compiled templates of the current thread,
+    creating it if necessary.
+
+    :return: the cache
+    """
+    cache = getattr(_LOCAL, "cache", None)
+    if cache is None:
+        cache = CompiledTemplateCache(_SETTINGS["max_entries"])
+        _LOCAL.cache = cache
+        with _LOCK:
+            _ALL_CACHES.append(cache)
+    return cache
+
+
+def compiled_templates_statistics() -> StrDict:
+    """
+    Return the statistics of the caches of compiled templates, summed
+    over all threads of this process.
+
+    :return: the statistics
+    """
+    totals: StrDict = {
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+        "entries": 0,
+        "parse_time": 0.0,
+        "time_saved": 0.0,
+    }
+    with _LOCK:
+        for cache in _ALL_CACHES:
+            for key, value in cache.statistics().items():
+                totals[key] += value
+    return totals
+
+
+def reset_compiled_templates_statistics() -> None:
+    """Reset the statistics of the caches of compiled templates of all threads"""
+    with _LOCK:
+        for cache in _ALL_CACHES:
+            cache.reset_statistics()
+
+
+def set_compiled_templates_limit(max_entries: Optional[int]) -> None:
+    """
+    Set the maximum number of compiled templates that are cached by
+    each thread. Existing caches are updated and pruned if necessary.
+
+    :param max_entries: the maximum number of entries, None means unbounded
+    """
+    _SETTINGS["max_entries"] = max_entries
+    with _LOCK:
+        for cache in _ALL_CACHES:
+            cache.resize(max_entries)
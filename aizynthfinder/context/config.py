@@ -23,6 +23,7 @@ class _PostprocessingConfiguration:
     min_routes: int = 5
     max_routes: int = 25
     all_routes: bool = False
+    max_extracted_routes: Optional[int] = None
     route_distance_model: Optional[str] = None
     route_scorers: List[str] = field(default_factory=lambda: [])
     scorer_weights: Optional[List[float]] = field(default_factory=lambda: None)
@@ -40,7 +41,14 @@ class _SearchConfiguration:
             "search_rewards": ["state score"],
             "immediate_instantiation": (),
             "mcts_grouping": None,
+            "transposition_table": False,
+            "transposition_statistics": False,
             "search_rewards_weights": [],
+            "leaf_batch_size": 1,
+            "virtual_loss": 1.0,
+            "template_executor": "serial",
+            "template_executor_workers": None,
+            "expansion_batch_size": 1,
         }
     )
     max_transforms: int = 6
@@ -51,6 +59,12 @@ class _SearchConfiguration:
     break_bonds: List[List[int]] = field(default_factory=list)
     freeze_bonds: List[List[int]] = field(default_factory=list)
     break_bonds_operator: str = "and"
+    molecule_pool: bool = False
+    molecule_pool_size: Optional[int] = 100000
+    persistent_molecule_pool: bool = False
+    identity_key: str = "inchi_key"
+    fingerprint_cache_size: Optional[int] = 100000
+    template_cache_size: Optional[int] = 5000
 
 
 @dataclass
@@ -0,0 +1,191 @@
+""" Module containing classes for caching the predictions of expansion policies
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from aizynthfinder.utils.cache import LruCache
+
+if TYPE_CHECKING:
+    from aizynthfinder.utils.type_utils import Any, Optional, StrDict, Tuple
+
+    Prediction = Tuple[np.ndarray, np.ndarray]
+
+# The default maximum number of entries of the caches of the policies
+DEFAULT_MAX_ENTRIES = 100000
+
+
+def _prediction_size(value: Prediction) -> int:
+    return sum(arr.nbytes for arr in value)
+
+
+def file_checksum(source: str) -> str:
+    """
+    Compute a checksum of a model or template file. If the source is
+    not a file, e.g. the URL of a remote model, the checksum of the
+    string itself is returned.
+
+    :param source: the path to the file
+    :return: the hexadecimal checksum
+    """
+    hasher = hashlib.sha256()
+    if os.path.isfile(source):
+        with open(source, "rb") as fileobj:
+            for chunk in iter(lambda: fileobj.read(1 << 20), b""):
+                hasher.update(chunk)
+    else:
+        hasher.update(source.encode())
+    return hasher.hexdigest()[:16]
+
+
+class PredictionCache(LruCache):
+    """
+    An in-memory cache of expansion policy predictions, i.e. the indices
+    of the selected templates and their probabilities, keyed by the
+    identity key of the molecule, by default the InChI key.
+
+    The cache is bounded in number of entries and bytes, and the least
+    recently used predictions are evicted first. By default, the cache
+    is bounded to `DEFAULT_MAX_ENTRIES` entries.
+
+    :ivar namespace: a string that uniquely identifies the policy and model
+
+    :param namespace: a string that uniquely identifies the policy and model
+    :param max_entries: the maximum number of cached predictions, None means unbounded
+    :param max_bytes: the maximum number of bytes used by the cached predictions
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: Optional[int] = DEFAULT_MAX_ENTRIES,
+        max_bytes: Optional[int] = None,
+        **_: Any,
+    ) -> None:
+        super().__init__(max_entries, max_bytes, sizeof=_prediction_size)
+        self.namespace = namespace
+
+    def lookup(self, key: str) -> Optional[Prediction]:
+        """
+        Look-up a prediction in the cache
+
+        :param key: the identity key of the molecule
+        :return: the prediction or None if it is not cached
+        """
+        return self.get(key)
+
+    def store(self, predictions: StrDict) -> None:
+        """
+        Store a number of new predictions in the cache
+
+        :param predictions: the predictions keyed by the identity key of the molecules
+        """
+        for key, value in predictions.items():
+            self[key] = value
+
+
+class DiskPredictionCache(PredictionCache):
+    """
+    A prediction cache that in addition to the in-memory cache
+    persists all predictions in an SQLite database.
+
+    The predictions are stored using the namespace of the cache,
+    which should include a checksum of the model, so that a database
+    file can be shared between different policies and models.
+
+    :ivar disk_hits: the number of look-ups that was found in the database
+
+    :param namespace: a string that uniquely identifies the policy and model
+    :param path: the path to the database file
+    :param max_entries: the maximum number of predictions cached in memory
+    :param max_bytes: the maximum number of bytes used by the predictions cached in memory
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        path: str,
+        max_entries: Optional[int] = DEFAULT_MAX_ENTRIES,
+        max_bytes: Optional[int] = None,
+        **_: Any,
+    ) -> None:
+        super().__init__(namespace, max_entries, max_bytes)
+        self.path = path
+        self.disk_hits = 0
+        self._connection = sqlite3.connect(path, timeout=60)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS predictions "
+            "(namespace TEXT, key TEXT, indices BLOB, probabilities BLOB, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._connection.commit()
+
+    def lookup(self, key: str) -> Optional[Prediction]:
+        """
+        Look-up a prediction in memory and then in the database
+
+        :param key: the identity key of the molecule
+        :return: the prediction or None if it is not cached
+        """
+        if key in self:
+            return self.get(key)
+
+        row = self._connection.execute(
+            "SELECT indices, probabilities FROM predictions "
+            "WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.disk_hits += 1
+        value = (
+            np.frombuffer(row[0], dtype=np.int64),
+            np.frombuffer(row[1], dtype=np.float64),
+        )
+        self[key] = value
+        return value
+
+    def reconnect(self) -> None:
+        """
+        Open a new connection to the database. This is necessary in forked
+        processes, because an SQLite connection cannot be shared between processes.
+        """
+        self._connection = sqlite3.connect(self.path, timeout=60)
+
+    def reset_statistics(self) -> None:
+        super().reset_statistics()
+        self.disk_hits = 0
+
+    def statistics(self) -> StrDict:
+        stats = super().statistics()
+        stats["disk_hits"] = self.disk_hits
+        return stats
+
+    def store(self, predictions: StrDict) -> None:
+        """
+        Store a number of new predictions in the cache and in the database
+
+        :param predictions: the predictions keyed by the identity key of the molecules
+        """
+        super().store(predictions)
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+            [
+                (
+                    self.namespace,
+                    key,
+                    np.asarray(indices, dtype=np.int64).tobytes(),
+                    np.asarray(probs, dtype=np.float64).tobytes(),
+                )
+                for key, (indices, probs) in predictions.items()
+            ],
+        )
+        self._connection.commit()
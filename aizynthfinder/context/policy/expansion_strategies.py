@@ -4,18 +4,33 @@
 from __future__ import annotations
 
 import abc
+import sys
 from typing import TYPE_CHECKING
 
 import numpy as np
-import pandas as pd
+from deprecated import deprecated
 
 from aizynthfinder.chem import SmilesBasedRetroReaction, TemplatedRetroReaction
-from aizynthfinder.context.policy.utils import _make_fingerprint
+from aizynthfinder.chem.template_cache import compiled_templates
+from aizynthfinder.context.policy.cache import (
+    DEFAULT_MAX_ENTRIES,
+    DiskPredictionCache,
+    PredictionCache,
+    file_checksum,
+)
+from aizynthfinder.context.policy.cache import __name__ as cache_module
+from aizynthfinder.context.policy.prefetch import PredictionPrefetcher
+from aizynthfinder.context.policy.screening import TemplateScreen
+from aizynthfinder.context.policy.template_library import TemplateLibrary
+from aizynthfinder.context.policy.utils import _make_fingerprints
 from aizynthfinder.utils.exceptions import PolicyException
+from aizynthfinder.utils.loading import load_dynamic_class
 from aizynthfinder.utils.logging import logger
 from aizynthfinder.utils.models import load_model
 
 if TYPE_CHECKING:
+    import pandas as pd
+
     from aizynthfinder.chem import TreeMolecule
     from aizynthfinder.chem.reaction import RetroReaction
     from aizynthfinder.context.config import Configuration
@@ -81,9 +96,42 @@ class ExpansionStrategy(abc.ABC):
         :return: the actions and the priors of those actions
         """
 
+    def cache_entries(self) -> StrDict:
+        """
+        Return the entries of the prediction cache, e.g. to save them
+        together with a search tree
+
+        :return: the cached predictions, empty if the strategy does not cache predictions
+        """
+        return {}
+
+    def cache_capacity(self) -> int:
+        """
+        Return the number of molecules that are guaranteed to still be in the
+        prediction cache after they have been predicted together
+
+        :return: the number of molecules, zero if the strategy does not cache predictions
+        """
+        return 0
+
+    def cache_statistics(self) -> StrDict:
+        """
+        Return statistics of the prediction cache, e.g. number of hits and misses
+
+        :return: the statistics, empty if the strategy does not cache predictions
+        """
+        return {}
+
     def reset_cache(self) -> None:
         """Reset the prediction cache"""
 
+    def restore_cache(self, entries: StrDict) -> None:
+        """
+        Add entries returned by `cache_entries` to the prediction cache
+
+        :param entries: the cached predictions
+        """
+
 
 class MultiExpansionStrategy(ExpansionStrategy):
     """
@@ -175,6 +223,22 @@ class MultiExpansionStrategy(ExpansionStrategy):
         )
         return all_possible_actions, all_priors
 
+    def cache_capacity(self) -> int:
+        """
+        Return the smallest number of molecules that are guaranteed to still be
+        in the prediction caches of the combined strategies after they have been
+        predicted together
+
+        :return: the number of molecules, zero if any strategy does not cache predictions
+        """
+        return min(
+            (
+                strategy.cache_capacity()
+                for strategy in self._get_expansion_strategies_from_config()
+            ),
+            default=0,
+        )
+
     def _get_expansion_strategies_from_config(self) -> List[ExpansionStrategy]:
         if self._expansion_strategies:
             return self._expansion_strategies
@@ -251,6 +315,8 @@ class TemplateBasedExpansionStrategy(ExpansionStrategy):
     A template-based expansion strategy that will return `TemplatedRetroReaction` objects upon expansion.
 
     :ivar template_column: the column in the template file that contains the templates
+    :ivar template_library: the templates and their metadata, use
+        `template_library.to_dataframe()` to get them as a pandas DataFrame
     :ivar cutoff_cumulative: the accumulative probability of the suggested templates
     :ivar cutoff_number: the maximum number of templates to returned
     :ivar use_rdchiral: a boolean to apply templates with RDChiral
@@ -259,6 +325,12 @@ class TemplateBasedExpansionStrategy(ExpansionStrategy):
     :ivar chiral_fingerprints: if True will base expansion on chiral fingerprint
     :ivar mask: a boolean vector of masks for the reaction templates. The length of the vector should be equal to the
         number of templates. It is set to None if no mask file is provided as input.
+    :ivar persistent_cache: if True, the prediction cache is kept between searches
+    :ivar prewarm_templates: the number of templates that are compiled when the strategy is loaded
+    :ivar prewarm_column: the column used to select the most frequently used templates to compile
+    :ivar screen: the substructure screen of the templates, None if screening is not used
+    :ivar screen_refill: if True, templates rejected by the screen are replaced by other templates
+    :ivar prefetch: the pipeline that predicts the cache molecules in the background, None if not used
 
     :param key: the key or label
     :param config: the configuration of the tree search
@@ -286,6 +358,9 @@ class TemplateBasedExpansionStrategy(ExpansionStrategy):
         self.use_remote_models: bool = bool(kwargs.get("use_remote_models", False))
         self.rescale_prior: bool = bool(kwargs.get("rescale_prior", False))
         self.chiral_fingerprints = bool(kwargs.get("chiral_fingerprints", False))
+        self.persistent_cache = bool(kwargs.get("persistent_cache", False))
+        self.prewarm_templates = int(kwargs.get("prewarm_templates", 0))
+        self.prewarm_column: str = kwargs.get("prewarm_column", "library_occurence")
 
         self._logger.info(
             f"Loading template-based expansion policy model from {source} to {self.key}"
@@ -293,23 +368,47 @@ class TemplateBasedExpansionStrategy(ExpansionStrategy):
         self.model = load_model(source, self.key, self.use_remote_models)
 
         self._logger.info(f"Loading templates from {templatefile} to {self.key}")
-        if templatefile.endswith(".csv.gz") or templatefile.endswith(".csv"):
-            self.templates: pd.DataFrame = pd.read_csv(
-                templatefile, index_col=0, sep="\t"
-            )
-        else:
-            self.templates = pd.read_hdf(templatefile, "table")
+        self.template_library = TemplateLibrary.from_file(
+            templatefile, self.template_column
+        )
+        self._templates_frame: Optional[pd.DataFrame] = None
 
         self.mask: Optional[np.ndarray] = (
             self._load_mask_file(maskfile) if maskfile else None
         )
 
-        if hasattr(self.model, "output_size") and len(self.templates) != self.model.output_size:  # type: ignore
+        if hasattr(self.model, "output_size") and len(self.template_library) != self.model.output_size:  # type: ignore
             raise PolicyException(
-                f"The number of templates ({len(self.templates)}) does not agree with the "  # type: ignore
+                f"The number of templates ({len(self.template_library)}) does not agree with the "  # type: ignore
                 f"output dimensions of the model ({self.model.output_size})"
             )
-        self._cache: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.screen: Optional[TemplateScreen] = None
+        self.screen_refill = bool(kwargs.get("screen_refill", False))
+        self._screened_templates = 0
+        if kwargs.get("screen_templates", False):
+            self.screen = self._setup_screen(templatefile, kwargs)
+        self._cache = self._setup_cache(source, templatefile, maskfile, kwargs)
+
+        if self.prewarm_templates > 0:
+            self._prewarm_compiled_templates()
+
+        prefetch_depth = int(kwargs.get("prefetch_depth", 0))
+        self.prefetch: Optional[PredictionPrefetcher] = (
+            PredictionPrefetcher(self.model.predict, prefetch_depth)
+            if prefetch_depth > 0
+            else None
+        )
+
+    @property
+    @deprecated(version="4.4.0", reason="replaced by 'template_library'")
+    def templates(self) -> pd.DataFrame:
+        """
+        The templates and their metadata as a pandas DataFrame. The DataFrame
+        is created from the template library the first time it is accessed.
+        """
+        if self._templates_frame is None:
+            self._templates_frame = self.template_library.to_dataframe()
+        return self._templates_frame
 
     def get_actions(
         self,
@@ -328,35 +427,108 @@ class TemplateBasedExpansionStrategy(ExpansionStrategy):
         possible_actions = []
         priors: List[float] = []
         cache_molecules = cache_molecules or []
-        self._update_cache(list(molecules) + list(cache_molecules))
+        if self.prefetch is not None and not self._collect_completed():
+            predictions = self._update_cache(molecules)
+            self._prefetch_predictions(cache_molecules)
+        else:
+            predictions = self._update_cache(list(molecules) + list(cache_molecules))
 
+        templates = self.template_library.templates
         for mol in molecules:
-            probable_transforms_idx, probs = self._cache[mol.inchi_key]
-            possible_moves = self.templates.iloc[probable_transforms_idx]
+            probable_transforms_idx, probs = predictions[mol.identity_key]
             if self.rescale_prior:
-                probs /= probs.sum()
+                probs = probs / probs.sum()
             priors.extend(probs)
-            for idx, (move_index, move) in enumerate(possible_moves.iterrows()):
-                metadata = dict(move)
-                del metadata[self.template_column]
-                metadata["policy_probability"] = float(probs[idx].round(4))
-                metadata["policy_probability_rank"] = idx
-                metadata["policy_name"] = self.key
-                metadata["template_code"] = move_index
-                metadata["template"] = move[self.template_column]
+            rounded_probs = probs.round(4).tolist()
+            move_indices = self.template_library.index[
+                probable_transforms_idx
+            ].tolist()
+            for idx, position in enumerate(probable_transforms_idx.tolist()):
+                smarts = templates[position]
+                metadata = self.template_library.metadata(
+                    position,
+                    {
+                        "policy_probability": rounded_probs[idx],
+                        "policy_probability_rank": idx,
+                        "policy_name": self.key,
+                        "template_code": move_indices[idx],
+                        "template": smarts,
+                    },
+                )
                 possible_actions.append(
                     TemplatedRetroReaction(
                         mol,
-                        smarts=move[self.template_column],
+                        smarts=smarts,
                         metadata=metadata,
                         use_rdchiral=self.use_rdchiral,
                     )
                 )
         return possible_actions, priors  # type: ignore
 
+    def cache_capacity(self) -> int:
+        """
+        Return the number of molecules that are guaranteed to still be in the
+        prediction cache after they have been predicted together. If the cache
+        is bounded by the number of bytes, this number is not known and zero
+        is returned.
+
+        :return: the number of molecules
+        """
+        if self._cache.max_bytes is not None:
+            return 0
+        if self._cache.max_entries is None:
+            return sys.maxsize
+        return self._cache.max_entries
+
+    def cache_entries(self) -> StrDict:
+        """
+        Return the predictions in the in-memory cache, from the least
+        to the most recently used
+
+        :return: the indices of the selected templates and their probabilities,
+            keyed by the identity key of the molecules
+        """
+        return dict(self._cache.items())
+
+    def cache_statistics(self) -> StrDict:
+        """
+        Return statistics of the prediction cache, e.g. number of hits and misses,
+        and the number of templates that would have been selected without the
+        substructure screen but were rejected by it
+
+        :return: the statistics
+        """
+        stats = self._cache.statistics()
+        if self.screen is not None:
+            stats["screened_templates"] = self._screened_templates
+        if self.prefetch is not None:
+            stats["prefetch"] = self.prefetch.statistics()
+        return stats
+
     def reset_cache(self) -> None:
-        """Reset the prediction cache"""
-        self._cache = {}
+        """
+        Reset the prediction cache. If the cache is persistent, only
+        the statistics of the cache is reset.
+        """
+        if not self.persistent_cache:
+            self._cache.clear()
+        self._cache.reset_statistics()
+        self._screened_templates = 0
+        if self.prefetch is not None:
+            self.prefetch.discard()
+            self.prefetch.reset_statistics()
+
+    def restore_cache(self, entries: StrDict) -> None:
+        """
+        Add predictions returned by `cache_entries` to the in-memory cache,
+        without updating the statistics of the cache. The predictions
+        must have been made with the same model and templates.
+
+        :param entries: the indices of the selected templates and their probabilities,
+            keyed by the identity key of the molecules
+        """
+        for key, (indices, probs) in entries.items():
+            self._cache[key] = (np.asarray(indices), np.asarray(probs))
 
     def _cutoff_predictions(self, predictions: np.ndarray) -> np.ndarray:
         """
@@ -378,33 +550,182 @@ class TemplateBasedExpansionStrategy(ExpansionStrategy):
     def _load_mask_file(self, maskfile: str) -> np.ndarray:
         self._logger.info(f"Loading masking of templates from {maskfile} to {self.key}")
         mask = np.load(maskfile)["arr_0"]
-        if len(mask) != len(self.templates):
+        if len(mask) != len(self.template_library):
             raise PolicyException(
-                f"The number of masks {len(mask)} does not match the number of templates {len(self.templates)}"
+                f"The number of masks {len(mask)} does not match the number of templates {len(self.template_library)}"
             )
         return mask
 
-    def _update_cache(self, molecules: Sequence[TreeMolecule]) -> None:
-        pred_inchis = []
-        fp_list = []
+    def _prewarm_compiled_templates(self) -> None:
+        """
+        Compile the most frequently used templates, as given by the `prewarm_column`
+        of the template library, or the first templates if that column does not exist.
+
+        Only the cache of the current thread is filled, the workers of a template
+        executor compile the templates when they first apply them.
+        """
+        if self.prewarm_column in self.template_library.columns:
+            occurences = np.asarray(
+                self.template_library.column(self.prewarm_column)
+            )
+            selection = np.argsort(-occurences, kind="stable")[: self.prewarm_templates]
+        else:
+            selection = np.arange(
+                min(self.prewarm_templates, len(self.template_library))
+            )
+        self._logger.info(
+            f"Compiling {len(selection)} templates from {self.key} into the template cache"
+        )
+        compiled_templates().prewarm(
+            (self.template_library.templates[idx] for idx in selection),
+            use_rdchiral=self.use_rdchiral,
+        )
+
+    def _screen_predictions(
+        self, molecule: TreeMolecule, pred: np.ndarray, indices: np.ndarray
+    ) -> np.ndarray:
+        """
+        Remove the selected templates that cannot match the molecule. With
+        `screen_refill`, the templates are selected again among those that pass the
+        screen. In both modes, the screened templates that are counted are the
+        selected templates that are rejected by the screen.
+        """
+        assert self.screen is not None
+        if not self.screen_refill:
+            applicable = self.screen.applicable(molecule, indices)
+            self._screened_templates += int(len(indices) - applicable.sum())
+            return indices[applicable]
+
+        applicable = self.screen.applicable(molecule)
+        self._screened_templates += int(len(indices) - applicable[indices].sum())
+        pred = pred * applicable
+        indices = self._cutoff_predictions(pred)
+        # The cutoff can select templates with zero probability
+        return indices[pred[indices] > 0]
+
+    def _setup_cache(
+        self, source: str, templatefile: str, maskfile: str, kwargs: StrDict
+    ) -> PredictionCache:
+        cache_path = kwargs.get("cache_path", "")
+        cache_kwargs = {
+            "max_entries": kwargs.get("cache_max_entries", DEFAULT_MAX_ENTRIES),
+            "max_bytes": kwargs.get("cache_max_bytes"),
+            "path": cache_path,
+        }
+        if "cache_class" in kwargs:
+            cls = load_dynamic_class(
+                kwargs["cache_class"], cache_module, PolicyException
+            )
+        elif cache_path:
+            cls = DiskPredictionCache
+        else:
+            cls = PredictionCache
+
+        namespace = self.key
+        if cls is not PredictionCache:
+            # The namespace should uniquely identify the predictions
+            # if they are shared between runs
+            namespace = "|".join(
+                [
+                    self.key,
+                    file_checksum(source),
+                    file_checksum(templatefile),
+                    file_checksum(maskfile) if maskfile else "",
+                    str(self.cutoff_cumulative),
+                    str(self.cutoff_number),
+                    str(self.chiral_fingerprints),
+                    f"{self.screen is not None}{self.screen_refill}",
+                ]
+            )
+        return cls(namespace, **cache_kwargs)
+
+    def _setup_screen(self, templatefile: str, kwargs: StrDict) -> TemplateScreen:
+        templates = self.template_library.templates
+        screen_path = kwargs.get("screen_path", "")
+        if screen_path:
+            self._logger.info(f"Loading template screen from {screen_path}")
+            return TemplateScreen.from_file(screen_path, templates, templatefile)
+        self._logger.info(f"Computing template screen for {self.key}")
+        return TemplateScreen.from_templates(templates)
+
+    def _update_cache(
+        self, molecules: Sequence[TreeMolecule]
+    ) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        predictions: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        pred_keys = []
+        pred_mols = []
         for molecule in molecules:
-            if molecule.inchi_key in self._cache or molecule.inchi_key in pred_inchis:
+            key = molecule.identity_key
+            if key in predictions or key in pred_keys:
                 continue
-            fp_list.append(
-                _make_fingerprint(molecule, self.model, self.chiral_fingerprints)
-            )
-            pred_inchis.append(molecule.inchi_key)
+            if self.prefetch is not None and key in self.prefetch:
+                predictions.update(self._store_predictions(*self.prefetch.wait(key)))
+                continue
+            cached = self._cache.lookup(key)
+            if cached is not None:
+                predictions[key] = cached
+                continue
+            pred_keys.append(key)
+            pred_mols.append(molecule)
+
+        if not pred_keys:
+            return predictions
+
+        fingerprints = _make_fingerprints(
+            pred_mols, self.model, self.chiral_fingerprints
+        )
+        pred_list = np.asarray(self.model.predict(fingerprints))
+        predictions.update(self._store_predictions(pred_keys, pred_mols, pred_list))
+        return predictions
 
-        if not pred_inchis:
+    def _collect_completed(self) -> bool:
+        """
+        Store the predictions of the prefetched batches that are completed,
+        and return True if no more batches can be submitted
+        """
+        assert self.prefetch is not None
+        for batch in self.prefetch.completed():
+            self._store_predictions(*batch)
+        return self.prefetch.full
+
+    def _prefetch_predictions(self, molecules: Sequence[TreeMolecule]) -> None:
+        """
+        Submit the molecules that are not cached or pending to the
+        background inference of the model
+        """
+        assert self.prefetch is not None
+        keys: List[str] = []
+        mols = []
+        for molecule in molecules:
+            key = molecule.identity_key
+            if key in keys or key in self.prefetch or key in self._cache:
+                continue
+            keys.append(key)
+            mols.append(molecule)
+        if not keys:
             return
+        fingerprints = _make_fingerprints(mols, self.model, self.chiral_fingerprints)
+        self.prefetch.submit(keys, mols, fingerprints)
 
-        pred_list = np.asarray(self.model.predict(np.vstack(fp_list)))
-        for pred, inchi in zip(pred_list, pred_inchis):
+    def _store_predictions(
+        self,
+        pred_keys: Sequence[str],
+        pred_mols: Sequence[TreeMolecule],
+        pred_list: np.ndarray,
+    ) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        new_predictions = {}
+        for pred, key, molecule in zip(pred_list, pred_keys, pred_mols):
             probable_transforms_idx = self._cutoff_predictions(pred)
-            self._cache[inchi] = (
+            if self.screen is not None:
+                probable_transforms_idx = self._screen_predictions(
+                    molecule, pred, probable_transforms_idx
+                )
+            new_predictions[key] = (
                 probable_transforms_idx,
                 pred[probable_transforms_idx],
             )
+        self._cache.store(new_predictions)
+        return new_predictions
 
 
 class TemplateBasedDirectExpansionStrategy(TemplateBasedExpansionStrategy):
@@ -3,13 +3,14 @@
 from __future__ import annotations
 
 import abc
+import sys
 from typing import TYPE_CHECKING
 
-import numpy as np
-
 from aizynthfinder.chem import TemplatedRetroReaction
-from aizynthfinder.context.policy.utils import _make_fingerprint
+from aizynthfinder.context.policy.cache import DEFAULT_MAX_ENTRIES
+from aizynthfinder.context.policy.utils import _make_reaction_fingerprints
 from aizynthfinder.utils.bonds import BrokenBonds
+from aizynthfinder.utils.cache import LruCache
 from aizynthfinder.utils.exceptions import (
     PolicyException,
     RejectionException,
@@ -20,7 +21,15 @@ from aizynthfinder.utils.models import load_model
 if TYPE_CHECKING:
     from aizynthfinder.chem.reaction import RetroReaction
     from aizynthfinder.context.config import Configuration
-    from aizynthfinder.utils.type_utils import Any, Dict, List, Optional, Tuple
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        Dict,
+        List,
+        Optional,
+        Sequence,
+        StrDict,
+        Tuple,
+    )
 
 
 class FilterStrategy(abc.ABC):
@@ -28,13 +37,15 @@ class FilterStrategy(abc.ABC):
     A base class for all filter strategies.
 
     The filter can be applied by either calling the `apply` method
-    of by calling the instantiated class with a reaction.
+    of by calling the instantiated class with a reaction. Several reactions
+    can be filtered at once with the `apply_many` method.
 
     .. code-block::
 
         filter = MyFilterStrategy("dummy", config)
         filter.apply(reaction)
         filter(reaction)
+        rejections = filter.apply_many(reactions)
 
     :param key: the key or label
     :param config: the configuration of the tree search
@@ -65,6 +76,27 @@ class FilterStrategy(abc.ABC):
         :raises: if the reaction should be rejected.
         """
 
+    def apply_many(
+        self, reactions: Sequence[RetroReaction]
+    ) -> List[Optional[RejectionException]]:
+        """
+        Apply the filter on a number of reactions. Strategies that can filter
+        several reactions more efficiently than one at a time should
+        override this method.
+
+        :param reactions: the reactions to filter
+        :return: for each reaction, the exception that rejected it, or None if it was not rejected
+        """
+        rejections: List[Optional[RejectionException]] = []
+        for reaction in reactions:
+            try:
+                self.apply(reaction)
+            except RejectionException as err:
+                rejections.append(err)
+            else:
+                rejections.append(None)
+        return rejections
+
 
 class BondFilter(FilterStrategy):
     """
@@ -97,6 +129,14 @@ class QuickKerasFilter(FilterStrategy):
     """
     Filter quick-filter trained on artificial negative data
 
+    The feasibility of the reactions filtered with `apply_many` is computed with
+    a single call to the model. The feasibility is cached by the hash of the
+    reaction, so that a reaction is only scored once in a search even if it
+    is created in many branches of the search tree. The cache is bounded
+    by the `cache_max_entries` and `cache_max_bytes` settings, by default to
+    `DEFAULT_MAX_ENTRIES` entries. The bytes are those of the cached probabilities,
+    the keys are not included.
+
     :ivar use_remote_models: a boolean to connect to remote TensorFlow servers. Defaults
         to False.
     :ivar filter_cutoff: the cut-off value
@@ -119,14 +159,51 @@ class QuickKerasFilter(FilterStrategy):
         self._rxn_fp_name = kwargs.get("rxn_fp_name", "input_2")
         self._exclude_from_policy: List[str] = kwargs.get("exclude_from_policy", [])
         self.filter_cutoff: float = float(kwargs.get("filter_cutoff", 0.05))
+        self._cache = LruCache(
+            kwargs.get("cache_max_entries", DEFAULT_MAX_ENTRIES),
+            kwargs.get("cache_max_bytes"),
+            sizeof=sys.getsizeof,
+        )
 
     def apply(self, reaction: RetroReaction) -> None:
-        if reaction.metadata.get("policy_name", "") in self._exclude_from_policy:
-            return
+        rejection = self.apply_many([reaction])[0]
+        if rejection is not None:
+            raise rejection
+
+    def apply_many(
+        self, reactions: Sequence[RetroReaction]
+    ) -> List[Optional[RejectionException]]:
+        rejections: List[Optional[RejectionException]] = [None] * len(reactions)
+        indices = [
+            idx
+            for idx, reaction in enumerate(reactions)
+            if reaction.metadata.get("policy_name", "") not in self._exclude_from_policy
+        ]
+        feasibilities = self.feasibility_many([reactions[idx] for idx in indices])
+        for idx, (feasible, prob) in zip(indices, feasibilities):
+            if not feasible:
+                rejections[idx] = RejectionException(
+                    f"{reactions[idx]} was filtered out with prob {prob}"
+                )
+        return rejections
+
+    def cache_entries(self) -> StrDict:
+        """
+        Return the entries of the feasibility cache, from the least
+        to the most recently used
+
+        :return: the feasibility probabilities keyed by the hash of the reaction
+        """
+        return dict(self._cache.items())
 
-        feasible, prob = self.feasibility(reaction)
-        if not feasible:
-            raise RejectionException(f"{reaction} was filtered out with prob {prob}")
+    def cache_statistics(self) -> StrDict:
+        """
+        Return statistics of the feasibility cache, e.g. number of hits and misses
+        and the number of bytes used by the cached probabilities
+
+        :return: the statistics
+        """
+        return self._cache.statistics()
 
     def feasibility(self, reaction: RetroReaction) -> Tuple[bool, float]:
         """
@@ -136,25 +213,63 @@ class QuickKerasFilter(FilterStrategy):
         :param reaction: the reaction to query
         :return: if the reaction is feasible
         """
-        if not reaction.reactants:
-            return False, 0.0
+        return self.feasibility_many([reaction])[0]
+
+    def feasibility_many(
+        self, reactions: Sequence[RetroReaction]
+    ) -> List[Tuple[bool, float]]:
+        """
+        Computes if a number of reactions are feasible. The reactions that
+        are not in the cache are given to the network model in one batch.
 
-        prob = self._predict(reaction)
-        feasible = prob >= self.filter_cutoff
-        return feasible, prob
+        :param reactions: the reactions to query
+        :return: for each reaction, if it is feasible and its probability
+        """
+        probs: List[Optional[float]] = [None] * len(reactions)
+        queries: Dict[str, List[int]] = {}
+        for idx, reaction in enumerate(reactions):
+            if not reaction.reactants:
+                continue
+            key = reaction.hash_key()
+            prob = self._cache.get(key)
+            if prob is None:
+                queries.setdefault(key, []).append(idx)
+            else:
+                probs[idx] = prob
+
+        if queries:
+            predictions = self._predict(
+                [reactions[positions[0]] for positions in queries.values()]
+            )
+            for (key, positions), prob in zip(queries.items(), predictions):
+                self._cache[key] = prob
+                for idx in positions:
+                    probs[idx] = prob
+
+        return [
+            (False, 0.0) if prob is None else (prob >= self.filter_cutoff, prob)
+            for prob in probs
+        ]
+
+    def reset_cache(self) -> None:
+        """Reset the feasibility cache"""
+        self._cache.clear()
+        self._cache.reset_statistics()
+
+    def restore_cache(self, entries: StrDict) -> None:
+        """
+        Add entries returned by `cache_entries` to the feasibility cache,
+        without updating the statistics of the cache
+
+        :param entries: the feasibility probabilities keyed by the hash of the reaction
+        """
+        for key, prob in entries.items():
+            self._cache[key] = prob
 
-    def _predict(self, reaction: RetroReaction) -> float:
-        prod_fp, rxn_fp = self._reaction_to_fingerprint(reaction, self.model)
+    def _predict(self, reactions: Sequence[RetroReaction]) -> List[float]:
+        prod_fp, rxn_fp = _make_reaction_fingerprints(reactions, self.model)
         kwargs = {self._prod_fp_name: prod_fp, self._rxn_fp_name: rxn_fp}
-        return self.model.predict(prod_fp, rxn_fp, **kwargs)[0][0]
-
-    @staticmethod
-    def _reaction_to_fingerprint(
-        reaction: RetroReaction, model: Any
-    ) -> Tuple[np.ndarray, np.ndarray]:
-        rxn_fp = _make_fingerprint(reaction, model)
-        prod_fp = _make_fingerprint(reaction.mol, model)
-        return prod_fp, rxn_fp
+        return self.model.predict(prod_fp, rxn_fp, **kwargs)[:, 0].tolist()
 
 
 class ReactantsCountFilter(FilterStrategy):
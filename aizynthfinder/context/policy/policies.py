@@ -20,14 +20,22 @@ from aizynthfinder.context.policy.filter_strategies import (
 from aizynthfinder.context.policy.filter_strategies import (
     __name__ as filter_strategy_module,
 )
-from aizynthfinder.utils.exceptions import PolicyException
+from aizynthfinder.utils.exceptions import PolicyException, RejectionException
 from aizynthfinder.utils.loading import load_dynamic_class
 
 if TYPE_CHECKING:
     from aizynthfinder.chem import TreeMolecule
     from aizynthfinder.chem.reaction import RetroReaction
     from aizynthfinder.context.config import Configuration
-    from aizynthfinder.utils.type_utils import Any, Dict, List, Sequence, Tuple
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        Dict,
+        List,
+        Optional,
+        Sequence,
+        StrDict,
+        Tuple,
+    )
 
 
 class ExpansionPolicy(ContextCollection):
@@ -79,6 +87,45 @@ class ExpansionPolicy(ContextCollection):
             all_priors.extend(priors)
         return all_possible_actions, all_priors
 
+    def cache_capacity(self) -> int:
+        """
+        Return the number of molecules that are guaranteed to still be in the
+        prediction caches of the selected policies after they have been predicted
+        together, see `ExpansionStrategy.cache_capacity`
+
+        :return: the number of molecules, zero if any selected policy does not cache
+        """
+        return min(
+            (self[name].cache_capacity() for name in self.selection or []),
+            default=0,
+        )
+
+    def cache_entries(self) -> Dict[str, StrDict]:
+        """
+        Return the entries of the prediction caches of the loaded policies
+
+        :return: the entries keyed by the policy key, policies without entries are omitted
+        """
+        entries = {}
+        for key, policy in self._items.items():
+            policy_entries = policy.cache_entries()
+            if policy_entries:
+                entries[key] = policy_entries
+        return entries
+
+    def cache_statistics(self) -> StrDict:
+        """
+        Return the statistics of the prediction caches of the loaded policies
+
+        :return: the statistics keyed by the policy key
+        """
+        stats = {}
+        for key, policy in self._items.items():
+            policy_stats = policy.cache_statistics()
+            if policy_stats:
+                stats[key] = policy_stats
+        return stats
+
     def load(self, source: ExpansionStrategy) -> None:  # type: ignore
         """
         Add a pre-initialized expansion strategy object to the policy
@@ -139,6 +186,17 @@ class ExpansionPolicy(ContextCollection):
         for policy in self._items.values():
             policy.reset_cache()
 
+    def restore_cache(self, entries: Dict[str, StrDict]) -> None:
+        """
+        Add entries returned by `cache_entries` to the prediction caches
+        of the loaded policies. Entries of policies that are not loaded are ignored.
+
+        :param entries: the entries keyed by the policy key
+        """
+        for key, policy_entries in entries.items():
+            if key in self._items:
+                self._items[key].restore_cache(policy_entries)
+
 
 class FilterPolicy(ContextCollection):
     """
@@ -172,6 +230,45 @@ class FilterPolicy(ContextCollection):
         for name in self.selection:
             self[name](reaction)
 
+    def apply_many(
+        self, reactions: Sequence[RetroReaction]
+    ) -> List[Optional[RejectionException]]:
+        """
+        Apply all the selected filters on a number of reactions. Each filter
+        is applied once on all the reactions that have not been rejected
+        by the previous filters.
+
+        :param reactions: the reactions to filter
+        :return: for each reaction, the exception that rejected it, or None if it was not rejected
+        :raises: if no policy is selected
+        """
+        if not self.selection:
+            raise PolicyException("No filter policy selected")
+
+        rejections: List[Optional[RejectionException]] = [None] * len(reactions)
+        for name in self.selection:
+            remaining = [idx for idx, err in enumerate(rejections) if err is None]
+            if not remaining:
+                break
+            results = self[name].apply_many([reactions[idx] for idx in remaining])
+            for idx, err in zip(remaining, results):
+                rejections[idx] = err
+        return rejections
+
+    def cache_entries(self) -> Dict[str, StrDict]:
+        """
+        Return the entries of the caches of the loaded filters
+
+        :return: the entries keyed by the filter key, filters without entries are omitted
+        """
+        entries = {}
+        for key, policy in self._items.items():
+            if hasattr(policy, "cache_entries"):
+                policy_entries = policy.cache_entries()
+                if policy_entries:
+                    entries[key] = policy_entries
+        return entries
+
     def load(self, source: FilterStrategy) -> None:  # type: ignore
         """
         Add a pre-initialized filter strategy object to the policy
@@ -231,3 +328,14 @@ class FilterPolicy(ContextCollection):
         for name in self.selection:
             if hasattr(self[name], "reset_cache"):
                 self[name].reset_cache()
+
+    def restore_cache(self, entries: Dict[str, StrDict]) -> None:
+        """
+        Add entries returned by `cache_entries` to the caches of the loaded filters.
+        Entries of filters that are not loaded are ignored.
+
+        :param entries: the entries keyed by the filter key
+        """
+        for key, policy_entries in entries.items():
+            if key in self._items and hasattr(self._items[key], "restore_cache"):
+                self._items[key].restore_cache(policy_entries)
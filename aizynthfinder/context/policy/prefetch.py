@@ -0,0 +1,164 @@
+""" Module containing a pipeline that runs expansion policy models in the background
+"""
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from aizynthfinder.chem import TreeMolecule
+    from aizynthfinder.utils.type_utils import (
+        Callable,
+        Dict,
+        List,
+        Optional,
+        Sequence,
+        StrDict,
+        Tuple,
+    )
+
+    PrefetchedBatch = Tuple[List[str], List[TreeMolecule], np.ndarray]
+
+
+class _PendingBatch:
+    def __init__(
+        self, keys: List[str], molecules: List[TreeMolecule], future: Future
+    ) -> None:
+        self.keys = keys
+        self.molecules = molecules
+        self.future = future
+
+
+class PredictionPrefetcher:
+    """
+    Runs the inference of a policy model for molecules that will probably be
+    expanded later, e.g. the molecules of the sibling nodes, in a background
+    thread, so that the inference overlaps with the application of templates
+    in the main thread.
+
+    The molecules are submitted in batches and a limited number of batches
+    can be pending at the same time. The predictions of a batch are
+    collected either when one of its molecules is needed, in which case the
+    main thread waits for the inference to finish, or when the batch
+    is completed.
+
+    .. code-block::
+
+        prefetcher = PredictionPrefetcher(model.predict, depth=2)
+        if not prefetcher.full:
+            prefetcher.submit(keys, molecules, fingerprints)
+        ...
+        keys, molecules, predictions = prefetcher.wait(keys[0])
+
+    :ivar depth: the maximum number of pending batches
+
+    :param predict: the inference function of the model
+    :param depth: the maximum number of pending batches
+    """
+
+    def __init__(self, predict: Callable[[np.ndarray], np.ndarray], depth: int) -> None:
+        self.depth = depth
+        self._predict = predict
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid = 0
+        self._batches: List[_PendingBatch] = []
+        self._pending: Dict[str, _PendingBatch] = {}
+        self._stats: StrDict = {}
+        self.reset_statistics()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._pending
+
+    @property
+    def full(self) -> bool:
+        """Return True if the maximum number of batches are pending"""
+        return len(self._batches) >= self.depth
+
+    def completed(self) -> List[PrefetchedBatch]:
+        """
+        Remove the batches whose inference has finished, without waiting
+        for the other batches
+
+        :return: the keys, the molecules and the predictions of each batch
+        """
+        done = [batch for batch in self._batches if batch.future.done()]
+        return [self._pop(batch) for batch in done]
+
+    def discard(self) -> None:
+        """Remove all pending batches, without waiting for them"""
+        for batch in self._batches:
+            batch.future.cancel()
+        self._batches = []
+        self._pending = {}
+
+    def reset_statistics(self) -> None:
+        """Reset the statistics of the prefetcher"""
+        self._stats = {"batches": 0, "molecules": 0, "waits": 0, "wait_time": 0.0}
+
+    def statistics(self) -> StrDict:
+        """
+        Return the number of submitted batches and molecules, and the number
+        of times and the time in seconds the main thread waited for a prediction
+
+        :return: the statistics
+        """
+        return dict(self._stats)
+
+    def submit(
+        self,
+        keys: Sequence[str],
+        molecules: Sequence[TreeMolecule],
+        fingerprints: np.ndarray,
+    ) -> None:
+        """
+        Submit a batch of molecules to the model, the inference
+        is run in a background thread
+
+        :param keys: the identity keys of the molecules
+        :param molecules: the molecules
+        :param fingerprints: the input of the model
+        """
+        future = self._get_executor().submit(self._predict, fingerprints)
+        batch = _PendingBatch(list(keys), list(molecules), future)
+        self._batches.append(batch)
+        for key in batch.keys:
+            self._pending[key] = batch
+        self._stats["batches"] += 1
+        self._stats["molecules"] += len(batch.keys)
+
+    def wait(self, key: str) -> PrefetchedBatch:
+        """
+        Remove the batch of a molecule, waiting for its inference to finish
+        if necessary
+
+        :param key: the identity key of the molecule
+        :return: the keys, the molecules and the predictions of the batch
+        :raises KeyError: if the molecule has not been submitted
+        """
+        batch = self._pending[key]
+        if not batch.future.done():
+            time0 = time.perf_counter()
+            batch.future.exception()
+            self._stats["waits"] += 1
+            self._stats["wait_time"] += time.perf_counter() - time0
+        return self._pop(batch)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # The thread of an executor created before a fork does not exist in the child
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="policy-prefetch"
+            )
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def _pop(self, batch: _PendingBatch) -> PrefetchedBatch:
+        self._batches.remove(batch)
+        for key in batch.keys:
+            if self._pending.get(key) is batch:
+                del self._pending[key]
+        return batch.keys, batch.molecules, np.asarray(batch.future.result())
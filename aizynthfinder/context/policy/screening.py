@@ -0,0 +1,153 @@
+""" Module containing a substructure screen for the applicability of reaction templates
+"""
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+import numpy as np
+from rdkit import Chem, DataStructs
+from rdkit.Chem import AllChem
+
+from aizynthfinder.context.policy.cache import file_checksum
+from aizynthfinder.utils.logging import logger
+
+if TYPE_CHECKING:
+    from aizynthfinder.chem import TreeMolecule
+    from aizynthfinder.utils.type_utils import Optional, RdMol, Sequence
+
+
+def _pattern_fingerprint(mol: RdMol, fp_size: int) -> np.ndarray:
+    bitvect = Chem.PatternFingerprint(mol, fpSize=fp_size)
+    arr = np.zeros((fp_size,), dtype=np.uint8)
+    DataStructs.ConvertToNumpyArray(bitvect, arr)
+    return np.packbits(arr).view(np.uint64)
+
+
+class TemplateScreen:
+    """
+    A substructure screen of the product side of retro-templates.
+
+    An RDKit pattern fingerprint is computed for the product query of
+    each template. A template can only match a molecule if all
+    bits of the template fingerprint are also set in the pattern fingerprint of the molecule,
+    so templates that fail this subset test can be rejected without
+    applying them. The screen never rejects a template that matches,
+    but some templates that pass the screen will still not be applicable.
+
+    Templates that cannot be parsed get an empty fingerprint and
+    are therefore never rejected.
+
+    .. code-block::
+
+        screen = TemplateScreen.from_templates(templates["retro_template"])
+        mask = screen.applicable(mol)
+
+    :ivar fingerprints: the packed fingerprints of the templates, one row per template
+    :ivar fp_size: the length of the fingerprints in bits
+    :ivar rejected: the number of templates rejected by the screen
+
+    :param fingerprints: the packed fingerprints of the templates
+    :param fp_size: the length of the fingerprints in bits
+    """
+
+    def __init__(self, fingerprints: np.ndarray, fp_size: int = 2048) -> None:
+        self.fingerprints = fingerprints
+        self.fp_size = fp_size
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    @classmethod
+    def from_templates(
+        cls, templates: Sequence[str], fp_size: int = 2048
+    ) -> "TemplateScreen":
+        """
+        Compute the screen of a number of retro-templates
+
+        :param templates: the reaction SMARTS of the retro-templates
+        :param fp_size: the length of the fingerprints in bits
+        :return: the screen
+        """
+        fingerprints = np.zeros((len(templates), fp_size // 64), dtype=np.uint64)
+        for idx, smarts in enumerate(templates):
+            try:
+                reaction = AllChem.ReactionFromSmarts(smarts)
+                query = reaction.GetReactantTemplate(0)
+                for jdx in range(1, reaction.GetNumReactantTemplates()):
+                    query = Chem.CombineMols(query, reaction.GetReactantTemplate(jdx))
+                query.UpdatePropertyCache(strict=False)
+                fingerprints[idx] = _pattern_fingerprint(query, fp_size)
+            except Exception:  # pylint: disable=broad-except
+                logger().debug(f"Could not compute screen of template {smarts}")
+        return cls(fingerprints, fp_size)
+
+    @classmethod
+    def from_file(
+        cls,
+        filename: str,
+        templates: Sequence[str],
+        templatefile: str,
+        fp_size: int = 2048,
+    ) -> "TemplateScreen":
+        """
+        Load a pre-computed screen from a numpy .npz file. If the file
+        does not exist or was computed for another template file, the
+        screen is computed and saved to the file.
+
+        :param filename: the path to the file with the screen
+        :param templates: the reaction SMARTS of the retro-templates
+        :param templatefile: the path to the template library, used to validate the file
+        :param fp_size: the length of the fingerprints in bits
+        :return: the screen
+        """
+        checksum = file_checksum(templatefile)
+        if os.path.exists(filename):
+            data = np.load(filename)
+            if (
+                str(data["checksum"]) == checksum
+                and int(data["fp_size"]) == fp_size
+                and len(data["fingerprints"]) == len(templates)
+            ):
+                return cls(data["fingerprints"], fp_size)
+            logger().info(
+                f"Template screen in {filename} does not match the templates, will re-compute it"
+            )
+
+        screen = cls.from_templates(templates, fp_size)
+        screen.save(filename, checksum)
+        return screen
+
+    def applicable(
+        self, mol: TreeMolecule, indices: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Screen the templates against a molecule
+
+        :param mol: the molecule
+        :param indices: if given, only screen these templates
+        :return: a boolean vector that is False for the templates that cannot match
+        """
+        mol_fp = _pattern_fingerprint(mol.rd_mol, self.fp_size)
+        fingerprints = (
+            self.fingerprints if indices is None else self.fingerprints[indices]
+        )
+        mask = ~np.any(fingerprints & ~mol_fp, axis=1)
+        self.rejected += int(len(mask) - mask.sum())
+        return mask
+
+    def save(self, filename: str, checksum: str = "") -> None:
+        """
+        Save the screen to a numpy .npz file
+
+        :param filename: the path to the file
+        :param checksum: the checksum of the template library
+        """
+        with open(filename, "wb") as fileobj:
+            np.savez(
+                fileobj,
+                fingerprints=self.fingerprints,
+                fp_size=self.fp_size,
+                checksum=checksum,
+            )
@@ -0,0 +1,428 @@
+""" Module containing a column-oriented template library and lazy views of template metadata
+"""
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import struct
+import sys
+from collections.abc import MutableMapping
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        Callable,
+        Dict,
+        Iterator,
+        List,
+        Optional,
+        Sequence,
+        StrDict,
+    )
+
+
+BINARY_EXTENSION = ".mmtpl"
+_MAGIC = b"AZTPL001"
+
+
+def _native(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _to_json(value: Any) -> str:
+    value = _native(value)
+    if isinstance(value, float) and math.isnan(value):
+        value = None
+    return json.dumps(value)
+
+
+class _EncodedColumn:
+    """
+    A read-only column of variable-length values that are stored
+    as UTF-8 encoded bytes in a buffer and decoded on access.
+
+    :param offsets: the start of each value in the data buffer, with one extra element for the end
+    :param data: the data buffer
+    :param decoder: the function used to create a value from the decoded string
+    """
+
+    def __init__(
+        self, offsets: np.ndarray, data: memoryview, decoder: Callable[[str], Any]
+    ) -> None:
+        self._offsets = offsets
+        self._data = data
+        self._decoder = decoder
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, position: Any) -> Any:
+        if isinstance(position, (int, np.integer)):
+            if position < 0:
+                position += len(self)
+            start = int(self._offsets[position])
+            end = int(self._offsets[position + 1])
+            return self._decoder(str(self._data[start:end], "utf-8"))
+        return np.array(
+            [self[pos] for pos in np.arange(len(self))[position]], dtype=object
+        )
+
+    def __iter__(self) -> Iterator[Any]:
+        for position in range(len(self)):
+            yield self[position]
+
+
+class TemplateLibrary:
+    """
+    A template library stored column by column in NumPy arrays.
+
+    The reaction templates and other string columns are stored as
+    arrays of interned strings, so that equal strings are only stored once.
+    Metadata of a template is accessed through a `TemplateMetadata`
+    view that reads the columns on access instead of copying them.
+
+    A library can also be saved in a binary format, with the extension ``.mmtpl``,
+    that is memory-mapped when it is loaded. Numerical columns are then
+    read directly from the mapped file, and strings are decoded when accessed,
+    so that several processes loading the same file share the memory.
+
+    .. code-block::
+
+        library = TemplateLibrary.from_file("uspto_templates.csv.gz")
+        smarts = library.templates[10]
+        metadata = library.metadata(10)
+        data = library.to_dataframe()
+        library.to_binary("uspto_templates.mmtpl")
+
+    :ivar template_column: the column that contains the templates
+    :ivar index: the template codes, i.e. the index of the template library
+
+    :param index: the template codes
+    :param columns: the arrays of each column, including the template column
+    :param template_column: the column that contains the templates
+    """
+
+    def __init__(
+        self,
+        index: Sequence[Any],
+        columns: Dict[str, Sequence[Any]],
+        template_column: str = "retro_template",
+    ) -> None:
+        self.template_column = template_column
+        self.index = index
+        self._columns = columns
+        self._metadata_columns = [
+            name for name in columns.keys() if name != template_column
+        ]
+        self._metadata_set = set(self._metadata_columns)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def columns(self) -> List[str]:
+        """Return the names of all columns, including the template column"""
+        return list(self._columns.keys())
+
+    @property
+    def metadata_columns(self) -> List[str]:
+        """Return the names of the columns that are part of the metadata"""
+        return self._metadata_columns
+
+    @property
+    def templates(self) -> Sequence[str]:
+        """
+        Return the reaction templates
+
+        :raises KeyError: if the template column is not in the library
+        """
+        return self._columns[self.template_column]
+
+    @classmethod
+    def from_binary(
+        cls, filename: str, template_column: str = "retro_template"
+    ) -> "TemplateLibrary":
+        """
+        Memory-map a library saved with `to_binary`
+
+        :param filename: the path to the file
+        :param template_column: the column that contains the templates
+        :return: the library
+        :raises ValueError: if the file is not a binary template library
+        """
+        with open(filename, "rb") as fileobj:
+            try:
+                buffer = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                buffer = b""
+        if buffer[: len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{filename} is not a binary template library")
+        (header_size,) = struct.unpack("<Q", buffer[len(_MAGIC) : len(_MAGIC) + 8])
+        header_start = len(_MAGIC) + 8
+        header = json.loads(
+            str(buffer[header_start : header_start + header_size], "utf-8")
+        )
+        # The offsets in the header are relative to the first data block
+        data_start = header_start + header_size
+        data_start += -data_start % 8
+
+        def _read_column(spec: StrDict) -> Sequence[Any]:
+            if spec["kind"] == "array":
+                return np.frombuffer(
+                    buffer,
+                    dtype=np.dtype(spec["dtype"]),
+                    count=header["nrows"],
+                    offset=data_start + spec["offset"],
+                )
+            offsets = np.frombuffer(
+                buffer,
+                dtype=np.uint64,
+                count=header["nrows"] + 1,
+                offset=data_start + spec["offset"],
+            )
+            start = data_start + spec["data_offset"]
+            data = memoryview(buffer)[start : start + int(offsets[-1])]
+            decoder = sys.intern if spec["kind"] == "string" else json.loads
+            return _EncodedColumn(offsets, data, decoder)
+
+        columns = {spec["name"]: _read_column(spec) for spec in header["columns"]}
+        return cls(_read_column(header["index"]), columns, template_column)
+
+    @classmethod
+    def from_dataframe(
+        cls, data: pd.DataFrame, template_column: str = "retro_template"
+    ) -> "TemplateLibrary":
+        """
+        Create a library from a pandas DataFrame
+
+        :param data: the templates and their metadata
+        :param template_column: the column that contains the templates
+        :return: the library
+        """
+        columns = {}
+        for name in data.columns:
+            array = data[name].to_numpy()
+            if array.dtype == object:
+                array = np.array(
+                    [sys.intern(val) if isinstance(val, str) else val for val in array],
+                    dtype=object,
+                )
+            columns[str(name)] = array
+        return cls(data.index.to_numpy(), columns, template_column)
+
+    @classmethod
+    def from_file(
+        cls, filename: str, template_column: str = "retro_template"
+    ) -> "TemplateLibrary":
+        """
+        Load a library from a tab-separated CSV file, an HDF5 file or
+        a binary file with the ``.mmtpl`` extension
+
+        :param filename: the path to the file
+        :param template_column: the column that contains the templates
+        :return: the library
+        """
+        if filename.endswith(BINARY_EXTENSION):
+            return cls.from_binary(filename, template_column)
+        if filename.endswith(".csv.gz") or filename.endswith(".csv"):
+            data: pd.DataFrame = pd.read_csv(filename, index_col=0, sep="\t")
+        else:
+            data = pd.read_hdf(filename, "table")
+        return cls.from_dataframe(data, template_column)
+
+    def column(self, name: str) -> Sequence[Any]:
+        """
+        Return the array of a column
+
+        :param name: the name of the column
+        :return: the values of the column
+        """
+        return self._columns[name]
+
+    def has_metadata(self, name: str) -> bool:
+        """
+        Return True if a column is part of the metadata
+
+        :param name: the name of the column
+        :return: if the column is part of the metadata
+        """
+        return name in self._metadata_set
+
+    def metadata(
+        self, position: int, extra: Optional[StrDict] = None
+    ) -> "TemplateMetadata":
+        """
+        Return a view of the metadata of a template
+
+        :param position: the position of the template in the library
+        :param extra: additional metadata that is not in the library
+        :return: the view
+        """
+        return TemplateMetadata(self, position, extra)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Return the library as a pandas DataFrame, with the same columns and index
+        as the DataFrame the library was created from. The columns are copied.
+
+        :return: the templates and their metadata
+        """
+        return pd.DataFrame(
+            {name: list(values) for name, values in self._columns.items()},
+            index=list(self.index),
+            columns=self.columns,
+        )
+
+    def to_binary(self, filename: str) -> None:
+        """
+        Save the library in a binary format that can be memory-mapped
+        with `from_binary`.
+
+        Numerical columns are stored as arrays, columns with only strings
+        are stored as UTF-8 encoded strings and other columns are stored as
+        JSON encoded values. Missing values in the last type of columns
+        are stored as None.
+
+        :param filename: the path to the file
+        """
+        blocks: List[bytes] = []
+        position = 0
+
+        def _add_block(data: bytes) -> int:
+            nonlocal position
+            offset = position
+            padding = -len(data) % 8
+            blocks.append(data + b"\0" * padding)
+            position += len(data) + padding
+            return offset
+
+        def _add_column(values: Sequence[Any]) -> StrDict:
+            array = np.asarray(values)
+            if array.dtype != object:
+                array = np.ascontiguousarray(array)
+                return {
+                    "kind": "array",
+                    "dtype": array.dtype.str,
+                    "offset": _add_block(array.tobytes()),
+                }
+            if all(isinstance(val, str) for val in array):
+                kind = "string"
+                encoded = [val.encode("utf-8") for val in array]
+            else:
+                kind = "json"
+                encoded = [_to_json(val).encode("utf-8") for val in array]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+            offsets[1:] = np.cumsum([len(val) for val in encoded])
+            return {
+                "kind": kind,
+                "offset": _add_block(offsets.tobytes()),
+                "data_offset": _add_block(b"".join(encoded)),
+            }
+
+        index_spec = _add_column(self.index)
+        column_specs = []
+        for name in self.columns:
+            spec = _add_column(self._columns[name])
+            spec["name"] = name
+            column_specs.append(spec)
+
+        header = {"nrows": len(self), "index": index_spec, "columns": column_specs}
+        header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        with open(filename, "wb") as fileobj:
+            fileobj.write(_MAGIC)
+            fileobj.write(struct.pack("<Q", len(header_bytes)))
+            fileobj.write(header_bytes)
+            # The data blocks are aligned to 8 bytes from the start of the file
+            fileobj.write(b"\0" * (-(len(_MAGIC) + 8 + len(header_bytes)) % 8))
+            for block in blocks:
+                fileobj.write(block)
+
+    def value(self, name: str, position: int) -> Any:
+        """
+        Return the value of a column for a template
+
+        :param name: the name of the column
+        :param position: the position of the template in the library
+        :return: the value
+        """
+        return _native(self._columns[name][position])
+
+
+class TemplateMetadata(MutableMapping):
+    """
+    A dictionary-like view of the metadata of a template in a `TemplateLibrary`.
+
+    The values of the library columns are read when accessed, and
+    values that are set or deleted are kept in a local dictionary
+    without modifying the library.
+
+    :param library: the template library
+    :param position: the position of the template in the library
+    :param extra: additional metadata that is not in the library
+    """
+
+    __slots__ = ("_library", "_position", "_local", "_deleted")
+
+    def __init__(
+        self,
+        library: TemplateLibrary,
+        position: int,
+        extra: Optional[StrDict] = None,
+    ) -> None:
+        self._library = library
+        self._position = position
+        self._local: StrDict = dict(extra or {})
+        self._deleted: List[str] = []
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._local:
+            return self._local[key]
+        if key in self._deleted or not self._library.has_metadata(key):
+            raise KeyError(key)
+        return self._library.value(key, self._position)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self._deleted:
+            self._deleted.remove(key)
+        self._local[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._local:
+            del self._local[key]
+        elif key in self._deleted or not self._library.has_metadata(key):
+            raise KeyError(key)
+        if self._library.has_metadata(key):
+            self._deleted.append(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self._library.metadata_columns:
+            if key not in self._local and key not in self._deleted:
+                yield key
+        yield from self._local
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __reduce__(self) -> Any:
+        # Pickle as a dictionary to avoid pickling the library
+        return (dict, (dict(self),))
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def copy(self) -> "TemplateMetadata":
+        """
+        Return a shallow copy of the view, the library is not copied
+
+        :return: the copy
+        """
+        new_view = TemplateMetadata(self._library, self._position, self._local)
+        new_view._deleted = list(self._deleted)
+        return new_view
@@ -6,10 +6,12 @@ from typing import TYPE_CHECKING
 
 import numpy as np
 
+from aizynthfinder.chem.fingerprints import fingerprint_service
+
 if TYPE_CHECKING:
     from aizynthfinder.chem import TreeMolecule
     from aizynthfinder.chem.reaction import RetroReaction
-    from aizynthfinder.utils.type_utils import Any, Union
+    from aizynthfinder.utils.type_utils import Any, Sequence, Tuple, Union
 
 
 def _make_fingerprint(
@@ -17,3 +19,30 @@ def _make_fingerprint(
 ) -> np.ndarray:
     fingerprint = obj.fingerprint(radius=2, nbits=len(model), chiral=chiral)
     return fingerprint.reshape([1, len(model)])
+
+
+def _make_fingerprints(
+    mols: Sequence[TreeMolecule], model: Any, chiral: bool = False
+) -> np.ndarray:
+    return fingerprint_service().fingerprints(
+        mols, radius=2, nbits=len(model), chiral=chiral
+    )
+
+
+def _make_reaction_fingerprints(
+    reactions: Sequence[RetroReaction], model: Any
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the fingerprints of the products and the difference fingerprints
+    of a number of reactions, computing the fingerprints of all molecules in one pass
+    """
+    prod_fp = _make_fingerprints([reaction.mol for reaction in reactions], model)
+    reactants_list = [reaction.reactants[reaction.index] for reaction in reactions]
+    reactants = [mol for reactants in reactants_list for mol in reactants]
+    rxn_fp = prod_fp.copy()
+    if reactants:
+        owners = np.repeat(
+            np.arange(len(reactions)), [len(reactants) for reactants in reactants_list]
+        )
+        np.subtract.at(rxn_fp, owners, _make_fingerprints(reactants, model))
+    return prod_fp, rxn_fp
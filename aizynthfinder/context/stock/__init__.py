@@ -2,6 +2,7 @@
 """
 from aizynthfinder.context.stock.queries import (
     InMemoryInchiKeyQuery,
+    MemoryMappedInchiKeyQuery,
     MongoDbInchiKeyQuery,
     StockQueryMixin,
 )
@@ -3,9 +3,12 @@
 
 from __future__ import annotations
 
+import mmap
 import os
+import struct
 from typing import TYPE_CHECKING
 
+import numpy as np
 import pandas as pd
 
 try:
@@ -17,13 +20,25 @@ else:
 
 from aizynthfinder.chem import Molecule
 from aizynthfinder.utils.exceptions import StockException
-from aizynthfinder.utils.mongo import get_mongo_client
+from aizynthfinder.utils.mongo import get_mongo_client, reset_mongo_client
 
 if TYPE_CHECKING:
     from pymongo.collection import Collection as MongoCollection
     from pymongo.database import Database as MongoDatabase
 
-    from aizynthfinder.utils.type_utils import Optional, Set, StrDict
+    from aizynthfinder.utils.type_utils import (
+        Dict,
+        Iterable,
+        List,
+        Optional,
+        Sequence,
+        Set,
+        StrDict,
+    )
+
+MMAP_STOCK_EXTENSION = ".mmstock"
+_MMAP_STOCK_MAGIC = b"AZSTK001"
+_INCHI_KEY_LENGTH = 27
 
 
 class StockQueryMixin:
@@ -72,6 +87,27 @@ class StockQueryMixin:
     def clear_cache(self) -> None:
         """Clear the internal search cache if available"""
 
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        """
+        Look up a number of molecules in the stock at once. Query classes that
+        can do this more efficiently than one molecule at a time
+        should override this method.
+
+        :param mols: the query molecules
+        :return: for each molecule if it is in stock
+        """
+        return [mol in self for mol in mols]
+
+    def availability_many(self, mols: Sequence[Molecule]) -> List[str]:
+        """
+        Returns the sources of a number of molecules at once
+
+        :param mols: the query molecules
+        :raises StockException: if the strings cannot be computed
+        :return: for each molecule, a comma-separated list of sources
+        """
+        return [self.availability_string(mol) for mol in mols]
+
     def price(self, mol: Molecule) -> float:
         """
         Returns the minimum price of the molecule in stock
@@ -151,6 +187,10 @@ class InMemoryInchiKeyQuery(StockQueryMixin):
     def __len__(self) -> int:
         return len(self._stock_inchikeys)
 
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        stock_inchikeys = self._stock_inchikeys
+        return [mol.inchi_key in stock_inchikeys for mol in mols]
+
     @property
     def stock_inchikeys(self) -> Set[str]:
         """Return the InChiKeys in this stock"""
@@ -189,9 +229,10 @@ class MongoDbInchiKeyQuery(StockQueryMixin):
         database: str = "stock_db",
         collection: str = "molecules",
     ) -> None:
-        self.client = get_mongo_client(
-            host or os.environ.get("MONGODB_HOST") or "localhost"
-        )
+        self._host = host or os.environ.get("MONGODB_HOST") or "localhost"
+        self._database_name = database
+        self._collection_name = collection
+        self.client = get_mongo_client(self._host)
         if self.client is None:
             raise ImportError(
                 "Cannot use this stock query class because it seems like pymongo is not installed. "
@@ -212,12 +253,41 @@ class MongoDbInchiKeyQuery(StockQueryMixin):
     def __str__(self) -> str:
         return "'MongoDB stock'"
 
+    def reconnect(self) -> None:
+        """
+        Connect to the database with a new client. This is necessary in forked
+        processes, because a Mongo client cannot be shared between processes.
+        """
+        reset_mongo_client()
+        self.client = get_mongo_client(self._host)
+        self.database = self.client[self._database_name]
+        self.molecules = self.database[self._collection_name]
+
+    def availability_many(self, mols: Sequence[Molecule]) -> List[str]:
+        inchi_keys = [mol.inchi_key for mol in mols]
+        sources: Dict[str, List[str]] = {key: [] for key in inchi_keys}
+        for item in self.molecules.find(
+            {"inchi_key": {"$in": list(sources.keys())}},
+            {"inchi_key": 1, "source": 1},
+        ):
+            sources[item["inchi_key"]].append(item["source"])
+        return [",".join(sources[key]) for key in inchi_keys]
+
     def availability_string(self, mol: Molecule) -> str:
         sources = [
             item["source"] for item in self.molecules.find({"inchi_key": mol.inchi_key})
         ]
         return ",".join(sources)
 
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        inchi_keys = [mol.inchi_key for mol in mols]
+        if not inchi_keys:
+            return []
+        found = set(
+            self.molecules.distinct("inchi_key", {"inchi_key": {"$in": inchi_keys}})
+        )
+        return [key in found for key in inchi_keys]
+
 
 class MolbloomFilterQuery(StockQueryMixin):
     """
@@ -242,9 +312,160 @@ class MolbloomFilterQuery(StockQueryMixin):
             return mol.smiles in self._filter
         return mol.inchi_key in self._filter
 
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        filter_ = self._filter
+        if self._smiles_based:
+            return [mol.smiles in filter_ for mol in mols]
+        return [mol.inchi_key in filter_ for mol in mols]
+
+
+class MemoryMappedInchiKeyQuery(StockQueryMixin):
+    """
+    A stock query class that is based on a memory-mapped file of
+    sorted, pre-computed inchi-keys and optionally their prices.
+
+    The file is created by the ``smiles2stock`` tool with the ``mmstock`` target,
+    or by the `make_mmap_stock` function. Loading the stock
+    only maps the file into memory, and the keys are looked up with a binary search.
+    Several processes that load the same file share its memory.
+
+    :parameter path: the path to the stock file
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as fileobj:
+            try:
+                buffer = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                buffer = b""
+        header_size = len(_MMAP_STOCK_MAGIC) + 16
+        if (
+            len(buffer) < header_size
+            or buffer[: len(_MMAP_STOCK_MAGIC)] != _MMAP_STOCK_MAGIC
+        ):
+            raise StockException(f"{path} is not a memory-mapped stock file")
+        nkeys, has_prices = struct.unpack(
+            "<QQ", buffer[len(_MMAP_STOCK_MAGIC) : header_size]
+        )
+        self._keys = np.frombuffer(
+            buffer,
+            dtype=f"S{_INCHI_KEY_LENGTH}",
+            count=nkeys,
+            offset=header_size,
+        )
+        self._prices: Optional[np.ndarray] = None
+        if has_prices:
+            prices_start = header_size + nkeys * _INCHI_KEY_LENGTH
+            prices_start += -prices_start % 8
+            self._prices = np.frombuffer(
+                buffer, dtype="<f8", count=nkeys, offset=prices_start
+            )
+
+    def __contains__(self, mol: Molecule) -> bool:
+        return self._find(mol.inchi_key) >= 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        return self.contains_inchi_keys([mol.inchi_key for mol in mols]).tolist()
+
+    def contains_inchi_keys(self, inchi_keys: Sequence[str]) -> np.ndarray:
+        """
+        Look up a number of inchi keys at once with a vectorised binary search
+
+        :param inchi_keys: the keys to look up
+        :return: a boolean vector that is True for the keys in the stock
+        """
+        return self._find_many(inchi_keys) >= 0
+
+    def price(self, mol: Molecule) -> float:
+        if self._prices is None:
+            raise StockException(
+                "no prices created, check if the stock was created with prices"
+            )
+        position = self._find(mol.inchi_key)
+        if position < 0:
+            raise StockException(f"no price info available for {mol.smiles}")
+        return float(self._prices[position])
+
+    def _find(self, inchi_key: str) -> int:
+        return int(self._find_many([inchi_key])[0])
+
+    def _find_many(self, inchi_keys: Sequence[str]) -> np.ndarray:
+        # The queries have the same dtype as the keys, so that the
+        # mapped array is not converted when searching
+        valid = np.array(
+            [len(key) <= _INCHI_KEY_LENGTH for key in inchi_keys], dtype=bool
+        )
+        queries = np.array(
+            [key.encode("ascii") if ok else b"" for key, ok in zip(inchi_keys, valid)],
+            dtype=self._keys.dtype,
+        )
+        if not len(self._keys) or not len(queries):
+            return np.full(len(queries), -1, dtype=np.int64)
+        positions = np.searchsorted(self._keys, queries)
+        clipped = np.minimum(positions, len(self._keys) - 1)
+        found = (
+            valid & (positions < len(self._keys)) & (self._keys[clipped] == queries)
+        )
+        return np.where(found, clipped, -1)
+
+
+def make_mmap_stock(
+    inchi_keys: Iterable[str],
+    filename: str,
+    prices: Optional[Iterable[float]] = None,
+) -> int:
+    """
+    Save inchi keys, and optionally prices, in a file that can be
+    loaded by `MemoryMappedInchiKeyQuery`.
+
+    The keys are sorted and only unique keys are stored. If a key occurs
+    several times, its lowest price is kept.
+
+    :param inchi_keys: the inchi keys
+    :param filename: the path to the stock file
+    :param prices: the prices of the compounds, in the same order as the keys
+    :raises StockException: if a key is longer than an inchi key or a price is missing or negative
+    :return: the number of unique keys
+    """
+    keys = np.array(list(inchi_keys), dtype=object)
+    if any(len(key) > _INCHI_KEY_LENGTH for key in keys):
+        raise StockException(
+            f"Keys of the memory-mapped stock can have at most {_INCHI_KEY_LENGTH} characters"
+        )
+    keys = keys.astype(f"S{_INCHI_KEY_LENGTH}")
+
+    price_array = None
+    if prices is not None:
+        price_array = np.asarray(list(prices), dtype="<f8")
+        if len(price_array) != len(keys):
+            raise StockException("Expected one price for each inchi key")
+        if np.isnan(price_array).any() or (price_array < 0).any():
+            raise StockException("Expected non-negative prices without null values")
+        order = np.lexsort((price_array, keys))
+    else:
+        order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    unique = np.ones(len(keys), dtype=bool)
+    unique[1:] = keys[1:] != keys[:-1]
+    keys = keys[unique]
+
+    with open(filename, "wb") as fileobj:
+        fileobj.write(_MMAP_STOCK_MAGIC)
+        fileobj.write(struct.pack("<QQ", len(keys), int(price_array is not None)))
+        fileobj.write(keys.tobytes())
+        if price_array is not None:
+            # The prices are aligned to 8 bytes from the start of the file
+            fileobj.write(b"\0" * (-fileobj.tell() % 8))
+            fileobj.write(price_array[order][unique].tobytes())
+    return len(keys)
+
 
 STOCK_QUERY_ALIAS = {
     "inchiset": "InMemoryInchiKeyQuery",
     "mongodb": "MongoDbInchiKeyQuery",
     "bloom": "MolbloomFilterQuery",
+    "mmstock": "MemoryMappedInchiKeyQuery",
 }
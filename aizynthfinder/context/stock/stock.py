@@ -9,7 +9,9 @@ from typing import TYPE_CHECKING
 from aizynthfinder.chem import Molecule
 from aizynthfinder.context.collection import ContextCollection
 from aizynthfinder.context.stock.queries import (
+    MMAP_STOCK_EXTENSION,
     InMemoryInchiKeyQuery,
+    MemoryMappedInchiKeyQuery,
     MolbloomFilterQuery,
     STOCK_QUERY_ALIAS,
     StockQueryMixin,
@@ -24,6 +26,7 @@ if TYPE_CHECKING:
         Dict,
         List,
         Optional,
+        Sequence,
         Set,
         StrDict,
         Union,
@@ -129,6 +132,60 @@ class Stock(ContextCollection):
             return ",".join(availability)
         return "Not in stock"
 
+    def availability_many(self, mols: Sequence[Molecule]) -> List[str]:
+        """
+        Return strings of what stocks a number of molecules are available in,
+        querying each selected stock once for all molecules.
+
+        :param mols: the molecules to query
+        :returns: for each molecule, the same string as `availability_string`
+        """
+        availabilities: List[Set[str]] = [set() for _ in mols]
+        for key in self.selection or []:
+            in_stock = self[key].contains_many(mols)
+            positions = [idx for idx, flag in enumerate(in_stock) if flag]
+            if not positions:
+                continue
+            try:
+                strings = self[key].availability_many([mols[idx] for idx in positions])
+            except (StockException, AttributeError):
+                strings = [key] * len(positions)
+            for idx, string in zip(positions, strings):
+                availabilities[idx].update(string.split(","))
+        return [
+            ",".join(sorted(availability)) if availability else "Not in stock"
+            for availability in availabilities
+        ]
+
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        """
+        Check if a number of molecules are in stock, querying each
+        selected stock once for all the unique molecules not found in
+        the previous stocks.
+
+        :param mols: the molecules to query
+        :returns: for each molecule if it is in stock
+        """
+        if not self.selection:
+            return [False] * len(mols)
+
+        if self._use_stop_criteria:
+            return [mol in self for mol in mols]
+
+        queries: Dict[str, Molecule] = {}
+        for mol in mols:
+            if mol.inchi_key not in self._exclude:
+                queries.setdefault(mol.inchi_key, mol)
+        remaining = list(queries.values())
+        found: Set[str] = set()
+        for key in self.selection:
+            if not remaining:
+                break
+            in_stock = self[key].contains_many(remaining)
+            found.update(mol.inchi_key for mol, flag in zip(remaining, in_stock) if flag)
+            remaining = [mol for mol, flag in zip(remaining, in_stock) if not flag]
+        return [mol.inchi_key in found for mol in mols]
+
     def exclude(self, mol: Molecule) -> None:
         """
         Exclude a molecule from the stock.
@@ -182,6 +239,8 @@ class Stock(ContextCollection):
                 kwargs = {"path": stock_config}
                 if stock_config.endswith(".bloom"):
                     cls: Any = MolbloomFilterQuery
+                elif stock_config.endswith(MMAP_STOCK_EXTENSION):
+                    cls = MemoryMappedInchiKeyQuery
                 else:
                     cls = InMemoryInchiKeyQuery
             else:
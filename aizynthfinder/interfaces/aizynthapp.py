@@ -267,7 +267,7 @@ class AiZynthApp:
 
     def _on_extend_button_clicked(self, _) -> None:
         self._toggle_button(False)
-        self._tree_search()
+        self._tree_search(continue_search=True)
         self._toggle_button(True)
 
     def _on_display_button_clicked(self, _) -> None:
@@ -347,9 +347,9 @@ class AiZynthApp:
         for button in self._buttons.values():
             button.disabled = not on_
 
-    def _tree_search(self) -> None:
+    def _tree_search(self, continue_search: bool = False) -> None:
         with self._output["tree_search"]:
-            self.finder.tree_search(show_progress=True)
+            self.finder.tree_search(show_progress=True, continue_search=continue_search)
             display(HTML("<b>Tree search completed!</b>"))
 
 
@@ -4,26 +4,34 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import importlib
 import json
 import logging
+import multiprocessing
 import os
 import tempfile
 import time
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import TYPE_CHECKING
 
 import pandas as pd
 
 from aizynthfinder.aizynthfinder import AiZynthFinder
 from aizynthfinder.chem import Molecule
+from aizynthfinder.context.policy.cache import DiskPredictionCache
+from aizynthfinder.context.stock.queries import MongoDbInchiKeyQuery
 from aizynthfinder.utils.files import (
+    JsonLinesWriter,
     cat_datafiles,
+    is_jsonl_file,
     save_datafile,
     split_file,
     start_processes,
 )
 from aizynthfinder.utils.logging import logger, setup_logger
+from aizynthfinder.utils.models import LocalOnnxModel
 
 if TYPE_CHECKING:
     from aizynthfinder.utils.type_utils import (
@@ -32,13 +40,21 @@ if TYPE_CHECKING:
         Dict,
         List,
         Optional,
+        Set,
         StrDict,
+        Tuple,
         Union,
     )
 
     _PostProcessingJob = Callable[[AiZynthFinder], StrDict]
     _PreProcessingJob = Callable[[AiZynthFinder, int], None]
 
+# The state of the worker processes of the worker pool, set before
+# the workers are forked so that the loaded finder is shared with them
+_WORKER_STATE: StrDict = {}
+# The search trees that cannot be saved in snapshots that have been warned about
+_SNAPSHOT_WARNINGS: Set[str] = set()
+
 
 def _do_clustering(
     finder: AiZynthFinder,
@@ -89,7 +105,10 @@ def _get_arguments() -> argparse.Namespace:
         "--stocks", nargs="+", default=[], help="the name of the stocks to use"
     )
     parser.add_argument(
-        "--output", help="the name of the output file (JSON or HDF5 file)"
+        "--output",
+        help="the name of the output file (JSON, JSON-lines or HDF5 file). "
+        "If a JSON-lines file is given, the result of each target is written "
+        "as soon as it is completed",
     )
     parser.add_argument(
         "--log_to_file",
@@ -102,6 +121,13 @@ def _get_arguments() -> argparse.Namespace:
         type=int,
         help="if given, the input is split over a number of processes",
     )
+    parser.add_argument(
+        "--worker_pool",
+        action="store_true",
+        default=False,
+        help="if provided together with --nproc, the targets are processed by a pool of "
+        "forked worker processes that share the loaded models and stocks",
+    )
     parser.add_argument(
         "--cluster",
         action="store_true",
@@ -125,6 +151,12 @@ def _get_arguments() -> argparse.Namespace:
         required=False,
         help="the path to the checkpoint file",
     )
+    parser.add_argument(
+        "--snapshots",
+        help="a directory where a snapshot of the search of each target is saved. "
+        "If a snapshot of a target exists, the search tree is restored from it and "
+        "the search is continued if the target has not been solved",
+    )
     return parser.parse_args()
 
 
@@ -189,6 +221,48 @@ def _load_checkpoint(
     return checkpoint_results
 
 
+def _search_target(
+    finder: AiZynthFinder,
+    snapshot_dir: Optional[str],
+    show_progress: bool = False,
+) -> float:
+    snapshot = ""
+    if snapshot_dir:
+        smiles_hash = hashlib.sha256(finder.target_smiles.encode("utf-8"))
+        snapshot = os.path.join(snapshot_dir, smiles_hash.hexdigest()[:16] + ".aztree")
+
+    continue_search = False
+    if snapshot and os.path.exists(snapshot):
+        try:
+            finder.load_snapshot(snapshot)
+        except ValueError as err:
+            logger().warning(f"Could not load snapshot {snapshot}: {err}")
+        else:
+            continue_search = True
+    if not continue_search:
+        finder.prepare_tree()
+    elif "first_solution_time" in finder.search_stats:
+        logger().info(f"Restored solved search of {finder.target_smiles}")
+        return 0.0
+
+    if snapshot and not hasattr(finder.tree, "binary_writer"):
+        tree_class = finder.tree.__class__.__name__
+        if tree_class not in _SNAPSHOT_WARNINGS:
+            logger().warning(
+                f"Snapshots of a {tree_class} tree cannot be saved, "
+                "the search will not be saved"
+            )
+            _SNAPSHOT_WARNINGS.add(tree_class)
+        snapshot = ""
+
+    search_time = finder.tree_search(
+        show_progress=show_progress, continue_search=continue_search
+    )
+    if snapshot:
+        finder.save_snapshot(snapshot)
+    return search_time
+
+
 def _process_single_smiles(
     smiles: str,
     finder: AiZynthFinder,
@@ -197,17 +271,17 @@ def _process_single_smiles(
     route_distance_model: Optional[str],
     post_processing: List[_PostProcessingJob],
     pre_processing: Optional[_PreProcessingJob],
+    snapshot_dir: Optional[str] = None,
 ) -> None:
     output_name = output_name or "trees.json"
     finder.target_smiles = smiles
     if pre_processing:
         pre_processing(finder, -1)
     try:
-        finder.prepare_tree()
+        _search_target(finder, snapshot_dir, show_progress=True)
     except ValueError as err:
         print(f"Failed to setup search due to: '{str(err).lower()}'")
         return
-    finder.tree_search(show_progress=True)
     finder.build_routes()
     finder.routes.compute_scores(*finder.scorers.objects())
 
@@ -231,25 +305,65 @@ def _process_single_smiles(
     logger().info(stats_str)
 
 
-def _process_multi_smiles(
-    filename: str,
+def _process_target(
+    smiles: str,
+    index: int,
     finder: AiZynthFinder,
-    output_name: str,
     do_clustering: bool,
     route_distance_model: Optional[str],
     post_processing: List[_PostProcessingJob],
     pre_processing: Optional[_PreProcessingJob],
-    checkpoint: Optional[str],
-) -> None:
-    output_name = output_name or "output.json.gz"
+    snapshot_dir: Optional[str] = None,
+) -> Optional[StrDict]:
+    if pre_processing:
+        pre_processing(finder, index)
+    processed_results = {}
+    finder.target_smiles = smiles
+    try:
+        search_time = _search_target(finder, snapshot_dir)
+    except ValueError as err:
+        print(f"Failed to setup search for {smiles} due to: '{str(err).lower()}'")
+        return None
+    finder.build_routes()
+    finder.routes.compute_scores(*finder.scorers.objects())
+    stats = finder.extract_statistics()
+
+    solved_str = "is solved" if stats["is_solved"] else "is not solved"
+    logger().info(f"Done with {smiles} in {search_time:.3} s and {solved_str}")
+    if do_clustering:
+        _do_clustering(
+            finder, stats, detailed_results=True, model_path=route_distance_model
+        )
+    _do_post_processing(finder, stats, post_processing)
+
+    for key, value in stats.items():
+        processed_results[key] = value
+    processed_results["stock_info"] = finder.stock_info()
+    processed_results["trees"] = finder.routes.dict_with_extra(
+        include_metadata=True, include_scores=True
+    )
+    return processed_results
+
+
+def _load_targets(
+    filename: str, checkpoint: Optional[str]
+) -> Tuple[List[str], StrDict]:
     with open(filename, "r") as fileobj:
         smiles = [line.strip() for line in fileobj.readlines()]
 
     checkpoint_data: StrDict = defaultdict(list)
     if checkpoint:
         checkpoint_data = _load_checkpoint(checkpoint)
-        start = len(checkpoint_data["processed_smiles"]) if checkpoint_data else 0
-        smiles = smiles[start:]
+        # The targets can be processed in any order, so each processed target
+        # is skipped once, in case the same SMILES is in the input several times
+        processed = Counter(checkpoint_data.get("processed_smiles", []))
+        remaining = []
+        for smi in smiles:
+            if processed[smi] > 0:
+                processed[smi] -= 1
+            else:
+                remaining.append(smi)
+        smiles = remaining
 
     results: StrDict = defaultdict(list)
     if checkpoint_data:
@@ -258,52 +372,193 @@ def _process_multi_smiles(
             for key, value in checkpoint_data.items()
             if key != "processed_smiles"
         }
-    for idx, smi in enumerate(smiles):
-        if pre_processing:
-            pre_processing(finder, idx)
-        processed_results = {}
-        finder.target_smiles = smi
-        try:
-            finder.prepare_tree()
-        except ValueError as err:
-            print(f"Failed to setup search for {smi} due to: '{str(err).lower()}'")
-            continue
-        search_time = finder.tree_search()
-        finder.build_routes()
-        finder.routes.compute_scores(*finder.scorers.objects())
-        stats = finder.extract_statistics()
-
-        solved_str = "is solved" if stats["is_solved"] else "is not solved"
-        logger().info(f"Done with {smi} in {search_time:.3} s and {solved_str}")
-        if do_clustering:
-            _do_clustering(
-                finder, stats, detailed_results=True, model_path=route_distance_model
+    return smiles, results
+
+
+def _open_output_writer(
+    output_name: str, results: StrDict
+) -> Optional[JsonLinesWriter]:
+    if not is_jsonl_file(output_name):
+        return None
+
+    writer = JsonLinesWriter(output_name)
+    # Results of the targets processed before the checkpoint are written first
+    keys = list(results.keys())
+    for values in zip(*results.values()):
+        writer.write(dict(zip(keys, values)))
+    results.clear()
+    return writer
+
+
+def _save_output(
+    results: StrDict, output_name: str, writer: Optional[JsonLinesWriter]
+) -> None:
+    if writer is None:
+        data = pd.DataFrame.from_dict(results)
+        save_datafile(data, output_name)
+    logger().info(f"Output saved to {output_name}")
+
+
+def _save_processed_target(
+    smiles: str,
+    processed_results: StrDict,
+    results: StrDict,
+    checkpoint: Optional[str],
+    writer: Optional[JsonLinesWriter],
+) -> None:
+    if checkpoint:
+        with open(checkpoint, "a") as checkpoint_file:
+            checkpoint_file.write(
+                json.dumps({"processed_smiles": smiles, "results": processed_results})
+                + "\n"
             )
-        _do_post_processing(finder, stats, post_processing)
+        logger().debug(f"Results for processed smiles '{smiles}' saved to {checkpoint}")
 
-        for key, value in stats.items():
-            processed_results[key] = value
-        processed_results["stock_info"] = finder.stock_info()
-        processed_results["trees"] = finder.routes.dict_with_extra(
-            include_metadata=True, include_scores=True
-        )
+    if writer is not None:
+        writer.write(processed_results)
+        return
+    for key, value in processed_results.items():
+        results[key].append(value)
 
-        if checkpoint:
-            with open(checkpoint, "a") as checkpoint_file:
-                checkpoint_file.write(
-                    json.dumps({"processed_smiles": smi, "results": processed_results})
-                    + "\n"
-                )
-            logger().debug(
-                f"Results for processed smiles '{smi}' saved to {checkpoint}"
+
+def _process_multi_smiles(
+    filename: str,
+    finder: AiZynthFinder,
+    output_name: str,
+    do_clustering: bool,
+    route_distance_model: Optional[str],
+    post_processing: List[_PostProcessingJob],
+    pre_processing: Optional[_PreProcessingJob],
+    checkpoint: Optional[str],
+    snapshot_dir: Optional[str] = None,
+) -> None:
+    output_name = output_name or "output.json.gz"
+    smiles, results = _load_targets(filename, checkpoint)
+    writer = _open_output_writer(output_name, results)
+
+    try:
+        for idx, smi in enumerate(smiles):
+            processed_results = _process_target(
+                smi,
+                idx,
+                finder,
+                do_clustering,
+                route_distance_model,
+                post_processing,
+                pre_processing,
+                snapshot_dir,
             )
+            if processed_results is not None:
+                _save_processed_target(
+                    smi, processed_results, results, checkpoint, writer
+                )
+    finally:
+        if writer is not None:
+            writer.close()
+
+    _save_output(results, output_name, writer)
+
+
+def _init_pool_worker() -> None:
+    # Sessions and connections created in the parent process cannot be used
+    # in the forked workers, so they are re-created in each worker
+    finder: AiZynthFinder = _WORKER_STATE["finder"]
+    for collection in [finder.expansion_policy, finder.filter_policy]:
+        for key in collection.items:
+            model = getattr(collection[key], "model", None)
+            if isinstance(model, LocalOnnxModel):
+                model.reset_session()
+            # pylint: disable=protected-access
+            cache = getattr(collection[key], "_cache", None)
+            if isinstance(cache, DiskPredictionCache):
+                cache.reconnect()
+    for key in finder.stock.items:
+        query = finder.stock[key]
+        if isinstance(query, MongoDbInchiKeyQuery):
+            query.reconnect()
+
+
+def _process_target_in_worker(
+    smiles: str, index: int
+) -> Tuple[int, str, Optional[StrDict]]:
+    return (
+        index,
+        smiles,
+        _process_target(smiles, index, *_WORKER_STATE["args"]),
+    )
 
-        for key, value in processed_results.items():
-            results[key].append(value)
 
-    data = pd.DataFrame.from_dict(results)
-    save_datafile(data, output_name)
-    logger().info(f"Output saved to {output_name}")
+def _process_multi_smiles_in_pool(
+    filename: str,
+    finder: AiZynthFinder,
+    output_name: str,
+    do_clustering: bool,
+    route_distance_model: Optional[str],
+    post_processing: List[_PostProcessingJob],
+    pre_processing: Optional[_PreProcessingJob],
+    checkpoint: Optional[str],
+    nproc: int,
+    snapshot_dir: Optional[str] = None,
+) -> None:
+    """
+    Process the targets in a pool of worker processes that are forked from
+    this process, so that the models, templates and stocks of the
+    finder are loaded once and shared with the workers.
+
+    The targets are dispatched to the workers one by one. If the output is
+    a JSON lines file, the results are saved to the checkpoint file and the
+    output as soon as each target is completed, so they are not in the order
+    of the input. For other outputs, the results are kept until the results
+    of all preceding targets are completed, so they are saved in the order
+    of the input.
+    """
+    output_name = output_name or "output.json.gz"
+    smiles, results = _load_targets(filename, checkpoint)
+    writer = _open_output_writer(output_name, results)
+
+    _WORKER_STATE["finder"] = finder
+    _WORKER_STATE["args"] = (
+        finder,
+        do_clustering,
+        route_distance_model,
+        post_processing,
+        pre_processing,
+        snapshot_dir,
+    )
+    try:
+        with ProcessPoolExecutor(
+            max_workers=nproc,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_pool_worker,
+        ) as pool:
+            futures = [
+                pool.submit(_process_target_in_worker, smi, idx)
+                for idx, smi in enumerate(smiles)
+            ]
+            pending: Dict[int, Tuple[str, Optional[StrDict]]] = {}
+            next_index = 0
+            for future in as_completed(futures):
+                index, smi, processed_results = future.result()
+                if writer is not None:
+                    if processed_results is not None:
+                        _save_processed_target(
+                            smi, processed_results, results, checkpoint, writer
+                        )
+                    continue
+                pending[index] = (smi, processed_results)
+                while next_index in pending:
+                    smi, processed_results = pending.pop(next_index)
+                    next_index += 1
+                    if processed_results is not None:
+                        _save_processed_target(
+                            smi, processed_results, results, checkpoint, writer
+                        )
+    finally:
+        _WORKER_STATE.clear()
+        if writer is not None:
+            writer.close()
+
+    _save_output(results, output_name, writer)
 
 
 def _multiprocess_smiles(args: argparse.Namespace) -> None:
@@ -330,6 +585,8 @@ def _multiprocess_smiles(args: argparse.Namespace) -> None:
             cmd_args.extend(["--route_distance_model", args.route_distance_model])
         if args.post_processing:
             cmd_args.extend(["--post_processing"] + args.post_processing)
+        if args.snapshots:
+            cmd_args.extend(["--snapshots", args.snapshots])
         return cmd_args
 
     if not os.path.exists(args.smiles):
@@ -339,7 +596,8 @@ def _multiprocess_smiles(args: argparse.Namespace) -> None:
 
     setup_logger(logging.INFO)
     filenames = split_file(args.smiles, args.nproc)
-    json_files = [tempfile.mktemp(suffix=".json.gz") for _ in range(args.nproc)]
+    suffix = ".jsonl.gz" if is_jsonl_file(args.output or "") else ".json.gz"
+    json_files = [tempfile.mktemp(suffix=suffix) for _ in range(args.nproc)]
     start_processes(filenames, "aizynthcli", create_cmd)
 
     if not all(os.path.exists(filename) for filename in json_files):
@@ -366,12 +624,22 @@ def main() -> None:
             )
             return
 
-    if args.nproc:
+    multi_smiles = os.path.exists(args.smiles)
+    use_worker_pool = bool(args.nproc and args.worker_pool and multi_smiles)
+    if use_worker_pool and "fork" not in multiprocessing.get_all_start_methods():
+        logger().warning(
+            "The worker pool is not supported on this platform, "
+            "will start separate processes instead"
+        )
+        use_worker_pool = False
+
+    if args.snapshots:
+        os.makedirs(args.snapshots, exist_ok=True)
+
+    if args.nproc and not use_worker_pool:
         _multiprocess_smiles(args)
         return
 
-    multi_smiles = os.path.exists(args.smiles)
-
     finder = AiZynthFinder(configfile=args.config)
     _select_stocks(finder, args)
     post_processing = _load_postprocessing_jobs(args.post_processing)
@@ -392,11 +660,15 @@ def main() -> None:
         pre_processing,
         args.checkpoint,
     ]
-    if multi_smiles:
-        _process_multi_smiles(*params)
+    if use_worker_pool:
+        _process_multi_smiles_in_pool(
+            *params, nproc=args.nproc, snapshot_dir=args.snapshots
+        )
+    elif multi_smiles:
+        _process_multi_smiles(*params, snapshot_dir=args.snapshots)
     else:
         params = params[:-1]
-        _process_single_smiles(*params)
+        _process_single_smiles(*params, snapshot_dir=args.snapshots)
 
 
 if __name__ == "__main__":
@@ -9,12 +9,25 @@ import networkx as nx
 
 from aizynthfinder.chem import UniqueMolecule
 from aizynthfinder.reactiontree import ReactionTree, ReactionTreeLoader
+from aizynthfinder.search.executor import TemplateExecutor
 
 if TYPE_CHECKING:
     from aizynthfinder.chem import FixedRetroReaction
     from aizynthfinder.context.config import Configuration
     from aizynthfinder.context.stock import Stock
-    from aizynthfinder.utils.type_utils import Any, List, Optional, StrDict, Union
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        Dict,
+        Iterator,
+        List,
+        Optional,
+        Set,
+        StrDict,
+        Tuple,
+        Union,
+    )
+
+    _TraceEdges = Tuple[Tuple[TreeNodeMixin, TreeNodeMixin], Any]
 
 
 class TreeNodeMixin:
@@ -32,13 +45,26 @@ class TreeNodeMixin:
 
 
 class AndOrSearchTreeBase(abc.ABC):
-    """A base class for a search tree based on an AND/OR structure"""
+    """
+    A base class for a search tree based on an AND/OR structure
+
+    Sub-classes should set the `root` of the tree and store the routes
+    extracted by `routes` in the `_routes` attribute, which should be
+    cleared when the tree is changed.
+
+    :ivar config: the configuration of the search tree
+    :ivar root: the root of the AND/OR tree, None if the tree is not initialized
+    :ivar template_executor: the executor used to apply the templates of an expansion
+    """
 
     def __init__(
         self, config: Configuration, root_smiles: Optional[str] = None
     ) -> None:
         self.config = config
+        self.template_executor = TemplateExecutor.from_config(config)
+        self.root: Optional[TreeNodeMixin] = None
         self._root_smiles = root_smiles
+        self._routes: List[ReactionTree] = []
 
     @property
     def mol_nodes(self) -> List[TreeNodeMixin]:
@@ -55,6 +81,21 @@ class AndOrSearchTreeBase(abc.ABC):
         """Return the routes of the tree"""
         return []
 
+    def iter_routes(self) -> Iterator[ReactionTree]:
+        """
+        Extracts routes from the AND/OR tree one at a time, so that
+        the caller can stop when it has enough routes. Solved
+        reactions are preferred, so the first route is solved if possible.
+        If the routes have already been extracted by `routes`, these are returned.
+
+        :return: an iterator over the routes
+        """
+        if self.root is None:
+            return iter([])
+        if self._routes:
+            return iter(self._routes)
+        return SplitAndOrTree(self.root, self.config.stock, lazy=True).iter_routes()
+
 
 class SplitAndOrTree:
     """
@@ -67,64 +108,102 @@ class SplitAndOrTree:
     to avoid combinatorial explosion.
 
     The routes are extracted on instantiation and the routes can be access from
-    the `routes` attribute.
+    the `routes` attribute. If `lazy` is True, no routes are extracted on
+    instantiation and the routes are instead yielded one at a time by `iter_routes`,
+    so that the caller can stop when it has enough routes.
+
+    :ivar routes: the extracted routes, empty if `lazy` is True
 
     :param root_node: the root of the AND/OR tree
     :param stock: the stock of the search
     :param max_routes: the maximum number of routes to extract
+    :param lazy: if True, do not extract the routes on instantiation
     """
 
     def __init__(
-        self, root_node: TreeNodeMixin, stock: Stock, max_routes: int = 25000
+        self,
+        root_node: TreeNodeMixin,
+        stock: Stock,
+        max_routes: int = 25000,
+        lazy: bool = False,
     ) -> None:
-        self._traces: List[_AndOrTrace] = []
-        self._black_list: List[TreeNodeMixin] = []
-        graph = _AndOrTrace(root_node)
-        self._samples = {child: 0 for child in root_node.children}
+        self._root_node = root_node
+        self._stock = stock
         if root_node.children:
             self._sampling_cutoff = max_routes / len(root_node.children)
         else:
             self._sampling_cutoff = max_routes
-        self._partition_search_tree(graph, root_node)
-        routes_list = [
-            ReactionTreeFromAndOrTrace(trace, stock).tree for trace in self._traces
-        ]
-        routes_map = {route.hash_key(): route for route in routes_list}
-        self.routes = list(routes_map.values())
+        self.routes: List[ReactionTree] = []
+        if not lazy:
+            routes_map = {route.hash_key(): route for route in self._all_routes()}
+            self.routes = list(routes_map.values())
+
+    def iter_routes(self) -> Iterator[ReactionTree]:
+        """
+        Extract the routes one at a time. Routes that are identical
+        to a route that has already been extracted are skipped.
+
+        The routes are extracted in the order they are found by the partition
+        of the tree, which selects solved reactions before unsolved reactions,
+        so the first routes are solved routes if the tree has any.
 
-    def _partition_search_tree(self, graph: _AndOrTrace, node: TreeNodeMixin) -> None:
+        :yield: the unique routes
+        """
+        seen_hashes = set()
+        for route in self._all_routes():
+            route_hash = route.hash_key()
+            if route_hash not in seen_hashes:
+                seen_hashes.add(route_hash)
+                yield route
+
+    def _all_routes(self) -> Iterator[ReactionTree]:
+        # The state of the partition is local to each generator, so that
+        # several extractions of the routes can be interleaved
+        black_list: Set[TreeNodeMixin] = set()
+        samples = {child: 0 for child in self._root_node.children}
+        root_trace = _AndOrTrace(self._root_node)
+        for trace in self._partition_search_tree(
+            root_trace, self._root_node, black_list, samples
+        ):
+            yield ReactionTreeFromAndOrTrace(trace.to_graph(), self._stock).tree
+
+    def _partition_search_tree(
+        self,
+        trace: _AndOrTrace,
+        node: TreeNodeMixin,
+        black_list: Set[TreeNodeMixin],
+        samples: Dict[TreeNodeMixin, int],
+    ) -> Iterator[_AndOrTrace]:
         # fmt: off
-        if self._sampling_cutoff and len(graph) > 1 and self._samples[graph.first_reaction] > self._sampling_cutoff:
+        if self._sampling_cutoff and trace.first_reaction is not None and samples[trace.first_reaction] > self._sampling_cutoff:
             return
         # fmt: on
 
         if not node.children:
-            self._traces.append(graph)
+            yield trace
 
         children_to_search = [
-            child for child in node.children if child not in self._black_list
+            child for child in node.children if child not in black_list
         ]
         if not children_to_search:
             for child in node.children:
-                self._black_list.remove(child)
+                black_list.remove(child)
             return
 
-        graph_copy = graph.copy()
-
         child_node = self._select_child_node(children_to_search)
-        graph.add_edge(node, child_node)
-        for grandchild in child_node.children:
-            graph.add_edge(child_node, grandchild)
-        self._black_list.append(child_node)
+        new_trace = trace.extend(node, child_node)
+        black_list.add(child_node)
 
-        leaves = [node for node in graph if not graph[node] and node.children]
-        if not leaves:
-            self._traces.append(graph)
-            self._samples[graph.first_reaction] += 1
+        if not new_trace.leaves:
+            assert new_trace.first_reaction is not None
+            samples[new_trace.first_reaction] += 1
+            yield new_trace
         else:
-            self._partition_search_tree(graph, leaves[0])
+            yield from self._partition_search_tree(
+                new_trace, new_trace.leaves[0], black_list, samples
+            )
 
-        self._partition_search_tree(graph_copy, node)
+        yield from self._partition_search_tree(trace, node, black_list, samples)
 
     def _select_child_node(self, children: List[TreeNodeMixin]) -> TreeNodeMixin:
         # This is what makes this algorithm different from what was
@@ -140,40 +219,71 @@ class SplitAndOrTree:
         return random.choice(children)
 
 
-class _AndOrTrace(nx.DiGraph):
-    """Helper class for the SplitAndOrTree class."""
+class _AndOrTrace:
+    """
+    Helper class for the SplitAndOrTree class.
 
-    def __init__(self, root: Optional[TreeNodeMixin] = None) -> None:
-        super().__init__()
-        self.root = root
-        self._first_reaction: Optional[TreeNodeMixin] = None
-        self._reaction_tree: Optional[Any] = None
-        if root:
-            self.add_node(root)
+    A partial route of an AND/OR tree. The trace is immutable and extending
+    it creates a new trace that shares the edges of this trace, so that
+    the partition of a tree does not need to copy the traces.
 
-    @property
-    def first_reaction(self) -> TreeNodeMixin:
-        """Return the first reaction or raise an exception"""
-        assert self._first_reaction is not None
-        return self._first_reaction
+    :ivar root: the root of the trace
+    :ivar first_reaction: the reaction of the root in the trace, if any
+    :ivar leaves: the molecule nodes of the trace with children that have not been added, in the order they were added
+    """
+
+    __slots__ = ("root", "first_reaction", "leaves", "_edges")
 
-    def add_edge(
-        self, u_of_edge: TreeNodeMixin, v_of_edge: TreeNodeMixin, **attr: Any
+    def __init__(
+        self,
+        root: TreeNodeMixin,
+        first_reaction: Optional[TreeNodeMixin] = None,
+        leaves: Optional[Tuple[TreeNodeMixin, ...]] = None,
+        edges: Optional[_TraceEdges] = None,
     ) -> None:
-        if u_of_edge is self.root:
-            if self._first_reaction is not None:
-                raise ValueError(
-                    "Re-defining trace. Trying to set first reaction twice."
-                )
-            self._first_reaction = v_of_edge
-        super().add_edge(u_of_edge, v_of_edge, **attr)
-
-    def copy(self, as_view: bool = False) -> "_AndOrTrace":
-        other = super().copy(as_view)
-        assert isinstance(other, _AndOrTrace)
-        other.root = self.root
-        other._first_reaction = self._first_reaction  # pylint: disable=protected-access
-        return other
+        self.root = root
+        self.first_reaction = first_reaction
+        if leaves is None:
+            leaves = (root,) if root.children else ()
+        self.leaves = leaves
+        self._edges = edges
+
+    def extend(self, node: TreeNodeMixin, child_node: TreeNodeMixin) -> _AndOrTrace:
+        """
+        Return a new trace in which a reaction node and its molecule nodes
+        have been added to a leaf of this trace
+
+        :param node: the leaf
+        :param child_node: the reaction node
+        :return: the new trace
+        """
+        if node is self.root and self.first_reaction is not None:
+            raise ValueError("Re-defining trace. Trying to set first reaction twice.")
+        first_reaction = child_node if node is self.root else self.first_reaction
+
+        edges = ((node, child_node), self._edges)
+        for grandchild in child_node.children:
+            edges = ((child_node, grandchild), edges)
+        leaves = tuple(leaf for leaf in self.leaves if leaf is not node) + tuple(
+            grandchild for grandchild in child_node.children if grandchild.children
+        )
+        return _AndOrTrace(self.root, first_reaction, leaves, edges)
+
+    def to_graph(self) -> nx.DiGraph:
+        """
+        Create a graph of the nodes of the trace
+
+        :return: the graph
+        """
+        edges = []
+        link = self._edges
+        while link is not None:
+            edge, link = link
+            edges.append(edge)
+        graph = nx.DiGraph()
+        graph.add_node(self.root)
+        graph.add_edges_from(reversed(edges))
+        return graph
 
 
 class ReactionTreeFromAndOrTrace(ReactionTreeLoader):
@@ -187,6 +297,9 @@ class ReactionTreeFromAndOrTrace(ReactionTreeLoader):
         self._stock = stock
         self._trace_graph = andor_trace
         self._trace_root = self._find_root()
+        self._trace_depths = nx.single_source_shortest_path_length(
+            andor_trace, self._trace_root
+        )
 
         self._add_node(
             self._unique_mol(self._trace_root.prop["mol"]),
@@ -207,7 +320,7 @@ class ReactionTreeFromAndOrTrace(ReactionTreeLoader):
         if node in self.tree.graph:
             return
 
-        depth = nx.shortest_path_length(self._trace_graph, self._trace_root, base_node)
+        depth = self._trace_depths[base_node]
         if isinstance(node, UniqueMolecule):
             self._add_node(
                 node, depth=depth, transform=depth // 2, in_stock=node in self._stock
@@ -5,22 +5,49 @@ from __future__ import annotations
 import json
 from typing import TYPE_CHECKING
 
-from aizynthfinder.chem.serialization import MoleculeDeserializer, MoleculeSerializer
+from aizynthfinder.chem.serialization import (
+    BinaryTreeReader,
+    BinaryTreeWriter,
+    MoleculeDeserializer,
+    MoleculeSerializer,
+    is_binary_tree_file,
+)
 from aizynthfinder.search.andor_trees import AndOrSearchTreeBase, SplitAndOrTree
-from aizynthfinder.search.breadth_first.nodes import MoleculeNode
+from aizynthfinder.search.breadth_first.nodes import MoleculeNode, ReactionNode
 from aizynthfinder.utils.logging import logger
 
 if TYPE_CHECKING:
     from aizynthfinder.chem import RetroReaction
     from aizynthfinder.context.config import Configuration
     from aizynthfinder.reactiontree import ReactionTree
-    from aizynthfinder.utils.type_utils import List, Optional, Sequence
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        Dict,
+        List,
+        Optional,
+        Sequence,
+        StrDict,
+        Union,
+    )
+
+# The columns of a node in a binary tree file
+_BINARY_COLUMNS = {
+    "mol": "<i4",
+    "reaction": "<i4",
+    "expandable": "u1",
+    "children": "<i4[]",
+}
 
 
 class SearchTree(AndOrSearchTreeBase):
     """
     Encapsulation of the a breadth-first exhaustive search algorithm
 
+    If the ``expansion_batch_size`` setting of the search algorithm is larger
+    than one, the molecules of a layer are sent to the expansion policy in
+    batches of that size. Molecules that occur more than once in the layer
+    are only sent once. The templates of a batch are applied together.
+
     :ivar config: settings of the tree search algorithm
     :ivar root: the root node
 
@@ -51,30 +78,63 @@ class SearchTree(AndOrSearchTreeBase):
             "reactants_generations": 0,
         }
 
+    @classmethod
+    def from_binary(cls, reader: BinaryTreeReader, config: Configuration) -> SearchTree:
+        """
+        Create a new search tree from a binary file written with `binary_writer`
+
+        :param reader: the reader of the binary file
+        :param config: the configuration of the search tree
+        :return: a deserialized tree
+        :raises ValueError: if the file does not contain a breadth-first tree
+        """
+        if reader.kind != "breadth_first":
+            raise ValueError(
+                f"The file contains a '{reader.kind}' tree, not a breadth-first tree"
+            )
+
+        tree = cls(config)
+        tree.profiling.update(reader.metadata.get("profiling", {}))
+
+        columns = reader.nodes
+        nodes: List[Any] = []
+        for idx, parent in enumerate(reader.parents().tolist()):
+            mol_idx = int(columns["mol"][idx])
+            if mol_idx >= 0:
+                mol = reader.molecules.get_tree_molecules([mol_idx])[0]
+                node = MoleculeNode(mol, config, nodes[parent] if parent >= 0 else None)
+                node.expandable = bool(columns["expandable"][idx])
+            else:
+                reaction = reader.action(int(columns["reaction"][idx]))
+                node = ReactionNode(reaction, nodes[parent])
+            nodes.append(node)
+
+        children_column = columns["children"]
+        for idx, node in enumerate(nodes):
+            node.children = [nodes[child] for child in children_column[idx].tolist()]
+        tree.root = nodes[0]
+        tree._find_mol_nodes()
+        return tree
+
     @classmethod
     def from_json(cls, filename: str, config: Configuration) -> SearchTree:
         """
-        Create a new search tree by deserialization from a JSON file
+        Create a new search tree by deserialization from a JSON file,
+        or from a binary file if the file has the ``.aztree`` extension
 
         :param filename: the path to the JSON node
         :param config: the configuration of the search tree
         :return: a deserialized tree
         """
-
-        def _find_mol_nodes(node):
-            for child_ in node.children:
-                tree._mol_nodes.append(child_)  # pylint: disable=protected-access
-                for grandchild in child_.children:
-                    _find_mol_nodes(grandchild)
+        if is_binary_tree_file(filename):
+            return cls.from_binary(BinaryTreeReader(filename), config)
 
         tree = cls(config)
         with open(filename, "r") as fileobj:
             dict_ = json.load(fileobj)
         mol_deser = MoleculeDeserializer(dict_["molecules"])
         tree.root = MoleculeNode.from_dict(dict_["tree"], config, mol_deser)
-        tree._mol_nodes.append(tree.root)  # pylint: disable=protected-access
-        for child in tree.root.children:
-            _find_mol_nodes(child)
+        tree._find_mol_nodes()  # pylint: disable=protected-access
         return tree
 
     @property
@@ -98,9 +158,17 @@ class SearchTree(AndOrSearchTreeBase):
         self._routes = []
         self._added_mol_nodes = []
 
-        for next_node in self._mol_nodes:
-            if next_node.expandable:
-                self._expand(next_node)
+        batch_size = int(
+            self.config.search.algorithm_config.get("expansion_batch_size") or 1
+        )
+        if batch_size > 1:
+            self._expand_layer(
+                [node for node in self._mol_nodes if node.expandable], batch_size
+            )
+        else:
+            for next_node in self._mol_nodes:
+                if next_node.expandable:
+                    self._expand(next_node)
 
         if not self._added_mol_nodes:
             self._logger.debug("No new nodes added in breadth-first iteration")
@@ -122,9 +190,36 @@ class SearchTree(AndOrSearchTreeBase):
             self._routes = SplitAndOrTree(self.root, self.config.stock).routes
         return self._routes
 
+    def binary_writer(self, filename: str) -> BinaryTreeWriter:
+        """
+        Write the search tree to a binary file and return the open writer,
+        so that additional data can be added to the file. The writer
+        must be closed to complete the file.
+
+        :param filename: the path to the binary file
+        :return: the writer
+        :raises ValueError: if the root of the tree is not defined
+        """
+        if self.root is None:
+            raise ValueError("Cannot serialize tree as root is not defined")
+
+        writer = BinaryTreeWriter(
+            filename,
+            _BINARY_COLUMNS,
+            kind="breadth_first",
+            metadata={"profiling": dict(self.profiling)},
+        )
+        writer.write_tree(
+            self.root,
+            lambda node: self._binary_record(node, writer),
+            lambda node: node.children,
+        )
+        return writer
+
     def serialize(self, filename: str) -> None:
         """
-        Seralize the search tree to a JSON file
+        Seralize the search tree to a JSON file, or to a compact binary file
+        if the filename has the ``.aztree`` extension
 
         :param filename: the path to the JSON file
         :type filename: str
@@ -132,11 +227,43 @@ class SearchTree(AndOrSearchTreeBase):
         if self.root is None:
             raise ValueError("Cannot serialize tree as root is not defined")
 
+        if is_binary_tree_file(filename):
+            self.binary_writer(filename).close()
+            return
+
         mol_ser = MoleculeSerializer()
         dict_ = {"tree": self.root.serialize(mol_ser), "molecules": mol_ser.store}
         with open(filename, "w") as fileobj:
             json.dump(dict_, fileobj, indent=2)
 
+    @staticmethod
+    def _binary_record(
+        node: Union[MoleculeNode, ReactionNode], writer: BinaryTreeWriter
+    ) -> StrDict:
+        if isinstance(node, MoleculeNode):
+            return {
+                "mol": writer.molecule(node.mol),
+                "reaction": -1,
+                "expandable": node.expandable,
+            }
+        return {
+            "mol": -1,
+            "reaction": writer.action(node.reaction),
+            "expandable": False,
+        }
+
+    def _find_mol_nodes(self) -> None:
+        def _find_children(node):
+            for child_ in node.children:
+                self._mol_nodes.append(child_)
+                for grandchild in child_.children:
+                    _find_children(grandchild)
+
+        assert self.root is not None
+        self._mol_nodes.append(self.root)
+        for child in self.root.children:
+            _find_children(child)
+
     def _expand(self, node: MoleculeNode) -> None:
         node.expandable = False
         reactions, _ = self.config.expansion_policy([node.mol])
@@ -145,6 +272,46 @@ class SearchTree(AndOrSearchTreeBase):
         if not reactions:
             return
 
+        self.template_executor.apply(reactions)
+        self._add_reactions(node, reactions)
+
+    def _expand_layer(self, nodes: List[MoleculeNode], batch_size: int) -> None:
+        groups: Dict[str, List[MoleculeNode]] = {}
+        for node in nodes:
+            node.expandable = False
+            groups.setdefault(node.mol.identity_key, []).append(node)
+
+        node_reactions: Dict[int, List[RetroReaction]] = {}
+        group_list = list(groups.values())
+        for start in range(0, len(group_list), batch_size):
+            batch = group_list[start : start + batch_size]
+            reactions, _ = self.config.expansion_policy(
+                [group[0].mol for group in batch]
+            )
+            self.profiling["expansion_calls"] += 1
+
+            mol_reactions: Dict[int, List[RetroReaction]] = {}
+            for reaction in reactions:
+                mol_reactions.setdefault(id(reaction.mol), []).append(reaction)
+            batch_reactions = []
+            for group in batch:
+                first_reactions = mol_reactions.get(id(group[0].mol), [])
+                node_reactions[id(group[0])] = first_reactions
+                for node in group[1:]:
+                    node_reactions[id(node)] = [
+                        reaction.copy(mol=node.mol) for reaction in first_reactions
+                    ]
+                for node in group:
+                    batch_reactions.extend(node_reactions[id(node)])
+            self.template_executor.apply(batch_reactions)
+
+        # The nodes are added in the same order as when expanding them one at a time
+        for node in nodes:
+            self._add_reactions(node, node_reactions[id(node)])
+
+    def _add_reactions(
+        self, node: MoleculeNode, reactions: Sequence[RetroReaction]
+    ) -> None:
         reactions_to_expand = []
         for reaction in reactions:
             try:
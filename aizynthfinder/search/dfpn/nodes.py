@@ -2,6 +2,7 @@
 """
 from __future__ import annotations
 
+import heapq
 from typing import TYPE_CHECKING
 
 import numpy as np
@@ -13,20 +14,49 @@ if TYPE_CHECKING:
     from aizynthfinder.chem import RetroReaction
     from aizynthfinder.context.config import Configuration
     from aizynthfinder.search.dfpn import SearchTree
-    from aizynthfinder.utils.type_utils import List, Optional, Sequence, Set, StrDict
+    from aizynthfinder.search.transpositions import TranspositionEntry
+    from aizynthfinder.utils.type_utils import (
+        List,
+        Optional,
+        Sequence,
+        Set,
+        StrDict,
+        Tuple,
+    )
 
 BIG_INT = int(1e10)
 
 
 class _SuperNode(TreeNodeMixin):
+    """
+    Base class of the DFPN nodes.
+
+    The nodes keep aggregates of the proof and disproof numbers of their
+    children, which are updated incrementally when a child is updated:
+    the number of proven and disproven children, the sum of the
+    numbers of the open children that are summed by the node, and a heap of the
+    open children ordered by the number that is minimized by the node.
+    The heap uses lazy invalidation, i.e. an entry is discarded when it reaches the
+    top of the heap if the child has been updated since it was pushed.
+    Children with the same value are ordered by their position.
+    """
+
     def __init__(self) -> None:
         # pylint: disable=invalid-name
         self.pn = 1  # Proof-number
         self.dn = 1  # Disproof-number
         self.pn_threshold = BIG_INT
         self.dn_threshold = BIG_INT
+        self.parent: Optional[_SuperNode] = None
         self._children: List["_SuperNode"] = []
         self.expandable = True
+        self._position: Optional[int] = None
+        self._child_states: List[Tuple[bool, bool, int]] = []
+        self._child_versions: List[int] = []
+        self._heap: List[Tuple[int, int, int]] = []
+        self._open_sum = 0
+        self._nproven = 0
+        self._ndisproven = 0
 
     @property  # type: ignore
     def children(self) -> List[ReactionNode]:  # type: ignore
@@ -68,13 +98,86 @@ class _SuperNode(TreeNodeMixin):
         """Update the proof and disproof numbers"""
         raise NotImplementedError("Implement a child class")
 
+    def _add_child_node(self, child: _SuperNode) -> None:
+        # pylint: disable=protected-access
+        child._position = len(self._child_states)
+        self._child_states.append((False, False, 0))
+        self._child_versions.append(0)
+        self._update_child(child)
+
+    def _best_children(self) -> Tuple[Optional[int], Optional[int]]:
+        """Return the positions of the two open children with the lowest values"""
+        best = self._heap_top()
+        if best is None:
+            return None, None
+        entry = heapq.heappop(self._heap)
+        second = self._heap_top()
+        heapq.heappush(self._heap, entry)
+        return best, second
+
+    def _child_value(self, position: int, child: _SuperNode) -> int:
+        """Return the number of an open child that is minimized by the node"""
+        raise NotImplementedError("Implement a child class")
+
+    def _child_summand(self, child: _SuperNode) -> int:
+        """Return the number of an open child that is summed by the node"""
+        raise NotImplementedError("Implement a child class")
+
+    def _heap_top(self) -> Optional[int]:
+        while self._heap:
+            _, position, version = self._heap[0]
+            if version == self._child_versions[position]:
+                return position
+            heapq.heappop(self._heap)
+        return None
+
+    def _min_value(self) -> int:
+        assert self._heap_top() is not None
+        return self._heap[0][0]
+
+    def _notify_parent(self) -> None:
+        if self.parent is not None and self._position is not None:
+            # pylint: disable=protected-access
+            self.parent._update_child(self)
+
     def _set_disproven(self) -> None:
         self.pn = BIG_INT
         self.dn = 0
+        self._notify_parent()
 
     def _set_proven(self) -> None:
         self.pn = 0
         self.dn = BIG_INT
+        self._notify_parent()
+
+    def _update_child(self, child: _SuperNode) -> None:
+        # pylint: disable=protected-access
+        position = child._position
+        assert position is not None
+        proven = child.proven
+        disproven = child.disproven
+        is_open = not (proven or disproven)
+        summand = self._child_summand(child) if is_open else 0
+
+        old_proven, old_disproven, old_summand = self._child_states[position]
+        self._nproven += int(proven) - int(old_proven)
+        self._ndisproven += int(disproven) - int(old_disproven)
+        self._open_sum += summand - old_summand
+        self._child_states[position] = (proven, disproven, summand)
+
+        self._child_versions[position] += 1
+        if is_open:
+            entry = (
+                self._child_value(position, child),
+                position,
+                self._child_versions[position],
+            )
+            heapq.heappush(self._heap, entry)
+        if len(self._heap) > 2 * len(self._child_states) + 16:
+            self._heap = [
+                item for item in self._heap if item[2] == self._child_versions[item[1]]
+            ]
+            heapq.heapify(self._heap)
 
 
 class MoleculeNode(_SuperNode):
@@ -109,6 +212,7 @@ class MoleculeNode(_SuperNode):
         self.in_stock = mol in config.stock
         self.parent = parent
         self._edge_costs: List[int] = []
+        self._ancestor_set: Optional[Set[TreeMolecule]] = None
         self.tree = owner
 
         # Makes it unexpandable if we have reached maximum depth
@@ -139,24 +243,38 @@ class MoleculeNode(_SuperNode):
         return {"solved": self.proven, "mol": self.mol}
 
     def expand(self) -> None:
-        """Expand the molecule by utilising an expansion policy"""
+        """
+        Expand the molecule by utilising an expansion policy. If the tree has
+        a transposition table, the expansion of an earlier node with the same
+        molecule is re-used instead.
+        """
         self.expandable = False
-        reactions, priors = self._config.expansion_policy([self.mol])
-        self.tree.profiling["expansion_calls"] += 1
+        entry = self.tree.transposition_entry(self.mol)
+        if entry is not None:
+            reactions = entry.actions_for([self.mol])
+            priors = entry.priors
+            self.tree.profiling["transposition_hits"] += 1
+        else:
+            reactions, priors = self._config.expansion_policy([self.mol])
+            self.tree.profiling["expansion_calls"] += 1
+            entry = self.tree.add_transposition(self, reactions, priors)
 
         if not reactions:
             self._set_disproven()
             return
 
+        self._apply_templates(reactions, entry)
         costs = -np.log(np.clip(priors, 1e-3, 1.0))
         reaction_costs = []
         reactions_to_expand = []
-        for reaction, cost in zip(reactions, costs):
+        for position, (reaction, cost) in enumerate(zip(reactions, costs)):
             try:
                 _ = reaction.reactants
                 self.tree.profiling["reactants_generations"] += 1
             except:  # pylint: disable=bare-except
                 continue
+            if entry is not None:
+                entry.add_outcomes(position, reaction)
             if not reaction.reactants:
                 continue
             for idx, _ in enumerate(reaction.reactants):
@@ -164,8 +282,9 @@ class MoleculeNode(_SuperNode):
                 reactions_to_expand.append(rxn_copy)
                 reaction_costs.append(cost)
 
+        ancestors = self._ancestors()
         for cost, rxn in zip(reaction_costs, reactions_to_expand):
-            self._add_child(rxn, cost)
+            self._add_child(rxn, cost, ancestors)
 
         if not self._children:
             self._set_disproven()
@@ -175,56 +294,53 @@ class MoleculeNode(_SuperNode):
         Find and return the most promising child for exploration
         Updates the thresholds on that child
         """
-        min_indices = np.argsort(
-            [
-                edge_cost + child.pn if not child.closed else BIG_INT
-                for edge_cost, child in zip(self._edge_costs, self._children)
-            ]
-        )
-        best_child = self._children[min_indices[0]]
-        if len(self._children) > 1 and not self._children[min_indices[1]].closed:
-            s2_pn = self._children[min_indices[1]].pn
+        best_idx, second_idx = self._best_children()
+        if best_idx is None:
+            best_idx = 0
+        best_child = self._children[best_idx]
+        if second_idx is not None:
+            s2_pn = self._children[second_idx].pn
         else:
             s2_pn = BIG_INT
 
         best_child.pn_threshold = (
-            min(self.pn_threshold, s2_pn + 2) - self._edge_costs[min_indices[0]]
+            min(self.pn_threshold, s2_pn + 2) - self._edge_costs[best_idx]
         )
         best_child.dn_threshold = self.dn_threshold - self.dn + best_child.dn
         return best_child
 
     def update(self) -> None:
         """Update the proof and disproof numbers"""
-        func = all if self.parent is None else any
-        if func(child.proven for child in self._children):
+        nchildren = len(self._children)
+        if self.parent is None:
+            any_proven = self._nproven == nchildren
+        else:
+            any_proven = self._nproven > 0
+        if any_proven:
             self._set_proven()
             return
-        if all(child.disproven for child in self._children):
+        if self._ndisproven == nchildren:
             self._set_disproven()
             return
 
-        child_dns = [child.dn for child in self._children if not child.closed]
-        if not child_dns:
+        if self._heap_top() is None:
             self._set_proven()
             return
 
-        self.dn = sum(child_dns)
+        self.dn = self._open_sum
         if self.dn >= BIG_INT:
             self.pn = 0
         else:
-            self.pn = min(
-                edge_cost + child.pn
-                for edge_cost, child in zip(self._edge_costs, self._children)
-                if not child.closed
-            )
-        return
+            self.pn = self._min_value()
+        self._notify_parent()
 
-    def _add_child(self, reaction: RetroReaction, _: float) -> None:
+    def _add_child(
+        self, reaction: RetroReaction, _: float, ancestors: Set[TreeMolecule]
+    ) -> None:
         reactants = reaction.reactants[reaction.index]
         if not reactants:
             return
 
-        ancestors = self._ancestors()
         for mol in reactants:
             if mol in ancestors:
                 return
@@ -234,15 +350,38 @@ class MoleculeNode(_SuperNode):
         )
         self._children.append(rxn_node)
         self._edge_costs.append(1)
+        self._add_child_node(rxn_node)
 
     def _ancestors(self) -> Set[TreeMolecule]:
-        if not self.parent:
-            return {self.mol}
+        # The set is shared by the descendants of the node and should not be changed
+        if self._ancestor_set is None:
+            if not self.parent:
+                self._ancestor_set = {self.mol}
+            else:
+                # pylint: disable=protected-access
+                self._ancestor_set = self.parent.parent._ancestors() | {self.mol}
+        return self._ancestor_set
+
+    def _apply_templates(
+        self, reactions: Sequence[RetroReaction], entry: Optional[TranspositionEntry]
+    ) -> None:
+        if entry is None:
+            self.tree.template_executor.apply(reactions)
+            return
+        # Re-create the reactants from the outcomes of an equivalent node if possible
+        self.tree.template_executor.apply(
+            [
+                reaction
+                for position, reaction in enumerate(reactions)
+                if not entry.set_outcomes(position, reaction)
+            ]
+        )
 
-        # pylint: disable=protected-access
-        ancestors = self.parent.parent._ancestors()
-        ancestors.add(self.mol)
-        return ancestors
+    def _child_summand(self, child: _SuperNode) -> int:
+        return child.dn
+
+    def _child_value(self, position: int, child: _SuperNode) -> int:
+        return self._edge_costs[position] + child.pn
 
 
 class ReactionNode(_SuperNode):
@@ -310,19 +449,20 @@ class ReactionNode(_SuperNode):
             MoleculeNode(mol=mol, config=self._config, owner=self.tree, parent=self)
             for mol in reactants
         ]
+        for child in self._children:
+            self._add_child_node(child)
 
     def promising_child(self) -> Optional[MoleculeNode]:
         """
         Find and return the most promising child for exploration
         Updates the thresholds on that child
         """
-        min_indices = np.argsort(
-            [child.dn if not child.closed else BIG_INT for child in self._children]
-        )
-
-        best_child = self._children[min_indices[0]]
-        if len(self._children) > 1 and not self._children[min_indices[1]].closed:
-            s2_dn = self._children[min_indices[1]].dn
+        best_idx, second_idx = self._best_children()
+        if best_idx is None:
+            best_idx = 0
+        best_child = self._children[best_idx]
+        if second_idx is not None:
+            s2_dn = self._children[second_idx].dn
         else:
             s2_dn = BIG_INT
 
@@ -332,12 +472,19 @@ class ReactionNode(_SuperNode):
 
     def update(self) -> None:
         """Update the proof and disproof numbers"""
-        if all(child.proven for child in self._children):
+        if self._nproven == len(self._children):
             self._set_proven()
             return
-        if any(child.disproven for child in self._children):
+        if self._ndisproven > 0:
             self._set_disproven()
             return
 
-        self.pn = sum(child.pn for child in self._children if not child.closed)
-        self.dn = min(child.dn for child in self._children if not child.closed)
+        self.pn = self._open_sum
+        self.dn = self._min_value()
+        self._notify_parent()
+
+    def _child_summand(self, child: _SuperNode) -> int:
+        return child.pn
+
+    def _child_value(self, position: int, child: _SuperNode) -> int:
+        return child.dn
@@ -7,12 +7,14 @@ from typing import TYPE_CHECKING
 from aizynthfinder.reactiontree import ReactionTree
 from aizynthfinder.search.andor_trees import AndOrSearchTreeBase, SplitAndOrTree
 from aizynthfinder.search.dfpn.nodes import MoleculeNode, ReactionNode
+from aizynthfinder.search.transpositions import TranspositionTable
 from aizynthfinder.utils.logging import logger
 
 if TYPE_CHECKING:
-    from aizynthfinder.chem import RetroReaction
+    from aizynthfinder.chem import RetroReaction, TreeMolecule
     from aizynthfinder.context.config import Configuration
     from aizynthfinder.search.andor_trees import TreeNodeMixin
+    from aizynthfinder.search.transpositions import TranspositionEntry
     from aizynthfinder.utils.type_utils import List, Optional, Sequence, Union
 
 
@@ -26,6 +28,7 @@ class SearchTree(AndOrSearchTreeBase):
 
     :ivar config: settings of the tree search algorithm
     :ivar root: the root node
+    :ivar transpositions: the expansions shared between molecule nodes with the same molecule, if enabled
 
     :param config: settings of the tree search algorithm
     :param root_smiles: the root will be set to a node representing this molecule, defaults to None
@@ -53,13 +56,38 @@ class SearchTree(AndOrSearchTreeBase):
         self.profiling = {
             "expansion_calls": 0,
             "reactants_generations": 0,
+            "transposition_hits": 0,
         }
+        self.transpositions: Optional[TranspositionTable] = None
+        if config.search.algorithm_config["transposition_table"]:
+            self.transpositions = TranspositionTable()
 
     @property
     def mol_nodes(self) -> Sequence[MoleculeNode]:  # type: ignore
         """Return the molecule nodes of the tree"""
         return self._mol_nodes
 
+    def add_transposition(
+        self,
+        node: MoleculeNode,
+        reactions: Sequence[RetroReaction],
+        priors: Sequence[float],
+    ) -> Optional[TranspositionEntry]:
+        """
+        Record the expansion of a molecule node in the transposition table,
+        if the table is enabled
+
+        :param node: the expanded node
+        :param reactions: the reactions of the expansion
+        :param priors: the priors of the reactions
+        :return: the new entry or None if the table is not enabled
+        """
+        if self.transpositions is None:
+            return None
+        return self.transpositions.add(
+            hash((node.mol.identity_key,)), node, reactions, priors
+        )
+
     def one_iteration(self) -> bool:
         """
         Perform one iteration of expansion.
@@ -108,6 +136,18 @@ class SearchTree(AndOrSearchTreeBase):
 
         return found_solution
 
+    def transposition_entry(self, mol: TreeMolecule) -> Optional[TranspositionEntry]:
+        """
+        Return the expansion of an earlier molecule node with the same
+        molecule, if the transposition table is enabled
+
+        :param mol: the molecule to expand
+        :return: the entry or None
+        """
+        if self.transpositions is None:
+            return None
+        return self.transpositions.get(hash((mol.identity_key,)))
+
     def routes(self) -> List[ReactionTree]:
         """
         Extracts and returns routes from the AND/OR tree
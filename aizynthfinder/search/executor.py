@@ -0,0 +1,171 @@
+""" Module containing a class for applying templates in parallel during expansion
+"""
+from __future__ import annotations
+
+import atexit
+import math
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from aizynthfinder.chem.reaction import (
+    RDCHIRAL_CPP,
+    RdChiralProduct,
+    TemplatedRetroReaction,
+    run_rdchiral_templates,
+)
+from aizynthfinder.utils.logging import logger
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor, Future
+
+    from aizynthfinder.chem import RetroReaction, TreeMolecule
+    from aizynthfinder.context.config import Configuration
+    from aizynthfinder.utils.type_utils import Dict, List, Optional, Sequence, Tuple
+
+# The pools are shared between all search trees to avoid the
+# overhead of starting new workers for each target molecule
+_POOLS: Dict[Tuple[str, int], Executor] = {}
+
+
+@atexit.register
+def shutdown_template_executors() -> None:
+    """
+    Shut down the pools of workers that are shared by the template executors.
+
+    This is called when the interpreter exits, but can be called at any time
+    to release the workers, new pools are started when they are needed again.
+    """
+    while _POOLS:
+        _, pool = _POOLS.popitem()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+class TemplateExecutor:
+    """
+    Apply the templates of the reactions created by an expansion concurrently,
+    so that the reactants of all reactions are computed at once.
+
+    Three modes are supported:
+        * ``serial`` - nothing is done up-front, the templates are applied
+          lazily when the reactants are requested
+        * ``thread`` - the templates are applied in a pool of threads
+        * ``process`` - the templates are applied in a pool of processes,
+          only the SMARTS and a picklable copy of the product molecule
+          is sent to the worker processes
+
+    Regardless of the mode, the reactant molecules are created in the
+    calling thread and the outcomes of the reactions are identical
+    to a serial application. Only reactions that use RDChiral are
+    applied in parallel, other reactions are left untouched.
+
+    The mode is taken from the ``template_executor`` setting of the search
+    algorithm and the number of workers from ``template_executor_workers``.
+
+    .. code-block::
+
+        executor = TemplateExecutor.from_config(config)
+        reactions, _ = config.expansion_policy([mol])
+        executor.apply(reactions)
+
+    :ivar mode: the mode of the executor
+    :ivar max_workers: the number of workers of the pool
+
+    :param mode: the mode of the executor
+    :param max_workers: the number of workers, if not given it is determined by the pool
+    :raises ValueError: if the mode is not recognized
+    """
+
+    modes = ("serial", "thread", "process")
+
+    def __init__(self, mode: str = "serial", max_workers: Optional[int] = None):
+        if mode not in self.modes:
+            raise ValueError(
+                f"Unknown template executor mode: {mode}. "
+                f"Use one of {', '.join(self.modes)}"
+            )
+        if mode == "process" and RDCHIRAL_CPP:
+            logger().warning(
+                "Process-based template executor is not supported "
+                "with the C++ version of RDChiral, will use threads instead."
+            )
+            mode = "thread"
+        self.mode = mode
+        self.max_workers = max_workers
+
+    @classmethod
+    def from_config(cls, config: Configuration) -> "TemplateExecutor":
+        """
+        Create an executor from the settings of the search algorithm
+
+        :param config: the configuration of the tree search
+        :return: the executor
+        """
+        algo_config = config.search.algorithm_config
+        return cls(
+            algo_config.get("template_executor") or "serial",
+            algo_config.get("template_executor_workers"),
+        )
+
+    def apply(self, reactions: Sequence[RetroReaction]) -> None:
+        """
+        Apply the templates of the given reactions. The reactants are
+        set on the reaction objects.
+
+        Reactions that fail in the workers are left unqueried, so that
+        any error is raised when the reactants are requested.
+
+        :param reactions: the reactions to apply
+        """
+        if self.mode == "serial":
+            return
+
+        jobs: Dict[int, Tuple[TreeMolecule, List[TemplatedRetroReaction]]] = {}
+        for reaction in reactions:
+            if (
+                not isinstance(reaction, TemplatedRetroReaction)
+                or not reaction.unqueried
+                # pylint: disable=protected-access
+                or not reaction._use_rdchiral
+            ):
+                continue
+            jobs.setdefault(id(reaction.mol), (reaction.mol, []))[1].append(reaction)
+        if not jobs:
+            return
+
+        pool = self._get_pool()
+        futures: List[Tuple[List[TemplatedRetroReaction], Future]] = []
+        for mol, mol_reactions in jobs.values():
+            mol.sanitize()
+            product = RdChiralProduct(mol)
+            chunk_size = math.ceil(len(mol_reactions) / self._nworkers(pool))
+            for start in range(0, len(mol_reactions), chunk_size):
+                chunk = mol_reactions[start : start + chunk_size]
+                future = pool.submit(
+                    run_rdchiral_templates,
+                    [reaction.smarts for reaction in chunk],
+                    product,
+                )
+                futures.append((chunk, future))
+
+        for chunk, future in futures:
+            try:
+                outcomes = future.result()
+            except Exception as err:  # pylint: disable=broad-except
+                logger().warning(f"Failed to apply templates in parallel: {err}")
+                continue
+            for reaction, reactants_smiles in zip(chunk, outcomes):
+                reaction.set_reactants_from_smiles(reactants_smiles)
+
+    def _get_pool(self) -> Executor:
+        key = (self.mode, self.max_workers or 0)
+        if key not in _POOLS:
+            if self.mode == "thread":
+                _POOLS[key] = ThreadPoolExecutor(max_workers=self.max_workers)
+            else:
+                _POOLS[key] = ProcessPoolExecutor(max_workers=self.max_workers)
+        return _POOLS[key]
+
+    @staticmethod
+    def _nworkers(pool: Executor) -> int:
+        # pylint: disable=protected-access
+        return getattr(pool, "_max_workers", 1) or 1
@@ -10,15 +10,18 @@ from paretoset import paretoset
 
 from aizynthfinder.chem import TreeMolecule, deserialize_action, serialize_action
 from aizynthfinder.search.mcts.state import MctsState
-from aizynthfinder.search.mcts.utils import ReactionTreeFromSuperNode, route_to_node
-from aizynthfinder.utils.exceptions import (
-    NodeUnexpectedBehaviourException,
-    RejectionException,
+from aizynthfinder.search.mcts.utils import (
+    GrowableArray,
+    ReactionTreeFromSuperNode,
+    route_to_node,
 )
+from aizynthfinder.utils.exceptions import NodeUnexpectedBehaviourException
 from aizynthfinder.utils.logging import logger
 
 if TYPE_CHECKING:
     from aizynthfinder.chem import (
+        BinaryTreeReader,
+        BinaryTreeWriter,
         MoleculeDeserializer,
         MoleculeSerializer,
         RetroReaction,
@@ -26,7 +29,8 @@ if TYPE_CHECKING:
     from aizynthfinder.context.config import Configuration
     from aizynthfinder.reactiontree import ReactionTree
     from aizynthfinder.search.mcts.search import MctsSearchTree
-    from aizynthfinder.utils.type_utils import List, Optional, StrDict, Tuple
+    from aizynthfinder.search.transpositions import TranspositionEntry
+    from aizynthfinder.utils.type_utils import Dict, List, Optional, StrDict, Tuple
 
 
 class MctsNode:
@@ -45,6 +49,9 @@ class MctsNode:
     the return value is a dictionary with keys "action", "value", "prior"
     and "visitations".
 
+    The statistics of the children are stored in growable NumPy arrays,
+    and the index of an instantiated child is kept in a look-up table.
+
     :ivar is_expanded: if the node has had children added to it
     :ivar is_expandable: if the node is expandable
     :ivar tree: the tree owning this node
@@ -55,6 +62,41 @@ class MctsNode:
     :param parent: the parent node, defaults to None
     """
 
+    __slots__ = (
+        "_state",
+        "_config",
+        "_expansion_policy",
+        "_filter_policy",
+        "tree",
+        "is_expanded",
+        "is_expandable",
+        "_parent",
+        "created_at_iteration",
+        "_children_values",
+        "_children_priors",
+        "_children_visitations",
+        "_children_actions",
+        "_children",
+        "_children_index",
+        "_virtual_losses",
+        "blacklist",
+        "_degeneracy_check",
+        "_logger",
+    )
+
+    # The columns of a node in a binary tree file, see `binary_record`
+    binary_columns = {
+        "state": "<i4[]",
+        "children": "<i4[]",
+        "children_values": "<f8[]",
+        "children_priors": "<f8[]",
+        "children_visitations": "<i8[]",
+        "children_actions": "<i4[]",
+        "is_expanded": "u1",
+        "is_expandable": "u1",
+        "created_at_iteration": "<i8",
+    }
+
     def __init__(
         self,
         state: MctsState,
@@ -76,13 +118,15 @@ class MctsNode:
         else:
             self.created_at_iteration = self.tree.profiling["iterations"]
 
-        self._children_values: List[float] = []
-        self._children_priors: List[float] = []
-        self._children_visitations: List[int] = []
+        self._children_values = GrowableArray([])
+        self._children_priors = GrowableArray([])
+        self._children_visitations = GrowableArray([], dtype=int)
         self._children_actions: List[RetroReaction] = []
         self._children: List[Optional[MctsNode]] = []
+        self._children_index: Dict[MctsNode, int] = {}
+        self._virtual_losses: Dict[int, int] = {}
 
-        self.blacklist = set(mol.inchi_key for mol in state.expandable_mols)
+        self.blacklist = set(mol.identity_key for mol in state.expandable_mols)
         if parent:
             self.blacklist = self.blacklist.union(parent.blacklist)
 
@@ -93,7 +137,7 @@ class MctsNode:
         self._logger = logger()
 
     def __getitem__(self, node: "MctsNode") -> StrDict:
-        idx = self._children.index(node)
+        idx = self._children_index[node]
         return {
             "action": self._children_actions[idx],
             "value": self._children_values[idx],
@@ -141,9 +185,11 @@ class MctsNode:
         node = cls(state=state, owner=tree, config=config, parent=parent)
         node.is_expanded = dict_["is_expanded"]
         node.is_expandable = dict_["is_expandable"]
-        node._children_values = dict_["children_values"]
-        node._children_priors = dict_["children_priors"]
-        node._children_visitations = dict_["children_visitations"]
+        node._children_values = GrowableArray(dict_["children_values"])
+        node._children_priors = GrowableArray(dict_["children_priors"])
+        node._children_visitations = GrowableArray(
+            dict_["children_visitations"], dtype=int
+        )
         node._children_actions = [
             deserialize_action(action_dict, molecules)
             for action_dict in dict_["children_actions"]
@@ -154,6 +200,56 @@ class MctsNode:
             else None
             for child in dict_["children"]
         ]
+        node._children_index = {
+            child: idx for idx, child in enumerate(node._children) if child
+        }
+        return node
+
+    @classmethod
+    def from_binary(
+        cls,
+        reader: BinaryTreeReader,
+        index: int,
+        state: MctsState,
+        tree: MctsSearchTree,
+        config: Configuration,
+        parent: Optional["MctsNode"] = None,
+    ) -> "MctsNode":
+        """
+        Create a new node from a row in a binary tree file, i.e. deserialization.
+        The children of the node are not created, and are set to None.
+
+        :param reader: the reader of the binary file
+        :param index: the index of the node in the file
+        :param state: the deserialized state of the node
+        :param tree: the search tree
+        :param config: settings of the tree search algorithm
+        :param parent: the parent node
+        :return: a deserialized node
+        """
+        # pylint: disable=protected-access
+        columns = reader.nodes
+        node = cls(state=state, owner=tree, config=config, parent=parent)
+        node.is_expanded = bool(columns["is_expanded"][index])
+        node.is_expandable = bool(columns["is_expandable"][index])
+        if "created_at_iteration" in columns:
+            created_at_iteration = int(columns["created_at_iteration"][index])
+            node.created_at_iteration = (
+                None if created_at_iteration < 0 else created_at_iteration
+            )
+        node._children_values = GrowableArray(
+            node._stats_from_binary(columns["children_values"][index])
+        )
+        node._children_priors = GrowableArray(
+            node._stats_from_binary(columns["children_priors"][index])
+        )
+        node._children_visitations = GrowableArray(
+            columns["children_visitations"][index], dtype=int
+        )
+        node._children_actions = reader.actions(
+            columns["children_actions"][index].tolist()
+        )
+        node._children = [None] * len(node._children_actions)
         return node
 
     @property
@@ -193,6 +289,17 @@ class MctsNode:
         """
         return self.path_to()[0]
 
+    def add_virtual_loss(self, child: "MctsNode") -> None:
+        """
+        Add a virtual loss to a child, which makes it less likely to be selected
+        again before the loss is removed. Used when several leaves are selected
+        before any of them are backpropagated.
+
+        :param child: the child node
+        """
+        idx = self._children_index[child]
+        self._virtual_losses[idx] = self._virtual_losses.get(idx, 0) + 1
+
     def backpropagate(self, child: "MctsNode", value_estimate: float) -> None:
         """
         Update the number of visitations of a particular child and its value.
@@ -200,7 +307,7 @@ class MctsNode:
         :param child: the child node
         :param value_estimate: the value to add to the child value
         """
-        idx = self._children.index(child)
+        idx = self._children_index[child]
         self._children_visitations[idx] += 1
         self._children_values[idx] += value_estimate
 
@@ -217,12 +324,27 @@ class MctsNode:
         """
         return {
             "actions": list(self._children_actions),
-            "values": list(self._children_values),
-            "priors": list(self._children_priors),
-            "visitations": list(self._children_visitations),
+            "values": self._children_values.tolist(),
+            "priors": self._children_priors.tolist(),
+            "visitations": self._children_visitations.tolist(),
             "objects": list(self._children),
         }
 
+    def cache_molecules(self) -> List[TreeMolecule]:
+        """
+        Return the molecules that are submitted to the expansion policy
+        for caching when this node is expanded, i.e. the expandable molecules
+        of the sibling nodes.
+
+        :return: the molecules
+        """
+        cache_molecules = []
+        if self.parent:
+            for child in self.parent.children:
+                if child is not self:
+                    cache_molecules.extend(child.state.expandable_mols)
+        return cache_molecules
+
     def expand(self) -> None:
         """
         Expand the node.
@@ -244,40 +366,60 @@ class MctsNode:
 
         self.is_expanded = True
 
-        cache_molecules = []
-        if self.parent:
-            for child in self.parent.children:
-                if child is not self:
-                    cache_molecules.extend(child.state.expandable_mols)
-
         # Calculate the possible actions, fill the child_info lists
         # Actions by default only assumes 1 set of reactants
-        actions, priors = self._expansion_policy(
-            self.state.expandable_mols, cache_molecules
-        )
+        entry = self._transposition_entry()
+        if entry is not None:
+            actions = entry.actions_for(self.state.expandable_mols)
+            priors = list(entry.priors)
+            self.tree.profiling["transposition_hits"] += 1
+        else:
+            actions, priors = self._expansion_policy(
+                self.state.expandable_mols, self.cache_molecules()
+            )
+            if self.tree:
+                self.tree.profiling["expansion_calls"] += 1
+                if self.tree.transpositions is not None:
+                    entry = self.tree.transpositions.add(
+                        self.state.expandables_hash, self, actions, priors
+                    )
         self._fill_children_lists(actions, priors)
+        if (
+            entry is not None
+            and entry.node is not self
+            and self._algo_config["transposition_statistics"]
+        ):
+            self._share_statistics(entry.node, len(actions))
 
         # Reverse the expansion if it did not produce any children
         if len(actions) == 0:
             self.is_expandable = False
             self.is_expanded = False
 
-        if self.tree:
-            self.tree.profiling["expansion_calls"] += 1
-
         if not self._algo_config["immediate_instantiation"]:
             return
         # Instantiate all children actions created by the marked policy,
         # a new list of actions will be iterated over, because it can grow due
         # to instantiation
         nactions = len(actions)
-        for child_idx, action in enumerate(self._children_actions[:nactions]):
-            policy_name = action.metadata.get("policy_name")
-            if (
-                policy_name
-                and policy_name in self._algo_config["immediate_instantiation"]
-            ):
-                self._instantiate_child(child_idx)
+        child_indices = [
+            child_idx
+            for child_idx, action in enumerate(self._children_actions[:nactions])
+            if action.metadata.get("policy_name")
+            in self._algo_config["immediate_instantiation"]
+        ]
+        for child_idx in child_indices:
+            self._reuse_transposed_reactants(child_idx)
+        if self.tree:
+            self.tree.template_executor.apply(
+                [self._children_actions[child_idx] for child_idx in child_indices]
+            )
+        if entry is not None:
+            for child_idx in child_indices:
+                entry.add_outcomes(child_idx, self._children_actions[child_idx])
+        rejections = self._filter_immediate_children(child_indices)
+        for child_idx in child_indices:
+            self._instantiate_child(child_idx, rejections.get(child_idx))
 
     def is_terminal(self) -> bool:
         """
@@ -324,6 +466,41 @@ class MctsNode:
 
         return child
 
+    def remove_virtual_loss(self, child: "MctsNode") -> None:
+        """
+        Remove a virtual loss previously added to a child
+
+        :param child: the child node
+        """
+        idx = self._children_index[child]
+        self._virtual_losses[idx] -= 1
+        if self._virtual_losses[idx] == 0:
+            del self._virtual_losses[idx]
+
+    def binary_record(self, writer: BinaryTreeWriter) -> StrDict:
+        """
+        Serialize the node object to a row of a binary tree file,
+        the children are added by the writer. The statistics of the
+        children are flattened.
+
+        :param writer: the writer of the binary file
+        :return: the value of each column, except the children
+        """
+        return {
+            "state": [writer.molecule(mol) for mol in self.state.mols],
+            "children_values": self._children_values.view.ravel(),
+            "children_priors": self._children_priors.view.ravel(),
+            "children_visitations": self._children_visitations.view,
+            "children_actions": [
+                writer.action(action) for action in self._children_actions
+            ],
+            "is_expanded": self.is_expanded,
+            "is_expandable": self.is_expandable,
+            "created_at_iteration": (
+                -1 if self.created_at_iteration is None else self.created_at_iteration
+            ),
+        }
+
     def serialize(self, molecule_store: MoleculeSerializer) -> StrDict:
         """
         Serialize the node object to a dictionary.
@@ -335,7 +512,7 @@ class MctsNode:
             "state": self.state.serialize(molecule_store),
             "children_values": self._serialize_stats_list("_children_values"),
             "children_priors": self._serialize_stats_list("_children_priors"),
-            "children_visitations": self._children_visitations,
+            "children_visitations": self._children_visitations.tolist(),
             "children_actions": [
                 serialize_action(action, molecule_store)
                 for action in self._children_actions
@@ -369,19 +546,44 @@ class MctsNode:
 
         return True
 
+    def _apply_virtual_loss(self, values: np.ndarray) -> np.ndarray:
+        if not self._virtual_losses:
+            return values
+        values = values.copy()
+        for idx, count in self._virtual_losses.items():
+            values[idx] -= count * self._algo_config["virtual_loss"]
+        return values
+
     def _children_q(self) -> np.ndarray:
-        return np.array(self._children_values) / np.array(self._children_visitations)
+        values = self._apply_virtual_loss(self._children_values.view)
+        return values / self._children_visitations_array()
 
     def _children_u(self) -> np.ndarray:
-        total_visits = np.log(np.sum(self._children_visitations))
-        child_visits = np.array(self._children_visitations)
+        child_visits = self._children_visitations_array()
+        total_visits = np.log(np.sum(child_visits))
         return self._algo_config["C"] * np.sqrt(2 * total_visits / child_visits)
 
+    def _children_visitations_array(self) -> np.ndarray:
+        visitations = self._children_visitations.view
+        if not self._virtual_losses:
+            return visitations
+        visitations = visitations.copy()
+        for idx, count in self._virtual_losses.items():
+            visitations[idx] += count
+        return visitations
+
     def _create_children_nodes(
-        self, states: List[MctsState], child_idx: int
+        self,
+        states: List[MctsState],
+        child_idx: int,
+        rejected: Optional[List[bool]] = None,
     ) -> List["MctsNode"]:
         new_nodes = []
         first_child_idx = child_idx
+        if rejected is None:
+            rejected = self._filter_child_reactions(
+                self._reaction_outcomes(self._children_actions[first_child_idx])
+            )
         for state_index, state in enumerate(states):
             if self._generated_degeneracy(state, first_child_idx):
                 # Only need to disable first new child,
@@ -395,13 +597,14 @@ class MctsNode:
             if state_index > 0:
                 child_idx = self._expand_children_lists(first_child_idx, state_index)
 
-            if self._filter_child_reaction(self._children_actions[child_idx]):
+            if rejected[state_index]:
                 self._disable_child(child_idx)
             else:
                 new_node = self.__class__(
                     state=state, owner=self.tree, config=self._config, parent=self
                 )
                 self._children[child_idx] = new_node
+                self._children_index[new_node] = child_idx
                 new_nodes.append(new_node)
         return new_nodes
 
@@ -421,31 +624,82 @@ class MctsNode:
         self, actions: List[RetroReaction], priors: List[float]
     ) -> None:
         self._children_actions = actions
-        self._children_priors = priors
+        self._children_priors = GrowableArray(priors)
         nactions = len(actions)
-        self._children_visitations = [1] * nactions
+        self._children_visitations = GrowableArray([1] * nactions, dtype=int)
         self._children = [None] * nactions
         if self._algo_config["use_prior"]:
-            self._children_values = list(self._children_priors)
+            self._children_values = GrowableArray(priors)
         else:
-            self._children_values = [self._algo_config["default_prior"]] * nactions
-
-    def _filter_child_reaction(self, reaction: RetroReaction) -> bool:
-        if self._regenerated_blacklisted(reaction):
-            self._logger.debug(
-                f"Reaction {reaction.reaction_smiles()} "
-                f"was rejected because it re-generated molecule not in stock"
+            self._children_values = GrowableArray(
+                [self._algo_config["default_prior"]] * nactions
             )
-            return True
+
+    def _filter_child_reactions(self, reactions: List[RetroReaction]) -> List[bool]:
+        """
+        Check if the reactions of a number of children should be rejected,
+        all reactions are given to the filter policy at once.
+        """
+        rejected = [False] * len(reactions)
+        for idx, reaction in enumerate(reactions):
+            if self._regenerated_blacklisted(reaction):
+                self._logger.debug(
+                    f"Reaction {reaction.reaction_smiles()} "
+                    f"was rejected because it re-generated molecule not in stock"
+                )
+                rejected[idx] = True
 
         if not self._filter_policy.selection:
-            return False
-        try:
-            self._filter_policy(reaction)
-        except RejectionException as err:
-            self._logger.debug(str(err))
-            return True
-        return False
+            return rejected
+        indices = [idx for idx, flag in enumerate(rejected) if not flag]
+        rejections = self._filter_policy.apply_many(
+            [reactions[idx] for idx in indices]
+        )
+        for idx, err in zip(indices, rejections):
+            if err is not None:
+                self._logger.debug(str(err))
+                rejected[idx] = True
+        return rejected
+
+    def _filter_immediate_children(
+        self, child_indices: List[int]
+    ) -> Dict[int, List[bool]]:
+        """
+        Filter the outcomes of all children that are instantiated immediately
+        upon expansion, so that the filter policy is called once for all of them.
+        """
+        outcomes: Dict[int, List[RetroReaction]] = {}
+        for child_idx in child_indices:
+            reaction = self._children_actions[child_idx]
+            if reaction.unqueried:
+                self._generate_reactants(child_idx)
+            if self._check_child_reaction(reaction):
+                outcomes[child_idx] = self._reaction_outcomes(reaction)
+
+        rejected = self._filter_child_reactions(
+            [reaction for reactions in outcomes.values() for reaction in reactions]
+        )
+        rejections = {}
+        start = 0
+        for child_idx, reactions in outcomes.items():
+            rejections[child_idx] = rejected[start : start + len(reactions)]
+            start += len(reactions)
+        return rejections
+
+    def _generate_reactants(self, child_idx: int) -> None:
+        """
+        Generate the reactants of the reaction of a child, re-using the
+        outcomes of the same reaction in an equivalent node if possible
+        """
+        if self._reuse_transposed_reactants(child_idx):
+            return
+        reaction = self._children_actions[child_idx]
+        if self.tree:
+            self.tree.profiling["reactants_generations"] += 1
+        _ = reaction.reactants
+        entry = self._transposition_entry()
+        if entry is not None:
+            entry.add_outcomes(child_idx, reaction)
 
     def _generated_degeneracy(self, new_state: MctsState, child_idx: int) -> bool:
         """
@@ -491,7 +745,9 @@ class MctsNode:
         previous_action.metadata["additional_actions"].append(metadata_copy)
         return True
 
-    def _instantiate_child(self, child_idx: int) -> List["MctsNode"]:
+    def _instantiate_child(
+        self, child_idx: int, rejected: Optional[List[bool]] = None
+    ) -> List["MctsNode"]:
         """
         Instantiate the children node.
 
@@ -503,38 +759,62 @@ class MctsNode:
             - If a filter policy is available and the reaction outcome is unlikely
               set value of child to -1e6
          * Return all new nodes
+
+        The outcomes rejected by the filters can be given by ``rejected``,
+        otherwise the filters are applied on the outcomes.
         """
         if self._children[child_idx] is not None:
             raise NodeUnexpectedBehaviourException("Node already instantiated")
 
         reaction = self._children_actions[child_idx]
         if reaction.unqueried:
-            if self.tree:
-                self.tree.profiling["reactants_generations"] += 1
-            _ = reaction.reactants
+            self._generate_reactants(child_idx)
 
         if not self._check_child_reaction(reaction):
             self._disable_child(child_idx)
             return []
 
         keep_mols = [mol for mol in self.state.mols if mol is not reaction.mol]
-        new_states = [
-            MctsState(keep_mols + list(reactants), self._config)
-            for reactants in reaction.reactants
+        new_states = MctsState.create_many(
+            [keep_mols + list(reactants) for reactants in reaction.reactants],
+            self._config,
+        )
+        return self._create_children_nodes(new_states, child_idx, rejected)
+
+    @staticmethod
+    def _reaction_outcomes(reaction: RetroReaction) -> List[RetroReaction]:
+        """Return one reaction for each of the outcomes of a reaction"""
+        return [reaction] + [
+            reaction.copy(index=idx) for idx in range(1, len(reaction.reactants))
         ]
-        return self._create_children_nodes(new_states, child_idx)
 
     def _regenerated_blacklisted(self, reaction: RetroReaction) -> bool:
         if not self._algo_config["prune_cycles_in_search"]:
             return False
         for reactants in reaction.reactants:
             for mol in reactants:
-                if mol.inchi_key in self.blacklist:
+                if mol.identity_key in self.blacklist:
                     return True
         return False
 
+    def _reuse_transposed_reactants(self, child_idx: int) -> bool:
+        """
+        Set the reactants of the reaction of a child from the outcomes
+        recorded in the transposition table, if the reaction has not been applied
+        """
+        reaction = self._children_actions[child_idx]
+        entry = self._transposition_entry()
+        if (
+            entry is None
+            or not reaction.unqueried
+            or not entry.set_outcomes(child_idx, reaction)
+        ):
+            return False
+        self.tree.profiling["transposition_reactant_hits"] += 1
+        return True
+
     def _score_and_select(self) -> Optional["MctsNode"]:
-        if not max(self._children_values) > 0:
+        if not self._children_values.view.max() > 0:
             raise ValueError("Has no selectable children")
         scores = self._children_q() + self._children_u()
         indices = np.where(scores == scores.max())[0]
@@ -557,7 +837,33 @@ class MctsNode:
         return None
 
     def _serialize_stats_list(self, name: str) -> List[float]:
-        return [float(value) for value in getattr(self, name)]
+        return getattr(self, name).tolist()
+
+    def _share_statistics(self, source: "MctsNode", nactions: int) -> None:
+        """
+        Copy the statistics of the children of an equivalent node that
+        have been visited, i.e. that have not been disabled by that node
+        """
+        # pylint: disable=protected-access
+        indices = np.flatnonzero(source._children_visitations.view[:nactions] > 1)
+        if len(indices) == 0:
+            return
+        self._copy_children_statistics(source, indices)
+
+    def _copy_children_statistics(
+        self, source: "MctsNode", indices: np.ndarray
+    ) -> None:
+        # pylint: disable=protected-access
+        self._children_values[indices] = source._children_values[indices]
+        self._children_visitations[indices] = source._children_visitations[indices]
+
+    def _stats_from_binary(self, values: np.ndarray) -> np.ndarray:
+        return values
+
+    def _transposition_entry(self) -> Optional[TranspositionEntry]:
+        if not self.tree or self.tree.transpositions is None:
+            return None
+        return self.tree.transpositions.get(self.state.expandables_hash)
 
 
 class ParetoMctsNode(MctsNode):
@@ -581,6 +887,18 @@ class ParetoMctsNode(MctsNode):
     It is assumed that all objectives are to be maximised.
     """
 
+    __slots__ = (
+        "_num_objectives",
+        "_prior_weight",
+        "_direction",
+        "_children_rewards_cummulative",
+    )
+
+    binary_columns = {
+        **MctsNode.binary_columns,
+        "children_cumulative_reward": "<f8[]",
+    }
+
     def __init__(
         self,
         state: MctsState,
@@ -592,9 +910,7 @@ class ParetoMctsNode(MctsNode):
         self._num_objectives = len(self._algo_config["search_rewards"])
         self._prior_weight = 1
         self._direction = "max"  # current implementation assumes maximisation
-        self._children_rewards_cummulative: List[List[float]]
-        self._children_values: List[List[float]]  # type: ignore
-        self._children_priors: List[List[float]]  # type: ignore
+        self._children_rewards_cummulative: GrowableArray
 
     def backpropagate(self, child: "MctsNode", value_estimate: List[float]) -> None:  # type: ignore
         """
@@ -603,17 +919,11 @@ class ParetoMctsNode(MctsNode):
         :param child: the child node
         :param value_estimate: the value to add to the child value
         """
-        idx = self._children.index(child)
+        idx = self._children_index[child]
         self._children_visitations[idx] += 1
         # here we only update the cummulative rewards,
         #  _children_values are updated at selection time
-        new_value_estimate = [
-            cum_reward + new_reward
-            for cum_reward, new_reward in zip(
-                self._children_rewards_cummulative[idx], value_estimate
-            )
-        ]
-        self._children_rewards_cummulative[idx] = new_value_estimate
+        self._children_rewards_cummulative[idx] += value_estimate
 
     def children_view(self) -> StrDict:
         """
@@ -627,9 +937,38 @@ class ParetoMctsNode(MctsNode):
         :return: the view
         """
         dict_ = super().children_view()
-        dict_["rewards_cum"] = list(self._children_rewards_cummulative)
+        dict_["rewards_cum"] = self._children_rewards_cummulative.tolist()
         return dict_
 
+    @classmethod
+    def from_binary(
+        cls,
+        reader: BinaryTreeReader,
+        index: int,
+        state: MctsState,
+        tree: MctsSearchTree,
+        config: Configuration,
+        parent: Optional["MctsNode"] = None,
+    ) -> "MctsNode":
+        node = super().from_binary(reader, index, state, tree, config, parent)
+        assert isinstance(node, ParetoMctsNode)
+        rewards = reader.nodes["children_cumulative_reward"][index]
+        # pylint: disable=protected-access
+        node._children_rewards_cummulative = GrowableArray(
+            node._stats_from_binary(rewards)
+        )
+        return node
+
+    def binary_record(self, writer: BinaryTreeWriter) -> StrDict:
+        record = super().binary_record(writer)
+        # The rewards are only set once the node has been expanded
+        if self._children_actions:
+            rewards = self._children_rewards_cummulative.view.ravel()
+        else:
+            rewards = np.zeros(0)
+        record["children_cumulative_reward"] = rewards
+        return record
+
     def serialize(self, molecule_store: MoleculeSerializer) -> StrDict:
         """
         Serialize the node object to a dictionary.
@@ -643,16 +982,26 @@ class ParetoMctsNode(MctsNode):
         )
         return dict_
 
+    def _copy_children_statistics(
+        self, source: "MctsNode", indices: np.ndarray
+    ) -> None:
+        super()._copy_children_statistics(source, indices)
+        assert isinstance(source, ParetoMctsNode)
+        # pylint: disable=protected-access
+        self._children_rewards_cummulative[
+            indices
+        ] = source._children_rewards_cummulative[indices]
+
     def _disable_child(self, child_idx: int) -> None:
         self._children_rewards_cummulative[child_idx] = [-1e6] * self._num_objectives
 
+    def _stats_from_binary(self, values: np.ndarray) -> np.ndarray:
+        return values.reshape(-1, self._num_objectives)
+
     def _expand_children_lists(self, old_index: int, action_index: int) -> int:
         ret = super()._expand_children_lists(old_index, action_index)
-        # These lists are nested lists, so need to make sure that the inner lists are also new
-        self._children_values[-1] = list(self._children_values[-1])
-        self._children_priors[-1] = list(self._children_priors[-1])
         self._children_rewards_cummulative.append(
-            list(self._children_rewards_cummulative[old_index])
+            self._children_rewards_cummulative[old_index]
         )
         return ret
 
@@ -662,29 +1011,32 @@ class ParetoMctsNode(MctsNode):
         self._children_actions = actions
         nactions = len(actions)
         # shape: num_actions x 1
-        self._children_visitations = [1] * nactions
+        self._children_visitations = GrowableArray([1] * nactions, dtype=int)
         self._children = [None] * nactions
         # shape: num_actions x num_objectives
-        self._children_rewards_cummulative = [[0.0] * self._num_objectives] * nactions
+        self._children_rewards_cummulative = GrowableArray(
+            np.zeros((nactions, self._num_objectives))
+        )
         if self._algo_config["use_prior"]:
             # shape: num_actions x num_objectives
             # for children i, 3 objectives -> [prior i, prior i, prior i]
-            self._children_priors = [[prior] * self._num_objectives for prior in priors]
-
+            priors_arr = np.repeat(
+                np.asarray(priors, dtype=float).reshape(-1, 1),
+                self._num_objectives,
+                axis=1,
+            )
         else:
-            self._children_priors = [
-                [self._algo_config["default_prior"]] * self._num_objectives
-            ] * nactions
+            priors_arr = np.full(
+                (nactions, self._num_objectives), self._algo_config["default_prior"]
+            )
+        self._children_priors = GrowableArray(priors_arr)
 
         # at initialisation, values = prior as cummulative rewards are zero
-        self._children_values = [
-            [prior * self._prior_weight for prior in priors]
-            for priors in self._children_priors
-        ]
+        self._children_values = GrowableArray(priors_arr * self._prior_weight)
 
     def _children_q(self, children_values_arr):
         children_visitations_expanded = np.repeat(
-            np.array(self._children_visitations).reshape(-1, 1),
+            self._children_visitations_array().reshape(-1, 1),
             axis=1,
             repeats=self._num_objectives,
         )
@@ -695,46 +1047,45 @@ class ParetoMctsNode(MctsNode):
         # update prior to zero once the node has been visited
         children_priors_arr = self._prior_schedule_oneoff()
         # compute prior_weight * prior + cummulative rewards
-        children_values_arr = self._prior_weight * children_priors_arr + np.array(
-            self._children_rewards_cummulative
+        children_values_arr = (
+            self._prior_weight * children_priors_arr
+            + self._children_rewards_cummulative.view
         )
         expanded_u = np.repeat(
             self._children_u().reshape(-1, 1), axis=1, repeats=self._num_objectives
         )
         # _children_scores shape: num_childrens x num_objectives
-        children_scores = self._children_q(children_values_arr) + expanded_u
+        children_scores = (
+            self._children_q(self._apply_virtual_loss(children_values_arr))
+            + expanded_u
+        )
         if children_scores.shape[1] != self._num_objectives:
             raise ValueError(
                 f"expected second dimension to have {self._num_objectives},"
                 f"currently has {children_scores.shape[1]}"
             )
-        self._children_values = children_values_arr.tolist()
-        self._children_priors = children_priors_arr.tolist()
+        self._children_values[:] = children_values_arr
+        self._children_priors[:] = children_priors_arr
         return children_scores
 
     def _prior_schedule_oneoff(self) -> np.ndarray:
         # shape: num_children x 1
-        visted_mask = (np.array(self._children_visitations) > 1).reshape(-1, 1)
+        visted_mask = (self._children_visitations.view > 1).reshape(-1, 1)
         # shape: num_children x num_objectives
         visted_mask = np.repeat(visted_mask, axis=1, repeats=self._num_objectives)
         # set the prior weights for visited children to be zero
-        children_priors_arr = np.array(self._children_priors)
+        children_priors_arr = self._children_priors.view.copy()
         children_priors_arr[visted_mask] = 0
         return children_priors_arr
 
     def _score_and_select(self) -> Optional["MctsNode"]:
-        if not max(max(value_list) for value_list in self._children_values) > 0:
+        if not self._children_values.view.max() > 0:
             raise ValueError("Has no selectable children")
         children_scores = self._compute_children_scores()
         pareto_idxs = self._update_pareto_front(children_scores)
         index = np.random.choice(pareto_idxs)
         return self._select_child(index)
 
-    def _serialize_stats_list(self, name: str):
-        return [
-            [float(value) for value in value_list] for value_list in getattr(self, name)
-        ]
-
     def _update_pareto_front(self, children_scores: np.ndarray) -> np.ndarray:
         """
         Update the pareto front of a node, this step normally happens
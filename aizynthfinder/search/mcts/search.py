@@ -8,8 +8,17 @@ from typing import TYPE_CHECKING
 
 import networkx as nx
 
-from aizynthfinder.chem import MoleculeDeserializer, MoleculeSerializer
+from aizynthfinder.chem import (
+    BinaryTreeReader,
+    BinaryTreeWriter,
+    MoleculeDeserializer,
+    MoleculeSerializer,
+    is_binary_tree_file,
+)
+from aizynthfinder.search.executor import TemplateExecutor
 from aizynthfinder.search.mcts.node import MctsNode, ParetoMctsNode
+from aizynthfinder.search.mcts.state import MctsState
+from aizynthfinder.search.transpositions import TranspositionTable
 from aizynthfinder.utils.logging import logger
 
 if TYPE_CHECKING:
@@ -30,6 +39,8 @@ class MctsSearchTree:
 
     :ivar root: the root node
     :ivar config: the configuration of the search tree
+    :ivar template_executor: the executor used to apply the templates of immediately instantiated children
+    :ivar transpositions: the expansions shared between nodes with the same expandable molecules, if enabled
 
     :param config: settings of the tree search algorithm
     :param root_smiles: the root will be set to a node representing this molecule, defaults to None
@@ -43,8 +54,14 @@ class MctsSearchTree:
             "expansion_calls": 0,
             "reactants_generations": 0,
             "iterations": 0,
+            "transposition_hits": 0,
+            "transposition_reactant_hits": 0,
         }
         self.config = config
+        self.template_executor = TemplateExecutor.from_config(config)
+        self.transpositions: Optional[TranspositionTable] = None
+        if config.search.algorithm_config["transposition_table"]:
+            self.transpositions = TranspositionTable()
         self.mode = self._check_mode()
         self._logger.debug(f"MCTS mode: {self.mode}")
 
@@ -70,15 +87,77 @@ class MctsSearchTree:
         if self.mode == "single-objective":
             self.reward_scorer_name = config_rewards[0]
 
+    @classmethod
+    def from_binary(
+        cls, reader: BinaryTreeReader, config: Configuration
+    ) -> "MctsSearchTree":
+        """
+        Create a new search tree from a binary file written with `binary_writer`
+
+        :param reader: the reader of the binary file
+        :param config: the configuration of the search
+        :return: a deserialized tree
+        :raises ValueError: if the file does not contain a MCTS tree
+        """
+        if reader.kind != "mcts":
+            raise ValueError(
+                f"The file contains a '{reader.kind}' tree, not a MCTS tree"
+            )
+
+        tree = MctsSearchTree(config)
+        tree.profiling.update(reader.metadata.get("profiling", {}))
+
+        # The stock is queried once for the molecules of all states
+        states_column = reader.nodes["state"]
+        states = MctsState.create_many(
+            [
+                reader.molecules.get_tree_molecules(states_column[idx].tolist())
+                for idx in range(reader.nnodes)
+            ],
+            config,
+        )
+        parents = reader.parents().tolist()
+        node_class = _MODE2NODECLASS[tree.mode]
+        nodes: List[MctsNode] = []
+        for idx, (state, parent) in enumerate(zip(states, parents)):
+            nodes.append(
+                node_class.from_binary(
+                    reader,
+                    idx,
+                    state,
+                    tree,
+                    config,
+                    nodes[parent] if parent >= 0 else None,
+                )
+            )
+
+        # pylint: disable=protected-access
+        children_column = reader.nodes["children"]
+        for idx, node in enumerate(nodes):
+            node._children = [
+                nodes[child] if child >= 0 else None
+                for child in children_column[idx].tolist()
+            ]
+            node._children_index = {
+                child: child_idx
+                for child_idx, child in enumerate(node._children)
+                if child
+            }
+        tree.root = nodes[0]
+        return tree
+
     @classmethod
     def from_json(cls, filename: str, config: Configuration) -> "MctsSearchTree":
         """
-        Create a new search tree by deserialization from a JSON file
+        Create a new search tree by deserialization from a JSON file,
+        or from a binary file if the file has the ``.aztree`` extension
 
         :param filename: the path to the JSON node
         :param config: the configuration of the search
         :return: a deserialized tree
         """
+        if is_binary_tree_file(filename):
+            return cls.from_binary(BinaryTreeReader(filename), config)
         tree = MctsSearchTree(config)
         with open(filename, "r") as fileobj:
             dict_ = json.load(fileobj)
@@ -88,6 +167,32 @@ class MctsSearchTree:
         )
         return tree
 
+    def binary_writer(self, filename: str) -> BinaryTreeWriter:
+        """
+        Write the search tree to a binary file and return the open writer,
+        so that additional data can be added to the file. The writer
+        must be closed to complete the file.
+
+        :param filename: the path to the binary file
+        :return: the writer
+        :raises ValueError: if the tree is not defined
+        """
+        if not self.root:
+            raise ValueError("Root of search tree is not defined ")
+
+        writer = BinaryTreeWriter(
+            filename,
+            _MODE2NODECLASS[self.mode].binary_columns,
+            kind="mcts",
+            metadata={"profiling": dict(self.profiling)},
+        )
+        writer.write_tree(
+            self.root,
+            lambda node: node.binary_record(writer),
+            lambda node: node._children,  # pylint: disable=protected-access
+        )
+        return writer
+
     def backpropagate(self, from_node: MctsNode) -> None:
         """
         Backpropagate the value estimate and update all nodes from a
@@ -165,9 +270,20 @@ class MctsSearchTree:
             3. Rollout
             4. Backpropagation
 
+        If the `leaf_batch_size` setting is larger than one, several
+        leaves are selected and processed in each iteration, see
+        `_one_batched_iteration`
+
         :return: if a solution was found
         """
         self.profiling["iterations"] += 1
+        # The cached graph is outdated when the tree grows, e.g. when a search is continued
+        self._graph = None
+        if self.config.search.algorithm_config["leaf_batch_size"] > 1:
+            return self._one_batched_iteration(
+                self.config.search.algorithm_config["leaf_batch_size"]
+            )
+
         leaf = self.select_leaf()
         leaf.expand()
         while not leaf.is_terminal():
@@ -179,6 +295,39 @@ class MctsSearchTree:
         self.backpropagate(leaf)
         return leaf.state.is_solved
 
+    def select_leaves(self, nleaves: int) -> List[MctsNode]:
+        """
+        Select a number of distinct leaves by repeated traversal of the tree.
+
+        A virtual loss is added to each edge leading to a selected leaf so
+        that subsequent traversals are steered towards other parts of the tree.
+        The virtual losses should be removed with `remove_virtual_loss` before
+        the leaves are backpropagated.
+
+        If the same leaf is selected twice, the selection stops and fewer
+        leaves are returned.
+
+        :param nleaves: the maximum number of leaves to select
+        :return: the leaves
+        """
+        leaves: List[MctsNode] = []
+        while len(leaves) < nleaves:
+            leaf = self.select_leaf()
+            if leaf in leaves:
+                break
+            leaves.append(leaf)
+            self._update_virtual_loss(leaf, add=True)
+        return leaves
+
+    def remove_virtual_loss(self, leaves: Sequence[MctsNode]) -> None:
+        """
+        Remove the virtual losses added by `select_leaves`
+
+        :param leaves: the selected leaves
+        """
+        for leaf in leaves:
+            self._update_virtual_loss(leaf, add=False)
+
     def select_leaf(self) -> MctsNode:
         """
         Traverse the tree selecting the most promising child at
@@ -201,7 +350,10 @@ class MctsSearchTree:
 
     def serialize(self, filename: str) -> None:
         """
-        Serialize the search tree to a JSON file
+        Serialize the search tree to a JSON file, or to a compact binary file
+        if the filename has the ``.aztree`` extension. The binary file is written
+        while the tree is traversed, and when it is loaded, the molecules
+        are not parsed until they are used.
 
         :param filename: the path to the JSON file
         :raises ValueError: if the tree is not defined
@@ -209,6 +361,10 @@ class MctsSearchTree:
         if not self.root:
             raise ValueError("Root of search tree is not defined ")
 
+        if is_binary_tree_file(filename):
+            self.binary_writer(filename).close()
+            return
+
         mol_ser = MoleculeSerializer()
         dict_ = {"tree": self.root.serialize(mol_ser), "molecules": mol_ser.store}
         with open(filename, "w") as fileobj:
@@ -234,3 +390,62 @@ class MctsSearchTree:
                 f"currently have {nweights} weights and {nrewards} objectives)"
             )
         return mode
+
+    def _expand_nodes(self, nodes: Sequence[MctsNode]) -> None:
+        """
+        Expand a number of nodes, making sure that the expansion policy
+        is called once for all the molecules of the nodes, so that the
+        predictions are cached when each node is expanded.
+
+        The policy is only called up-front if the predictions of all the
+        molecules fit in the prediction caches of the selected policies,
+        otherwise the model would be called again when the nodes are expanded.
+        """
+        expandable_nodes = [
+            node for node in nodes if node.is_expandable and not node.is_expanded
+        ]
+        if len(expandable_nodes) > 1:
+            molecules = []
+            for node in expandable_nodes:
+                molecules.extend(node.state.expandable_mols)
+                molecules.extend(node.cache_molecules())
+            expansion_policy = self.config.expansion_policy
+            if len(molecules) <= expansion_policy.cache_capacity():
+                expansion_policy.get_actions([], molecules)
+        for node in nodes:
+            node.expand()
+
+    def _one_batched_iteration(self, nleaves: int) -> bool:
+        leaves = self.select_leaves(nleaves)
+        self._expand_nodes(leaves)
+
+        # Each leaf is rolled out until it is terminal, as in the serial iteration,
+        # but the children of a step are expanded together
+        current_leaves = list(leaves)
+        while not all(leaf.is_terminal() for leaf in current_leaves):
+            children = []
+            for idx, leaf in enumerate(current_leaves):
+                if leaf.is_terminal():
+                    continue
+                child = leaf.promising_child()
+                if child:
+                    children.append(child)
+                    current_leaves[idx] = child
+            if children:
+                self._expand_nodes(children)
+
+        self.remove_virtual_loss(leaves)
+        for leaf in current_leaves:
+            self.backpropagate(leaf)
+        return any(leaf.state.is_solved for leaf in current_leaves)
+
+    def _update_virtual_loss(self, leaf: MctsNode, add: bool) -> None:
+        current = leaf
+        while current is not self.root:
+            parent = current.parent
+            assert parent is not None
+            if add:
+                parent.add_virtual_loss(current)
+            else:
+                parent.remove_virtual_loss(current)
+            current = parent
@@ -38,12 +38,33 @@ class MctsState:
 
     :param mols: the molecules of the state
     :param config: settings of the tree search algorithm
+    :param in_stock_list: for each molecule if they are in stock, if not given the stock is queried
     """
 
-    def __init__(self, mols: Sequence[TreeMolecule], config: Configuration) -> None:
+    __slots__ = (
+        "mols",
+        "stock",
+        "in_stock_list",
+        "expandable_mols",
+        "_stock_availability",
+        "is_solved",
+        "max_transforms",
+        "is_terminal",
+        "_hash",
+        "expandables_hash",
+    )
+
+    def __init__(
+        self,
+        mols: Sequence[TreeMolecule],
+        config: Configuration,
+        in_stock_list: Optional[Sequence[bool]] = None,
+    ) -> None:
         self.mols = mols
         self.stock = config.stock
-        self.in_stock_list = [mol in self.stock for mol in self.mols]
+        if in_stock_list is None:
+            in_stock_list = self.stock.contains_many(self.mols)
+        self.in_stock_list = list(in_stock_list)
         self.expandable_mols = [
             mol for mol, in_stock in zip(self.mols, self.in_stock_list) if not in_stock
         ]
@@ -54,11 +75,11 @@ class MctsState:
             self.max_transforms >= config.search.max_transforms
         ) or self.is_solved
 
-        inchis = [mol.inchi_key for mol in self.mols]
-        self._hash = hash(tuple(sorted(inchis)))
+        keys = [mol.identity_key for mol in self.mols]
+        self._hash = hash(tuple(sorted(keys)))
 
-        inchis = [mol.inchi_key for mol in self.expandable_mols]
-        self.expandables_hash = hash(tuple(sorted(inchis)))
+        keys = [mol.identity_key for mol in self.expandable_mols]
+        self.expandables_hash = hash(tuple(sorted(keys)))
 
     def __hash__(self) -> int:
         return self._hash
@@ -97,6 +118,30 @@ class MctsState:
         mols = molecules.get_tree_molecules(dict_["mols"])
         return MctsState(mols, config)
 
+    @classmethod
+    def create_many(
+        cls, mols_list: Sequence[Sequence[TreeMolecule]], config: Configuration
+    ) -> List["MctsState"]:
+        """
+        Create a number of states, querying the stock once for
+        all the molecules of the states
+
+        :param mols_list: the molecules of each state
+        :param config: settings of the tree search algorithm
+        :return: the new states
+        """
+        all_mols = [mol for mols in mols_list for mol in mols]
+        in_stock = dict(
+            zip(
+                (mol.identity_key for mol in all_mols),
+                config.stock.contains_many(all_mols),
+            )
+        )
+        return [
+            cls(mols, config, [in_stock[mol.identity_key] for mol in mols])
+            for mols in mols_list
+        ]
+
     @property
     def stock_availability(self) -> List[str]:
         """
@@ -106,9 +151,7 @@ class MctsState:
         :rtype: list of str
         """
         if not self._stock_availability:
-            self._stock_availability = [
-                self.stock.availability_string(mol) for mol in self.mols
-            ]
+            self._stock_availability = self.stock.availability_many(self.mols)
         return self._stock_availability
 
     def serialize(self, molecule_store: MoleculeSerializer) -> StrDict:
@@ -3,12 +3,74 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+import numpy as np
+
 from aizynthfinder.reactiontree import ReactionTreeLoader
 
 if TYPE_CHECKING:
     from aizynthfinder.chem import RetroReaction
     from aizynthfinder.search.mcts import MctsNode
-    from aizynthfinder.utils.type_utils import List, Optional, Tuple
+    from aizynthfinder.utils.type_utils import Any, Dict, List, Optional, Tuple
+
+
+_EMPTY_ARRAYS: Dict[Tuple[Any, Tuple[int, ...]], np.ndarray] = {}
+
+
+class GrowableArray:
+    """
+    A NumPy array that can be appended to with amortized constant cost,
+    by over-allocating the underlying storage.
+
+    Indexing and in-place operations are applied on a view of the
+    used part of the storage, which is also available as the `view` property.
+
+    :param values: the initial values, the first dimension is the growable one
+    :param dtype: the data type of the array
+    """
+
+    __slots__ = ("_data", "_size")
+
+    def __init__(self, values: Any, dtype: Any = float) -> None:
+        data = np.array(values, dtype=dtype)
+        if len(data) == 0:
+            # Empty arrays are shared to save memory. The storage is re-allocated
+            # on the first append, so the shared array is never written to.
+            data = _EMPTY_ARRAYS.setdefault((data.dtype, data.shape), data)
+        self._data: np.ndarray = data
+        self._size = len(self._data)
+
+    def __getitem__(self, index: Any) -> Any:
+        return self._data[: self._size][index]
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        self._data[: self._size][index] = value
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def view(self) -> np.ndarray:
+        """Return a view of the used part of the storage"""
+        return self._data[: self._size]
+
+    def append(self, value: Any) -> None:
+        """
+        Append a value to the end of the array, growing the storage if needed
+
+        :param value: the value, or row, to append
+        """
+        if self._size == len(self._data):
+            new_data = np.empty(
+                (max(2 * self._size, 4),) + self._data.shape[1:], dtype=self._data.dtype
+            )
+            new_data[: self._size] = self._data[: self._size]
+            self._data = new_data
+        self._data[self._size] = value
+        self._size += 1
+
+    def tolist(self) -> List[Any]:
+        """Return the used part of the storage as a (nested) list of Python objects"""
+        return self.view.tolist()
 
 
 class ReactionTreeFromSuperNode(ReactionTreeLoader):
@@ -6,13 +6,15 @@ from typing import TYPE_CHECKING
 
 import numpy as np
 
+from aizynthfinder.chem.fingerprints import fingerprint_service
 from aizynthfinder.search.retrostar.cost import __name__ as retrostar_cost_module
 from aizynthfinder.utils.loading import load_dynamic_class
+from aizynthfinder.utils.models import load_model
 
 if TYPE_CHECKING:
     from aizynthfinder.chem import Molecule
     from aizynthfinder.context.config import Configuration
-    from aizynthfinder.utils.type_utils import Any, List, Tuple
+    from aizynthfinder.utils.type_utils import Any, Dict, List, Sequence, Tuple
 
 
 class MoleculeCost:
@@ -30,12 +32,19 @@ class MoleculeCost:
         }
     }
 
-    The cost can be computed by calling the instantiated class with a molecule.
+    The cost can be computed by calling the instantiated class with a molecule,
+    or for many molecules at once with `calculate_many`, which evaluates
+    the cost model in one batch if the model supports it.
+    The costs are memoized by the identity key of the molecules.
 
     .. code-block::
 
-        calculator = MyCost(config)
-        cost = calculator.calculate(molecule)
+        calculator = MoleculeCost(config)
+        cost = calculator(molecule)
+        costs = calculator.calculate_many(molecules)
+
+    :ivar hits: the number of costs taken from the memo
+    :ivar misses: the number of costs computed by the cost model
 
     :param config: the configuration of the tree search
     """
@@ -52,9 +61,35 @@ class MoleculeCost:
         del kwargs["cost"]
 
         self.molecule_cost = cls(**kwargs) if kwargs else cls()
+        self.hits = 0
+        self.misses = 0
+        self._memo: Dict[str, float] = {}
 
     def __call__(self, mol: Molecule) -> float:
-        return self.molecule_cost.calculate(mol)
+        return self.calculate_many([mol])[0]
+
+    def calculate_many(self, mols: Sequence[Molecule]) -> List[float]:
+        """
+        Compute the costs of a number of molecules, the molecules
+        that are not memoized are evaluated in one batch
+
+        :param mols: the molecules
+        :return: the costs
+        """
+        keys = [mol.identity_key for mol in mols]
+        missing: Dict[str, Molecule] = {}
+        for key, mol in zip(keys, mols):
+            if key not in self._memo and key not in missing:
+                missing[key] = mol
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            if hasattr(self.molecule_cost, "calculate_many"):
+                costs = self.molecule_cost.calculate_many(list(missing.values()))
+            else:
+                costs = [self.molecule_cost.calculate(mol) for mol in missing.values()]
+            self._memo.update(zip(missing.keys(), costs))
+        return [self._memo[key] for key in keys]
 
 
 class RetroStarCost:
@@ -76,6 +111,10 @@ class RetroStarCost:
     The first item of the tuple should be a list of the model weights for each layer.
     The second item of the tuple should be a list of the model biases for each layer.
 
+    Alternatively, the model can be an ONNX model (with the ``.onnx`` extension) that
+    takes the fingerprints and outputs the cost, i.e. including the final softplus.
+    No drop-out is applied to an ONNX model.
+
     :param model_path: the filename of the model weights and biases
     :param fingerprint_length: the number of bits in the fingerprint
     :param fingerprint_radius: the radius of the fingerprint
@@ -91,17 +130,35 @@ class RetroStarCost:
         self.dropout_rate: float = float(kwargs.get("dropout_rate", 0.1))
 
         self._dropout_prob = 1.0 - self.dropout_rate
-        self._weights, self._biases = self._load_model(model_path)
+        self._onnx_model: Any = None
+        if model_path.split(".")[-1] == "onnx":
+            self._onnx_model = load_model(model_path, "molecule_cost", False)
+        else:
+            self._weights, self._biases = self._load_model(model_path)
 
     def __repr__(self) -> str:
         return "retrostar"
 
     def calculate(self, mol: Molecule) -> float:
+        return self.calculate_many([mol])[0]
+
+    def calculate_many(self, mols: Sequence[Molecule]) -> List[float]:
+        """
+        Compute the costs of a number of molecules in one batch, the
+        drop-out is sampled independently for each molecule
+
+        :param mols: the molecules
+        :return: the costs
+        """
         # pylint: disable=invalid-name
-        mol.sanitize()
-        vec = mol.fingerprint(
-            radius=self.fingerprint_radius, nbits=self.fingerprint_length
+        if not mols:
+            return []
+        vec = fingerprint_service().fingerprints(
+            mols, radius=self.fingerprint_radius, nbits=self.fingerprint_length
         )
+        if self._onnx_model is not None:
+            return np.asarray(self._onnx_model.predict(vec))[:, 0].tolist()
+
         for W, b in zip(self._weights[:-1], self._biases[:-1]):
             vec = np.matmul(vec, W) + b
             vec *= vec > 0  # ReLU
@@ -110,7 +167,7 @@ class RetroStarCost:
                 self._dropout_prob
             )
         vec = np.matmul(vec, self._weights[-1]) + self._biases[-1]
-        return float(np.log(1 + np.exp(vec)))
+        return np.log(1 + np.exp(vec))[:, 0].tolist()
 
     @staticmethod
     def _load_model(model_path: str) -> Tuple[List[np.ndarray], List[np.ndarray]]:
@@ -131,3 +188,6 @@ class ZeroMoleculeCost:
 
     def calculate(self, _mol: Molecule) -> float:  # pytest: disable=unused-argument
         return 0.0
+
+    def calculate_many(self, mols: Sequence[Molecule]) -> List[float]:
+        return [0.0] * len(mols)
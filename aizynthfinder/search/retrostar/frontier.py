@@ -0,0 +1,96 @@
+""" Module containing the frontier of expandable molecule nodes of a Retro* tree
+"""
+from __future__ import annotations
+
+import heapq
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from aizynthfinder.search.retrostar.nodes import MoleculeNode, ReactionNode
+    from aizynthfinder.utils.type_utils import Dict, Iterable, List, Optional, Tuple
+
+    _HeapEntry = Tuple[float, int, MoleculeNode]
+
+
+class Frontier:
+    """
+    The expandable molecule nodes of a Retro* tree, ordered by their
+    target value V_t(m|T) in a binary heap.
+
+    The heap uses lazy invalidation: when the target value of a reaction
+    node changes, its expandable children are pushed again with the new
+    value, and entries that are out-dated or whose node is no longer expandable
+    are discarded when they reach the top of the heap. The heap is rebuilt
+    when it holds too many out-dated entries.
+
+    Nodes with the same target value are selected in the order they
+    were added to the frontier.
+
+    .. code-block::
+
+        frontier = Frontier()
+        frontier.add(root)
+        node = frontier.select()
+
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[_HeapEntry] = []
+        self._nodes: List[MoleculeNode] = []
+        self._order: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def add(self, nodes: Iterable[MoleculeNode]) -> None:
+        """
+        Add new molecule nodes to the frontier, the nodes
+        that are not expandable are only given an order.
+
+        :param nodes: the nodes to add
+        """
+        for node in nodes:
+            self._order[id(node)] = len(self._nodes)
+            self._nodes.append(node)
+            self._push(node)
+
+    def select(self) -> Optional[MoleculeNode]:
+        """
+        Return the expandable node with the lowest target value, without
+        removing it from the frontier
+
+        :return: the node or None if no node can be expanded
+        """
+        while self._heap:
+            value, _, node = self._heap[0]
+            if node.expandable and value == node.target_value:
+                return node if value != np.inf else None
+            heapq.heappop(self._heap)
+        return None
+
+    def update(self, node: ReactionNode) -> None:
+        """
+        Update the frontier after the target value of a reaction
+        node has changed
+
+        :param node: the reaction node
+        """
+        for child in node.children:
+            self._push(child)
+        if len(self._heap) > 2 * len(self._nodes) + 64:
+            self._rebuild()
+
+    def _push(self, node: MoleculeNode) -> None:
+        order = self._order.get(id(node))
+        if node.expandable and order is not None:
+            heapq.heappush(self._heap, (node.target_value, order, node))
+
+    def _rebuild(self) -> None:
+        self._heap = [
+            (node.target_value, order, node)
+            for order, node in enumerate(self._nodes)
+            if node.expandable
+        ]
+        heapq.heapify(self._heap)
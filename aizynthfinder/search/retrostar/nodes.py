@@ -18,6 +18,7 @@ if TYPE_CHECKING:
         MoleculeSerializer,
     )
     from aizynthfinder.context.config import Configuration
+    from aizynthfinder.search.retrostar.frontier import Frontier
     from aizynthfinder.utils.type_utils import List, Optional, Sequence, Set, StrDict
 
 
@@ -27,6 +28,7 @@ class MoleculeNode(TreeNodeMixin):
 
     :ivar cost: the cost of synthesizing the molecule
     :ivar expandable: if True, this node is part of the frontier
+    :ivar frontier: the frontier of the tree that is updated with the node, if any
     :ivar mol: the molecule represented by the node
     :ivar in_stock: if True the molecule is in stock and hence should not be expanded
     :ivar parent: the parent of the node
@@ -52,6 +54,7 @@ class MoleculeNode(TreeNodeMixin):
         self.value = self.cost
         self.in_stock = mol in config.stock
         self.parent = parent
+        self.frontier: Optional[Frontier] = parent.frontier if parent else None
 
         self._children: List[ReactionNode] = []
         self.solved = self.in_stock
@@ -228,6 +231,7 @@ class ReactionNode(TreeNodeMixin):
     An AND node representing a reaction
 
     :ivar cost: the cost of the reaction
+    :ivar frontier: the frontier of the tree that is updated with the node, if any
     :ivar parent: the parent of the node
     :ivar reaction: the reaction represented by the node
     :ivar solved: if True all children nodes are solved
@@ -243,6 +247,7 @@ class ReactionNode(TreeNodeMixin):
         self, cost: float, reaction: RetroReaction, parent: MoleculeNode
     ) -> None:
         self.parent = parent
+        self.frontier: Optional[Frontier] = parent.frontier
         self.cost = cost
         self.reaction = reaction
 
@@ -352,6 +357,8 @@ class ReactionNode(TreeNodeMixin):
         self.value += value
         self.target_value += value
         self.solved = all(node.solved for node in self.children)
+        if self.frontier is not None:
+            self.frontier.update(self)
 
         if value != 0:
             self._propagate(value, exclude=from_mol)
@@ -361,6 +368,8 @@ class ReactionNode(TreeNodeMixin):
     def _propagate(self, value: float, exclude: Optional[TreeMolecule] = None) -> None:
         if not exclude:
             self.target_value += value
+            if self.frontier is not None:
+                self.frontier.update(self)
 
         for child in self.children:
             if exclude is None or child.mol is not exclude:
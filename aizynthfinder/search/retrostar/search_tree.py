@@ -7,18 +7,42 @@ from typing import TYPE_CHECKING
 
 import numpy as np
 
-from aizynthfinder.chem.serialization import MoleculeDeserializer, MoleculeSerializer
+from aizynthfinder.chem.serialization import (
+    BinaryTreeReader,
+    BinaryTreeWriter,
+    MoleculeDeserializer,
+    MoleculeSerializer,
+    is_binary_tree_file,
+)
 from aizynthfinder.search.andor_trees import AndOrSearchTreeBase, SplitAndOrTree
 from aizynthfinder.search.retrostar.cost import MoleculeCost
-from aizynthfinder.search.retrostar.nodes import MoleculeNode
-from aizynthfinder.utils.exceptions import RejectionException
+from aizynthfinder.search.retrostar.frontier import Frontier
+from aizynthfinder.search.retrostar.nodes import MoleculeNode, ReactionNode
 from aizynthfinder.utils.logging import logger
 
 if TYPE_CHECKING:
     from aizynthfinder.chem import RetroReaction
     from aizynthfinder.context.config import Configuration
     from aizynthfinder.reactiontree import ReactionTree
-    from aizynthfinder.utils.type_utils import List, Optional, Sequence
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        List,
+        Optional,
+        Sequence,
+        StrDict,
+        Union,
+    )
+
+# The columns of a node in a binary tree file
+_BINARY_COLUMNS = {
+    "mol": "<i4",
+    "reaction": "<i4",
+    "cost": "<f8",
+    "value": "<f8",
+    "target_value": "<f8",
+    "expandable": "u1",
+    "children": "<i4[]",
+}
 
 
 class SearchTree(AndOrSearchTreeBase):
@@ -27,6 +51,7 @@ class SearchTree(AndOrSearchTreeBase):
 
     :ivar config: settings of the tree search algorithm
     :ivar root: the root node
+    :ivar frontier: the expandable molecule nodes, ordered by their target value
 
     :param config: settings of the tree search algorithm
     :param root_smiles: the root will be set to a node representing this molecule, defaults to None
@@ -39,12 +64,15 @@ class SearchTree(AndOrSearchTreeBase):
         self._mol_nodes: List[MoleculeNode] = []
         self._logger = logger()
         self.molecule_cost = MoleculeCost(config)
+        self.frontier = Frontier()
 
         if root_smiles:
             self.root: Optional[MoleculeNode] = MoleculeNode.create_root(
                 root_smiles, config, self.molecule_cost
             )
+            self.root.frontier = self.frontier
             self._mol_nodes.append(self.root)
+            self.frontier.add([self.root])
         else:
             self.root = None
 
@@ -55,21 +83,69 @@ class SearchTree(AndOrSearchTreeBase):
             "reactants_generations": 0,
         }
 
+    @classmethod
+    def from_binary(cls, reader: BinaryTreeReader, config: Configuration) -> SearchTree:
+        """
+        Create a new search tree from a binary file written with `binary_writer`
+
+        :param reader: the reader of the binary file
+        :param config: the configuration of the search tree
+        :return: a deserialized tree
+        :raises ValueError: if the file does not contain a Retro* tree
+        """
+        if reader.kind != "retrostar":
+            raise ValueError(
+                f"The file contains a '{reader.kind}' tree, not a Retro* tree"
+            )
+
+        tree = cls(config)
+        tree.profiling.update(reader.metadata.get("profiling", {}))
+
+        columns = reader.nodes
+        nodes: List[Any] = []
+        for idx, parent in enumerate(reader.parents().tolist()):
+            mol_idx = int(columns["mol"][idx])
+            if mol_idx >= 0:
+                mol = reader.molecules.get_tree_molecules([mol_idx])[0]
+                node = MoleculeNode(
+                    mol,
+                    config,
+                    tree.molecule_cost,
+                    nodes[parent] if parent >= 0 else None,
+                )
+                node.expandable = bool(columns["expandable"][idx])
+            else:
+                reaction = reader.action(int(columns["reaction"][idx]))
+                node = ReactionNode(0, reaction, nodes[parent])
+                node.target_value = float(columns["target_value"][idx])
+            node.cost = float(columns["cost"][idx])
+            node.value = float(columns["value"][idx])
+            nodes.append(node)
+
+        # The children are set from the leaves and up, so that
+        # the reaction nodes can be solved from their children
+        children_column = columns["children"]
+        for idx in reversed(range(len(nodes))):
+            node = nodes[idx]
+            node.children = [nodes[child] for child in children_column[idx].tolist()]
+            if isinstance(node, ReactionNode):
+                node.solved = all(child.solved for child in node.children)
+        tree.root = nodes[0]
+        tree._find_mol_nodes()
+        return tree
+
     @classmethod
     def from_json(cls, filename: str, config: Configuration) -> SearchTree:
         """
-        Create a new search tree by deserialization from a JSON file
+        Create a new search tree by deserialization from a JSON file,
+        or from a binary file if the file has the ``.aztree`` extension
 
         :param filename: the path to the JSON node
         :param config: the configuration of the search tree
         :return: a deserialized tree
         """
-
-        def _find_mol_nodes(node):
-            for child_ in node.children:
-                tree._mol_nodes.append(child_)  # pylint: disable=protected-access
-                for grandchild in child_.children:
-                    _find_mol_nodes(grandchild)
+        if is_binary_tree_file(filename):
+            return cls.from_binary(BinaryTreeReader(filename), config)
 
         tree = cls(config)
         with open(filename, "r") as fileobj:
@@ -78,9 +154,7 @@ class SearchTree(AndOrSearchTreeBase):
         tree.root = MoleculeNode.from_dict(
             dict_["tree"], config, mol_deser, tree.molecule_cost
         )
-        tree._mol_nodes.append(tree.root)  # pylint: disable=protected-access
-        for child in tree.root.children:
-            _find_mol_nodes(child)
+        tree._find_mol_nodes()  # pylint: disable=protected-access
         return tree
 
     @property
@@ -131,9 +205,36 @@ class SearchTree(AndOrSearchTreeBase):
             self._routes = SplitAndOrTree(self.root, self.config.stock).routes
         return self._routes
 
+    def binary_writer(self, filename: str) -> BinaryTreeWriter:
+        """
+        Write the search tree to a binary file and return the open writer,
+        so that additional data can be added to the file. The writer
+        must be closed to complete the file.
+
+        :param filename: the path to the binary file
+        :return: the writer
+        :raises ValueError: if the root of the tree is not defined
+        """
+        if self.root is None:
+            raise ValueError("Cannot serialize tree as root is not defined")
+
+        writer = BinaryTreeWriter(
+            filename,
+            _BINARY_COLUMNS,
+            kind="retrostar",
+            metadata={"profiling": dict(self.profiling)},
+        )
+        writer.write_tree(
+            self.root,
+            lambda node: self._binary_record(node, writer),
+            lambda node: node.children,
+        )
+        return writer
+
     def serialize(self, filename: str) -> None:
         """
-        Seralize the search tree to a JSON file
+        Seralize the search tree to a JSON file, or to a compact binary file
+        if the filename has the ``.aztree`` extension
 
         :param filename: the path to the JSON file
         :type filename: str
@@ -141,11 +242,37 @@ class SearchTree(AndOrSearchTreeBase):
         if self.root is None:
             raise ValueError("Cannot serialize tree as root is not defined")
 
+        if is_binary_tree_file(filename):
+            self.binary_writer(filename).close()
+            return
+
         mol_ser = MoleculeSerializer()
         dict_ = {"tree": self.root.serialize(mol_ser), "molecules": mol_ser.store}
         with open(filename, "w") as fileobj:
             json.dump(dict_, fileobj, indent=2)
 
+    @staticmethod
+    def _binary_record(
+        node: Union[MoleculeNode, ReactionNode], writer: BinaryTreeWriter
+    ) -> StrDict:
+        if isinstance(node, MoleculeNode):
+            return {
+                "mol": writer.molecule(node.mol),
+                "reaction": -1,
+                "cost": node.cost,
+                "value": node.value,
+                "target_value": np.nan,
+                "expandable": node.expandable,
+            }
+        return {
+            "mol": -1,
+            "reaction": writer.action(node.reaction),
+            "cost": node.cost,
+            "value": node.value,
+            "target_value": node.target_value,
+            "expandable": False,
+        }
+
     def _expand(self, node: MoleculeNode) -> None:
         reactions, priors = self.config.expansion_policy([node.mol])
         self.profiling["expansion_calls"] += 1
@@ -153,6 +280,7 @@ class SearchTree(AndOrSearchTreeBase):
         if not reactions:
             return
 
+        self.template_executor.apply(reactions)
         costs = -np.log(np.clip(priors, 1e-3, 1.0))
         reactions_to_expand = []
         reaction_costs = []
@@ -165,38 +293,56 @@ class SearchTree(AndOrSearchTreeBase):
             if not reaction.reactants:
                 continue
             for idx, _ in enumerate(reaction.reactants):
-                rxn_copy = reaction.copy(idx)
-                if self._filter_reaction(rxn_copy):
-                    continue
-                reactions_to_expand.append(rxn_copy)
+                reactions_to_expand.append(reaction.copy(idx))
                 reaction_costs.append(cost)
 
-        for cost, rxn in zip(reaction_costs, reactions_to_expand):
+        rejected = self._filter_reactions(reactions_to_expand)
+        accepted = [
+            (cost, rxn)
+            for cost, rxn, is_rejected in zip(
+                reaction_costs, reactions_to_expand, rejected
+            )
+            if not is_rejected
+        ]
+        # The costs of all new molecules are computed in one batch and memoized
+        self.molecule_cost.calculate_many(
+            [mol for _, rxn in accepted for mol in rxn.reactants[rxn.index]]
+        )
+        for cost, rxn in accepted:
             new_nodes = node.add_stub(cost, rxn)
             self._mol_nodes.extend(new_nodes)
+            self.frontier.add(new_nodes)
 
-    def _filter_reaction(self, reaction: RetroReaction) -> bool:
+    def _filter_reactions(self, reactions: List[RetroReaction]) -> List[bool]:
         if not self.config.filter_policy.selection:
-            return False
-        try:
-            self.config.filter_policy(reaction)
-        except RejectionException as err:
-            self._logger.debug(str(err))
-            return True
-        return False
+            return [False] * len(reactions)
+        rejected = []
+        for err in self.config.filter_policy.apply_many(reactions):
+            if err is not None:
+                self._logger.debug(str(err))
+            rejected.append(err is not None)
+        return rejected
+
+    def _find_mol_nodes(self) -> None:
+        def _find_children(node):
+            for child_ in node.children:
+                self._mol_nodes.append(child_)
+                for grandchild in child_.children:
+                    _find_children(grandchild)
 
-    def _select(self) -> Optional[MoleculeNode]:
-        scores = np.asarray(
-            [
-                node.target_value if node.expandable else np.inf
-                for node in self._mol_nodes
-            ]
-        )
+        assert self.root is not None
+        self._mol_nodes.append(self.root)
+        for child in self.root.children:
+            _find_children(child)
 
-        if scores.min() == np.inf:
-            return None
+        for mol_node in self._mol_nodes:
+            mol_node.frontier = self.frontier
+            for reaction_node in mol_node.children:
+                reaction_node.frontier = self.frontier
+        self.frontier.add(self._mol_nodes)
 
-        return self._mol_nodes[int(np.argmin(scores))]
+    def _select(self) -> Optional[MoleculeNode]:
+        return self.frontier.select()
 
     @staticmethod
     def _update(node: MoleculeNode) -> None:
@@ -0,0 +1,161 @@
+""" Module containing a table of the expansions that are shared by equivalent
+nodes of a search tree
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from aizynthfinder.chem import TemplatedRetroReaction
+
+if TYPE_CHECKING:
+    from aizynthfinder.chem import RetroReaction, TreeMolecule
+    from aizynthfinder.search.dfpn.nodes import MoleculeNode as DfpnMoleculeNode
+    from aizynthfinder.search.mcts import MctsNode
+    from aizynthfinder.utils.type_utils import (
+        Dict,
+        List,
+        Optional,
+        Sequence,
+        Tuple,
+        Union,
+    )
+
+    _ExpandedNode = Union[MctsNode, DfpnMoleculeNode]
+
+
+class TranspositionEntry:
+    """
+    The expansion of a state in a `TranspositionTable`.
+
+    The actions are kept as they were returned by the expansion policy and
+    are copied onto the molecules of every equivalent node that is expanded.
+    The outcomes of templated actions are recorded by position as mapped SMILES,
+    so that the reactants can be re-created without applying the template again.
+    This is only done if the mapped SMILES of the product is identical, so that the
+    atom mapping of the reactants is correct.
+
+    :ivar node: the first node that was expanded with this state
+    :ivar actions: the actions of the expansion
+    :ivar priors: the priors of the actions
+    :ivar outcomes: the mapped SMILES of the product and of the reactants of each outcome, by action position
+
+    :param node: the first node that was expanded with this state
+    :param actions: the actions of the expansion
+    :param priors: the priors of the actions
+    """
+
+    __slots__ = ("node", "actions", "priors", "outcomes")
+
+    def __init__(
+        self,
+        node: _ExpandedNode,
+        actions: Sequence[RetroReaction],
+        priors: Sequence[float],
+    ) -> None:
+        self.node = node
+        self.actions = [action.copy() for action in actions]
+        self.priors = list(priors)
+        self.outcomes: Dict[int, Tuple[str, List[str]]] = {}
+
+    def actions_for(self, mols: Sequence[TreeMolecule]) -> List[RetroReaction]:
+        """
+        Return copies of the actions that are applied to the given molecules,
+        which should have the same identity keys as the molecules of the expansion
+
+        :param mols: the expandable molecules of a node
+        :return: the actions
+        """
+        mols_by_key = {mol.identity_key: mol for mol in mols}
+        return [
+            action.copy(mol=mols_by_key[action.mol.identity_key])
+            for action in self.actions
+        ]
+
+    def add_outcomes(self, position: int, reaction: RetroReaction) -> None:
+        """
+        Record the outcomes of an action that has been applied. Only
+        templated reactions are recorded.
+
+        :param position: the position of the action in the expansion
+        :param reaction: the applied reaction
+        """
+        if (
+            position >= len(self.actions)
+            or position in self.outcomes
+            or reaction.unqueried
+            or not isinstance(reaction, TemplatedRetroReaction)
+        ):
+            return
+        self.outcomes[position] = (
+            reaction.mol.mapped_smiles,
+            [
+                ".".join(mol.mapped_smiles for mol in reactants)
+                for reactants in reaction.reactants
+            ],
+        )
+
+    def set_outcomes(self, position: int, reaction: RetroReaction) -> bool:
+        """
+        Set the reactants of an action from the recorded outcomes
+        of the same action in an equivalent node
+
+        :param position: the position of the action in the expansion
+        :param reaction: the reaction to set the reactants of
+        :return: if the reactants could be set
+        """
+        if position not in self.outcomes or not isinstance(
+            reaction, TemplatedRetroReaction
+        ):
+            return False
+        product_smiles, reactants_smiles = self.outcomes[position]
+        if reaction.mol.mapped_smiles != product_smiles:
+            return False
+        reaction.set_reactants_from_smiles(reactants_smiles)
+        return True
+
+
+class TranspositionTable:
+    """
+    A tree-wide table of the expansions of search tree nodes.
+
+    In the MCTS, the table is keyed by the `expandables_hash` of the
+    state of a node, so that nodes with the same expandable molecules,
+    e.g. reached by applying the same reactions in a different order, share the
+    expansion of the first of them. In the DFPN search, the table is keyed by
+    the hash of the identity key of the molecule of a molecule node.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[int, TranspositionEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(
+        self,
+        key: int,
+        node: _ExpandedNode,
+        actions: Sequence[RetroReaction],
+        priors: Sequence[float],
+    ) -> TranspositionEntry:
+        """
+        Add the expansion of a node to the table
+
+        :param key: the key of the expanded state
+        :param node: the expanded node
+        :param actions: the actions of the expansion
+        :param priors: the priors of the actions
+        :return: the new entry
+        """
+        entry = TranspositionEntry(node, actions, priors)
+        self._entries[key] = entry
+        return entry
+
+    def get(self, key: int) -> Optional[TranspositionEntry]:
+        """
+        Return the entry of a state, if it exists
+
+        :param key: the key of the expanded state
+        :return: the entry or None
+        """
+        return self._entries.get(key)
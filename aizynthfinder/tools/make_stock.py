@@ -18,6 +18,7 @@ from rdkit import Chem
 
 from aizynthfinder.chem import Molecule, MoleculeException
 from aizynthfinder.context.stock import MongoDbInchiKeyQuery
+from aizynthfinder.context.stock.queries import make_mmap_stock
 
 if TYPE_CHECKING:
     from aizynthfinder.utils.type_utils import Iterable, List, Optional
@@ -50,7 +51,7 @@ def _get_arguments() -> argparse.Namespace:
     )
     parser.add_argument(
         "--target",
-        choices=["hdf5", "mongo", "molbloom", "molbloom-inchi"],
+        choices=["hdf5", "mongo", "molbloom", "molbloom-inchi", "mmstock"],
         help="type of output",
         default="hdf5",
     )
@@ -118,6 +119,15 @@ def make_hdf5_stock(inchi_keys: _StrIterator, filename: str) -> None:
     print(f"Created HDF5 stock with {len(data)} unique compounds")
 
 
+def make_mmstock(inchi_keys: _StrIterator, filename: str) -> None:
+    """
+    Put all the inchi keys from the given iterable in a sorted,
+    memory-mapped stock file. Only unique inchi keys are stored.
+    """
+    nkeys = make_mmap_stock(inchi_keys, filename)
+    print(f"Created memory-mapped stock with {nkeys} unique compounds")
+
+
 def make_molbloom(
     smiles_list: _StrIterator, filename: str, filter_size: int, approx_mols: int
 ) -> None:
@@ -208,6 +218,8 @@ def main() -> None:
 
     if args.target == "hdf5":
         make_hdf5_stock(inchi_keys_gen, args.output)
+    elif args.target == "mmstock":
+        make_mmstock(inchi_keys_gen, args.output)
     elif args.target == "molbloom-inchi":
         make_molbloom_inchi(inchi_keys_gen, args.output, *args.bloom_params)
     else:
@@ -0,0 +1,43 @@
+""" Module containing a CLI for converting a template library to the memory-mapped binary format
+"""
+import argparse
+
+from aizynthfinder.context.policy.template_library import (
+    BINARY_EXTENSION,
+    TemplateLibrary,
+)
+
+
+def main() -> None:
+    """Entry-point for the templates2binary tool"""
+    parser = argparse.ArgumentParser("templates2binary")
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="the template library, a tab-separated CSV file or an HDF5 file",
+    )
+    parser.add_argument(
+        "--output",
+        required=True,
+        help=f"the name of the binary template library, should end with {BINARY_EXTENSION}",
+    )
+    args = parser.parse_args()
+
+    if not args.output.endswith(BINARY_EXTENSION):
+        print(
+            f"The output file does not end with {BINARY_EXTENSION}, "
+            "and will not be recognized as a binary template library",
+            flush=True,
+        )
+
+    library = TemplateLibrary.from_file(args.input)
+    library.to_binary(args.output)
+    print(
+        f"Created binary template library with {len(library)} templates "
+        f"and {len(library.columns)} columns",
+        flush=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
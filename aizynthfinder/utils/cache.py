@@ -0,0 +1,154 @@
+""" Module containing a size-bounded least-recently-used cache
+"""
+from __future__ import annotations
+
+import sys
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        Callable,
+        Hashable,
+        Iterator,
+        Optional,
+        StrDict,
+        Tuple,
+    )
+
+
+class LruCache:
+    """
+    A least-recently-used cache that is bounded by the number of entries
+    and/or by an estimate of the number of bytes used by the cached values.
+
+    When any of the limits are exceeded, the least recently used entries
+    are evicted.
+
+    .. code-block::
+
+        cache = LruCache(max_entries=1000)
+        cache["key"] = value
+        if "key" in cache:
+            value = cache["key"]
+
+    :ivar max_entries: the maximum number of entries, None means unbounded
+    :ivar max_bytes: the maximum number of bytes, None means unbounded
+    :ivar hits: the number of successful look-ups
+    :ivar misses: the number of unsuccessful look-ups
+    :ivar evictions: the number of entries evicted because of the limits
+
+    :param max_entries: the maximum number of entries
+    :param max_bytes: the maximum number of bytes
+    :param sizeof: a function that estimates the size of a value in bytes
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or sys.getsizeof
+        self._store: OrderedDict[Hashable, Tuple[Any, int]] = OrderedDict()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._store
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value, _ = self._store[key]
+        self._store.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        if key in self._store:
+            self._nbytes -= self._store.pop(key)[1]
+        size = self._sizeof(value)
+        self._store[key] = (value, size)
+        self._nbytes += size
+        self._evict()
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._store)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the estimated number of bytes of the cached values"""
+        return self._nbytes
+
+    def clear(self) -> None:
+        """Remove all entries from the cache"""
+        self._store.clear()
+        self._nbytes = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the value of a key and update the hit and miss counters
+
+        :param key: the key to look-up
+        :param default: the value to return if the key is not in the cache
+        :return: the cached value or the default value
+        """
+        if key not in self._store:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return self[key]
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """
+        Iterate over the keys and values, from the least to the most
+        recently used entry, without updating the order or the counters
+
+        :yield: the key and the value of each entry
+        """
+        for key, (value, _) in self._store.items():
+            yield key, value
+
+    def resize(self, max_entries: Optional[int]) -> None:
+        """
+        Change the maximum number of entries, evicting entries if necessary
+
+        :param max_entries: the new maximum number of entries
+        """
+        self.max_entries = max_entries
+        self._evict()
+
+    def reset_statistics(self) -> None:
+        """Reset the hit, miss and eviction counters"""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def statistics(self) -> StrDict:
+        """
+        Return the counters and the current size of the cache
+
+        :return: the statistics
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._store),
+            "bytes": self._nbytes,
+        }
+
+    def _evict(self) -> None:
+        while self._store and (
+            (self.max_entries is not None and len(self._store) > self.max_entries)
+            or (self.max_bytes is not None and self._nbytes > self.max_bytes)
+        ):
+            _, (_, size) = self._store.popitem(last=False)
+            self._nbytes -= size
+            self.evictions += 1
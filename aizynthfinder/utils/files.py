@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import gzip
 import json
+import os
 import subprocess
 import tempfile
 import time
@@ -10,6 +11,7 @@ import warnings
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+import numpy as np
 import pandas as pd
 from deprecated import deprecated
 
@@ -19,16 +21,111 @@ if TYPE_CHECKING:
     from aizynthfinder.utils.type_utils import (
         Any,
         Callable,
+        IO,
+        Iterator,
         List,
         Optional,
         Sequence,
+        StrDict,
         Union,
     )
 
 
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _open_text(filename: str, mode: str) -> IO[str]:
+    if filename.endswith(".gz"):
+        return gzip.open(filename, mode + "t", encoding="UTF-8")  # type: ignore
+    return open(filename, mode, encoding="UTF-8")
+
+
+def is_jsonl_file(filename: Union[str, Path]) -> bool:
+    """
+    Return True if the filename has the extension of a
+    JSON-lines file, i.e. .jsonl or .jsonl.gz
+
+    :param filename: the path to the file
+    :return: if the file is a JSON-lines file
+    """
+    return str(filename).endswith((".jsonl", ".jsonl.gz"))
+
+
+class JsonLinesWriter:
+    """
+    Write records, e.g. the results of one target, to a JSON-lines file
+    one at a time. Each record is written to the file and flushed as soon
+    as it is added, so only one record needs to be kept in memory.
+
+    If the filename ends with .gz, the file is gzip-compressed.
+
+    .. code-block::
+
+        with JsonLinesWriter("output.jsonl.gz") as writer:
+            writer.write({"target": "CCO", "is_solved": True})
+
+    :ivar filename: the path to the file
+    :ivar nrecords: the number of records written
+
+    :param filename: the path to the file
+    :param append: if True, the records are appended to an existing file
+    """
+
+    def __init__(self, filename: Union[str, Path], append: bool = False) -> None:
+        self.filename = str(filename)
+        self.nrecords = 0
+        self._fileobj = _open_text(self.filename, "a" if append else "w")
+
+    def __enter__(self) -> "JsonLinesWriter":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the file"""
+        self._fileobj.close()
+
+    def write(self, record: StrDict) -> None:
+        """
+        Write a record to the file
+
+        :param record: the record
+        """
+        self._fileobj.write(json.dumps(record, default=_json_default) + "\n")
+        self._fileobj.flush()
+        self.nrecords += 1
+
+
+def iter_datafile(filename: Union[str, Path]) -> Iterator[StrDict]:
+    """
+    Iterate over the records, i.e. rows, of aizynth output.
+
+    Records of JSON-lines files are read one at a time, and hence
+    the file is never loaded into memory. Other formats are
+    loaded before the records are returned.
+
+    :param filename: the path to the data
+    :yield: the records
+    """
+    if not is_jsonl_file(filename):
+        yield from read_datafile(filename).to_dict("records")
+        return
+
+    with _open_text(str(filename), "r") as fileobj:
+        for line in fileobj:
+            if line.strip():
+                yield json.loads(line)
+
+
 def read_datafile(filename: Union[str, Path]) -> pd.DataFrame:
     """
-    Read aizynth output from disc in either .hdf5 or .json format
+    Read aizynth output from disc in either .hdf5, .json or .jsonl(.gz) format
 
     :param filename: the path to the data
     :return: the loaded data
@@ -36,12 +133,14 @@ def read_datafile(filename: Union[str, Path]) -> pd.DataFrame:
     filename_str = str(filename)
     if filename_str.endswith(".hdf5") or filename_str.endswith(".hdf"):
         return pd.read_hdf(filename, "table")
+    if is_jsonl_file(filename_str):
+        return pd.DataFrame.from_records(list(iter_datafile(filename_str)))
     return pd.read_json(filename, orient="table")
 
 
 def save_datafile(data: pd.DataFrame, filename: Union[str, Path]) -> None:
     """
-    Save the given data to disc in either .hdf5 or .json format
+    Save the given data to disc in either .hdf5, .json or .jsonl(.gz) format
 
     :param data: the data to save
     :param filename: the path to the data
@@ -51,6 +150,10 @@ def save_datafile(data: pd.DataFrame, filename: Union[str, Path]) -> None:
         with warnings.catch_warnings():  # This wil suppress a PerformanceWarning
             warnings.simplefilter("ignore")
             data.to_hdf(filename, key="table")
+    elif is_jsonl_file(filename_str):
+        with JsonLinesWriter(filename_str) as writer:
+            for record in data.to_dict("records"):
+                writer.write(record)
     else:
         data.to_json(filename, orient="table")
 
@@ -72,10 +175,18 @@ def cat_datafiles(
     if `tree_name` is given, will take out the `trees` column
     from the tables and save it to a gzipped-json file.
 
+    If the concatenated file is a JSON-lines file, the records of the input
+    files are streamed to it, and the input files are only loaded into memory if
+    they are not JSON-lines files.
+
     :param input_files: the paths to the files to concatenate
     :param output_name: the name of the concatenated file
     :param trees_name: the name of the concatenated trees
     """
+    if is_jsonl_file(output_name):
+        _stream_datafiles(input_files, output_name, trees_name)
+        return
+
     data = read_datafile(input_files[0])
     if "trees" not in data.columns:
         trees_name = None
@@ -101,6 +212,35 @@ def cat_datafiles(
             json.dump(trees, fileobj)
 
 
+def _stream_datafiles(
+    input_files: List[str], output_name: str, trees_name: Optional[str]
+) -> None:
+    trees_fileobj = None
+    if trees_name:
+        if not trees_name.endswith(".gz"):
+            trees_name += ".gz"
+        trees_fileobj = _open_text(trees_name, "w")
+        trees_fileobj.write("[")
+
+    ntrees = 0
+    with JsonLinesWriter(output_name) as writer:
+        for filename in input_files:
+            for record in iter_datafile(filename):
+                if trees_fileobj is not None and "trees" in record:
+                    trees_fileobj.write(
+                        ("," if ntrees else "")
+                        + json.dumps(record.pop("trees"), default=_json_default)
+                    )
+                    ntrees += 1
+                writer.write(record)
+
+    if trees_fileobj is not None:
+        trees_fileobj.write("]")
+        trees_fileobj.close()
+        if not ntrees:
+            os.remove(trees_name)  # type: ignore
+
+
 def split_file(filename: str, nparts: int) -> List[str]:
     """
     Split the content of a text file into a given number of temporary files
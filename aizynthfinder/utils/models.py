@@ -147,12 +147,8 @@ class LocalOnnxModel:
     """
 
     def __init__(self, filename: str) -> None:
-        session_options = onnxruntime.SessionOptions()
-        session_options.intra_op_num_threads = _get_thread_count_per_core()
-
-        self.model = onnxruntime.InferenceSession(
-            filename, sess_options=session_options
-        )
+        self._filename = filename
+        self.model = self._create_session()
         self._model_inputs = self.model.get_inputs()
         self._model_output = self.model.get_outputs()[0]
         self._model_dimensions = int(self._model_inputs[0].shape[1])
@@ -161,6 +157,14 @@ class LocalOnnxModel:
     def __len__(self) -> int:
         return self._model_dimensions
 
+    def reset_session(self) -> None:
+        """
+        Re-create the inference session of the model. This is necessary
+        in forked processes, because the threads of the session
+        created in the parent process are not copied to the child process.
+        """
+        self.model = self._create_session()
+
     def predict(self, *args: np.ndarray, **_: np.ndarray) -> np.ndarray:
         """
         Perform a prediction run on the onnx model.
@@ -171,11 +175,18 @@ class LocalOnnxModel:
         return self.model.run(
             [self._model_output.name],
             {
-                model_input.name: input.astype(np.float32)
+                model_input.name: np.asarray(input, dtype=np.float32)
                 for model_input, input in zip(self._model_inputs, list(args))
             },
         )[0]
 
+    def _create_session(self) -> onnxruntime.InferenceSession:
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = _get_thread_count_per_core()
+        return onnxruntime.InferenceSession(
+            self._filename, sess_options=session_options
+        )
+
 
 def _log_and_reraise_exceptions(method: Callable) -> Callable:
     @functools.wraps(method)
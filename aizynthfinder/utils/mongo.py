@@ -50,3 +50,13 @@ def get_mongo_client(
         logger().debug(f"Connecting to MongoDB on {host}:{port}")
         _CLIENT = MongoClient(uri)  # pylint: disable=C0103
     return _CLIENT
+
+
+def reset_mongo_client() -> None:
+    """
+    Forget the client created by `get_mongo_client`, so that a new client
+    is created the next time it is called. This is necessary in forked
+    processes, because a MongoClient cannot be shared between processes.
+    """
+    global _CLIENT
+    _CLIENT = None  # pylint: disable=C0103
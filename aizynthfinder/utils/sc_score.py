@@ -6,8 +6,8 @@ import pickle
 from typing import TYPE_CHECKING
 
 import numpy as np
-from rdkit.Chem import AllChem
 
+from aizynthfinder.chem.fingerprints import morgan_fingerprints
 from aizynthfinder.utils.math import (
     dense_layer_forward_pass,
     rectified_linear_unit,
@@ -78,13 +78,9 @@ class SCScore:
 
     def _make_fingerprint(self, rd_mol: RdMol) -> np.ndarray:
         """Returns the molecule's Morgan fingerprint"""
-        fp_vec = AllChem.GetMorganFingerprintAsBitVect(
-            rd_mol,
+        return morgan_fingerprints(
+            [rd_mol],
             self._fingerprint_radius,
-            nBits=self._fingerprint_length,
-            useChirality=True,
-        )
-        return np.array(
-            fp_vec,
-            dtype=bool,
-        )
+            nbits=self._fingerprint_length,
+            chiral=True,
+        )[0]
@@ -2,7 +2,10 @@
 """
 # pylint: disable=unused-import
 from typing import Callable  # noqa
+from typing import Hashable  # noqa
+from typing import IO  # noqa
 from typing import Iterable  # noqa
+from typing import Iterator  # noqa
 from typing import List  # noqa
 from typing import Sequence  # noqa
 from typing import Set  # noqa
@@ -0,0 +1,77 @@
+""" Micro-benchmark of the molecule identity keys
+
+Creates the reactants of a set of molecules as they are created in the search,
+i.e. atom-mapped tree molecules, and reports for each identity mode
+    * the number of molecules hashed per second
+    * the number of search states created per second
+
+Usage:
+
+    python benchmarks/identity_key.py --molecules 2000 --repeats 3
+"""
+import argparse
+import time
+
+from aizynthfinder.chem import TreeMolecule
+from aizynthfinder.chem.mol import IDENTITY_MODES, set_identity_mode
+from aizynthfinder.context.config import Configuration
+from aizynthfinder.search.mcts import MctsState
+
+SMILES = [
+    "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1",
+    "O=C(Nc1ccc(F)cc1)c1ccccc1",
+    "CC(C)(C)OC(=O)N1CCC(CC1)C(=O)O",
+    "COc1ccc(cc1)C(=O)Cl",
+    "Nc1cccc(c1F)C(=O)C1CCN(C)CC1",
+    "C[C@H](N)c1ccc(Br)cc1",
+    "OC(=O)c1ccc(F)cc1",
+    "CCOC(=O)c1cnc2ccccc2c1O",
+]
+
+
+def create_molecules(nmols):
+    """Create atom-mapped children of the template molecules"""
+    parents = [TreeMolecule(smiles=smiles, parent=None) for smiles in SMILES]
+    return [
+        TreeMolecule(smiles=parents[idx % len(parents)].mapped_smiles, parent=None)
+        for idx in range(nmols)
+    ]
+
+
+def hash_rate(nmols):
+    """Hash freshly created molecules, so that no key is cached"""
+    mols = create_molecules(nmols)
+    time0 = time.perf_counter()
+    _ = set(mols)
+    return nmols / (time.perf_counter() - time0)
+
+
+def state_rate(nmols, config):
+    """Create states of freshly created molecules"""
+    mols = create_molecules(nmols)
+    time0 = time.perf_counter()
+    for idx in range(0, nmols, 4):
+        MctsState(mols[idx : idx + 4], config)
+    return nmols / (time.perf_counter() - time0)
+
+
+def main():
+    """Entry-point of the benchmark"""
+    parser = argparse.ArgumentParser("Benchmark of molecule identity keys")
+    parser.add_argument("--molecules", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    config = Configuration()
+    for mode in IDENTITY_MODES:
+        set_identity_mode(mode)
+        hashing = max(hash_rate(args.molecules) for _ in range(args.repeats))
+        states = max(state_rate(args.molecules, config) for _ in range(args.repeats))
+        print(f"Identity mode: {mode}")
+        print(f"  Molecules hashed per second: {hashing:.0f}")
+        print(f"  Molecules in states per second: {states:.0f}")
+    set_identity_mode("inchi_key")
+
+
+if __name__ == "__main__":
+    main()
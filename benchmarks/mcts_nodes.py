@@ -0,0 +1,89 @@
+""" Micro-benchmark of the MCTS node statistics
+
+Builds a synthetic search tree without applying any chemistry and reports
+    * the number of leaf selections + backpropagations per second
+    * the memory used per node
+
+Usage:
+
+    python benchmarks/mcts_nodes.py --nodes 50000 --actions 50 --children 10
+"""
+import argparse
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+from aizynthfinder.chem import TreeMolecule
+from aizynthfinder.context.config import Configuration
+from aizynthfinder.search.mcts import MctsNode, MctsSearchTree, MctsState
+
+
+def build_tree(config, nnodes, nactions, nchildren):
+    """
+    Build a tree breadth-first by instantiating the first children of each node.
+    The other children are disabled so that they are never selected.
+    """
+    tree = MctsSearchTree(config)
+    state = MctsState([TreeMolecule(smiles="CCO", parent=None)], config)
+    tree.root = MctsNode(state, tree, config)
+
+    queue = deque([tree.root])
+    count = 1
+    while queue and count < nnodes:
+        node = queue.popleft()
+        node.is_expanded = True
+        # pylint: disable=protected-access
+        # The policy returns the priors as float32 scalars
+        priors = list(np.random.uniform(0.01, 1.0, size=nactions).astype(np.float32))
+        node._fill_children_lists([None] * nactions, priors)
+        node._children_values[nchildren:] = -1e6
+        for idx in range(min(nchildren, nnodes - count)):
+            child = MctsNode(state, tree, config, parent=node)
+            node._children[idx] = child
+            node._children_index[child] = idx
+            queue.append(child)
+            count += 1
+    return tree, count
+
+
+def run_selections(tree, nselections):
+    """Select leaves and backpropagate a random reward along the path"""
+    time0 = time.perf_counter()
+    for _ in range(nselections):
+        leaf = tree.select_leaf()
+        reward = np.random.uniform()
+        current = leaf
+        while current is not tree.root:
+            current.parent.backpropagate(current, reward)
+            current = current.parent
+    return nselections / (time.perf_counter() - time0)
+
+
+def main():
+    """Entry-point of the benchmark"""
+    parser = argparse.ArgumentParser("Benchmark of MCTS node statistics")
+    parser.add_argument("--nodes", type=int, default=50000)
+    parser.add_argument("--actions", type=int, default=50)
+    parser.add_argument("--children", type=int, default=10)
+    parser.add_argument("--selections", type=int, default=5000)
+    args = parser.parse_args()
+
+    config = Configuration()
+    np.random.seed(1789)
+
+    tracemalloc.start()
+    mem0, _ = tracemalloc.get_traced_memory()
+    tree, nnodes = build_tree(config, args.nodes, args.actions, args.children)
+    mem1, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rate = run_selections(tree, args.selections)
+    print(f"Nodes: {nnodes}")
+    print(f"Bytes per node: {(mem1 - mem0) / nnodes:.0f}")
+    print(f"Selections per second: {rate:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+""" Benchmark of the start-up time when loading a template library
+
+Compares the loading of a template library from its original format
+(CSV or HDF5) with the memory-mapped binary format and reports
+    * the time to load the library
+    * the memory allocated by Python when loading the library
+    * the time to build the metadata of 50 random templates
+
+If a configuration file is given, the time to create an ``AiZynthFinder``
+object is also reported, with the template files of the expansion policies
+replaced by converted binary files.
+
+If no template library is given, a synthetic library is created.
+
+Usage:
+
+    python benchmarks/template_library.py --templates uspto_templates.csv.gz
+    python benchmarks/template_library.py --templates uspto_templates.csv.gz --config config.yml
+    python benchmarks/template_library.py --ntemplates 50000
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from aizynthfinder.aizynthfinder import AiZynthFinder
+from aizynthfinder.context.policy.template_library import TemplateLibrary
+
+
+def make_synthetic_library(filename, ntemplates):
+    """Create a CSV template library with random templates and metadata"""
+    data = pd.DataFrame(
+        {
+            "retro_template": [
+                "".join(random.choices(string.ascii_letters, k=120))
+                for _ in range(ntemplates)
+            ],
+            "template_hash": [
+                "".join(random.choices(string.hexdigits, k=64))
+                for _ in range(ntemplates)
+            ],
+            "classification": random.choices(["0.0", "1.2", "6.1.1"], k=ntemplates),
+            "library_occurence": np.random.randint(1, 1000, size=ntemplates),
+        }
+    )
+    data.to_csv(filename, sep="\t")
+
+
+def time_loading(filename, nrepeats):
+    """Time the loading of a library and the creation of the metadata"""
+    tracemalloc.start()
+    time0 = time.perf_counter()
+    library = TemplateLibrary.from_file(filename)
+    load_time = time.perf_counter() - time0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    time0 = time.perf_counter()
+    for _ in range(nrepeats):
+        for position in np.random.choice(len(library), 50).tolist():
+            dict(library.metadata(position, {"template": library.templates[position]}))
+    metadata_time = (time.perf_counter() - time0) / nrepeats
+    return load_time, peak, metadata_time
+
+
+def time_finder(configfile, nrepeats):
+    """Time the creation of a finder object from a configuration file"""
+    times = []
+    for _ in range(nrepeats):
+        time0 = time.perf_counter()
+        AiZynthFinder(configfile=configfile)
+        times.append(time.perf_counter() - time0)
+    return min(times)
+
+
+def convert_config(configfile, tmpdir):
+    """Convert the template files of a configuration file to binary files"""
+    with open(configfile, "r") as fileobj:
+        config = yaml.load(fileobj.read(), Loader=yaml.SafeLoader)
+
+    for key, policy in config.get("expansion", {}).items():
+        if isinstance(policy, list):
+            templatefile = policy[1]
+        elif isinstance(policy, dict) and "template" in policy:
+            templatefile = policy["template"]
+        else:
+            continue
+        binary_filename = os.path.join(tmpdir, f"{key}.mmtpl")
+        TemplateLibrary.from_file(templatefile).to_binary(binary_filename)
+        if isinstance(policy, list):
+            policy[1] = binary_filename
+        else:
+            policy["template"] = binary_filename
+
+    binary_configfile = os.path.join(tmpdir, "config.yml")
+    with open(binary_configfile, "w") as fileobj:
+        yaml.dump(config, fileobj)
+    return binary_configfile
+
+
+def main():
+    """Entry-point for the benchmark"""
+    parser = argparse.ArgumentParser("template_library")
+    parser.add_argument("--templates", help="the template library")
+    parser.add_argument("--config", help="a configuration file for AiZynthFinder")
+    parser.add_argument("--ntemplates", type=int, default=50000)
+    parser.add_argument("--repeats", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        templatefile = args.templates
+        if not templatefile:
+            templatefile = os.path.join(tmpdir, "templates.csv")
+            make_synthetic_library(templatefile, args.ntemplates)
+        binary_filename = os.path.join(tmpdir, "templates.mmtpl")
+
+        time0 = time.perf_counter()
+        TemplateLibrary.from_file(templatefile).to_binary(binary_filename)
+        print(f"Converted library in {time.perf_counter() - time0:.2f} s")
+
+        for label, filename in [("original", templatefile), ("binary", binary_filename)]:
+            load_time, peak, metadata_time = time_loading(filename, args.repeats)
+            print(
+                f"{label:>8}: loading {load_time:.3f} s, "
+                f"peak memory {peak / 1024 ** 2:.1f} MB, "
+                f"metadata of 50 templates {metadata_time * 1e3:.3f} ms"
+            )
+
+        if args.config:
+            binary_config = convert_config(args.config, tmpdir)
+            for label, configfile in [
+                ("original", args.config),
+                ("binary", binary_config),
+            ]:
+                print(
+                    f"{label:>8}: AiZynthFinder start-up "
+                    f"{time_finder(configfile, 3):.3f} s"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -43,6 +43,40 @@ def test_one_iteration(default_config, setup_policies, setup_stock):
         tree.one_iteration()
 
 
+@pytest.mark.parametrize("batch_size", [2, 10])
+def test_one_iteration_batched(default_config, setup_policies, setup_stock, batch_size):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    child1_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F", "O"]
+    child2_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F"]
+    grandchild_smi = ["N#Cc1cccc(N)c1F", "O=C(Cl)c1ccc(F)cc1"]
+    lookup = {
+        root_smi: [
+            {"smiles": ".".join(child1_smi), "prior": 0.7},
+            {"smiles": ".".join(child2_smi), "prior": 0.3},
+        ],
+        child1_smi[1]: {"smiles": ".".join(grandchild_smi), "prior": 0.7},
+    }
+    stock = [child1_smi[0], child1_smi[2]] + grandchild_smi
+    default_config.search.algorithm_config["expansion_batch_size"] = batch_size
+    setup_policies(lookup, config=default_config)
+    setup_stock(default_config, *stock)
+    tree = SearchTree(default_config, root_smi)
+
+    tree.one_iteration()
+    assert tree.one_iteration()
+
+    smiles = [node.mol.smiles for node in tree.mol_nodes]
+    assert (
+        smiles == [root_smi] + child1_smi + child2_smi + grandchild_smi + grandchild_smi
+    )
+    # The duplicated molecule of the second layer is only sent once
+    assert tree.profiling["expansion_calls"] == 2
+    parents = [node.parent.parent for node in tree.mol_nodes[-4:]]
+    assert parents[0] is tree.mol_nodes[2]
+    assert parents[2] is tree.mol_nodes[5]
+    assert tree.mol_nodes[-1].mol.parent is tree.mol_nodes[5].mol
+
+
 def test_search_incomplete(default_config, setup_policies, setup_stock):
     root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
     child1_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F", "O"]
@@ -104,3 +138,42 @@ def test_routes(default_config, setup_policies, setup_stock):
     assert smiles == [root_smi] + child1_smi + grandchild_smi
     smiles = [mol.smiles for mol in routes[0].molecules()]
     assert smiles == [root_smi] + child2_smi + grandchild_smi
+
+
+def test_serialize_deserialize_binary(
+    default_config, setup_policies, setup_stock, tmpdir
+):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    child1_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F", "O"]
+    child2_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F"]
+    grandchild_smi = ["N#Cc1cccc(N)c1F", "O=C(Cl)c1ccc(F)cc1"]
+    lookup = {
+        root_smi: [
+            {"smiles": ".".join(child1_smi), "prior": 0.7},
+            {"smiles": ".".join(child2_smi), "prior": 0.3},
+        ],
+        child1_smi[1]: {"smiles": ".".join(grandchild_smi), "prior": 0.7},
+    }
+    stock = [child1_smi[0], child1_smi[2]] + grandchild_smi
+    setup_policies(lookup, config=default_config)
+    setup_stock(default_config, *stock)
+    tree = SearchTree(default_config, root_smi)
+    tree.one_iteration()
+    filename = str(tmpdir / "tree.aztree")
+
+    tree.serialize(filename)
+    new_tree = SearchTree.from_json(filename, default_config)
+
+    assert [node.mol.inchi_key for node in new_tree.mol_nodes] == [
+        node.mol.inchi_key for node in tree.mol_nodes
+    ]
+    assert [node.expandable for node in new_tree.mol_nodes] == [
+        node.expandable for node in tree.mol_nodes
+    ]
+    assert [node.in_stock for node in new_tree.mol_nodes] == [
+        node.in_stock for node in tree.mol_nodes
+    ]
+    assert [child.reaction.smiles for child in new_tree.root.children] == [
+        child.reaction.smiles for child in tree.root.children
+    ]
+    assert new_tree.root.children[0].children[0].parent is new_tree.root.children[0]
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from rdkit import DataStructs
+from rdkit.Chem import AllChem
+
+from aizynthfinder.chem import Molecule, TreeMolecule
+from aizynthfinder.chem.fingerprints import (
+    FingerprintService,
+    fingerprint_service,
+    fingerprint_statistics,
+    morgan_fingerprints,
+    reset_fingerprint_service,
+)
+from aizynthfinder.context.policy.utils import _make_reaction_fingerprints
+
+
+@pytest.fixture
+def clean_service():
+    reset_fingerprint_service(clear=True)
+    yield fingerprint_service()
+    reset_fingerprint_service(clear=True)
+
+
+def _rdkit_fingerprint(mol, nbits, chiral=False):
+    bitvect = AllChem.GetMorganFingerprintAsBitVect(
+        mol.rd_mol, 2, nbits, useChirality=chiral
+    )
+    array = np.zeros((1,))
+    DataStructs.ConvertToNumpyArray(bitvect, array)
+    return array
+
+
+def test_batch_fingerprints(clean_service):
+    mols = [Molecule(smiles=smiles) for smiles in ["CCO", "c1ccccc1", "CC(=O)N"]]
+
+    matrix = clean_service.fingerprints(mols, radius=2, nbits=64)
+
+    assert matrix.shape == (3, 64)
+    assert matrix.dtype == np.float32
+    assert matrix.flags["C_CONTIGUOUS"]
+    for row, mol in zip(matrix, mols):
+        assert row.tolist() == _rdkit_fingerprint(mol, 64).tolist()
+    assert fingerprint_statistics()["misses"] == 3
+    assert fingerprint_statistics()["entries"] == 3
+    # Packed bits
+    assert fingerprint_statistics()["bytes"] == 3 * 8
+
+
+def test_cached_fingerprints(clean_service):
+    mols = [Molecule(smiles="CCO"), Molecule(smiles="CCO"), Molecule(smiles="CCN")]
+    clean_service.fingerprints(mols[:1], radius=2, nbits=64)
+
+    matrix = clean_service.fingerprints(mols, radius=2, nbits=64)
+
+    assert matrix[0].tolist() == matrix[1].tolist()
+    assert matrix[0].tolist() == _rdkit_fingerprint(mols[0], 64).tolist()
+    stats = fingerprint_statistics()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+
+
+def test_bounded_service():
+    service = FingerprintService(max_entries=1)
+    mols = [Molecule(smiles="CCO"), Molecule(smiles="CCN")]
+
+    service.fingerprints(mols, radius=2, nbits=64)
+
+    assert len(service) == 1
+    assert service.statistics()["evictions"] == 1
+
+
+def test_molecule_fingerprint_variants(clean_service):
+    mol = Molecule(smiles="C[C@@H](C(=O)O)N")
+
+    fp1 = mol.fingerprint(radius=2, nbits=1024)
+    fp2 = mol.fingerprint(radius=2, nbits=1024, chiral=True)
+
+    assert fp1.tolist() == _rdkit_fingerprint(mol, 1024).tolist()
+    assert fp2.tolist() == _rdkit_fingerprint(mol, 1024, chiral=True).tolist()
+    assert not fp1.flags.writeable
+    assert mol.fingerprint(radius=2, nbits=1024) is fp1
+
+
+def test_morgan_fingerprints():
+    mol = Molecule(smiles="CCO", sanitize=True)
+
+    matrix = morgan_fingerprints([mol.rd_mol, mol.rd_mol], radius=2, nbits=32)
+
+    assert matrix.shape == (2, 32)
+    assert matrix[1].tolist() == _rdkit_fingerprint(mol, 32).tolist()
+
+
+def test_reaction_fingerprints(get_action, clean_service):
+    reactions = [get_action(), get_action()]
+
+    prod_fp, rxn_fp = _make_reaction_fingerprints(reactions, [0] * 64)
+
+    for idx, reaction in enumerate(reactions):
+        assert prod_fp[idx].tolist() == reaction.mol.fingerprint(2, 64).tolist()
+        assert rxn_fp[idx].tolist() == reaction.fingerprint(2, 64).tolist()
@@ -2,6 +2,7 @@ import pytest
 from rdkit import Chem
 
 from aizynthfinder.chem import MoleculeException, Molecule
+from aizynthfinder.chem.mol import identity_mode, set_identity_mode
 
 
 def test_no_input():
@@ -98,3 +99,43 @@ def test_chiral_fingerprint():
     fp2 = mol2.fingerprint(radius=2, chiral=True)
 
     assert fp1.tolist() != fp2.tolist()
+
+
+@pytest.fixture
+def smiles_identity():
+    set_identity_mode("smiles")
+    yield
+    set_identity_mode("inchi_key")
+
+
+def test_default_identity_key():
+    mol = Molecule(smiles="OCC")
+
+    assert identity_mode() == "inchi_key"
+    assert mol.identity_key == mol.inchi_key
+
+
+def test_smiles_identity_key(smiles_identity):
+    mol1 = Molecule(smiles="OCC")
+    mol2 = Molecule(smiles="[CH3:1][CH2:2][OH:3]")
+
+    assert mol1.identity_key == "CCO"
+    assert mol2.identity_key == "CCO"
+    assert mol1 == mol2
+    assert hash(mol1) == hash(mol2)
+    assert vars(mol1)["_inchi_key"] is None
+
+
+def test_smiles_identity_key_differs_for_stereo(smiles_identity):
+    mol1 = Molecule(smiles="C[C@H](N)O")
+    mol2 = Molecule(smiles="C[C@@H](N)O")
+
+    assert mol1 != mol2
+    assert len({mol1, mol2}) == 2
+
+
+def test_unknown_identity_mode():
+    with pytest.raises(ValueError, match="identity"):
+        set_identity_mode("inchi")
+
+    assert identity_mode() == "inchi_key"
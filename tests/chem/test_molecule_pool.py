@@ -0,0 +1,84 @@
+import pytest
+
+from aizynthfinder.chem import TreeMolecule
+from aizynthfinder.chem.molecule_pool import (
+    DEFAULT_MAX_ENTRIES,
+    configure_molecule_pool,
+    molecule_pool,
+    reset_molecule_pool,
+)
+
+
+@pytest.fixture
+def enabled_pool():
+    configure_molecule_pool(True, 2)
+    reset_molecule_pool()
+    yield molecule_pool()
+    configure_molecule_pool(False, DEFAULT_MAX_ENTRIES)
+    reset_molecule_pool()
+
+
+def test_disabled_molecule_pool():
+    configure_molecule_pool(False)
+
+    assert molecule_pool() is None
+
+
+def test_intern_molecules(enabled_pool):
+    parent1 = TreeMolecule(smiles="CCCO", parent=None)
+    parent2 = TreeMolecule(smiles="CCCCO", parent=None)
+
+    mol1 = TreeMolecule(smiles="[CH3:1][CH2:2][OH:3]", parent=parent1, sanitize=True)
+    mol2 = TreeMolecule(smiles="[CH3:4][CH2:3][OH:2]", parent=parent2, sanitize=True)
+
+    assert mol1.smiles == mol2.smiles == "CCO"
+    assert mol1.rd_mol is mol2.rd_mol
+    assert mol1.inchi_key == mol2.inchi_key
+    assert mol1.fingerprint(2) is mol2.fingerprint(2)
+    # The atom mapping and the parent are not shared
+    assert mol1.mapped_smiles != mol2.mapped_smiles
+    assert mol1.parent is parent1
+    assert mol2.parent is parent2
+    assert enabled_pool.statistics() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+        "entries": 1,
+    }
+
+
+def test_intern_molecules_atom_order(enabled_pool):
+    parent = TreeMolecule(smiles="CCCO", parent=None)
+
+    mol1 = TreeMolecule(smiles="[CH3:1][CH2:2][OH:3]", parent=parent, sanitize=True)
+    mol2 = TreeMolecule(smiles="[OH:3][CH2:2][CH3:1]", parent=parent, sanitize=True)
+
+    assert mol1.smiles == mol2.smiles == "CCO"
+    # The atoms of the RDKit molecule should match those of the atom-mapped molecule
+    assert mol1.rd_mol is not mol2.rd_mol
+    assert mol2.rd_mol.GetAtomWithIdx(0).GetSymbol() == "O"
+    assert mol1.inchi_key == mol2.inchi_key
+    assert mol1.fingerprint(2) is mol2.fingerprint(2)
+
+
+def test_intern_molecules_bounded(enabled_pool):
+    parent = TreeMolecule(smiles="CCCO", parent=None)
+
+    for smiles in ["CCO", "CCN", "CCCl", "CCO"]:
+        TreeMolecule(smiles=smiles, parent=parent, sanitize=True)
+
+    assert enabled_pool.statistics() == {
+        "hits": 0,
+        "misses": 4,
+        "evictions": 2,
+        "entries": 2,
+    }
+
+
+def test_unsanitized_molecules_are_not_interned(enabled_pool):
+    parent = TreeMolecule(smiles="CCCO", parent=None)
+
+    mol = TreeMolecule(smiles="CCO", parent=parent)
+
+    assert len(enabled_pool) == 0
+    assert mol.inchi_key == "LFQSCWFLJHTTHZ-UHFFFAOYSA-N"
@@ -1,3 +1,5 @@
+import pytest
+
 from aizynthfinder.chem import (
     FixedRetroReaction,
     SmilesBasedRetroReaction,
@@ -6,6 +8,10 @@ from aizynthfinder.chem import (
     UniqueMolecule,
     hash_reactions,
 )
+from aizynthfinder.search.executor import (
+    TemplateExecutor,
+    shutdown_template_executors,
+)
 
 
 def test_retro_reaction(get_action):
@@ -42,6 +48,59 @@ def test_reaction_failure_rdchiral(get_action, mocker):
     assert not products
 
 
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_template_executor(get_action, mode):
+    reaction1 = get_action(applicable=True)
+    reaction2 = get_action(applicable=False)
+    reaction3 = get_action(applicable=True, use_rdchiral=False)
+    executor = TemplateExecutor(mode, max_workers=2)
+
+    executor.apply([reaction1, reaction2, reaction3])
+
+    assert not reaction1.unqueried
+    assert not reaction2.unqueried
+    assert reaction3.unqueried
+    assert [mol.smiles for mol in reaction1.reactants[0]] == [
+        "CCCCOc1ccc(CC(=O)Cl)cc1",
+        "CNO",
+    ]
+    assert (
+        reaction1.mapped_reaction_smiles()
+        == get_action(applicable=True).mapped_reaction_smiles()
+    )
+    assert reaction2.reactants == ()
+
+
+def test_shutdown_template_executors(get_action):
+    executor = TemplateExecutor("thread", max_workers=2)
+    executor.apply([get_action(applicable=True)])
+    pool = executor._get_pool()
+
+    shutdown_template_executors()
+
+    assert pool._shutdown
+    assert executor._get_pool() is not pool
+
+    reaction = get_action(applicable=True)
+    executor.apply([reaction])
+
+    assert not reaction.unqueried
+    shutdown_template_executors()
+
+
+def test_template_executor_serial(get_action):
+    reaction = get_action(applicable=True)
+
+    TemplateExecutor("serial").apply([reaction])
+
+    assert reaction.unqueried
+
+
+def test_template_executor_unknown_mode():
+    with pytest.raises(ValueError, match="Unknown template executor mode"):
+        TemplateExecutor("gpu")
+
+
 def test_retro_reaction_with_rdkit(get_action):
     reaction = get_action(applicable=True, use_rdchiral=False)
 
@@ -83,6 +142,15 @@ def test_retro_reaction_copy(get_action):
     assert copy_.index != reaction.index
 
 
+def test_retro_reaction_copy_unqueried(get_action):
+    reaction = get_action()
+
+    copy_ = reaction.copy()
+
+    assert copy_.unqueried
+    assert copy_.reactants[0][1].smiles == "CNO"
+
+
 def test_smiles_based_retroreaction():
     mol = TreeMolecule(smiles="CNC(C)=O", parent=None)
     reaction = SmilesBasedRetroReaction(mol, reactants_str="CC(=O)O.CN")
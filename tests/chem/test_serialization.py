@@ -1,5 +1,10 @@
-from aizynthfinder.chem.serialization import MoleculeSerializer, MoleculeDeserializer
-from aizynthfinder.chem import Molecule, TreeMolecule
+from aizynthfinder.chem.serialization import (
+    BinaryTreeReader,
+    BinaryTreeWriter,
+    MoleculeSerializer,
+    MoleculeDeserializer,
+)
+from aizynthfinder.chem import Molecule, SmilesBasedRetroReaction, TreeMolecule
 
 
 def test_empty_store():
@@ -84,3 +89,93 @@ def test_chaining():
     assert deserializer[id(mol1)].smiles == mol1.smiles
     assert id(deserializer[id_]) != id_
     assert id(deserializer[id(mol1)]) != id(mol1)
+
+
+def test_deserialize_lazy_tree_mols():
+    store = {
+        123: {
+            "smiles": "CCC",
+            "class": "TreeMolecule",
+            "parent": None,
+            "transform": 1,
+            "inchi_key": "ATUOYWHBWRKTHZ-UHFFFAOYSA-N",
+        },
+        234: {"smiles": "CCO", "class": "TreeMolecule", "parent": 123, "transform": 2},
+        345: {"smiles": "CCN", "class": "Molecule"},
+    }
+
+    deserializer = MoleculeDeserializer(store, lazy=True)
+    mol1 = deserializer[123]
+    mol2 = deserializer[234]
+
+    assert isinstance(mol1, TreeMolecule)
+    assert mol2.parent is mol1
+    assert mol2.transform == 2
+    assert mol1.inchi_key == "ATUOYWHBWRKTHZ-UHFFFAOYSA-N"
+    assert "rd_mol" not in vars(mol1)
+    assert type(deserializer[345]) is Molecule
+
+    assert mol2.smiles == "CCO"
+    assert type(mol2) is TreeMolecule
+    assert mol2.inchi_key == TreeMolecule(parent=None, smiles="CCO").inchi_key
+
+    serializer = MoleculeSerializer()
+    mol3 = TreeMolecule(smiles="CCCl", parent=mol2)
+    serializer[mol3]
+    assert serializer.store[id(mol2)] == {
+        "smiles": mol2.mapped_smiles,
+        "class": "TreeMolecule",
+        "parent": id(mol1),
+        "transform": 2,
+    }
+    assert serializer.store[id(mol1)]["class"] == "TreeMolecule"
+
+
+def test_binary_tree_roundtrip(tmpdir):
+    mol1 = TreeMolecule(parent=None, smiles="CCCO")
+    mol2 = TreeMolecule(parent=mol1, smiles="CCC")
+    mol1.inchi_key
+    reaction = SmilesBasedRetroReaction(
+        mol1, reactants_str="CCC.O", metadata={"template_code": 1, "prior": 0.5}
+    )
+    reaction.reactants
+    filename = str(tmpdir / "tree.aztree")
+    columns = {"mol": "<i4", "reaction": "<i4", "value": "<f8", "children": "<i4[]"}
+    tree = {"root": ["child1", None, "child2"], "child1": ["child3"]}
+
+    with BinaryTreeWriter(filename, columns, kind="dummy", chunk_size=2) as writer:
+        writer.write_tree(
+            "root",
+            lambda node: {
+                "mol": writer.molecule(mol2 if node == "root" else None),
+                "reaction": writer.action(reaction) if node == "child3" else -1,
+                "value": len(node),
+            },
+            lambda node: tree.get(node, []),
+        )
+
+    reader = BinaryTreeReader(filename)
+
+    assert reader.kind == "dummy"
+    assert reader.nnodes == 4
+    assert reader.nodes["value"].tolist() == [4, 6, 6, 6]
+    assert [reader.nodes["children"][idx].tolist() for idx in range(4)] == [
+        [1, -1, 2],
+        [3],
+        [],
+        [],
+    ]
+    assert reader.parents().tolist() == [-1, 0, 0, 1]
+
+    new_mol2 = reader.molecules[reader.nodes["mol"][0]]
+    assert new_mol2.parent.inchi_key == mol1.inchi_key
+    assert "rd_mol" not in vars(new_mol2.parent)
+    assert new_mol2.smiles == mol2.smiles
+
+    new_reaction = reader.action(reader.nodes["reaction"][3])
+    assert isinstance(new_reaction, SmilesBasedRetroReaction)
+    assert new_reaction.metadata == reaction.metadata
+    assert new_reaction.reactants_str == "CCC.O"
+    assert [[mol.smiles for mol in outcome] for outcome in new_reaction.reactants] == [
+        ["CCC", "O"]
+    ]
@@ -0,0 +1,75 @@
+import threading
+
+from aizynthfinder.chem.template_cache import (
+    CompiledTemplateCache,
+    compiled_templates,
+    compiled_templates_statistics,
+    reset_compiled_templates_statistics,
+)
+
+SMARTS = (
+    "([#8:4]-[N;H0;D3;+0:5](-[C;D1;H3:6])-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3])"
+    ">>(Cl-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3]).([#8:4]-[NH;D2;+0:5]-[C;D1;H3:6])"
+)
+
+
+def test_compile_template():
+    cache = CompiledTemplateCache()
+
+    rxn1 = cache.rdchiral_reaction(SMARTS)
+    rxn2 = cache.rdchiral_reaction(SMARTS)
+    rxn3 = cache.rdkit_reaction(SMARTS)
+
+    assert rxn1 is rxn2
+    assert rxn3 is not rxn1
+    assert rxn3.GetNumReactantTemplates() == 1
+    stats = cache.statistics()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 2
+    assert stats["parse_time"] > 0
+    assert 0 < stats["time_saved"] < stats["parse_time"]
+
+
+def test_bounded_template_cache():
+    cache = CompiledTemplateCache(max_entries=1)
+
+    cache.rdchiral_reaction(SMARTS)
+    cache.rdkit_reaction(SMARTS)
+
+    assert len(cache) == 1
+    assert cache.evictions == 1
+
+
+def test_prewarm_template_cache():
+    cache = CompiledTemplateCache()
+
+    cache.prewarm([SMARTS, "not a template"])
+
+    assert len(cache) == 1
+    assert cache.statistics()["misses"] == 0
+
+    cache.rdchiral_reaction(SMARTS)
+
+    assert cache.hits == 1
+
+
+def test_template_cache_per_thread():
+    reset_compiled_templates_statistics()
+    main_cache = compiled_templates()
+    main_cache.rdkit_reaction(SMARTS)
+    thread_caches = []
+
+    def _worker():
+        thread_caches.append(compiled_templates())
+        compiled_templates().rdkit_reaction(SMARTS)
+
+    thread = threading.Thread(target=_worker)
+    thread.start()
+    thread.join()
+
+    assert compiled_templates() is main_cache
+    assert thread_caches[0] is not main_cache
+    assert thread_caches[0].misses == 1
+    stats = compiled_templates_statistics()
+    assert stats["hits"] + stats["misses"] == 2
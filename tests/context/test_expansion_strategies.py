@@ -1,3 +1,7 @@
+import pickle
+
+import numpy as np
+import pandas as pd
 import pytest
 
 from aizynthfinder.chem import TreeMolecule
@@ -5,6 +9,7 @@ from aizynthfinder.context.policy import (
     MultiExpansionStrategy,
     TemplateBasedExpansionStrategy,
 )
+from aizynthfinder.context.policy.template_library import TemplateLibrary
 from aizynthfinder.utils.exceptions import PolicyException
 
 
@@ -160,7 +165,7 @@ def test_load_templated_expansion_strategy(
 ):
     strategy, mocked_onnx_model = setup_template_expansion_policy()
     mocked_onnx_model.assert_called_once()
-    assert len(strategy.templates) == 3
+    assert len(strategy.template_library) == 3
 
 
 def test_load_invalid_templated_expansion_strategy(
@@ -191,5 +196,127 @@ def test_load_templated_expansion_strategy_from_csv(
         "default", default_config, model="dummy.onnx", template=templates_filename
     )
 
-    assert len(strategy.templates) == 3
-    assert list(strategy.templates.columns) == ["template", "metadata"]
+    assert len(strategy.template_library) == 3
+    assert list(strategy.template_library.columns) == ["template", "metadata"]
+
+
+def test_template_library_metadata():
+    data = pd.DataFrame(
+        {
+            "retro_template": ["AAA", "BBB"],
+            "classification": ["class1", "class2"],
+            "library_occurence": [5, 10],
+        },
+        index=[10, 20],
+    )
+    library = TemplateLibrary.from_dataframe(data)
+
+    metadata = library.metadata(1, {"policy_name": "policy1"})
+
+    assert len(library) == 2
+    assert library.templates[1] == "BBB"
+    assert library.index[1] == 20
+    assert dict(metadata) == {
+        "classification": "class2",
+        "library_occurence": 10,
+        "policy_name": "policy1",
+    }
+    assert type(metadata["library_occurence"]) is int
+
+    copy_ = metadata.copy()
+    copy_["classification"] = "class3"
+    del copy_["library_occurence"]
+
+    assert dict(copy_) == {"classification": "class3", "policy_name": "policy1"}
+    assert metadata["classification"] == "class2"
+    assert library.metadata(1)["library_occurence"] == 10
+    with pytest.raises(KeyError):
+        _ = copy_["library_occurence"]
+
+    assert pickle.loads(pickle.dumps(metadata)) == dict(metadata)
+    pd.testing.assert_frame_equal(library.to_dataframe(), data)
+
+
+def test_get_actions_metadata(default_config, mock_onnx_model, tmpdir):
+    templates_filename = str(tmpdir / "templates.hdf5")
+    pd.DataFrame(
+        {
+            "retro_template": ["AAA", "BBB", "CCC"],
+            "library_occurence": [1, 2, 3],
+        }
+    ).to_hdf(templates_filename, "table")
+    strategy = TemplateBasedExpansionStrategy(
+        "policy1", default_config, model="dummy.onnx", template=templates_filename
+    )
+
+    actions, _ = strategy.get_actions([TreeMolecule(smiles="CCO", parent=None)])
+
+    assert dict(actions[0].metadata) == {
+        "library_occurence": 2,
+        "policy_probability": 0.7,
+        "policy_probability_rank": 0,
+        "policy_name": "policy1",
+        "template_code": 1,
+        "template": "BBB",
+    }
+    assert actions[0].smarts == "BBB"
+    assert actions[1].copy().metadata["template"] == "AAA"
+
+
+def test_template_library_binary(tmpdir):
+    data = pd.DataFrame(
+        {
+            "retro_template": ["AAA", "BBB", "CCC"],
+            "classification": ["class1", None, "class3"],
+            "library_occurence": [5, 10, 15],
+        },
+        index=[10, 20, 30],
+    )
+    filename = str(tmpdir / "templates.mmtpl")
+    TemplateLibrary.from_dataframe(data).to_binary(filename)
+
+    library = TemplateLibrary.from_file(filename)
+
+    assert len(library) == 3
+    assert library.columns == ["retro_template", "classification", "library_occurence"]
+    assert list(library.templates) == ["AAA", "BBB", "CCC"]
+    assert library.templates[np.array([2, 0])].tolist() == ["CCC", "AAA"]
+    assert library.index[np.array([2, 0])].tolist() == [30, 10]
+    assert dict(library.metadata(1)) == {
+        "classification": None,
+        "library_occurence": 10,
+    }
+    pd.testing.assert_frame_equal(library.to_dataframe(), data)
+
+
+def test_template_library_binary_invalid(tmpdir):
+    filename = str(tmpdir / "templates.mmtpl")
+    with open(filename, "wb") as fileobj:
+        fileobj.write(b"not a template library")
+
+    with pytest.raises(ValueError, match="not a binary template library"):
+        TemplateLibrary.from_file(filename)
+
+
+def test_load_templated_expansion_strategy_from_binary(
+    default_config, mock_onnx_model, create_dummy_templates, tmpdir
+):
+    hdf_filename = create_dummy_templates(3)
+    binary_filename = str(tmpdir / "templates.mmtpl")
+    TemplateLibrary.from_file(hdf_filename).to_binary(binary_filename)
+    mols = [TreeMolecule(smiles="CCO", parent=None)]
+
+    strategy1 = TemplateBasedExpansionStrategy(
+        "policy1", default_config, model="dummy.onnx", template=hdf_filename
+    )
+    strategy2 = TemplateBasedExpansionStrategy(
+        "policy2", default_config, model="dummy.onnx", template=binary_filename
+    )
+    actions1, priors1 = strategy1.get_actions(mols)
+    actions2, priors2 = strategy2.get_actions(mols)
+
+    assert priors1 == priors2
+    assert [action.smarts for action in actions1] == [
+        action.smarts for action in actions2
+    ]
+    assert [action.metadata["template_code"] for action in actions2] == [1, 0]
@@ -55,7 +55,14 @@ def test_load_from_file(write_yaml):
         "search_rewards": ["state score"],
         "immediate_instantiation": (),
         "mcts_grouping": None,
+        "transposition_table": False,
+        "transposition_statistics": False,
         "search_rewards_weights": [],
+        "leaf_batch_size": 1,
+        "virtual_loss": 1.0,
+        "template_executor": "serial",
+        "template_executor_workers": None,
+        "expansion_batch_size": 1,
     }
 
 
@@ -1,4 +1,7 @@
+import sys
+
 import numpy as np
+import pandas as pd
 import pytest
 
 from aizynthfinder.chem import (
@@ -6,6 +9,7 @@ from aizynthfinder.chem import (
     TemplatedRetroReaction,
     TreeMolecule,
 )
+from aizynthfinder.chem.template_cache import compiled_templates
 from aizynthfinder.context.policy import (
     BondFilter,
     QuickKerasFilter,
@@ -13,6 +17,8 @@ from aizynthfinder.context.policy import (
     TemplateBasedDirectExpansionStrategy,
     TemplateBasedExpansionStrategy,
 )
+from aizynthfinder.context.policy.cache import DEFAULT_MAX_ENTRIES
+from aizynthfinder.context.policy.screening import TemplateScreen
 from aizynthfinder.utils.exceptions import PolicyException, RejectionException
 
 
@@ -45,9 +51,9 @@ def test_load_expansion_policy_from_config_files(
         }
     )
     assert "policy1" in expansion_policy.items
-    assert len(expansion_policy["policy1"].templates) == 3
+    assert len(expansion_policy["policy1"].template_library) == 3
     assert "policy2" in expansion_policy.items
-    assert len(expansion_policy["policy2"].templates) == 3
+    assert len(expansion_policy["policy2"].template_library) == 3
 
 
 def test_load_expansion_policy_from_config_custom(
@@ -77,16 +83,34 @@ def test_load_expansion_policy_from_config_custom(
         }
     )
     assert "policy1" in expansion_policy.items
-    assert len(expansion_policy["policy1"].templates) == 3
+    assert len(expansion_policy["policy1"].template_library) == 3
     assert "policy2" in expansion_policy.items
-    assert len(expansion_policy["policy2"].templates) == 3
+    assert len(expansion_policy["policy2"].template_library) == 3
     assert "policy3" in expansion_policy.items
-    assert len(expansion_policy["policy3"].templates) == 3
+    assert len(expansion_policy["policy3"].template_library) == 3
     assert expansion_policy["policy1"].cutoff_number == 75
     assert expansion_policy["policy2"].cutoff_number == 25
     assert expansion_policy["policy3"].cutoff_number == 50
 
 
+def test_template_based_expansion_deprecated_templates(
+    default_config, mock_onnx_model, create_dummy_templates
+):
+    template_filename = create_dummy_templates(3)
+    strategy = TemplateBasedExpansionStrategy(
+        "policy1", default_config, model="dummy1.onnx", template=template_filename
+    )
+
+    with pytest.deprecated_call():
+        templates = strategy.templates
+
+    expected = pd.read_hdf(template_filename, "table")
+    pd.testing.assert_frame_equal(templates, expected, check_dtype=False)
+    assert templates.iloc[1]["retro_template"] == expected.iloc[1]["retro_template"]
+    with pytest.deprecated_call():
+        assert strategy.templates is templates
+
+
 def test_get_actions(default_config, setup_template_expansion_policy):
     strategy, _ = setup_template_expansion_policy()
     expansion_policy = default_config.expansion_policy
@@ -167,7 +191,7 @@ def test_get_actions_using_rdkit(
     mols = [TreeMolecule(smiles="CCO", parent=None)]
     expansion_policy.select("policy1")
     mocker.patch(
-        "aizynthfinder.chem.reaction.AllChem.ReactionFromSmarts",
+        "aizynthfinder.chem.template_cache.CompiledTemplateCache.rdkit_reaction",
         side_effect=RuntimeError("Intential error"),
     )
 
@@ -230,6 +254,310 @@ def test_template_based_expansion_caching(
     assert actions1[0].smarts == actions2[0].smarts
 
 
+def test_template_based_expansion_prefetch(
+    default_config, mock_onnx_model, create_dummy_templates, mocker
+):
+    template_filename = create_dummy_templates(3)
+    expansion_policy = default_config.expansion_policy
+    expansion_policy.load_from_config(
+        **{
+            "policy1": {
+                "model": "dummy1.onnx",
+                "template": template_filename,
+                "prefetch_depth": 1,
+            }
+        },
+    )
+    policy = expansion_policy["policy1"]
+    predict_spy = mocker.spy(policy.model.model, "run")
+    mols = [TreeMolecule(smiles="CCO", parent=None)]
+    caching_mols = [TreeMolecule(smiles="CCCCO", parent=None)]
+
+    _, priors1 = policy(mols, caching_mols)
+
+    assert predict_spy.call_count == 2
+    assert caching_mols[0].identity_key in policy.prefetch
+
+    actions, priors2 = policy(caching_mols)
+
+    assert predict_spy.call_count == 2
+    assert priors1 == priors2
+    assert all(action.mol is caching_mols[0] for action in actions)
+    stats = policy.cache_statistics()
+    assert stats["prefetch"]["batches"] == 1
+    assert stats["prefetch"]["molecules"] == 1
+    assert stats["misses"] == 1
+
+    policy([TreeMolecule(smiles="CCCO", parent=None)], mols + caching_mols)
+
+    assert policy.cache_statistics()["prefetch"]["batches"] == 1
+
+    policy.reset_cache()
+
+    assert policy.cache_statistics()["prefetch"]["batches"] == 0
+
+
+def test_template_based_expansion_cache_statistics(
+    default_config, mock_onnx_model, create_dummy_templates
+):
+    template_filename = create_dummy_templates(3)
+    expansion_policy = default_config.expansion_policy
+    expansion_policy.load_from_config(
+        **{"policy1": {"model": "dummy1.onnx", "template": template_filename}},
+    )
+    expansion_policy.select("policy1")
+    mols = [TreeMolecule(smiles="CCO", parent=None)]
+
+    expansion_policy(mols)
+    expansion_policy(mols)
+
+    stats = expansion_policy.cache_statistics()
+    assert stats["policy1"]["hits"] == 1
+    assert stats["policy1"]["misses"] == 1
+    assert stats["policy1"]["entries"] == 1
+
+    expansion_policy.reset_cache()
+
+    stats = expansion_policy.cache_statistics()
+    assert stats["policy1"]["hits"] == 0
+    assert stats["policy1"]["entries"] == 0
+
+
+def test_template_based_expansion_restore_cache(
+    default_config, mock_onnx_model, create_dummy_templates
+):
+    template_filename = create_dummy_templates(3)
+    expansion_policy = default_config.expansion_policy
+    expansion_policy.load_from_config(
+        **{"policy1": {"model": "dummy1.onnx", "template": template_filename}},
+    )
+    expansion_policy.select("policy1")
+    mols = [TreeMolecule(smiles="CCO", parent=None)]
+    _, priors1 = expansion_policy(mols)
+
+    entries = expansion_policy.cache_entries()
+    expansion_policy.reset_cache()
+    expansion_policy.restore_cache(entries)
+    _, priors2 = expansion_policy(mols)
+
+    assert list(entries["policy1"].keys()) == [mols[0].inchi_key]
+    mock_onnx_model.assert_called_once()
+    assert priors1 == priors2
+    assert expansion_policy.cache_statistics()["policy1"]["hits"] == 1
+
+
+def test_template_based_expansion_prewarm_templates(
+    default_config, mock_onnx_model, tmpdir
+):
+    templates = [
+        "[C:1]-[N;H0;D3;+0:2]>>Cl-[C:1].[NH;D2;+0:2]",
+        "[c:1]-[O;H0;D2;+0:2]>>Br-[c:1].[OH;D1;+0:2]",
+        "[C:1]-[O;H0;D2;+0:2]>>I-[C:1].[OH;D1;+0:2]",
+    ]
+    template_filename = str(tmpdir / "templates.hdf5")
+    pd.DataFrame(
+        {"retro_template": templates, "library_occurence": [1, 10, 5]}
+    ).to_hdf(template_filename, "table")
+    compiled_templates().clear()
+
+    default_config.expansion_policy.load_from_config(
+        **{
+            "policy1": {
+                "model": "dummy1.onnx",
+                "template": template_filename,
+                "prewarm_templates": 2,
+            }
+        },
+    )
+
+    cache = compiled_templates()
+    assert ("rdchiral", templates[0]) not in cache
+    assert ("rdchiral", templates[1]) in cache
+    assert ("rdchiral", templates[2]) in cache
+
+
+SCREEN_TEMPLATES = [
+    "[C:1]-[N;H0;D3;+0:2]>>Cl-[C:1].[NH;D2;+0:2]",
+    "[C:1]-[S;H0;D2;+0:2]>>Cl-[C:1].[SH;D1;+0:2]",
+    "[c:1]-[O;H0;D2;+0:2]>>Br-[c:1].[OH;D1;+0:2]",
+]
+
+
+def test_template_screen(tmpdir, create_templates_file):
+    mol = TreeMolecule(smiles="CCCCOc1ccc(CC(=O)N(C)O)cc1", parent=None)
+    templates_filename = create_templates_file(SCREEN_TEMPLATES)
+    screen_filename = str(tmpdir / "screen.npz")
+
+    screen = TemplateScreen.from_file(
+        screen_filename, SCREEN_TEMPLATES, templates_filename
+    )
+
+    assert screen.applicable(mol).tolist() == [True, False, True]
+    assert screen.applicable(mol, np.array([2, 1])).tolist() == [True, False]
+    assert screen.rejected == 2
+
+    screen2 = TemplateScreen.from_file(
+        screen_filename, SCREEN_TEMPLATES, templates_filename
+    )
+
+    assert (screen2.fingerprints == screen.fingerprints).all()
+
+
+@pytest.mark.parametrize(
+    "kwargs,expected",
+    [
+        ({}, [1, 0]),
+        ({"screen_templates": True}, [0]),
+        ({"screen_templates": True, "screen_refill": True}, [0, 2]),
+    ],
+)
+def test_template_based_expansion_screening(
+    default_config, mock_onnx_model, create_templates_file, kwargs, expected
+):
+    strategy = TemplateBasedExpansionStrategy(
+        "policy1",
+        default_config,
+        model="dummy.onnx",
+        template=create_templates_file(SCREEN_TEMPLATES),
+        cutoff_number=2,
+        **kwargs,
+    )
+    mols = [TreeMolecule(smiles="CCCCOc1ccc(CC(=O)N(C)O)cc1", parent=None)]
+
+    actions, _ = strategy.get_actions(mols)
+
+    assert [action.metadata["template_code"] for action in actions] == expected
+    assert all(action.reactants for action in actions) == bool(kwargs)
+    if kwargs:
+        assert strategy.cache_statistics()["screened_templates"] == 1
+
+
+@pytest.mark.parametrize("refill", [False, True])
+def test_template_based_expansion_screening_statistics(
+    default_config, mock_onnx_model, create_templates_file, tmpdir, refill
+):
+    mask_file = str(tmpdir / "mask.npz")
+    np.savez_compressed(mask_file, np.array([True, False, True]))
+    strategy = TemplateBasedExpansionStrategy(
+        "policy1",
+        default_config,
+        model="dummy.onnx",
+        template=create_templates_file(SCREEN_TEMPLATES),
+        cutoff_number=1,
+        mask=mask_file,
+        screen_templates=True,
+        screen_refill=refill,
+    )
+    mols = [TreeMolecule(smiles="CCCCOc1ccc(CC(=O)N(C)O)cc1", parent=None)]
+
+    actions, _ = strategy.get_actions(mols)
+
+    # The rejected template is masked, so it would not have been selected anyway
+    assert [action.metadata["template_code"] for action in actions] == [0]
+    assert strategy.cache_statistics()["screened_templates"] == 0
+
+
+def test_template_based_expansion_bounded_cache(
+    default_config, mock_onnx_model, create_dummy_templates
+):
+    template_filename = create_dummy_templates(3)
+    expansion_policy = default_config.expansion_policy
+    expansion_policy.load_from_config(
+        **{
+            "policy1": {
+                "model": "dummy1.onnx",
+                "template": template_filename,
+                "cache_max_entries": 1,
+            }
+        },
+    )
+    policy = expansion_policy["policy1"]
+    mol1 = TreeMolecule(smiles="CCO", parent=None)
+    mol2 = TreeMolecule(smiles="CCCCO", parent=None)
+
+    policy([mol1])
+    actions, _ = policy([mol2])
+
+    assert all(action.mol is mol2 for action in actions)
+    assert policy.cache_statistics()["entries"] == 1
+    assert policy.cache_statistics()["evictions"] == 1
+
+
+def test_template_based_expansion_default_cache_bound(
+    default_config, mock_onnx_model, create_dummy_templates
+):
+    template_filename = create_dummy_templates(3)
+    expansion_policy = default_config.expansion_policy
+    expansion_policy.load_from_config(
+        **{
+            "policy1": {"model": "dummy1.onnx", "template": template_filename},
+            "policy2": {
+                "model": "dummy1.onnx",
+                "template": template_filename,
+                "cache_max_entries": None,
+            },
+        },
+    )
+    prediction = (np.array([0]), np.array([1.0]))
+    predictions = {str(idx): prediction for idx in range(DEFAULT_MAX_ENTRIES + 1)}
+
+    for key in ["policy1", "policy2"]:
+        expansion_policy[key]._cache.store(predictions)
+
+    stats = expansion_policy.cache_statistics()
+    assert stats["policy1"]["entries"] == DEFAULT_MAX_ENTRIES
+    assert stats["policy1"]["evictions"] == 1
+    assert stats["policy2"]["entries"] == DEFAULT_MAX_ENTRIES + 1
+    assert stats["policy2"]["evictions"] == 0
+    assert expansion_policy["policy1"].cache_capacity() == DEFAULT_MAX_ENTRIES
+    assert expansion_policy["policy2"].cache_capacity() == sys.maxsize
+
+    expansion_policy.select(["policy1", "policy2"])
+    assert expansion_policy.cache_capacity() == DEFAULT_MAX_ENTRIES
+
+
+def test_template_based_expansion_persistent_cache(
+    default_config, mock_onnx_model, create_dummy_templates, tmpdir, mocker
+):
+    template_filename = create_dummy_templates(3)
+    config = {
+        "model": "dummy1.onnx",
+        "template": template_filename,
+        "cache_path": str(tmpdir / "cache.db"),
+        "persistent_cache": True,
+    }
+    expansion_policy = default_config.expansion_policy
+    expansion_policy.load_from_config(**{"policy1": config})
+    expansion_policy.select("policy1")
+    predict_spy = mocker.spy(expansion_policy["policy1"].model, "predict")
+    mols = [TreeMolecule(smiles="CCO", parent=None)]
+
+    _, priors1 = expansion_policy(mols)
+    expansion_policy.reset_cache()
+    _, priors2 = expansion_policy(mols)
+
+    assert predict_spy.call_count == 1
+    assert priors1 == priors2
+    assert expansion_policy.cache_statistics()["policy1"]["hits"] == 1
+
+    # A re-loaded policy should read the predictions from disk
+    expansion_policy.load_from_config(**{"policy1": config})
+    predict_spy2 = mocker.spy(expansion_policy["policy1"].model, "predict")
+    _, priors3 = expansion_policy(mols)
+
+    assert predict_spy2.call_count == 0
+    assert priors3 == pytest.approx(priors1)
+    assert expansion_policy.cache_statistics()["policy1"]["disk_hits"] == 1
+
+    # A new connection, as opened in forked workers, reads the same database
+    cache = expansion_policy["policy1"]._cache
+    cache.clear()
+    cache.reconnect()
+
+    assert cache.lookup(mols[0].identity_key) is not None
+    assert cache.disk_hits == 2
+
+
 def test_masking_reaction_templates(
     default_config, mock_onnx_model, tmpdir, create_dummy_templates
 ):
@@ -376,6 +704,75 @@ def test_skip_filter_rejection(default_config, mock_onnx_model):
     assert filter_policy(reaction) is None
 
 
+def test_filter_apply_many(default_config, mock_onnx_model, mocker):
+    filter_policy = default_config.filter_policy
+    filter_policy.load_from_config(
+        **{"policy1": {"type": "quick-filter", "model": "dummy1.onnx"}}
+    )
+    filter_policy.select("policy1")
+    strategy = filter_policy["policy1"]
+    predict = mocker.patch.object(
+        strategy.model,
+        "predict",
+        side_effect=lambda prod_fp, rxn_fp, **_: np.full((len(prod_fp), 1), 0.2),
+    )
+    mol = TreeMolecule(
+        parent=None, smiles="CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    )
+    reaction1 = SmilesBasedRetroReaction(
+        mol, reactants_str="CN1CCC(Cl)CC1.N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F.O"
+    )
+    reaction2 = SmilesBasedRetroReaction(
+        mol, reactants_str="CN1CCCCC1.N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F"
+    )
+    reaction3 = SmilesBasedRetroReaction(mol, reactants_str="")
+
+    rejections = filter_policy.apply_many([reaction1, reaction2, reaction1.copy()])
+
+    assert rejections == [None, None, None]
+    predict.assert_called_once()
+    assert predict.call_args[0][0].shape[0] == 2
+
+    strategy.filter_cutoff = 0.9
+    rejections = filter_policy.apply_many([reaction1, reaction2, reaction3])
+
+    assert all(isinstance(err, RejectionException) for err in rejections)
+    predict.assert_called_once()
+    assert strategy.cache_statistics()["hits"] == 2
+
+    entries = filter_policy.cache_entries()
+    strategy.reset_cache()
+    assert strategy.cache_statistics()["entries"] == 0
+
+    filter_policy.restore_cache(entries)
+    assert list(entries["policy1"].values()) == [0.2, 0.2]
+    assert strategy.cache_statistics()["entries"] == 2
+    assert strategy._cache.max_entries == DEFAULT_MAX_ENTRIES
+    assert strategy.cache_statistics()["bytes"] == 2 * sys.getsizeof(0.2)
+
+
+def test_filter_apply_many_default(default_config):
+    smarts = (
+        "([C:3]-[N;H0;D2;+0:2]=[C;H0;D3;+0:1](-[c:4]1:[c:5]:[c:6]:[c:7]:[c:8]:[c:9]:1)-[c;H0;D3;+0:11](:[c:10]):[c:12])>>"
+        "(O=[C;H0;D3;+0:1](-[NH;D2;+0:2]-[C:3])-[c:4]1:[c:5]:[c:6]:[c:7]:[c:8]:[c:9]:1.[c:10]:[cH;D2;+0:11]:[c:12])"
+    )
+    mol = TreeMolecule(parent=None, smiles="c1c2c(ccc1)CCN=C2c3ccccc3")
+    rxn1 = TemplatedRetroReaction(mol=mol, smarts=smarts)
+    rxn2 = rxn1.copy(index=1)
+    if len(rxn1.reactants[0]) == 1:
+        rxn1, rxn2 = rxn2, rxn1
+    default_config.filter_policy.load(ReactantsCountFilter("dummy", default_config))
+
+    with pytest.raises(PolicyException, match="selected"):
+        default_config.filter_policy.apply_many([rxn1])
+
+    default_config.filter_policy.select("dummy")
+    rejections = default_config.filter_policy.apply_many([rxn1, rxn2])
+
+    assert isinstance(rejections[0], RejectionException)
+    assert rejections[1] is None
+
+
 def test_reactants_count_rejection(default_config):
     smarts = (
         "([C:3]-[N;H0;D2;+0:2]=[C;H0;D3;+0:1](-[c:4]1:[c:5]:[c:6]:[c:7]:[c:8]:[c:9]:1)-[c;H0;D3;+0:11](:[c:10]):[c:12])>>"
@@ -7,11 +7,16 @@ from aizynthfinder.chem import Molecule
 from aizynthfinder.context.stock import (
     StockException,
 )
-from aizynthfinder.context.stock.queries import HAS_MOLBLOOM
+from aizynthfinder.context.stock.queries import (
+    HAS_MOLBLOOM,
+    MemoryMappedInchiKeyQuery,
+    make_mmap_stock,
+)
 from aizynthfinder.tools.make_stock import (
     extract_plain_smiles,
     extract_smiles_from_module,
     make_hdf5_stock,
+    make_mmstock,
     make_mongo_stock,
     make_molbloom,
     make_molbloom_inchi,
@@ -112,6 +117,58 @@ def test_availability_string_multi(
     assert stock.availability_string(benzene) == "source1,stock1"
 
 
+def test_availability_many(
+    default_config, setup_stock_with_query, create_dummy_stock1, create_dummy_stock2
+):
+    stock = default_config.stock
+    stock.load(setup_stock_with_query(create_dummy_stock1("hdf5")), "stock1")
+    stock.load(setup_stock_with_query(create_dummy_stock2), "stock2")
+    stock.select(["stock1", "stock2"])
+    mols = [
+        Molecule(smiles="CCO"),
+        Molecule(smiles="c1ccccc1"),
+        Molecule(smiles="Cc1ccccc1"),
+    ]
+
+    assert stock.availability_many(mols) == [
+        "Not in stock",
+        "stock1,stock2",
+        "stock1",
+    ]
+
+
+def test_contains_many(
+    default_config,
+    setup_stock_with_query,
+    create_dummy_stock1,
+    create_dummy_stock2,
+    mocker,
+):
+    stock = default_config.stock
+    stock.load(setup_stock_with_query(create_dummy_stock1("hdf5")), "stock1")
+    stock.load(setup_stock_with_query(create_dummy_stock2), "stock2")
+    stock.select(["stock1", "stock2"])
+    ethanol = Molecule(smiles="CCO")
+    benzene = Molecule(smiles="c1ccccc1")
+    toluene = Molecule(smiles="Cc1ccccc1")
+    spy = mocker.spy(stock["stock2"], "contains_many")
+
+    assert stock.contains_many([ethanol, benzene, toluene, benzene]) == [
+        False,
+        True,
+        True,
+        True,
+    ]
+    # Only the molecule not found in the first stock is queried in the second stock
+    assert spy.call_args[0][0] == [ethanol]
+
+    stock.exclude(benzene)
+    assert stock.contains_many([ethanol, benzene, toluene]) == [False, False, True]
+
+    stock.select([])
+    assert stock.contains_many([toluene]) == [False]
+
+
 def test_mol_in_stock(setup_stock_with_query):
     stock = setup_stock_with_query()
 
@@ -436,6 +493,36 @@ def test_mongodb_availability(mocked_mongo_db_query):
     assert query.availability_string(benzene) == "source1,source2"
 
 
+def test_mongodb_contains_many(mocked_mongo_db_query):
+    _, query = mocked_mongo_db_query()
+    benzene = Molecule(smiles="c1ccccc1")
+    toluene = Molecule(smiles="Cc1ccccc1")
+    query.molecules.distinct.return_value = [benzene.inchi_key]
+
+    assert query.contains_many([benzene, toluene]) == [True, False]
+    query.molecules.distinct.assert_called_once_with(
+        "inchi_key", {"inchi_key": {"$in": [benzene.inchi_key, toluene.inchi_key]}}
+    )
+    query.molecules.count_documents.assert_not_called()
+
+
+def test_mongodb_availability_many(mocked_mongo_db_query):
+    _, query = mocked_mongo_db_query()
+    benzene = Molecule(smiles="c1ccccc1")
+    toluene = Molecule(smiles="Cc1ccccc1")
+    query.molecules.find.return_value = [
+        {"inchi_key": benzene.inchi_key, "source": "source1"},
+        {"inchi_key": benzene.inchi_key, "source": "source2"},
+        {"inchi_key": toluene.inchi_key, "source": "source2"},
+    ]
+
+    assert query.availability_many([benzene, toluene]) == [
+        "source1,source2",
+        "source2",
+    ]
+    query.molecules.find.assert_called_once()
+
+
 def test_mongodb_integration(default_config, mocked_mongo_db_query):
     _, query = mocked_mongo_db_query()
     query.molecules.count_documents.return_value = 1
@@ -537,3 +624,65 @@ def test_make_bloom_inchi_filter(default_config, tmpdir):
     stock.load_from_config(molbloom=filename)
 
     assert "molbloom" in stock.items
+
+
+def test_make_mmap_stock(default_config, tmpdir):
+    filename = str(tmpdir / "temp.mmstock")
+    inchi_keys = ("key2", "key1", "key2")
+
+    make_mmstock(inchi_keys, filename)
+    stock = default_config.stock
+    stock.load_from_config(stock1=filename)
+    stock.select(["stock1"])
+
+    assert isinstance(stock["stock1"], MemoryMappedInchiKeyQuery)
+    assert len(stock) == 2
+
+
+def test_mmap_stock_lookup(tmpdir):
+    filename = str(tmpdir / "temp.mmstock")
+    benzene = Molecule(smiles="c1ccccc1")
+    toluene = Molecule(smiles="Cc1ccccc1")
+    make_mmap_stock(
+        [toluene.inchi_key, "key1", benzene.inchi_key, toluene.inchi_key],
+        filename,
+        prices=[20.0, 1.0, 5.0, 10.0],
+    )
+
+    query = MemoryMappedInchiKeyQuery(filename)
+
+    assert len(query) == 3
+    assert benzene in query
+    assert Molecule(smiles="CCO") not in query
+    assert query.price(benzene) == 5.0
+    assert query.price(toluene) == 10.0
+    with pytest.raises(StockException):
+        query.price(Molecule(smiles="CCO"))
+    assert query.contains_inchi_keys(
+        ["key1", "key0", "key10", benzene.inchi_key, "X" * 30]
+    ).tolist() == [True, False, False, True, False]
+
+
+def test_mmap_stock_without_price(tmpdir):
+    filename = str(tmpdir / "temp.mmstock")
+    make_mmap_stock(["key1"], filename)
+
+    query = MemoryMappedInchiKeyQuery(filename)
+
+    with pytest.raises(StockException, match="no prices"):
+        query.price(Molecule(smiles="CCO"))
+
+
+def test_mmap_stock_invalid(tmpdir):
+    filename = str(tmpdir / "temp.mmstock")
+    with open(filename, "w") as fileobj:
+        fileobj.write("key1\n")
+
+    with pytest.raises(StockException):
+        MemoryMappedInchiKeyQuery(filename)
+
+    with pytest.raises(StockException):
+        make_mmap_stock(["X" * 28], filename)
+
+    with pytest.raises(StockException):
+        make_mmap_stock(["key1"], filename, prices=[-1.0])
@@ -101,3 +101,48 @@ def test_update(
 
     assert node.proven
     assert not node.disproven
+
+
+def test_promising_child_ties(default_config, setup_root, setup_policies):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    lookup = {
+        root_smi: [
+            {"smiles": "CN1CCC(Cl)CC1.N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F", "prior": 0.7},
+            {"smiles": "ClC(=O)c1ccc(F)cc1.CN1CCC(CC1)C(=O)c1cccc(N)c1F", "prior": 0.3},
+        ]
+    }
+    node = setup_root(root_smi)
+    setup_policies(lookup)
+    node.expand()
+
+    child = node.promising_child()
+
+    # Children with the same proof number are selected in order
+    assert child is node.children[0]
+    assert child.pn_threshold == 2
+    assert child.dn_threshold == BIG_INT
+
+    child.expand()
+    child.update()
+    node.update()
+
+    assert node.pn == 2
+    assert node.dn == 2
+    assert node.promising_child() is node.children[1]
+
+
+def test_shared_ancestors(
+    default_config, setup_root, setup_policies, get_linear_expansion
+):
+    node = setup_root("OOc1ccc(-c2ccc(NC3CCCC(C4C=CC=C4)C3)cc2)cc1")
+    setup_policies(get_linear_expansion)
+    node.expand()
+    child = node.promising_child()
+    child.expand()
+    grandchild = child.promising_child()
+
+    ancestors = grandchild._ancestors()
+
+    assert ancestors == {node.mol, grandchild.mol}
+    assert grandchild._ancestors() is ancestors
+    assert node._ancestors() == {node.mol}
@@ -69,3 +69,78 @@ def test_search_incomplete(default_config, setup_policies, setup_stock):
     routes = tree.routes()
     assert len(routes) == 2
     assert all(not route.is_solved for route in routes)
+
+
+def _search_setup(default_config, setup_policies, setup_stock):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    child1_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F", "O"]
+    child2_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F"]
+    grandchild_smi = ["N#Cc1cccc(N)c1F", "O=C(Cl)c1ccc(F)cc1"]
+    lookup = {
+        root_smi: [
+            {"smiles": ".".join(child1_smi), "prior": 0.7},
+            {"smiles": ".".join(child2_smi), "prior": 0.3},
+        ],
+        child1_smi[1]: {"smiles": ".".join(grandchild_smi), "prior": 0.7},
+    }
+    stock = [child1_smi[0], child1_smi[2]] + grandchild_smi
+    setup_policies(lookup, config=default_config)
+    setup_stock(default_config, *stock)
+    return root_smi
+
+
+def _run_search(tree):
+    results = []
+    while True:
+        try:
+            results.append(tree.one_iteration())
+        except StopIteration:
+            break
+    return results
+
+
+@pytest.mark.parametrize("use_table", [False, True])
+def test_search_incremental_numbers(
+    default_config, setup_policies, setup_stock, use_table
+):
+    default_config.search.algorithm_config["transposition_table"] = use_table
+    root_smi = _search_setup(default_config, setup_policies, setup_stock)
+    tree = SearchTree(default_config, root_smi)
+
+    _run_search(tree)
+
+    for mol_node in tree.mol_nodes:
+        for node in [mol_node] + mol_node.children:
+            open_children = [child for child in node.children if not child.closed]
+            if node.closed or not open_children:
+                continue
+            if node in tree.mol_nodes:
+                assert node.dn == sum(child.dn for child in open_children)
+                assert node.pn == min(1 + child.pn for child in open_children)
+            else:
+                assert node.pn == sum(child.pn for child in open_children)
+                assert node.dn == min(child.dn for child in open_children)
+
+
+def test_search_transposition_table(default_config, setup_policies, setup_stock):
+    root_smi = _search_setup(default_config, setup_policies, setup_stock)
+    tree1 = SearchTree(default_config, root_smi)
+    results1 = _run_search(tree1)
+    default_config.search.algorithm_config["transposition_table"] = True
+    tree2 = SearchTree(default_config, root_smi)
+
+    results2 = _run_search(tree2)
+
+    assert results2 == results1
+    assert len(tree2.routes()) == len(tree1.routes()) == 2
+    assert len(tree2.mol_nodes) == len(tree1.mol_nodes)
+    assert tree1.transpositions is None
+    assert tree1.profiling["transposition_hits"] == 0
+    assert len(tree2.transpositions) == 2
+    # The molecule that is reached twice is only expanded once
+    assert tree2.profiling["transposition_hits"] > 0
+    assert tree2.profiling["expansion_calls"] < tree1.profiling["expansion_calls"]
+    assert tree2.profiling["transposition_hits"] == 1
+    assert (
+        tree2.profiling["expansion_calls"] == tree1.profiling["expansion_calls"] - 1
+    )
@@ -1,3 +1,8 @@
+import pytest
+
+from aizynthfinder.search.mcts.utils import GrowableArray
+
+
 def test_root_state_properties(generate_root):
     root = generate_root("CCCCOc1ccc(CC(=O)N(C)O)cc1")
     root2 = generate_root("CCCCOc1ccc(CC(=O)N(C)O)cc1")
@@ -56,6 +61,19 @@ def test_expand_root_immediate_instantiation(setup_mcts_search, default_config):
     assert view["objects"][2] is None
 
 
+def test_instantiate_child_with_one_stock_query(setup_mcts_search, mocker):
+    root, _, _ = setup_mcts_search
+    root.expand()
+    spy = mocker.spy(root._config.stock, "contains_many")
+
+    child = root.promising_child()
+
+    spy.assert_called_once()
+    assert child.state.in_stock_list == [
+        mol in root._config.stock for mol in child.state.mols
+    ]
+
+
 def test_expand_when_solved(setup_mcts_search, setup_stock):
     root, _, _ = setup_mcts_search
     root.expand()
@@ -135,6 +153,37 @@ def test_backpropagate(setup_mcts_search):
     assert view_prior["values"][1:] == view_post["values"][1:]
 
 
+def test_child_statistics_lookup(setup_mcts_search):
+    root, _, _ = setup_mcts_search
+    root.expand()
+    child = root.promising_child()
+
+    root.backpropagate(child, 1.5)
+
+    stats = root[child]
+    assert stats["visitations"] == 2
+    assert stats["value"] == pytest.approx(0.7 + 1.5)
+    assert stats["prior"] == pytest.approx(0.7)
+    assert stats["action"] is root.children_view()["actions"][0]
+
+
+def test_growable_array():
+    array = GrowableArray([])
+    for value in range(10):
+        array.append(value)
+    array[1] += 2
+
+    assert len(array) == 10
+    assert array.tolist() == [0, 3, 2, 3, 4, 5, 6, 7, 8, 9]
+    assert array.view.max() == 9
+
+    array2d = GrowableArray([[1.0, 2.0]])
+    array2d.append(array2d[0])
+    array2d[1] += [1.0, 1.0]
+
+    assert array2d.tolist() == [[1.0, 2.0], [2.0, 3.0]]
+
+
 def test_expand_dead_end(setup_policies, generate_root):
     root_smiles = "CCCCOc1ccc(CC(=O)N(C)O)cc1"
     expansions = {root_smiles: []}
@@ -1,4 +1,7 @@
+import pytest
+
 from aizynthfinder.chem import TreeMolecule
+from aizynthfinder.chem.mol import set_identity_mode
 from aizynthfinder.chem.serialization import MoleculeDeserializer, MoleculeSerializer
 from aizynthfinder.search.mcts import MctsNode, MctsSearchTree, MctsState
 
@@ -156,3 +159,92 @@ def test_serialize_deserialize_tree(
     assert new_child.is_expanded
     assert str(root_new.state) == str(root.state)
     assert str(new_child.state) == str(child.state)
+
+
+def test_serialize_binary_tree_smiles_identity(
+    setup_complete_mcts_tree,
+    default_config,
+    tmpdir,
+):
+    tree, nodes = setup_complete_mcts_tree
+    root = nodes[0]
+    filename = str(tmpdir / "dummy.aztree")
+    set_identity_mode("smiles")
+    try:
+        for node in nodes:
+            for mol in node.state.mols:
+                assert mol.identity_key
+        smiles_key = root.state.mols[0].identity_key
+        tree.serialize(filename)
+        new_tree = MctsSearchTree.from_json(filename, default_config)
+
+        new_mol = new_tree.root.state.mols[0]
+        assert new_mol.identity_key == smiles_key
+        assert "rd_mol" not in vars(new_mol)
+    finally:
+        set_identity_mode("inchi_key")
+
+
+def test_serialize_deserialize_binary_tree(
+    setup_complete_mcts_tree,
+    default_config,
+    tmpdir,
+):
+    tree, nodes = setup_complete_mcts_tree
+    root, child, _ = nodes
+    filename = str(tmpdir / "dummy.aztree")
+
+    tree.serialize(filename)
+    new_tree = MctsSearchTree.from_json(filename, default_config)
+
+    root_new = new_tree.root
+    assert len(root_new.children) == 1
+    # The molecules are not parsed until used
+    assert "rd_mol" not in vars(root_new.state.mols[0])
+    assert root_new.state.mols[0].inchi_key == root.state.mols[0].inchi_key
+    assert "rd_mol" not in vars(root_new.state.mols[0])
+
+    new_child = root_new.children[0]
+    assert new_child.parent is root_new
+    assert root_new.children_view()["values"] == root.children_view()["values"]
+    assert root_new.children_view()["priors"] == root.children_view()["priors"]
+    assert (
+        root_new.children_view()["visitations"] == root.children_view()["visitations"]
+    )
+    assert root_new.is_expanded
+    assert new_child.children_view()["values"] == child.children_view()["values"]
+    assert new_child.children_view()["priors"] == child.children_view()["priors"]
+    assert (
+        new_child.children_view()["visitations"] == child.children_view()["visitations"]
+    )
+    assert new_child.is_expanded
+    assert str(root_new.state) == str(root.state)
+    assert str(new_child.state) == str(child.state)
+    assert [action.metadata for action in root_new.children_view()["actions"]] == [
+        action.metadata for action in root.children_view()["actions"]
+    ]
+    assert [
+        action.reactants_str for action in new_child.children_view()["actions"]
+    ] == [action.reactants_str for action in child.children_view()["actions"]]
+
+
+def test_serialize_binary_tree_twice(setup_complete_mcts_tree, default_config, tmpdir):
+    tree, _ = setup_complete_mcts_tree
+    filename1 = str(tmpdir / "tree1.aztree")
+    filename2 = str(tmpdir / "tree2.aztree")
+    tree.serialize(filename1)
+
+    # Saving a restored tree does not need to parse the molecules
+    MctsSearchTree.from_json(filename1, default_config).serialize(filename2)
+
+    with open(filename1, "rb") as fileobj1, open(filename2, "rb") as fileobj2:
+        assert fileobj1.read() == fileobj2.read()
+
+
+def test_deserialize_binary_tree_wrong_file(default_config, tmpdir):
+    filename = str(tmpdir / "dummy.aztree")
+    with open(filename, "wb") as fileobj:
+        fileobj.write(b"not a tree")
+
+    with pytest.raises(ValueError, match="not a binary search tree"):
+        MctsSearchTree.from_json(filename, default_config)
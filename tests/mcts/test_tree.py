@@ -1,3 +1,8 @@
+import pytest
+
+from aizynthfinder.search.mcts import MctsNode, MctsSearchTree
+
+
 def test_select_leaf_root(setup_complete_mcts_tree):
     tree, nodes = setup_complete_mcts_tree
     nodes[0].is_expanded = False
@@ -17,15 +22,16 @@ def test_select_leaf(setup_complete_mcts_tree):
 
 def test_backpropagation(setup_complete_mcts_tree, mocker):
     tree, nodes = setup_complete_mcts_tree
-    for node in nodes:
-        node.backpropagate = mocker.MagicMock()
+    patched_backpropagate = mocker.patch.object(
+        MctsNode, "backpropagate", autospec=True
+    )
     score = tree.reward_scorer[tree.reward_scorer_name](nodes[2])
 
     tree.backpropagate(nodes[2])
 
-    nodes[0].backpropagate.assert_called_once_with(nodes[1], score)
-    nodes[1].backpropagate.assert_called_once_with(nodes[2], score)
-    nodes[2].backpropagate.assert_not_called()
+    assert patched_backpropagate.call_count == 2
+    patched_backpropagate.assert_any_call(nodes[0], nodes[1], score)
+    patched_backpropagate.assert_any_call(nodes[1], nodes[2], score)
 
 
 def test_route_to_node(setup_complete_mcts_tree):
@@ -48,3 +54,134 @@ def test_create_graph(setup_complete_mcts_tree):
     assert len(graph) == 3
     assert list(graph.successors(nodes[0])) == [nodes[1]]
     assert list(graph.successors(nodes[1])) == [nodes[2]]
+
+
+def test_select_leaves_with_virtual_loss(setup_policies, default_config):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    lookup = {
+        root_smi: [
+            {"smiles": "CN1CCC(Cl)CC1.N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F.O", "prior": 0.7},
+            {"smiles": "CN1CCC(Cl)CC1.N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F", "prior": 0.3},
+        ]
+    }
+    setup_policies(lookup)
+    tree = MctsSearchTree(config=default_config, root_smiles=root_smi)
+    tree.root.expand()
+
+    leaves = tree.select_leaves(3)
+
+    assert len(leaves) == 2
+    assert leaves[0] is not leaves[1]
+    assert tree.root.children == leaves
+
+    tree.remove_virtual_loss(leaves)
+
+    assert tree.select_leaf() is leaves[0]
+
+
+@pytest.fixture
+def setup_transposed_nodes(default_config, setup_policies, setup_stock):
+    """
+    Setup a tree where the same expandable molecule is reached by
+    breaking down two other molecules in different order
+    """
+    default_config.search.algorithm_config["transposition_table"] = True
+    amide_smi = "CCCCOc1ccc(CC(=O)N(C)O)cc1"
+    root_smi = "c1ccc2ccccc2c1"
+    smarts = (
+        "([#8:4]-[N;H0;D3;+0:5](-[C;D1;H3:6])-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3])"
+        ">>(Cl-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3]).([#8:4]-[NH;D2;+0:5]-[C;D1;H3:6])"
+    )
+    lookup = {
+        root_smi: {"smiles": f"{amide_smi}.Brc1ccccc1.Ic1ccccc1", "prior": 1.0},
+        amide_smi: {"smarts": smarts, "prior": 0.1},
+        "Brc1ccccc1": {"smiles": "c1ccccc1.Br", "prior": 0.9},
+        "Ic1ccccc1": {"smiles": "c1ccccc1.I", "prior": 0.8},
+    }
+    setup_policies(lookup)
+    setup_stock(
+        default_config, "c1ccccc1", "Br", "I", "CNO", "CCCCOc1ccc(CC(=O)Cl)cc1"
+    )
+    tree = MctsSearchTree(config=default_config, root_smiles=root_smi)
+    tree.root.expand()
+    node1 = tree.root.promising_child()
+    node1.expand()
+    # Break down the bromide first and then the iodide
+    node2 = node1.promising_child()
+    node1.backpropagate(node2, -10.0)
+    node2.expand()
+    node3 = node2.promising_child()
+    # Break down the iodide first and then the bromide
+    node4 = node1.promising_child()
+    node4.expand()
+    node5 = node4.promising_child()
+    return tree, node3, node5
+
+
+def test_transposition_table(setup_transposed_nodes):
+    tree, node1, node2 = setup_transposed_nodes
+    assert node1.state.expandables_hash == node2.state.expandables_hash
+
+    node1.expand()
+    child1 = node1.promising_child()
+
+    assert tree.profiling["expansion_calls"] == 5
+    assert tree.profiling["reactants_generations"] == 6
+    assert tree.profiling["transposition_hits"] == 0
+
+    node2.expand()
+    child2 = node2.promising_child()
+
+    assert tree.profiling["expansion_calls"] == 5
+    assert tree.profiling["reactants_generations"] == 6
+    assert tree.profiling["transposition_hits"] == 1
+    assert tree.profiling["transposition_reactant_hits"] == 1
+    action1 = node1[child1]["action"]
+    action2 = node2[child2]["action"]
+    assert action2 is not action1
+    assert action2.smarts == action1.smarts
+    assert action2.mol in node2.state.mols
+    assert child2.state.is_solved
+    assert sorted(mol.mapped_smiles for mol in child2.state.mols) == sorted(
+        mol.mapped_smiles for mol in child1.state.mols
+    )
+
+
+def test_transposition_table_statistics(setup_transposed_nodes, default_config):
+    default_config.search.algorithm_config["transposition_statistics"] = True
+    _, node1, node2 = setup_transposed_nodes
+
+    node1.expand()
+    child1 = node1.promising_child()
+    node1.backpropagate(child1, 2.0)
+    node2.expand()
+
+    view = node2.children_view()
+    assert view["visitations"] == [2]
+    assert view["values"] == [pytest.approx(2.1)]
+
+
+@pytest.mark.parametrize("cache_capacity,expected_calls", [(0, 2), (100, 3)])
+def test_expand_nodes_model_calls(
+    setup_policies, default_config, mocker, cache_capacity, expected_calls
+):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    lookup = {
+        root_smi: [
+            {"smiles": "CN1CCC(Cl)CC1.N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F.O", "prior": 0.7},
+            {"smiles": "CN1CCC(Cl)CC1.N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F", "prior": 0.3},
+        ]
+    }
+    strategy, _ = setup_policies(lookup)
+    tree = MctsSearchTree(config=default_config, root_smiles=root_smi)
+    tree.root.expand()
+    leaves = tree.select_leaves(2)
+    tree.remove_virtual_loss(leaves)
+    mocker.patch.object(strategy, "cache_capacity", return_value=cache_capacity)
+    model_spy = mocker.spy(strategy, "get_actions")
+
+    tree._expand_nodes(leaves)
+
+    assert model_spy.call_count == expected_calls
+    prewarm_calls = [call for call in model_spy.call_args_list if not call.args[0]]
+    assert len(prewarm_calls) == expected_calls - 2
@@ -1,5 +1,9 @@
+import itertools
+import random
+
 import numpy as np
 
+from aizynthfinder.search.andor_trees import SplitAndOrTree
 from aizynthfinder.search.retrostar.search_tree import SearchTree
 from aizynthfinder.chem.serialization import MoleculeSerializer
 
@@ -13,6 +17,28 @@ def test_one_iteration(setup_search_tree):
     assert len(tree.root.children[0].children) == 3
 
 
+def test_one_iteration_template_executor(default_config, setup_policies, setup_stock):
+    root_smiles = "CCCCOc1ccc(CC(=O)N(C)O)cc1"
+    smarts = (
+        "([#8:4]-[N;H0;D3;+0:5](-[C;D1;H3:6])-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3])"
+        ">>(Cl-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3]).([#8:4]-[NH;D2;+0:5]-[C;D1;H3:6])"
+    )
+    default_config.search.algorithm_config["template_executor"] = "thread"
+    setup_policies({root_smiles: {"smarts": smarts, "prior": 1.0}})
+    setup_stock(default_config, "CCCCOc1ccc(CC(=O)Cl)cc1", "CNO")
+    tree = SearchTree(config=default_config, root_smiles=root_smiles)
+
+    tree.one_iteration()
+
+    assert tree.template_executor.mode == "thread"
+    assert len(tree.root.children) == 1
+    assert [child.mol.smiles for child in tree.root.children[0].children] == [
+        "CCCCOc1ccc(CC(=O)Cl)cc1",
+        "CNO",
+    ]
+    assert tree.root.solved
+
+
 def test_one_iteration_filter_unfeasible(setup_search_tree):
     tree = setup_search_tree
     smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1>>CN1CCC(Cl)CC1.N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F.O"
@@ -107,6 +133,29 @@ def test_serialization_deserialization(
     assert len(new_tree.root.children) == len(tree.root.children)
 
 
+def test_serialization_deserialization_binary(shared_datadir, tmpdir, default_config):
+    tree = SearchTree.from_json(
+        str(shared_datadir / "andor_tree_for_clustering.json"), default_config
+    )
+    filename = str(tmpdir / "tree.aztree")
+
+    tree.serialize(filename)
+    new_tree = SearchTree.from_json(filename, default_config)
+
+    assert len(new_tree.mol_nodes) == len(tree.mol_nodes)
+    for new_node, node in zip(new_tree.mol_nodes, tree.mol_nodes):
+        assert new_node.mol.inchi_key == node.mol.inchi_key
+        assert new_node.value == node.value
+        assert new_node.cost == node.cost
+        assert new_node.expandable == node.expandable
+        assert new_node.solved == node.solved
+    for new_child, child in zip(new_tree.root.children, tree.root.children):
+        assert new_child.reaction.metadata == child.reaction.metadata
+        assert new_child.target_value == child.target_value
+        assert new_child.solved == child.solved
+    assert len(new_tree.routes()) == 97
+
+
 def test_split_andor_tree(shared_datadir, default_config):
     tree = SearchTree.from_json(
         str(shared_datadir / "andor_tree_for_clustering.json"), default_config
@@ -117,7 +166,59 @@ def test_split_andor_tree(shared_datadir, default_config):
     assert len(routes) == 97
 
 
-def test_update(shared_datadir, default_config, setup_stock):
+def test_split_andor_tree_lazy(shared_datadir, default_config):
+    tree = SearchTree.from_json(
+        str(shared_datadir / "andor_tree_for_clustering.json"), default_config
+    )
+    random.seed(1)
+    routes = tree.routes()
+    random.seed(1)
+
+    lazy_routes = list(
+        SplitAndOrTree(tree.root, default_config.stock, lazy=True).iter_routes()
+    )
+
+    assert [route.hash_key() for route in lazy_routes] == [
+        route.hash_key() for route in routes
+    ]
+
+
+def test_split_andor_tree_interleaved(shared_datadir, default_config):
+    tree = SearchTree.from_json(
+        str(shared_datadir / "andor_tree_for_clustering.json"), default_config
+    )
+    expected = {route.hash_key() for route in tree.routes()}
+    splitter = SplitAndOrTree(tree.root, default_config.stock, lazy=True)
+
+    hashes1 = []
+    hashes2 = []
+    for route1, route2 in itertools.zip_longest(
+        splitter.iter_routes(), splitter.iter_routes()
+    ):
+        if route1 is not None:
+            hashes1.append(route1.hash_key())
+        if route2 is not None:
+            hashes2.append(route2.hash_key())
+
+    assert len(hashes1) == len(hashes2) == 97
+    assert set(hashes1) == set(hashes2) == expected
+
+
+def test_split_andor_tree_stop_early(shared_datadir, default_config):
+    tree = SearchTree.from_json(
+        str(shared_datadir / "andor_tree_for_clustering.json"), default_config
+    )
+
+    routes = list(itertools.islice(tree.iter_routes(), 3))
+
+    assert len(routes) == 3
+    assert len({route.hash_key() for route in routes}) == 3
+    assert routes[0].is_solved == tree.root.solved
+    # The routes are not cached by the tree
+    assert len(tree.routes()) == 97
+
+
+def test_update(shared_datadir, default_config, setup_stock, tmpdir):
     # Todo: re-write
     setup_stock(
         default_config,
@@ -141,4 +242,51 @@ def test_update(shared_datadir, default_config, setup_stock):
     ]
     assert tree.root.value == saved_root_value
 
-    tree.serialize("temp.json")
+    tree.serialize(str(tmpdir / "tree.json"))
+
+
+def _select_by_scan(tree):
+    scores = [
+        node.target_value if node.expandable else np.inf for node in tree.mol_nodes
+    ]
+    if min(scores) == np.inf:
+        return None
+    return tree.mol_nodes[int(np.argmin(scores))]
+
+
+def test_frontier_selection(shared_datadir, default_config):
+    tree = SearchTree.from_json(
+        str(shared_datadir / "andor_tree_for_clustering.json"), default_config
+    )
+
+    assert tree.frontier.select() is _select_by_scan(tree)
+
+    for idx, node in enumerate(tree.mol_nodes[::-7]):
+        if node.parent:
+            node.parent.update(idx % 5 - 1.5, from_mol=node.mol)
+        assert tree.frontier.select() is _select_by_scan(tree)
+
+    for node in tree.mol_nodes:
+        node.expandable = False
+
+    assert tree.frontier.select() is None
+
+
+def test_frontier_in_search(setup_search_tree):
+    tree = setup_search_tree
+
+    tree.one_iteration()
+
+    assert tree.frontier.select() is _select_by_scan(tree)
+    assert all(node.frontier is tree.frontier for node in tree.mol_nodes)
+
+
+def test_molecule_costs_in_one_batch(setup_search_tree, mocker):
+    tree = setup_search_tree
+    spy = mocker.spy(tree.molecule_cost.molecule_cost, "calculate_many")
+
+    tree.one_iteration()
+
+    spy.assert_called_once()
+    assert len(spy.call_args[0][0]) == 3
+    assert len(tree.mol_nodes) == 4
@@ -43,3 +43,53 @@ def test_molecule_cost_retrostar(default_config, setup_mocked_model):
 
     molecule_cost = MoleculeCost(default_config)(mol)
     assert pytest.approx(molecule_cost, abs=0.001) == 30
+
+
+def test_retrostar_cost_many(setup_mocked_model):
+    mols = [Molecule(smiles="CCCC"), Molecule(smiles="CCO"), Molecule(smiles="C")]
+    cost = RetroStarCost(model_path="dummy", fingerprint_length=10, dropout_rate=0.0)
+
+    costs = cost.calculate_many(mols)
+
+    assert costs == pytest.approx([cost.calculate(mol) for mol in mols])
+    assert cost.calculate_many([]) == []
+
+
+def test_molecule_cost_memo(default_config, setup_mocked_model, mocker):
+    default_config.search.algorithm_config["molecule_cost"] = {
+        "cost": "aizynthfinder.search.retrostar.cost.RetroStarCost",
+        "model_path": "dummy",
+        "fingerprint_length": 10,
+        "dropout_rate": 0.0,
+    }
+    molecule_cost = MoleculeCost(default_config)
+    spy = mocker.spy(molecule_cost.molecule_cost, "calculate_many")
+    mols = [Molecule(smiles="CCCC"), Molecule(smiles="CCO"), Molecule(smiles="CCCC")]
+
+    costs = molecule_cost.calculate_many(mols)
+
+    assert costs[0] == costs[2]
+    assert costs[0] == pytest.approx(30, abs=0.001)
+    spy.assert_called_once()
+    assert len(spy.call_args[0][0]) == 2
+
+    assert molecule_cost(Molecule(smiles="OCC")) == costs[1]
+    spy.assert_called_once()
+    assert molecule_cost.hits == 2
+    assert molecule_cost.misses == 2
+
+
+class SmilesLengthCost:
+    def calculate(self, mol):
+        return len(mol.smiles)
+
+
+def test_molecule_cost_without_batch(default_config):
+    default_config.search.algorithm_config["molecule_cost"] = {
+        "cost": f"{__name__}.SmilesLengthCost"
+    }
+    molecule_cost = MoleculeCost(default_config)
+
+    costs = molecule_cost.calculate_many([Molecule(smiles="CC"), Molecule(smiles="CCO")])
+
+    assert costs == [2, 3]
@@ -132,6 +132,20 @@ def test_tree_statistics_andor_tree(setup_analysis_andor_tree):
     assert stats["policy_used_counts"] == {}
 
 
+def test_tree_analysis_max_routes(setup_analysis_andor_tree):
+    search_tree = setup_analysis_andor_tree().search_tree
+    analysis = TreeAnalysis(
+        search_tree, scorer=NumberOfReactionsScorer(), max_routes=10
+    )
+
+    stats = analysis.tree_statistics()
+    best_routes, _ = analysis.sort(RouteSelectionArguments(nmin=1, nmax=20))
+
+    assert stats["number_of_routes"] == 10
+    assert len(best_routes) <= 10
+    assert analysis.best() is best_routes[0]
+
+
 def test_tree_statistics_multiobjective(
     setup_analysis, default_config, setup_mo_scorer
 ):
@@ -2,6 +2,7 @@ import glob
 import json
 import os
 import sys
+import time
 from typing import Dict, List
 
 import pandas as pd
@@ -10,6 +11,7 @@ import yaml
 
 from aizynthfinder.analysis import RouteCollection
 from aizynthfinder.chem import MoleculeException
+from aizynthfinder.context.policy.template_library import TemplateLibrary
 from aizynthfinder.interfaces import AiZynthApp
 from aizynthfinder.interfaces.aizynthapp import main as app_main
 from aizynthfinder.interfaces.aizynthcli import main as cli_main
@@ -17,6 +19,8 @@ from aizynthfinder.reactiontree import ReactionTree
 from aizynthfinder.tools.cat_output import main as cat_main
 from aizynthfinder.tools.download_public_data import main as download_main
 from aizynthfinder.tools.make_stock import main as make_stock_main
+from aizynthfinder.tools.make_template_library import main as make_templates_main
+from aizynthfinder.utils.files import iter_datafile
 
 try:
     from aizynthfinder.interfaces.gui import ClusteringGui
@@ -290,6 +294,206 @@ def test_cli_multiple_smiles_with_checkpoint(
     pd.testing.assert_frame_equal(results_output, multi_smiles_with_checkpoint_results)
 
 
+def test_cli_multiple_smiles_streaming_output(
+    mocker,
+    add_cli_arguments,
+    tmpdir,
+    create_dummy_smiles_source,
+):
+    finder_patch = mocker.patch("aizynthfinder.interfaces.aizynthcli.AiZynthFinder")
+    finder_patch.return_value.extract_statistics.return_value = {
+        "a": 1,
+        "b": 2,
+        "is_solved": True,
+    }
+    finder_patch.return_value.tree_search.return_value = 1.5
+    finder_patch.return_value.stock_info.return_value = 1
+    finder_patch.return_value.routes.dict_with_extra.return_value = [{"tree": 3}]
+    pd_patch = mocker.patch(
+        "aizynthfinder.interfaces.aizynthcli.pd.DataFrame.from_dict"
+    )
+    smiles_input = create_dummy_smiles_source("txt")
+    output_name = str(tmpdir / "data.jsonl.gz")
+    add_cli_arguments(
+        f"--smiles {smiles_input} --config config_local.yml --output {output_name}"
+    )
+
+    cli_main()
+
+    pd_patch.assert_not_called()
+    records = list(iter_datafile(output_name))
+    assert len(records) == 4
+    assert records[0] == {
+        "a": 1,
+        "b": 2,
+        "is_solved": True,
+        "stock_info": 1,
+        "trees": [{"tree": 3}],
+    }
+
+
+def test_cli_multiple_smiles_with_snapshots(
+    mocker,
+    add_cli_arguments,
+    tmpdir,
+    create_dummy_smiles_source,
+):
+    finder_patch = mocker.patch("aizynthfinder.interfaces.aizynthcli.AiZynthFinder")
+    finder = finder_patch.return_value
+    finder.extract_statistics.return_value = {"a": 1, "is_solved": False}
+    finder.tree_search.return_value = 1.5
+    finder.stock_info.return_value = 1
+    finder.routes.dict_with_extra.return_value = [{"tree": 3}]
+    finder.search_stats = {}
+    smiles_input = create_dummy_smiles_source("txt")
+    output_name = str(tmpdir / "data.jsonl.gz")
+    snapshot_dir = str(tmpdir / "snapshots")
+    add_cli_arguments(
+        f"--smiles {smiles_input} --config config_local.yml --output {output_name} "
+        f"--snapshots {snapshot_dir}"
+    )
+
+    cli_main()
+
+    assert os.path.isdir(snapshot_dir)
+    finder.load_snapshot.assert_not_called()
+    assert finder.save_snapshot.call_count == 4
+    snapshots = [args[0] for args, _ in finder.save_snapshot.call_args_list]
+    # The same target gets the same snapshot
+    assert len(set(snapshots)) == 3
+    assert snapshots[0] == snapshots[2]
+    assert all(os.path.dirname(filename) == snapshot_dir for filename in snapshots)
+
+    # The search of an unsolved target is continued from its snapshot
+    open(snapshots[1], "w").close()
+    finder.reset_mock()
+
+    cli_main()
+
+    finder.load_snapshot.assert_called_once_with(snapshots[1])
+    assert finder.prepare_tree.call_count == 3
+    assert finder.tree_search.call_args_list[1] == mocker.call(
+        show_progress=False, continue_search=True
+    )
+    assert finder.save_snapshot.call_count == 4
+
+    # A solved target is not searched again
+    finder.reset_mock()
+    finder.search_stats = {"first_solution_time": 1.0}
+
+    cli_main()
+
+    finder.load_snapshot.assert_called_once_with(snapshots[1])
+    assert finder.tree_search.call_count == 3
+    assert finder.save_snapshot.call_count == 3
+
+
+def test_cli_snapshots_unsupported_tree(
+    mocker,
+    add_cli_arguments,
+    tmpdir,
+    create_dummy_smiles_source,
+):
+    finder_patch = mocker.patch("aizynthfinder.interfaces.aizynthcli.AiZynthFinder")
+    finder = finder_patch.return_value
+    finder.extract_statistics.return_value = {"a": 1, "is_solved": False}
+    finder.tree_search.return_value = 1.5
+    finder.stock_info.return_value = 1
+    finder.routes.dict_with_extra.return_value = [{"tree": 3}]
+    finder.tree = mocker.MagicMock(spec=[])
+    smiles_input = create_dummy_smiles_source("txt")
+    output_name = str(tmpdir / "data.jsonl.gz")
+    add_cli_arguments(
+        f"--smiles {smiles_input} --config config_local.yml --output {output_name} "
+        f"--snapshots {str(tmpdir / 'snapshots')}"
+    )
+
+    cli_main()
+
+    assert finder.tree_search.call_count == 4
+    finder.save_snapshot.assert_not_called()
+    assert len(list(iter_datafile(output_name))) == 4
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32", reason="the worker pool requires forked processes"
+)
+def test_cli_multiple_smiles_worker_pool(
+    mocker,
+    add_cli_arguments,
+    tmpdir,
+    create_dummy_smiles_source,
+    expected_checkpoint_output,
+    multi_smiles_with_checkpoint_results,
+):
+    finder_patch = mocker.patch("aizynthfinder.interfaces.aizynthcli.AiZynthFinder")
+    finder_patch.return_value.extract_statistics.return_value = {
+        "a": 1,
+        "b": 2,
+        "is_solved": True,
+    }
+    finder_patch.return_value.tree_search.return_value = 1.5
+    finder_patch.return_value.stock_info.return_value = 1
+    finder_patch.return_value.routes.dict_with_extra.return_value = 3
+    multiprocess_patch = mocker.patch(
+        "aizynthfinder.interfaces.aizynthcli._multiprocess_smiles"
+    )
+
+    smiles_input = create_dummy_smiles_source("txt")
+    output_name = str(tmpdir / "data.json.gz")
+    checkpoint = str(tmpdir / "checkpoint.json.gz")
+    add_cli_arguments(
+        f"--smiles {smiles_input} --config config_local.yml --output {output_name} "
+        f"--checkpoint {checkpoint} --nproc 2 --worker_pool"
+    )
+
+    cli_main()
+
+    with open(checkpoint) as json_file:
+        checkpoint_output = [json.loads(line) for line in json_file]
+    results_output = pd.read_json(output_name, orient="table")
+
+    multiprocess_patch.assert_not_called()
+    finder_patch.assert_called_once_with(configfile="config_local.yml")
+    assert checkpoint_output == expected_checkpoint_output
+    pd.testing.assert_frame_equal(results_output, multi_smiles_with_checkpoint_results)
+
+
+def test_cli_multiple_smiles_worker_pool_input_order(
+    mocker, add_cli_arguments, tmpdir
+):
+    smiles = ["c1ccccc1", "Cc1ccccc1", "CCO", "CCCO"]
+    finder_patch = mocker.patch("aizynthfinder.interfaces.aizynthcli.AiZynthFinder")
+    finder = finder_patch.return_value
+
+    def tree_search(**_):
+        # The first target is completed after the others
+        if finder.target_smiles == smiles[0]:
+            time.sleep(0.5)
+        return 1.5
+
+    finder.tree_search.side_effect = tree_search
+    finder.extract_statistics.side_effect = lambda: {
+        "target": finder.target_smiles,
+        "is_solved": True,
+    }
+    finder.stock_info.return_value = 1
+    finder.routes.dict_with_extra.return_value = 3
+    smiles_input = str(tmpdir / "smiles_source.txt")
+    with open(smiles_input, "w") as fileobj:
+        fileobj.write("\n".join(smiles))
+    output_name = str(tmpdir / "data.json.gz")
+    add_cli_arguments(
+        f"--smiles {smiles_input} --config config_local.yml --output {output_name} "
+        "--nproc 2 --worker_pool"
+    )
+
+    cli_main()
+
+    results_output = pd.read_json(output_name, orient="table")
+    assert results_output["target"].tolist() == smiles
+
+
 def test_cli_multiple_smiles_unsanitizable(
     mocker,
     add_cli_arguments,
@@ -386,6 +590,17 @@ def test_make_stock_from_plain_file(
     assert len(default_config.stock) == 3
 
 
+def test_make_template_library(create_dummy_templates, tmpdir, add_cli_arguments):
+    input_name = create_dummy_templates(3)
+    output_name = str(tmpdir / "templates.mmtpl")
+    add_cli_arguments(f"--input {input_name} --output {output_name}")
+
+    make_templates_main()
+
+    library = TemplateLibrary.from_file(output_name)
+    assert list(library.templates) == list(pd.read_hdf(input_name, "table")["retro_template"])
+
+
 def test_cat_main(tmpdir, add_cli_arguments, create_dummy_stock1, create_dummy_stock2):
     filename = str(tmpdir / "output.hdf")
     inputs = [create_dummy_stock1("hdf5"), create_dummy_stock2]
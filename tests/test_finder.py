@@ -1,8 +1,11 @@
 import logging
+import os
 
+import numpy as np
 import pandas as pd
 import pytest
 from aizynthfinder.aizynthfinder import AiZynthFinder
+from aizynthfinder.chem.template_cache import compiled_templates
 
 
 def state_smiles(state):
@@ -931,3 +934,162 @@ def test_one_expansion_multistep(setup_aizynthfinder):
     assert nodes[1].created_at_iteration == 1
     assert finder.search_stats["iterations"] == 1
     assert finder.search_stats["returned_first"]
+
+
+def test_two_expansions_two_children_leaf_batch(setup_aizynthfinder, mocker):
+    """
+    Test the building of this tree, selecting two leaves in each iteration:
+                root
+            /           \
+        child 1        child 2
+            |             |
+        grandchild 1   grandchild 2
+    """
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    child1_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F", "O"]
+    child2_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F"]
+    grandchild_smi = ["N#Cc1cccc(N)c1F", "O=C(Cl)c1ccc(F)cc1"]
+    lookup = {
+        root_smi: [
+            {"smiles": ".".join(child1_smi), "prior": 0.7},
+            {"smiles": ".".join(child2_smi), "prior": 0.3},
+        ],
+        child1_smi[1]: {"smiles": ".".join(grandchild_smi), "prior": 0.7},
+        child2_smi[1]: {"smiles": ".".join(grandchild_smi), "prior": 0.7},
+    }
+    finder = setup_aizynthfinder(
+        lookup, [child1_smi[0], child1_smi[2]] + grandchild_smi
+    )
+    finder.config.search.algorithm_config["leaf_batch_size"] = 2
+    finder.config.search.iteration_limit = 2
+    finder.prepare_tree()
+    select_spy = mocker.spy(finder.tree, "select_leaves")
+
+    finder.tree_search()
+
+    nodes = list(finder.tree.graph())
+    assert len(nodes) == 5
+    assert finder.search_stats["iterations"] == 2
+    assert [len(leaves) for leaves in select_spy.spy_return_list] == [1, 2]
+    assert all(not node._virtual_losses for node in nodes)
+    assert nodes[0].children_view()["visitations"] == [3, 2]
+
+
+def test_save_and_load_snapshot(setup_aizynthfinder, tmpdir, mocker):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    child1_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F", "O"]
+    child2_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F"]
+    grandchild_smi = ["N#Cc1cccc(N)c1F", "O=C(Cl)c1ccc(F)cc1"]
+    lookup = {
+        root_smi: [
+            {"smiles": ".".join(child1_smi), "prior": 0.7},
+            {"smiles": ".".join(child2_smi), "prior": 0.3},
+        ],
+        child1_smi[1]: {"smiles": ".".join(grandchild_smi), "prior": 0.7},
+        child2_smi[1]: {"smiles": ".".join(grandchild_smi), "prior": 0.7},
+    }
+    stock = [child1_smi[0], child1_smi[2]] + grandchild_smi
+    finder = setup_aizynthfinder(lookup, stock)
+    finder.config.search.iteration_limit = 1
+    finder.tree_search()
+    mocker.patch.object(
+        finder.expansion_policy["dummy"],
+        "cache_entries",
+        return_value={"AAA": (np.array([1, 2]), np.array([0.5, 0.25]))},
+    )
+    filename = str(tmpdir / "snapshot.aztree")
+
+    finder.save_snapshot(filename)
+
+    assert not [name for name in os.listdir(str(tmpdir)) if name.endswith(".tmp")]
+
+    finder2 = setup_aizynthfinder(lookup, stock)
+    restore_patch = mocker.patch.object(
+        finder2.expansion_policy["dummy"], "restore_cache"
+    )
+    finder2.load_snapshot(filename)
+
+    assert finder2.target_smiles == finder.target_smiles
+    assert len(finder2.tree.graph()) == len(finder.tree.graph())
+    assert finder2.tree.profiling == finder.tree.profiling
+    assert finder2.search_stats == finder.search_stats
+    indices, priors = restore_patch.call_args[0][0]["AAA"]
+    assert indices.tolist() == [1, 2]
+    assert priors.tolist() == [0.5, 0.25]
+
+    finder2.config.search.iteration_limit = 2
+    finder2.tree_search(continue_search=True)
+
+    # The continued search should give the same tree as an uninterrupted search
+    finder.config.search.iteration_limit = 3
+    finder.prepare_tree()
+    finder.tree_search()
+    nodes = list(finder2.tree.graph())
+    expected_nodes = list(finder.tree.graph())
+    assert len(nodes) == len(expected_nodes) == 5
+    assert [node.created_at_iteration for node in nodes] == [
+        node.created_at_iteration for node in expected_nodes
+    ]
+    assert finder2.search_stats["iterations"] == 3
+    assert finder2.search_stats["first_solution_iteration"] == 1
+
+
+def test_load_snapshot_not_a_snapshot(setup_aizynthfinder, tmpdir):
+    root_smi = "CCCO"
+    finder = setup_aizynthfinder({root_smi: []}, [])
+    finder.prepare_tree()
+    filename = str(tmpdir / "tree.aztree")
+    finder.tree.serialize(filename)
+
+    with pytest.raises(ValueError, match="does not contain a snapshot"):
+        finder.load_snapshot(filename)
+
+
+def test_molecule_pool(setup_aizynthfinder):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    child_smi = "CN1CCC(Cl)CC1.N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F.O"
+    lookup = {root_smi: {"smiles": child_smi, "prior": 1.0}}
+    finder = setup_aizynthfinder(lookup, [])
+    finder.config.search.iteration_limit = 5
+
+    finder.prepare_tree()
+    finder.tree_search()
+
+    # The pool is not used by default
+    assert finder.search_stats["molecule_pool"] == {}
+
+    finder.config.search.molecule_pool = True
+    finder.prepare_tree()
+    finder.tree_search()
+
+    expected = {"hits": 0, "misses": 3, "evictions": 0, "entries": 3}
+    assert finder.search_stats["molecule_pool"] == expected
+
+    finder.prepare_tree()
+    finder.tree_search()
+
+    assert finder.search_stats["molecule_pool"] == expected
+
+    finder.config.search.persistent_molecule_pool = True
+    finder.prepare_tree()
+    finder.tree_search()
+
+    expected = {"hits": 3, "misses": 0, "evictions": 0, "entries": 3}
+    assert finder.search_stats["molecule_pool"] == expected
+
+
+def test_template_cache_size(setup_aizynthfinder):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    child_smi = "CN1CCC(Cl)CC1.N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F.O"
+    lookup = {root_smi: {"smiles": child_smi, "prior": 1.0}}
+    finder = setup_aizynthfinder(lookup, [])
+    finder.config.search.template_cache_size = 10
+
+    finder.prepare_tree()
+
+    assert compiled_templates().max_entries == 10
+
+    finder.config.search.template_cache_size = 5000
+    finder.prepare_tree()
+
+    assert compiled_templates().max_entries == 5000
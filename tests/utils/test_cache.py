@@ -0,0 +1,70 @@
+from aizynthfinder.utils.cache import LruCache
+
+
+def test_lru_cache_get():
+    cache = LruCache()
+    cache["a"] = 1
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.statistics()["hits"] == 1
+    assert cache.statistics()["misses"] == 1
+
+
+def test_lru_cache_evict_on_entries():
+    cache = LruCache(max_entries=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    cache.get("a")
+    cache["c"] = 3
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.evictions == 1
+
+
+def test_lru_cache_evict_on_bytes():
+    cache = LruCache(max_bytes=10, sizeof=len)
+    cache["a"] = "aaaa"
+    cache["b"] = "bbbb"
+    cache["c"] = "cccc"
+
+    assert list(cache) == ["b", "c"]
+    assert cache.nbytes == 8
+    assert cache.evictions == 1
+
+
+def test_lru_cache_clear_and_reset():
+    cache = LruCache()
+    cache["a"] = 1
+    cache.get("a")
+
+    cache.clear()
+    cache.reset_statistics()
+
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+    assert cache.statistics()["hits"] == 0
+
+
+def test_lru_cache_resize():
+    cache = LruCache()
+    cache["a"] = 1
+    cache["b"] = 2
+    cache["c"] = 3
+
+    cache.resize(1)
+
+    assert list(cache) == ["c"]
+    assert cache.evictions == 2
+
+
+def test_lru_cache_items():
+    cache = LruCache()
+    cache["a"] = 1
+    cache["b"] = 2
+    cache.get("a")
+
+    assert list(cache.items()) == [("b", 2), ("a", 1)]
+    assert cache.statistics()["hits"] == 1
@@ -2,11 +2,14 @@ import os
 import gzip
 import json
 
+import numpy as np
 import pytest
 import pandas as pd
 
 from aizynthfinder.utils.files import (
+    JsonLinesWriter,
     cat_datafiles,
+    iter_datafile,
     split_file,
     start_processes,
     read_datafile,
@@ -132,6 +135,8 @@ def test_cat_hdf_trees(tmpdir):
     [
         ("temp.json"),
         ("temp.hdf5"),
+        ("temp.jsonl"),
+        ("temp.jsonl.gz"),
     ],
 )
 def test_save_load_datafile_roundtrip(filename, tmpdir):
@@ -144,3 +149,40 @@ def test_save_load_datafile_roundtrip(filename, tmpdir):
     assert data1.columns.to_list() == data2.columns.to_list()
     assert data1.a.to_list() == data2.a.to_list()
     assert data1.b.to_list() == data2.b.to_list()
+
+
+def test_jsonl_writer(tmpdir):
+    filename = str(tmpdir / "output.jsonl.gz")
+
+    with JsonLinesWriter(filename) as writer:
+        writer.write({"a": np.int64(1), "trees": [{"smiles": "CCO"}]})
+    with JsonLinesWriter(filename, append=True) as writer:
+        writer.write({"a": 2, "trees": np.array([])})
+
+    records = iter_datafile(filename)
+
+    assert next(records) == {"a": 1, "trees": [{"smiles": "CCO"}]}
+    assert next(records) == {"a": 2, "trees": []}
+    with pytest.raises(StopIteration):
+        next(records)
+    assert writer.nrecords == 1
+
+
+def test_cat_jsonl_trees(tmpdir):
+    filename = str(tmpdir / "output.jsonl.gz")
+    tree_filename = str(tmpdir / "trees.json")
+    filename1 = str(tmpdir / "file1.hdf5")
+    filename2 = str(tmpdir / "file2.jsonl.gz")
+    trees1 = [[1], [2]]
+    trees2 = [[3], [4]]
+    pd.DataFrame({"mol": ["A", "B"], "trees": trees1}).to_hdf(filename1, "table")
+    save_datafile(pd.DataFrame({"mol": ["C", "D"], "trees": trees2}), filename2)
+
+    cat_datafiles([filename1, filename2], filename, tree_filename)
+
+    with gzip.open(tree_filename + ".gz", "rt", encoding="UTF-8") as fileobj:
+        trees_cat = json.load(fileobj)
+    assert trees_cat == trees1 + trees2
+    data = read_datafile(filename)
+    assert data.mol.to_list() == ["A", "B", "C", "D"]
+    assert "trees" not in data
@@ -30,3 +30,14 @@ def test_local_onnx_model_output_size(
     expected_output = 3
 
     assert output == expected_output
+
+
+def test_local_onnx_model_reset_session(
+    mock_onnx_model: pytest_mock.MockerFixture,
+) -> None:
+    onnx_model = models.LocalOnnxModel("test_model.onnx")
+
+    onnx_model.reset_session()
+
+    assert mock_onnx_model.call_count == 2
+    assert mock_onnx_model.call_args[0][0] == "test_model.onnx"